@@ -1,14 +1,24 @@
 from __future__ import annotations
 
+import json
+import os
 import re
-from dataclasses import dataclass
+import tempfile
+from dataclasses import asdict, dataclass, field
 from datetime import datetime
 from pathlib import Path
-from typing import Callable, Iterable
+from typing import TYPE_CHECKING, Callable, Iterable
 
 from openpyxl import load_workbook
 from openpyxl.workbook.defined_name import DefinedName
 
+from file_copy import file_sha256
+from index_trie import as_index_trie
+from run_history import RunRecorder, run_stage, total_size
+
+if TYPE_CHECKING:
+    from folder_catalog import FolderCatalog
+
 
 StatusCallback = Callable[[str], None] | None
 NormalizeKey = Callable[[str], str]
@@ -17,6 +27,7 @@ DATE_FORMAT = "dd.mm.yyyy"
 REPORT_NAME_RANGE = "ReportName"
 CREATED_DATE_RANGE = "CreatedDate"
 EXTRA_FIELD_RANGE = "ExtraField1"
+CMM_MANIFEST_NAME = ".cmm_manifest.json"
 RE_INDEX = re.compile(
     r"\b([IVXLCDM]+)\.(\d+)(?:\.(\d+))?(?:\.(\d+))?([A-Za-z\u0400-\u04FF])?\b",
     re.IGNORECASE,
@@ -30,6 +41,15 @@ class CommentSheetResult:
     created: list[Path]
     skipped_existing: list[Path]
     failed: list[tuple[Path, str]]
+    updated: list[Path] = field(default_factory=list)
+
+
+@dataclass
+class CmmManifestEntry:
+    """Входные данные, по которым был собран CMM."""
+
+    template_sha256: str
+    extra_value: str
 
 
 def _notify(callback: StatusCallback, message: str) -> None:
@@ -38,6 +58,26 @@ def _notify(callback: StatusCallback, message: str) -> None:
         callback(message)
 
 
+def load_cmm_manifest(base_dir: Path) -> dict[str, CmmManifestEntry]:
+    """Читает манифест CMM папки; повреждённый манифест считается пустым."""
+    try:
+        data = json.loads((base_dir / CMM_MANIFEST_NAME).read_text(encoding="utf-8"))
+        return {key: CmmManifestEntry(**value) for key, value in data.items()}
+    except FileNotFoundError:
+        return {}
+    except (ValueError, TypeError, AttributeError):
+        return {}
+
+
+def save_cmm_manifest(base_dir: Path, entries: dict[str, CmmManifestEntry]) -> None:
+    """Сохраняет манифест CMM атомарной заменой файла."""
+    path = base_dir / CMM_MANIFEST_NAME
+    tmp_path = path.with_name(path.name + ".tmp")
+    payload = {key: asdict(value) for key, value in sorted(entries.items())}
+    tmp_path.write_text(json.dumps(payload, ensure_ascii=False, indent=1), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
 def _iter_candidate_files(base_dir: Path) -> Iterable[Path]:
     """Возвращает поток файлов с поддерживаемыми расширениями."""
     for ext in SUPPORTED_EXTENSIONS:
@@ -97,24 +137,34 @@ def fill_basic_fields(workbook, report_name: str) -> None:
         ensure_named_range(worksheet, workbook, worksheet["D4"], CREATED_DATE_RANGE)
 
 
-def fill_extra_fields(
-    workbook, report_name: str, tz_map: dict[str, str], normalize_key: NormalizeKey
-) -> None:
-    """Устанавливает описание из TZ в именованный диапазон ExtraField1."""
-    worksheet = workbook.active
+def resolve_extra_value(
+    report_name: str,
+    tz_map: dict[str, str],
+    normalize_key: NormalizeKey,
+    status_callback: StatusCallback = None,
+) -> str:
+    """Возвращает описание из TZ для ExtraField1 (или пояснение, почему его нет).
+
+    Если точного индекса в TZ нет, берётся описание ближайшего предка
+    (`IndexTrie.lookup`); об этом сообщается в `status_callback`.
+    """
     index_code = extract_index_from_name(report_name)
+    if not index_code:
+        return f"Индекс отсутствует ({report_name})"
+    match = as_index_trie(tz_map, normalize_key).lookup(index_code)
+    if match and match.value:
+        if not match.exact:
+            _notify(
+                status_callback,
+                f"Описание для {index_code} взято от {match.key} (уровней вверх: {match.depth})",
+            )
+        return match.value
+    return f"Нет описания для {index_code}"
 
-    extra_value = "Отсутствует информация в TZ"
-    if index_code:
-        lookup_key = normalize_key(index_code)
-        description = tz_map.get(lookup_key)
-        if description:
-            extra_value = description
-        else:
-            extra_value = f"Нет описания для {index_code}"
-    else:
-        extra_value = f"Индекс отсутствует ({report_name})"
 
+def write_extra_value(workbook, extra_value: str) -> None:
+    """Записывает значение в именованный диапазон ExtraField1 (или D6)."""
+    worksheet = workbook.active
     defined = dict(workbook.defined_names.items())
     if EXTRA_FIELD_RANGE in defined:
         for sheet, coord in defined[EXTRA_FIELD_RANGE].destinations:
@@ -125,23 +175,67 @@ def fill_extra_fields(
         ensure_named_range(worksheet, workbook, worksheet["D6"], EXTRA_FIELD_RANGE)
 
 
+def fill_extra_fields(
+    workbook,
+    report_name: str,
+    tz_map: dict[str, str],
+    normalize_key: NormalizeKey,
+    extra_value: str | None = None,
+) -> str:
+    """Устанавливает описание из TZ в именованный диапазон ExtraField1.
+
+    Уже найденное описание передаётся в `extra_value`, чтобы не искать его повторно.
+    """
+    if extra_value is None:
+        extra_value = resolve_extra_value(report_name, tz_map, normalize_key)
+    write_extra_value(workbook, extra_value)
+    return extra_value
+
+
 def create_comment_sheet(
     report_path: Path,
     template_path: Path,
     tz_map: dict[str, str],
     normalize_key: NormalizeKey,
+    extra_value: str | None = None,
+    replace: bool = False,
 ) -> Path:
-    """Создаёт новый CMM рядом с исходным отчётом."""
+    """Создаёт CMM рядом с исходным отчётом.
+
+    Книга сохраняется во временный файл той же папки и подменяет CMM только
+    после успешной записи, поэтому при ошибке пересборки (`replace=True`)
+    прежний CMM остаётся на месте.
+    """
     stem = report_path.stem
     output_path = report_path.with_name(f"{stem}_CMM.xlsx")
-    if output_path.exists():
+    if output_path.exists() and not replace:
         raise FileExistsError(str(output_path))
 
     workbook = load_workbook(template_path)
     workbook.template = False
     fill_basic_fields(workbook, stem)
-    fill_extra_fields(workbook, stem, tz_map, normalize_key)
-    workbook.save(output_path)
+    fill_extra_fields(workbook, stem, tz_map, normalize_key, extra_value)
+    handle, tmp_name = tempfile.mkstemp(
+        prefix=f".{output_path.stem}.", suffix=".tmp", dir=output_path.parent
+    )
+    os.close(handle)
+    try:
+        workbook.save(tmp_name)
+        os.replace(tmp_name, output_path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+    return output_path
+
+
+def patch_comment_sheet(output_path: Path, extra_value: str) -> Path:
+    """Обновляет ExtraField1 в существующем CMM, не пересобирая его из шаблона."""
+    workbook = load_workbook(output_path)
+    try:
+        write_extra_value(workbook, extra_value)
+        workbook.save(output_path)
+    finally:
+        workbook.close()
     return output_path
 
 
@@ -151,8 +245,19 @@ def generate_comment_sheets(
     tz_map: dict[str, str],
     normalize_key: NormalizeKey,
     status_callback: StatusCallback = None,
+    catalog: FolderCatalog | None = None,
+    incremental: bool = False,
+    run_metrics: RunRecorder | None = None,
 ) -> CommentSheetResult:
-    """Генерирует CMM для всех подходящих файлов в каталоге."""
+    """Генерирует CMM для всех подходящих файлов в каталоге.
+
+    С `catalog` кандидаты берутся из общего каталога сессии, а не с диска.
+    Для каждого CMM в манифест `.cmm_manifest.json` записываются хеш шаблона
+    и описание ExtraField1. С `incremental` существующие CMM не пропускаются:
+    при новом описании из TZ ячейка правится на месте, при сменившемся
+    шаблоне CMM пересобирается; неизменённые CMM не открываются.
+    Длительности поиска, заполнения и записи манифеста пишутся в `run_metrics`.
+    """
     resolved_dir = source_dir.resolve()
     if not resolved_dir.exists() or not resolved_dir.is_dir():
         raise FileNotFoundError(f"Каталог не найден: {resolved_dir}")
@@ -160,8 +265,15 @@ def generate_comment_sheets(
         raise FileNotFoundError(f"Шаблон не найден: {template_path}")
 
     _notify(status_callback, f"Поиск файлов для CMM в {resolved_dir}")
-    candidates = sorted({p for p in _iter_candidate_files(resolved_dir)})
+    with run_stage(run_metrics, "scan"):
+        if catalog is not None:
+            candidates = catalog.files(resolved_dir, SUPPORTED_EXTENSIONS)
+        else:
+            candidates = sorted({p for p in _iter_candidate_files(resolved_dir)})
+    if run_metrics is not None:
+        run_metrics.set_input(len(candidates), total_size(candidates))
     created: list[Path] = []
+    updated: list[Path] = []
     skipped: list[Path] = []
     failed: list[tuple[Path, str]] = []
 
@@ -169,28 +281,65 @@ def generate_comment_sheets(
         _notify(status_callback, "Нет файлов для обработки")
         return CommentSheetResult(created=[], skipped_existing=[], failed=[])
 
-    for candidate in candidates:
-        name_upper = candidate.name.upper()
-        if not name_upper.startswith("CT-DR-"):
-            continue
-
-        _notify(status_callback, f"Обработка файла {candidate.name}")
+    template_sha256 = file_sha256(template_path)
+    tz_map = as_index_trie(tz_map, normalize_key)
+    manifest = load_cmm_manifest(resolved_dir)
+    manifest_changed = False
+
+    with run_stage(run_metrics, "fill"):
+        for candidate in candidates:
+            name_upper = candidate.name.upper()
+            if not name_upper.startswith("CT-DR-"):
+                continue
+
+            output_path = candidate.with_name(f"{candidate.stem}_CMM.xlsx")
+            key = output_path.relative_to(resolved_dir).as_posix()
+            extra_value = resolve_extra_value(candidate.stem, tz_map, normalize_key, status_callback)
+            expected = CmmManifestEntry(template_sha256, extra_value)
+
+            _notify(status_callback, f"Обработка файла {candidate.name}")
+            try:
+                if incremental and output_path.exists():
+                    known = manifest.get(key)
+                    if known == expected:
+                        skipped.append(candidate)
+                        continue
+                    if known is not None and known.template_sha256 != template_sha256:
+                        create_comment_sheet(
+                            candidate, template_path, tz_map, normalize_key, extra_value, replace=True
+                        )
+                        _notify(status_callback, f"Пересобран (новый шаблон): {output_path.name}")
+                    else:
+                        patch_comment_sheet(output_path, extra_value)
+                        _notify(status_callback, f"Обновлено описание: {output_path.name}")
+                    updated.append(output_path)
+                else:
+                    result_path = create_comment_sheet(
+                        candidate, template_path, tz_map, normalize_key, extra_value
+                    )
+                    created.append(result_path)
+                    _notify(status_callback, f"Создан: {result_path.name}")
+            except FileExistsError:
+                skipped.append(candidate)
+                _notify(
+                    status_callback, f"Пропущен (уже существует CMM): {candidate.name}"
+                )
+                continue
+            except Exception as error:  # noqa: BLE001
+                failed.append((candidate, str(error)))
+                _notify(status_callback, f"Ошибка: {candidate.name} - {error}")
+                continue
+
+            manifest[key] = expected
+            manifest_changed = True
+
+    if manifest_changed:
         try:
-            result_path = create_comment_sheet(
-                candidate, template_path, tz_map, normalize_key
-            )
-        except FileExistsError:
-            skipped.append(candidate)
-            _notify(
-                status_callback, f"Пропущен (уже существует CMM): {candidate.name}"
-            )
-            continue
-        except Exception as error:  # noqa: BLE001
-            failed.append((candidate, str(error)))
-            _notify(status_callback, f"Ошибка: {candidate.name} - {error}")
-            continue
+            with run_stage(run_metrics, "manifest"):
+                save_cmm_manifest(resolved_dir, manifest)
+        except OSError as error:
+            _notify(status_callback, f"Манифест CMM не сохранён: {error}")
 
-        created.append(result_path)
-        _notify(status_callback, f"Создан: {result_path.name}")
-
-    return CommentSheetResult(created=created, skipped_existing=skipped, failed=failed)
+    return CommentSheetResult(
+        created=created, skipped_existing=skipped, failed=failed, updated=updated
+    )
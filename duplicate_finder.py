@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Sequence
+
+from file_copy import file_sha256
+from io_scheduler import AdaptiveIOScheduler
+
+
+HASH_CACHE_FILE_NAME = "hash_cache.json"
+HASH_CACHE_VERSION = 1
+PARTIAL_HASH_BLOCK = 64 * 1024  # начало и конец файла для предварительного сравнения
+HASH_CACHE_MAX_AGE_DAYS = 30  # записи, к которым не обращались дольше, не сохраняются
+
+
+def partial_hash(path: Path, size: int) -> str:
+    """SHA-256 первых и последних `PARTIAL_HASH_BLOCK` байт файла."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as source:
+        digest.update(source.read(PARTIAL_HASH_BLOCK))
+        if size > 2 * PARTIAL_HASH_BLOCK:
+            source.seek(size - PARTIAL_HASH_BLOCK)
+            digest.update(source.read(PARTIAL_HASH_BLOCK))
+        elif size > PARTIAL_HASH_BLOCK:
+            digest.update(source.read())
+    return digest.hexdigest()
+
+
+class HashCache:
+    """Кэш хешей файлов по пути, размеру и mtime (JSON рядом с настройками).
+
+    Запись устаревает при любом изменении размера или mtime. Методы можно
+    вызывать из нескольких потоков; на диск кэш пишется только `save()`.
+    Записи чистятся лениво, без обращения к диску при сохранении: запись
+    исчезнувшего файла удаляется при первом обращении к нему, а записи, к
+    которым не обращались `HASH_CACHE_MAX_AGE_DAYS` дней, не сохраняются.
+    """
+
+    def __init__(self, path: Path | None = None) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: dict[str, dict[str, object]] = {}
+        self._dirty = False
+        self._today = int(time.time() // 86400)
+        self.hits = 0
+        if path is not None:
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+                if data.get("version") == HASH_CACHE_VERSION:
+                    self._entries = dict(data.get("files", {}))
+            except (OSError, ValueError, AttributeError):
+                self._entries = {}
+        for entry in self._entries.values():
+            entry.setdefault("used", self._today)
+
+    @staticmethod
+    def _key(path: Path) -> str:
+        return str(path.resolve())
+
+    def _stat(self, path: Path, key: str) -> os.stat_result:
+        try:
+            return path.stat()
+        except FileNotFoundError:
+            with self._lock:
+                if self._entries.pop(key, None) is not None:
+                    self._dirty = True
+            raise
+
+    def _entry(self, key: str, stat: os.stat_result) -> dict[str, object]:
+        """Запись файла с актуальными размером и mtime; вызывается под блокировкой."""
+        entry = self._entries.get(key)
+        if entry is None or entry.get("size") != stat.st_size or entry.get("mtime_ns") != stat.st_mtime_ns:
+            entry = self._entries[key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        if entry.get("used") != self._today:
+            entry["used"] = self._today
+            self._dirty = True
+        return entry
+
+    def _lookup(self, path: Path, field_name: str, compute: Callable[[Path, int], str]) -> str:
+        key = self._key(path)
+        stat = self._stat(path, key)
+        with self._lock:
+            entry = self._entry(key, stat)
+            cached = entry.get(field_name)
+            if cached is not None:
+                self.hits += 1
+                return str(cached)
+        value = compute(path, stat.st_size)
+        with self._lock:
+            entry[field_name] = value
+            self._dirty = True
+        return value
+
+    def sha256(self, path: Path) -> str:
+        """Полный SHA-256 файла (подходит как `hash_file` для манифеста и реестра)."""
+        return self._lookup(path, "sha256", lambda file_path, _size: file_sha256(file_path))
+
+    def partial(self, path: Path) -> str:
+        return self._lookup(path, "partial", partial_hash)
+
+    def cached_sha256(self, path: Path) -> str | None:
+        """SHA-256 из кэша без чтения файла; `None`, если файл с такими размером и mtime не хешировался."""
+        stat = self._stat(path, self._key(path))
+        return self.known_sha256(path, stat.st_size, stat.st_mtime_ns)
+
+    def remember_sha256(self, path: Path, sha256: str) -> None:
+        """Запоминает SHA-256, посчитанный попутно (например, при записи архива)."""
+        key = self._key(path)
+        stat = self._stat(path, key)
+        with self._lock:
+            entry = self._entry(key, stat)
+            entry["sha256"] = sha256
+            self._dirty = True
+
+    def known_sha256(self, path: Path, size: int, mtime_ns: int) -> str | None:
+        with self._lock:
+            entry = self._entries.get(self._key(path))
+        if entry and entry.get("size") == size and entry.get("mtime_ns") == mtime_ns:
+            value = entry.get("sha256")
+            return str(value) if value is not None else None
+        return None
+
+    def save(self) -> None:
+        """Сохраняет кэш атомарной заменой файла; давно не использованные записи отбрасываются.
+
+        Временный файл создаётся с уникальным именем в той же папке, так что
+        GUI и обработчик могут сохранять общий кэш одновременно.
+        """
+        if self.path is None or not self._dirty:
+            return
+        oldest = self._today - HASH_CACHE_MAX_AGE_DAYS
+        with self._lock:
+            files = {key: value for key, value in self._entries.items() if int(value.get("used", 0)) >= oldest}
+            payload = json.dumps({"version": HASH_CACHE_VERSION, "files": files}, ensure_ascii=False)
+            self._dirty = False
+        handle, tmp_name = tempfile.mkstemp(prefix=f"{self.path.name}.", suffix=".tmp", dir=self.path.parent)
+        try:
+            with os.fdopen(handle, "w", encoding="utf-8") as stream:
+                stream.write(payload)
+            os.replace(tmp_name, self.path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+
+@dataclass
+class DuplicateReport:
+    """Группы файлов с одинаковым содержимым; первый файл группы — основной."""
+
+    groups: list[list[Path]] = field(default_factory=list)
+    hashed_partial: int = 0
+    hashed_full: int = 0
+
+    @property
+    def duplicates(self) -> dict[Path, Path]:
+        """Повторяющийся файл → основной файл с тем же содержимым."""
+        return {copy: group[0] for group in self.groups for copy in group[1:]}
+
+    @property
+    def duplicate_count(self) -> int:
+        return sum(len(group) - 1 for group in self.groups)
+
+    def saved_bytes(self) -> int:
+        return sum(group[0].stat().st_size * (len(group) - 1) for group in self.groups)
+
+
+def _regroup(
+    candidates: list[list[Path]],
+    hash_func: Callable[[Path], str],
+    scheduler: AdaptiveIOScheduler,
+) -> tuple[list[list[Path]], int]:
+    """Делит группы-кандидаты по значению `hash_func`, отбрасывая одиночные файлы."""
+    pending = [path for group in candidates for path in group]
+    hashes = dict(zip(pending, scheduler.map(hash_func, pending)))
+    regrouped: list[list[Path]] = []
+    for group in candidates:
+        by_hash: dict[str, list[Path]] = {}
+        for path in group:
+            by_hash.setdefault(hashes[path], []).append(path)
+        regrouped.extend(paths for paths in by_hash.values() if len(paths) > 1)
+    return regrouped, len(pending)
+
+
+def find_duplicates(
+    files: Sequence[Path],
+    scheduler: AdaptiveIOScheduler | None = None,
+    cache: HashCache | None = None,
+) -> DuplicateReport:
+    """Находит файлы с одинаковым содержимым.
+
+    Сначала файлы группируются по размеру (без чтения), затем совпавшие по
+    размеру сравниваются по хешу начала и конца, и только оставшиеся —
+    по полному SHA-256. Хеши считаются параллельно и берутся из `cache`,
+    если файл не менялся. Порядок файлов в группах совпадает с `files`.
+    """
+    scheduler = scheduler or AdaptiveIOScheduler()
+    cache = cache or HashCache()
+    report = DuplicateReport()
+
+    unique_files = list(dict.fromkeys(files))
+    by_size: dict[int, list[Path]] = {}
+    for path in unique_files:
+        by_size.setdefault(path.stat().st_size, []).append(path)
+    candidates = [group for group in by_size.values() if len(group) > 1]
+    if not candidates:
+        return report
+
+    # Если полные хеши уже в кэше, предварительное сравнение не нужно
+    known_groups: list[list[Path]] = []
+    unknown_groups: list[list[Path]] = []
+    for group in candidates:
+        stats = [path.stat() for path in group]
+        if all(cache.known_sha256(path, stat.st_size, stat.st_mtime_ns) for path, stat in zip(group, stats)):
+            known_groups.append(group)
+        else:
+            unknown_groups.append(group)
+
+    partial_groups, report.hashed_partial = _regroup(unknown_groups, cache.partial, scheduler)
+    full_groups, report.hashed_full = _regroup(known_groups + partial_groups, cache.sha256, scheduler)
+
+    order = {path: position for position, path in enumerate(unique_files)}
+    report.groups = sorted(
+        (sorted(group, key=order.__getitem__) for group in full_groups),
+        key=lambda group: order[group[0]],
+    )
+    return report
+
+
+__all__ = [
+    "HASH_CACHE_FILE_NAME",
+    "HASH_CACHE_MAX_AGE_DAYS",
+    "DuplicateReport",
+    "HashCache",
+    "find_duplicates",
+    "partial_hash",
+]
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import errno
+import hashlib
+import os
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO
+
+
+COPY_CHUNK_SIZE = 8 * 1024 * 1024
+COPY_METHOD_COPY_FILE_RANGE = "copy_file_range"
+COPY_METHOD_SENDFILE = "sendfile"
+COPY_METHOD_BUFFERED = "buffered"
+# Ошибки, при которых системный вызов копирования просто не подходит для этой пары файлов.
+KERNEL_COPY_UNSUPPORTED = {
+    errno.EXDEV,
+    errno.ENOSYS,
+    errno.EINVAL,
+    errno.EBADF,
+    errno.EOPNOTSUPP,
+    errno.ENOTSUP,
+}
+# `sendfile` в обычный файл работает только в Linux (в macOS — лишь в сокет, ENOTSOCK)
+SENDFILE_TO_FILES = sys.platform.startswith("linux")
+
+
+@dataclass
+class CopyResult:
+    """Итог копирования одного файла."""
+
+    path: Path
+    size: int
+    method: str
+    sha256: str | None = None
+
+
+def _kernel_copy(source: BinaryIO, target: BinaryIO) -> tuple[str | None, int]:
+    """Копирует через `copy_file_range`/`sendfile`; возвращает метод и число байт.
+
+    Если ни один вызов не доступен, метод равен `None`, а позиции файлов
+    указывают на место, с которого нужно продолжить обычным чтением. Любая
+    ошибка до первого скопированного байта ведёт к обычному чтению, а после
+    него пробрасывается, если это не ошибка «вызов не поддерживается».
+    """
+    in_fd, out_fd = source.fileno(), target.fileno()
+    copied = 0
+
+    if hasattr(os, "copy_file_range"):
+        try:
+            while True:
+                sent = os.copy_file_range(in_fd, out_fd, COPY_CHUNK_SIZE)
+                if sent == 0:
+                    return COPY_METHOD_COPY_FILE_RANGE, copied
+                copied += sent
+        except OSError as error:
+            if copied and error.errno not in KERNEL_COPY_UNSUPPORTED:
+                raise
+
+    if SENDFILE_TO_FILES and hasattr(os, "sendfile"):
+        try:
+            while True:
+                sent = os.sendfile(out_fd, in_fd, copied, COPY_CHUNK_SIZE)
+                if sent == 0:
+                    return COPY_METHOD_SENDFILE, copied
+                copied += sent
+                target.seek(copied)
+        except OSError as error:
+            if copied and error.errno not in KERNEL_COPY_UNSUPPORTED:
+                raise
+
+    source.seek(copied)
+    target.seek(copied)
+    return None, copied
+
+
+def _buffered_copy(source: BinaryIO, target: BinaryIO, digest=None) -> int:
+    """Копирует крупными блоками, по желанию обновляя хеш в том же проходе."""
+    buffer = bytearray(COPY_CHUNK_SIZE)
+    view = memoryview(buffer)
+    copied = 0
+    while True:
+        read = source.readinto(buffer)
+        if not read:
+            return copied
+        chunk = view[:read]
+        target.write(chunk)
+        if digest is not None:
+            digest.update(chunk)
+        copied += read
+
+
+def copy_file(src: Path, dest: Path, compute_sha256: bool = False) -> CopyResult:
+    """Копирует содержимое файла без прав доступа и метаданных.
+
+    Без контрольной суммы данные передаются ядром (`copy_file_range`,
+    затем `sendfile`), а при их недоступности — блочным чтением. С
+    `compute_sha256=True` файл читается один раз, и SHA-256 считается
+    в том же проходе, что и запись.
+    """
+    with open(src, "rb") as source, open(dest, "wb") as target:
+        if compute_sha256:
+            digest = hashlib.sha256()
+            size = _buffered_copy(source, target, digest)
+            return CopyResult(dest, size, COPY_METHOD_BUFFERED, digest.hexdigest())
+
+        method, copied = _kernel_copy(source, target)
+        if method is None:
+            copied += _buffered_copy(source, target)
+            method = COPY_METHOD_BUFFERED
+        return CopyResult(dest, copied, method)
+
+
+def file_sha256(path: Path) -> str:
+    """Считает SHA-256 файла блочным чтением."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as source:
+        buffer = bytearray(COPY_CHUNK_SIZE)
+        view = memoryview(buffer)
+        while read := source.readinto(buffer):
+            digest.update(view[:read])
+    return digest.hexdigest()
+
+
+__all__ = [
+    "COPY_CHUNK_SIZE",
+    "CopyResult",
+    "copy_file",
+    "file_sha256",
+]
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from cmm_builder import extract_index_from_name
+from index_folder_builder import extract_grouping_key
+
+# Грубейшая гранулярность mtime среди поддерживаемых ФС (FAT — 2 с)
+MTIME_GRANULARITY_NS = 2_000_000_000
+
+
+@dataclass(frozen=True)
+class CatalogEntry:
+    """Файл из каталога сессии с заранее разобранными метаданными имени."""
+
+    path: Path
+    extension: str
+    grouping_key: str | None
+    index_code: str | None
+
+    @property
+    def name(self) -> str:
+        return self.path.name
+
+
+@dataclass
+class _DirectorySnapshot:
+    mtime_ns: int
+    files: tuple[CatalogEntry, ...]
+    subdirs: tuple[Path, ...]
+    racy: bool = False
+
+
+def _make_entry(path: Path) -> CatalogEntry:
+    return CatalogEntry(
+        path=path,
+        extension=path.suffix.lower(),
+        grouping_key=extract_grouping_key(path.name),
+        index_code=extract_index_from_name(path.name),
+    )
+
+
+class FolderCatalog:
+    """Общий для вкладок каталог файлов: каждая папка сканируется один раз.
+
+    Содержимое каждой папки кешируется вместе с её mtime; при следующем
+    запросе папка перечитывается, только если mtime изменился (файл добавлен,
+    удалён или переименован). Для неизменных папок стоимость запроса — один
+    `stat` на каталог, без повторного разбора имён файлов.
+
+    Снимок папки, mtime которой отстоит от момента сканирования меньше чем на
+    `racy_window_ns`, не считается надёжным: на ФС с грубыми отметками времени
+    изменение сразу после сканирования может не сдвинуть mtime, поэтому такая
+    папка перечитывается при каждом запросе, пока её mtime не «устареет».
+    """
+
+    def __init__(self, racy_window_ns: int = MTIME_GRANULARITY_NS) -> None:
+        self._snapshots: dict[Path, _DirectorySnapshot] = {}
+        self.racy_window_ns = racy_window_ns
+        self._lock = threading.Lock()
+        self.scanned_dirs = 0
+
+    def _snapshot(self, directory: Path) -> _DirectorySnapshot | None:
+        try:
+            mtime_ns = directory.stat().st_mtime_ns
+        except OSError:
+            self._snapshots.pop(directory, None)
+            return None
+
+        cached = self._snapshots.get(directory)
+        if cached is not None and cached.mtime_ns == mtime_ns and not cached.racy:
+            return cached
+
+        scanned_ns = time.time_ns()
+        files: list[CatalogEntry] = []
+        subdirs: list[Path] = []
+        try:
+            with os.scandir(directory) as iterator:
+                for item in iterator:
+                    try:
+                        if item.is_dir(follow_symlinks=False):
+                            subdirs.append(Path(item.path))
+                        elif item.is_file():
+                            files.append(_make_entry(Path(item.path)))
+                    except OSError:
+                        continue
+        except OSError:
+            self._snapshots.pop(directory, None)
+            return None
+
+        racy = scanned_ns - mtime_ns < self.racy_window_ns
+        snapshot = _DirectorySnapshot(mtime_ns, tuple(files), tuple(subdirs), racy)
+        self._snapshots[directory] = snapshot
+        self.scanned_dirs += 1
+        return snapshot
+
+    def iter_entries(
+        self, root: Path, extensions: Iterable[str] | None = None
+    ) -> Iterator[CatalogEntry]:
+        """Выдаёт файлы дерева `root` папка за папкой, без общего списка и сортировки.
+
+        Блокировка берётся только на чтение снимка одной папки, поэтому
+        медленный потребитель не задерживает другие вкладки.
+        """
+        allowed = {ext.lower() for ext in extensions} if extensions is not None else None
+        pending = [root.resolve()]
+        while pending:
+            with self._lock:
+                snapshot = self._snapshot(pending.pop())
+            if snapshot is None:
+                continue
+            pending.extend(snapshot.subdirs)
+            if allowed is None:
+                yield from snapshot.files
+            else:
+                yield from (e for e in snapshot.files if e.extension in allowed)
+
+    def entries(
+        self, root: Path, extensions: Iterable[str] | None = None
+    ) -> list[CatalogEntry]:
+        """Возвращает файлы дерева `root` (рекурсивно), отсортированные по пути.
+
+        `extensions` — необязательный набор расширений в нижнем регистре.
+        """
+        result = list(self.iter_entries(root, extensions))
+        result.sort(key=lambda entry: entry.path)
+        return result
+
+    def files(self, root: Path, extensions: Iterable[str] | None = None) -> list[Path]:
+        """Пути файлов дерева `root`, как у `sorted(root.rglob('*'))`."""
+        return [entry.path for entry in self.entries(root, extensions)]
+
+    def invalidate(self, path: Path | None = None) -> None:
+        """Сбрасывает кеш папки `path` и её подпапок (или весь кеш)."""
+        with self._lock:
+            if path is None:
+                self._snapshots.clear()
+                return
+            resolved = path.resolve()
+            for directory in list(self._snapshots):
+                if directory == resolved or resolved in directory.parents:
+                    del self._snapshots[directory]
+
+
+__all__ = [
+    "CatalogEntry",
+    "FolderCatalog",
+    "MTIME_GRANULARITY_NS",
+]
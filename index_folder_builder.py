@@ -1,16 +1,42 @@
 from __future__ import annotations
 
+import errno
+import json
+import os
 import re
 import shutil
-from collections import defaultdict
+import threading
+from collections import Counter
+from contextlib import nullcontext
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import islice
 from pathlib import Path
-from typing import Callable, TypedDict
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows: reflink через ioctl недоступен
+    fcntl = None  # type: ignore[assignment]
 
 from openpyxl import load_workbook
 from openpyxl.utils.cell import column_index_from_string
 
+from file_copy import copy_file, file_sha256
+from index_trie import IndexTrie, TrieMatch
+from index_plan import FileSpool, scan_keys, spool_files, stream_files
+from io_scheduler import AdaptiveIOScheduler
+from move_journal import STATUS_COMMITTED, MoveJournal
+from run_history import RunRecorder, run_stage
+from suffix_suggestions import DEFAULT_SUGGESTIONS, SuffixCandidate, SuffixSuggestion, SuggestionIndex
+from tz_parser import normalize_key
+
+if TYPE_CHECKING:
+    from folder_catalog import FolderCatalog
+
 
 StatusCallback = Callable[[str], None]
+SuffixRow = tuple[object, object, object, object]  # значения B, E, G, H строки TZ
 
 # --- Регулярные выражения для поиска индексов ---
 RE_C_GROUPING_KEY = re.compile(
@@ -32,6 +58,19 @@ TZ_LOOKUP_COL = "B"
 TZ_PERIODICITY_COL = "E"
 TZ_SUFFIX_COL = "G"
 TZ_RESERVED_COL = "H"
+# Суффикс по умолчанию ищется только по точному индексу: суффикс предка
+# меняет имя папки группы, поэтому подъём включается явно (`fallback_depth`)
+SUFFIX_FALLBACK_DEPTH = 0
+
+# --- Режимы переноса файлов ---
+TRANSFER_COPY = "copy"
+TRANSFER_MOVE = "move"
+TRANSFER_HARDLINK = "hardlink"
+TRANSFER_REFLINK = "reflink"
+TRANSFER_MODES = (TRANSFER_COPY, TRANSFER_MOVE, TRANSFER_HARDLINK, TRANSFER_REFLINK)
+FICLONE = 0x40049409  # ioctl Linux для copy-on-write клонирования (btrfs, XFS)
+TRANSFER_MANIFEST_NAME = "transfer_manifest.json"
+STREAM_JOURNAL_BATCH = 256  # перемещений на одну запись плана в журнал
 
 # --- Таблицы транслитерации ---
 CYRILLIC_TO_LATIN = {
@@ -72,16 +111,6 @@ CYRILLIC_TO_LATIN = {
 CYRILLIC_TO_LATIN.update(
     {k.lower(): v.lower() for k, v in list(CYRILLIC_TO_LATIN.items())}
 )
-LATIN_TO_CYRILLIC = {
-    "a": "а",
-    "b": "б",
-    "v": "в",
-    "g": "г",
-    "A": "А",
-    "B": "Б",
-    "V": "В",
-    "G": "Г",
-}
 
 
 PERIODICITY_LATIN_MAP = {
@@ -92,17 +121,80 @@ PERIODICITY_LATIN_MAP = {
 }
 
 
-class PlannedFolder(TypedDict):
-    folder_name: str
-    suffix: str | None
-    grouping_key: str
-    file_paths: list[Path]
+class PlannedFolder:
+    """Целевая папка группы; сами файлы группы читаются из `FileSpool`."""
+
+    __slots__ = ("folder_name", "suffix", "grouping_key", "file_count", "suffix_from")
+
+    def __init__(
+        self,
+        folder_name: str,
+        suffix: str | None,
+        grouping_key: str,
+        file_count: int,
+        suffix_from: TrieMatch[str] | None = None,
+    ) -> None:
+        self.folder_name = folder_name
+        self.suffix = suffix
+        self.grouping_key = grouping_key
+        self.file_count = file_count
+        self.suffix_from = suffix_from  # суффикс взят от предка индекса
+
+
+@dataclass
+class TransferRecord:
+    """Сведения о перенесённом файле для манифеста запуска."""
+
+    source: Path
+    destination: Path
+    mode: str
+    size: int
+    sha256: str | None = None
+
+
+@dataclass(frozen=True)
+class MissingSuffix:
+    """Группа, для которой в TZ не нашёлся суффикс."""
+
+    index_code: str
+    reserved: str | None
+    periodicity: str | None
+
+    def __str__(self) -> str:
+        return f"{self.index_code} (Reserved={self.reserved or '—'}; Periodicity={self.periodicity or '—'})"
+
+
+class MissingSuffixError(ValueError):
+    """Группировка по суффиксу невозможна: для групп `missing` суффиксов в TZ нет.
+
+    `suggestions` — ближайшие строки TZ для каждой группы (см. `TzSuffixResolver.suggest`).
+    """
+
+    def __init__(
+        self, missing: list[MissingSuffix], suggestions: dict[MissingSuffix, list[SuffixSuggestion]]
+    ) -> None:
+        self.missing = missing
+        self.suggestions = suggestions
+        lines = []
+        for item in missing:
+            lines.append(str(item))
+            lines.extend(f"    возможно: {hint.candidate.describe()}" for hint in suggestions.get(item, ()))
+        super().__init__(
+            "Невозможно сгруппировать по суффиксу. Не найдены суффиксы для следующих групп:\n\n"
+            + "\n".join(lines)
+        )
 
 
 class TzSuffixResolver:
-    """Загружает файл TZ_glob.xlsx и предоставляет поиск суффиксов для индексов."""
+    """Загружает файл TZ_glob.xlsx и предоставляет поиск суффиксов для индексов.
+
+    Строки справочника раскладываются по дереву индексов (`IndexTrie`): поиск
+    идёт по уровням индекса, а если для него суффикса нет — по предкам не выше
+    `fallback_depth` уровней.
+    По умолчанию (`SUFFIX_FALLBACK_DEPTH`) к предкам не поднимается.
+    """
 
-    def __init__(self, tz_file_path: Path) -> None:
+    def __init__(self, tz_file_path: Path, fallback_depth: int = SUFFIX_FALLBACK_DEPTH) -> None:
         if not tz_file_path.exists():
             raise FileNotFoundError(f"Файл справочника не найден: {tz_file_path}")
 
@@ -114,12 +206,31 @@ class TzSuffixResolver:
             )
 
         sheet = workbook[TZ_SHEET_NAME]
-        self._lookup_idx = column_index_from_string(TZ_LOOKUP_COL) - 1
-        self._periodicity_idx = column_index_from_string(TZ_PERIODICITY_COL) - 1
-        self._suffix_idx = column_index_from_string(TZ_SUFFIX_COL) - 1
-        self._reserved_idx = column_index_from_string(TZ_RESERVED_COL) - 1
-        self._rows = tuple(sheet.iter_rows(values_only=True))
+        lookup_idx = column_index_from_string(TZ_LOOKUP_COL) - 1
+        periodicity_idx = column_index_from_string(TZ_PERIODICITY_COL) - 1
+        suffix_idx = column_index_from_string(TZ_SUFFIX_COL) - 1
+        reserved_idx = column_index_from_string(TZ_RESERVED_COL) - 1
+        min_length = max(lookup_idx, suffix_idx, periodicity_idx) + 1
+        rows = [
+            (
+                row[lookup_idx],
+                row[periodicity_idx],
+                row[suffix_idx],
+                row[reserved_idx] if len(row) > reserved_idx else None,
+            )
+            for row in sheet.iter_rows(values_only=True)
+            if len(row) >= min_length
+        ]
         workbook.close()
+        self.fallback_depth = fallback_depth
+        grouped: dict[str, list[SuffixRow]] = {}
+        for row in rows:
+            row_lookup = self._normalize_lookup(row[0])
+            if row_lookup:
+                grouped.setdefault(normalize_key(row_lookup), []).append(row)
+        self._index: IndexTrie[list[SuffixRow]] = IndexTrie(grouped)
+        self._suggestions: SuggestionIndex | None = None
+        self._suggestions_lock = threading.Lock()
 
     @staticmethod
     def _normalize_lookup(value: object | None) -> str:
@@ -153,45 +264,19 @@ class TzSuffixResolver:
         transliterated = "".join(PERIODICITY_LATIN_MAP.get(ch, ch) for ch in text)
         return transliterated.upper()
 
-    def find_suffix(
+    def rows(self) -> list[SuffixRow]:
+        """Строки справочника `(B, E, G, H)`, сгруппированные по индексу."""
+        return [row for rows in self._index.values() for row in rows]
+
+    def _select_suffix(
         self,
-        lookup_key: str,
-        reserved_code: str | None = None,
-        periodicity_code: str | None = None,
+        rows: list[SuffixRow],
+        normalized_reserved: str | None,
+        normalized_periodicity: str | None,
     ) -> str | None:
-        """Возвращает подходящий суффикс по индексу и коду Reserved."""
-        normalized_lookup = lookup_key.strip()
-        if not normalized_lookup:
-            return None
-
-        lookup_variants = {normalized_lookup.lower()}
-        last_char = normalized_lookup[-1]
-        if last_char in LATIN_TO_CYRILLIC:
-            variant = normalized_lookup[:-1] + LATIN_TO_CYRILLIC[last_char]
-            lookup_variants.add(variant.lower())
-
-        normalized_reserved = self._normalize_reserved(reserved_code)
-        normalized_periodicity = self._normalize_periodicity(periodicity_code)
         fallback: str | None = None
-
-        for row in self._rows:
-            if len(row) <= max(
-                self._lookup_idx, self._suffix_idx, self._periodicity_idx
-            ):
-                continue
-
-            row_lookup_raw = (
-                row[self._lookup_idx] if len(row) > self._lookup_idx else None
-            )
-            row_lookup = self._normalize_lookup(row_lookup_raw)
-            if row_lookup not in lookup_variants:
-                continue
-
-            row_periodicity_raw = (
-                row[self._periodicity_idx] if len(row) > self._periodicity_idx else None
-            )
+        for _lookup, row_periodicity_raw, row_suffix_raw, row_reserved_raw in rows:
             row_periodicity = self._normalize_periodicity(row_periodicity_raw)
-
             if normalized_periodicity:
                 if row_periodicity != normalized_periodicity:
                     continue
@@ -199,16 +284,10 @@ class TzSuffixResolver:
                 if row_periodicity:
                     continue
 
-            row_suffix_raw = (
-                row[self._suffix_idx] if len(row) > self._suffix_idx else None
-            )
             suffix = self._normalize_suffix(row_suffix_raw)
             if not suffix:
                 continue
 
-            row_reserved_raw = (
-                row[self._reserved_idx] if len(row) > self._reserved_idx else None
-            )
             row_reserved = self._normalize_reserved(row_reserved_raw)
 
             if normalized_reserved:
@@ -221,6 +300,71 @@ class TzSuffixResolver:
 
         return fallback
 
+    def find_suffix_match(
+        self,
+        lookup_key: str,
+        reserved_code: str | None = None,
+        periodicity_code: str | None = None,
+    ) -> TrieMatch[str] | None:
+        """Суффикс с ключом TZ, от которого он взят, и глубиной подъёма к предку (0 — точно)."""
+        normalized_lookup = lookup_key.strip()
+        if not normalized_lookup:
+            return None
+
+        normalized_reserved = self._normalize_reserved(reserved_code)
+        normalized_periodicity = self._normalize_periodicity(periodicity_code)
+        for match in self._index.matches(normalized_lookup, self.fallback_depth):
+            suffix = self._select_suffix(match.value, normalized_reserved, normalized_periodicity)
+            if suffix:
+                return TrieMatch(match.key, suffix, match.depth)
+        return None
+
+    def _suggestion_index(self) -> SuggestionIndex:
+        with self._suggestions_lock:
+            if self._suggestions is None:
+                candidates = []
+                for lookup, periodicity, suffix, reserved in self.rows():
+                    suffix = self._normalize_suffix(suffix)
+                    if suffix:
+                        candidates.append(
+                            SuffixCandidate(
+                                str(lookup).strip(),
+                                self._normalize_periodicity(periodicity),
+                                self._normalize_reserved(reserved),
+                                suffix,
+                            )
+                        )
+                self._suggestions = SuggestionIndex(candidates)
+            return self._suggestions
+
+    def suggest(
+        self,
+        lookup_key: str,
+        reserved_code: str | None = None,
+        periodicity_code: str | None = None,
+        limit: int = DEFAULT_SUGGESTIONS,
+    ) -> list[SuffixSuggestion]:
+        """Ближайшие строки TZ (B, E, H) с суффиксом для группы, у которой его нет.
+
+        Индекс подсказок строится при первом вызове и общий для всех групп.
+        """
+        return self._suggestion_index().suggest(
+            lookup_key,
+            self._normalize_reserved(reserved_code),
+            self._normalize_periodicity(periodicity_code),
+            limit,
+        )
+
+    def find_suffix(
+        self,
+        lookup_key: str,
+        reserved_code: str | None = None,
+        periodicity_code: str | None = None,
+    ) -> str | None:
+        """Возвращает подходящий суффикс по индексу и коду Reserved."""
+        match = self.find_suffix_match(lookup_key, reserved_code, periodicity_code)
+        return match.value if match else None
+
 
 def transliterate_cyrillic_to_latin(text: str) -> str:
     """Преобразует строку, заменяя кириллицу на латиницу для имён директорий."""
@@ -249,47 +393,498 @@ def extract_periodicity_value(grouping_key: str) -> str | None:
     return value or None
 
 
-def _group_files(source_dir: Path) -> dict[str, list[Path]]:
-    grouped: dict[str, list[Path]] = defaultdict(list)
-    for file_path in source_dir.rglob("*"):
-        if not file_path.is_file():
-            continue
-
-        c_match = RE_C_GROUPING_KEY.search(file_path.name)
-        if c_match:
-            grouped[c_match.group(1)].append(file_path)
-            continue
-
-        match = RE_GROUPING_KEY.search(file_path.name)
-        if match:
-            grouped[match.group(1)].append(file_path)
-
-    return grouped
-
-
-def _transfer_file(src: Path, dest_dir: Path, is_copy: bool) -> Path:
-    operation = shutil.copy if is_copy else shutil.move
-    dest = dest_dir / src.name
-    if not dest.exists():
-        transferred = operation(str(src), str(dest))
-        return Path(transferred)
+def extract_grouping_key(file_name: str) -> str | None:
+    """Возвращает ключ группировки (индекс с ревизией) из имени файла."""
+    c_match = RE_C_GROUPING_KEY.search(file_name)
+    if c_match:
+        return c_match.group(1)
+    match = RE_GROUPING_KEY.search(file_name)
+    return match.group(1) if match else None
+
+
+def _reflink_file(src: Path, dest: Path) -> None:
+    """Создаёт copy-on-write клон файла; при отсутствии поддержки бросает OSError."""
+    if fcntl is None:
+        raise OSError(errno.EOPNOTSUPP, "reflink не поддерживается на этой платформе")
+
+    created = False
+    try:
+        with open(src, "rb") as source, open(dest, "xb") as target:
+            created = True
+            fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+    except OSError:
+        if created:
+            dest.unlink(missing_ok=True)
+        raise
+
+
+def _place_file(src: Path, dest: Path, mode: str, compute_sha256: bool) -> TransferRecord:
+    """Переносит файл выбранным способом и возвращает фактически применённый режим.
+
+    Ссылочные режимы при ошибке (другой том, неподдерживаемая ФС) откатываются
+    на обычное копирование. При копировании SHA-256 считается в том же проходе.
+    """
+    if mode == TRANSFER_MOVE:
+        shutil.move(str(src), str(dest))
+        return TransferRecord(src, dest, TRANSFER_MOVE, dest.stat().st_size)
+    if mode == TRANSFER_HARDLINK:
+        try:
+            os.link(src, dest)
+            return TransferRecord(src, dest, TRANSFER_HARDLINK, dest.stat().st_size)
+        except OSError:
+            pass
+    elif mode == TRANSFER_REFLINK:
+        try:
+            _reflink_file(src, dest)
+            return TransferRecord(src, dest, TRANSFER_REFLINK, dest.stat().st_size)
+        except OSError:
+            pass
+    copied = copy_file(src, dest, compute_sha256=compute_sha256)
+    return TransferRecord(src, dest, TRANSFER_COPY, copied.size, copied.sha256)
+
+
+def _free_destination(
+    dest_dir: Path, name: str, reserved: set[str] | None = None
+) -> Path:
+    """Подбирает свободное имя `name`, `name_1`, ... в целевой папке.
+
+    `reserved` — имена в этой папке, уже занятые планом, но ещё не созданные.
+    """
+    reserved = reserved or set()
+    dest = dest_dir / name
+    if not dest.exists() and name not in reserved:
+        return dest
 
     stem = dest.stem
     suffix = dest.suffix
     counter = 1
     while True:
-        candidate = dest_dir / f"{stem}_{counter}{suffix}"
-        if not candidate.exists():
-            transferred = operation(str(src), str(candidate))
-            return Path(transferred)
+        candidate_name = f"{stem}_{counter}{suffix}"
+        candidate = dest_dir / candidate_name
+        if not candidate.exists() and candidate_name not in reserved:
+            return candidate
         counter += 1
 
 
+def _reserve_destination(in_flight: dict[Path, set[str]], dest_dir: Path, name: str) -> Path:
+    """Подбирает свободное имя с учётом переносов, которые ещё выполняются.
+
+    Имя освобождается вызывающим после завершения переноса: дальше его
+    занимает уже созданный файл.
+    """
+    taken = in_flight.setdefault(dest_dir, set())
+    dest = _free_destination(dest_dir, name, taken)
+    taken.add(dest.name)
+    return dest
+
+
+def _execute_transfers(
+    scheduler: AdaptiveIOScheduler,
+    transfers: Iterable[tuple[Path, Path]],
+    mode: str,
+    compute_sha256: bool,
+) -> Iterator[TransferRecord]:
+    """Выполняет пары (источник, назначение) параллельно; записи выдаются в порядке пар."""
+
+    def place(transfer: tuple[Path, Path]) -> TransferRecord:
+        return _place_file(transfer[0], transfer[1], mode, compute_sha256)
+
+    def copied_bytes(_transfer: tuple[Path, Path], record: TransferRecord) -> int:
+        # Ссылки и перемещения внутри тома данных не передают — считаются операциями
+        return record.size if record.mode == TRANSFER_COPY else 0
+
+    return scheduler.map(place, transfers, copied_bytes)
+
+
+def write_transfer_manifest(
+    destination_dir: Path, source_dir: Path, records: list[TransferRecord]
+) -> Path:
+    """Дописывает записи переноса (режим, размер, SHA-256) в манифест целевой папки."""
+    manifest_path = destination_dir / TRANSFER_MANIFEST_NAME
+    entries: dict[str, dict[str, object]] = {}
+    if manifest_path.exists():
+        previous = json.loads(manifest_path.read_text(encoding="utf-8"))
+        entries = {entry["destination"]: entry for entry in previous.get("files", [])}
+
+    for record in records:
+        relative = record.destination.relative_to(destination_dir).as_posix()
+        entries[relative] = {
+            "destination": relative,
+            "source": str(record.source),
+            "mode": record.mode,
+            "size": record.size,
+            "sha256": record.sha256,
+        }
+
+    manifest = {
+        "updated": datetime.now().isoformat(timespec="seconds"),
+        "source_dir": str(source_dir),
+        "files": sorted(entries.values(), key=lambda entry: str(entry["destination"])),
+    }
+    manifest_path.write_text(
+        json.dumps(manifest, indent=2, ensure_ascii=False), encoding="utf-8"
+    )
+    return manifest_path
+
+
+def verify_transfer_manifest(manifest_path: Path) -> list[Path]:
+    """Сверяет файлы целевой папки с SHA-256 из манифеста; возвращает несовпадения."""
+    destination_dir = manifest_path.parent
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    mismatched: list[Path] = []
+    for entry in manifest.get("files", []):
+        expected = entry.get("sha256")
+        if not expected:
+            continue
+        path = destination_dir / entry["destination"]
+        if not path.exists() or file_sha256(path) != expected:
+            mismatched.append(path)
+    return mismatched
+
+
+def format_transfer_counts(counts: Counter[str]) -> str:
+    """Формирует сводку вида `hardlink — 10, copy — 2` по режимам переноса."""
+    return ", ".join(
+        f"{mode} — {counts[mode]}" for mode in TRANSFER_MODES if counts.get(mode)
+    )
+
+
 def _notify(callback: StatusCallback | None, message: str) -> None:
     if callback is not None:
         callback(message)
 
 
+def _resolve_group(
+    grouping_key: str, resolver: TzSuffixResolver, file_count: int = 0
+) -> tuple[PlannedFolder | None, MissingSuffix | None]:
+    """Подбирает папку для ключа группы.
+
+    Возвращает план (или `None`, если индекс не выделяется) и описание
+    группы без суффикса в TZ (или `None`, если суффикс найден либо не нужен).
+    """
+    if grouping_key.upper().endswith("-C"):
+        # У C-групп нет суффикса
+        return PlannedFolder(transliterate_cyrillic_to_latin(grouping_key), None, grouping_key, file_count), None
+
+    index_match = RE_INDEX_CODE.search(grouping_key)
+    if not index_match:
+        return None, None
+
+    index_code = index_match.group(1)
+    reserved_code = extract_reserved_value(grouping_key)
+    periodicity_code = extract_periodicity_value(grouping_key)
+    match = resolver.find_suffix_match(index_code, reserved_code, periodicity_code)
+    suffix = match.value if match else None
+    missing = None
+    if not suffix:
+        missing = MissingSuffix(index_code, reserved_code, periodicity_code)
+
+    latin_key = transliterate_cyrillic_to_latin(grouping_key)
+    folder_name = f"{latin_key}_{suffix}" if suffix else latin_key
+    suffix_from = match if match and not match.exact else None
+    return PlannedFolder(folder_name, suffix, grouping_key, file_count, suffix_from), missing
+
+
+def _report_suffix_fallback(plan: PlannedFolder, status_callback: StatusCallback | None) -> None:
+    if plan.suffix_from is not None:
+        _notify(
+            status_callback,
+            f"Суффикс для {plan.grouping_key} взят от {plan.suffix_from.key} "
+            f"(уровней вверх: {plan.suffix_from.depth}).",
+        )
+
+
+def _missing_suffix_error(
+    items_without_suffix: list[MissingSuffix], resolver: TzSuffixResolver
+) -> MissingSuffixError:
+    suggestions = {
+        item: resolver.suggest(item.index_code, item.reserved, item.periodicity)
+        for item in items_without_suffix
+    }
+    return MissingSuffixError(items_without_suffix, suggestions)
+
+
+def _plan_folders(
+    spool: FileSpool,
+    resolver: TzSuffixResolver,
+    group_by_suffix: bool,
+    status_callback: StatusCallback | None,
+) -> dict[str, PlannedFolder]:
+    """Подбирает целевую папку для каждого ключа; файлы групп при этом не читаются."""
+    planned: dict[str, PlannedFolder] = {}
+    items_without_suffix: list[MissingSuffix] = []
+
+    for grouping_key, file_count in sorted(spool.key_counts.items()):
+        plan, missing = _resolve_group(grouping_key, resolver, file_count)
+        if plan is None:
+            _notify(status_callback, f"Пропуск: не удалось выделить индекс из {grouping_key}.")
+            continue
+        if missing:
+            items_without_suffix.append(missing)
+            if not group_by_suffix:
+                _notify(status_callback, f"Нет суффикса для {missing}.")
+                continue
+        _report_suffix_fallback(plan, status_callback)
+        planned[grouping_key] = plan
+
+    if group_by_suffix and items_without_suffix:
+        raise _missing_suffix_error(items_without_suffix, resolver)
+    return planned
+
+
+def _target_dir(destination_dir: Path, plan: PlannedFolder, group_by_suffix: bool) -> Path:
+    base_dir = destination_dir
+    # Если группировка включена и суффикс есть, создаем подпапку
+    if group_by_suffix and plan.suffix:
+        base_dir = destination_dir / plan.suffix
+    return base_dir / plan.folder_name
+
+
+def _planned_moves(
+    spool: FileSpool,
+    targets: dict[str, Path],
+    renamed: dict[int, str],
+) -> Iterator[tuple[Path, Path]]:
+    """Выдаёт пары (источник, назначение) в порядке переноса.
+
+    Имена назначения, отличные от исходных, запоминаются в `renamed`,
+    чтобы при переносе не подбирать их заново.
+    """
+    reserved: dict[Path, set[str]] = {}
+    move_id = 0
+    for group in spool.iter_groups():
+        target_dir = targets.get(group.grouping_key)
+        if target_dir is None:
+            continue
+        taken = reserved.setdefault(target_dir, set())
+        for file_path in group:
+            dest = _free_destination(target_dir, file_path.name, taken)
+            taken.add(dest.name)
+            if dest.name != file_path.name:
+                renamed[move_id] = dest.name
+            move_id += 1
+            yield file_path, dest
+
+
+class _FolderTracker:
+    """Сообщает о папке, как только в неё перенесены файлы всех её групп."""
+
+    __slots__ = ("_callback", "_keys_left", "_pending")
+
+    def __init__(self, callback: Callable[[Path], None] | None, targets: Iterable[Path]) -> None:
+        self._callback = callback
+        self._keys_left: Counter[Path] = Counter(targets)
+        self._pending: Counter[Path] = Counter()
+
+    def scheduled(self, folder: Path) -> None:
+        self._pending[folder] += 1
+
+    def group_done(self, folder: Path) -> None:
+        self._keys_left[folder] -= 1
+        self._check(folder)
+
+    def transferred(self, folder: Path) -> None:
+        self._pending[folder] -= 1
+        self._check(folder)
+
+    def _check(self, folder: Path) -> None:
+        if self._keys_left[folder] == 0 and self._pending[folder] == 0:
+            self._keys_left[folder] = -1  # о каждой папке сообщается один раз
+            if self._callback is not None:
+                self._callback(folder)
+
+
+def _run_index_plan(
+    spool: FileSpool,
+    destination_dir: Path,
+    tz_file_path: Path,
+    resolver: TzSuffixResolver | None,
+    mode: str,
+    group_by_suffix: bool,
+    compute_checksums: bool,
+    counts: Counter[str],
+    scheduler: AdaptiveIOScheduler,
+    status_callback: StatusCallback | None,
+    on_folder_ready: Callable[[Path], None] | None = None,
+    run_metrics: RunRecorder | None = None,
+) -> tuple[list[Path], list[TransferRecord]]:
+    if not spool.key_counts:
+        raise ValueError("Не удалось найти файлы с индексами в выбранном каталоге.")
+
+    if resolver is None:
+        resolver = TzSuffixResolver(tz_file_path)
+    planned = _plan_folders(spool, resolver, group_by_suffix, status_callback)
+
+    targets = {
+        grouping_key: _target_dir(destination_dir, plan, group_by_suffix)
+        for grouping_key, plan in planned.items()
+    }
+
+    # В режиме перемещения весь план заранее пишется в журнал целевой папки.
+    journal: MoveJournal | None = None
+    renamed: dict[int, str] = {}
+    if mode == TRANSFER_MOVE:
+        journal = MoveJournal.create(destination_dir, _planned_moves(spool, targets, renamed))
+
+    created_dirs: list[Path] = []
+    seen_dirs: set[Path] = set()
+    records: list[TransferRecord] = []
+    in_flight: dict[Path, set[str]] = {}
+    tracker = _FolderTracker(on_folder_ready, targets.values())
+
+    def transfers() -> Iterator[tuple[Path, Path]]:
+        move_id = 0
+        for group in spool.iter_groups():
+            target_dir = targets.get(group.grouping_key)
+            if target_dir is None:
+                continue
+            target_dir.mkdir(parents=True, exist_ok=True)
+            if target_dir not in seen_dirs:
+                seen_dirs.add(target_dir)
+                created_dirs.append(target_dir)
+
+            _notify(
+                status_callback,
+                f"Группа {group.grouping_key} → {target_dir.relative_to(destination_dir)}",
+            )
+
+            for file_path in group:
+                if journal is not None:
+                    dest = target_dir / renamed.get(move_id, file_path.name)
+                    move_id += 1
+                else:
+                    dest = _reserve_destination(in_flight, target_dir, file_path.name)
+                tracker.scheduled(target_dir)
+                yield file_path, dest
+            tracker.group_done(target_dir)
+
+    done_id = 0
+    with journal if journal is not None else nullcontext():
+        for record in _execute_transfers(scheduler, transfers(), mode, compute_checksums):
+            if journal is not None:
+                journal.mark_done(done_id)
+                done_id += 1
+            else:
+                in_flight[record.destination.parent].discard(record.destination.name)
+            counts[record.mode] += 1
+            if run_metrics is not None:
+                run_metrics.add_input(bytes_total=record.size)
+            if compute_checksums:
+                records.append(record)
+            _notify(status_callback, f"  • {record.source.name} → {record.destination.name}")
+            tracker.transferred(record.destination.parent)
+        if journal is not None:
+            journal.close(STATUS_COMMITTED)
+    return created_dirs, records
+
+
+def _run_index_stream(
+    source_dir: Path,
+    destination_dir: Path,
+    tz_file_path: Path,
+    resolver: TzSuffixResolver | None,
+    mode: str,
+    group_by_suffix: bool,
+    compute_checksums: bool,
+    counts: Counter[str],
+    scheduler: AdaptiveIOScheduler,
+    status_callback: StatusCallback | None,
+    run_metrics: RunRecorder | None = None,
+) -> tuple[list[Path], list[TransferRecord]]:
+    """Переносит файлы по мере сканирования, без предварительного списка.
+
+    Папка группы подбирается при первой встрече ключа и запоминается.
+    С `group_by_suffix` сначала выполняется быстрый проход по именам:
+    об отсутствующих суффиксах нужно сообщить до первого переноса.
+    """
+    if resolver is None:
+        resolver = TzSuffixResolver(tz_file_path)
+
+    if group_by_suffix:
+        keys = scan_keys(source_dir, extract_grouping_key)
+        if not keys:
+            raise ValueError("Не удалось найти файлы с индексами в выбранном каталоге.")
+        missing = [m for m in (_resolve_group(key, resolver)[1] for key in sorted(keys)) if m]
+        if missing:
+            raise _missing_suffix_error(missing, resolver)
+
+    targets: dict[str, Path | None] = {}
+    created_dirs: list[Path] = []
+    seen_dirs: set[Path] = set()
+    records: list[TransferRecord] = []
+
+    def target_for(grouping_key: str) -> Path | None:
+        if grouping_key in targets:
+            return targets[grouping_key]
+        plan, missing = _resolve_group(grouping_key, resolver)
+        target_dir = None
+        if plan is None:
+            _notify(status_callback, f"Пропуск: не удалось выделить индекс из {grouping_key}.")
+        elif missing and not group_by_suffix:
+            _notify(status_callback, f"Нет суффикса для {missing}.")
+        else:
+            _report_suffix_fallback(plan, status_callback)
+            target_dir = _target_dir(destination_dir, plan, group_by_suffix)
+            target_dir.mkdir(parents=True, exist_ok=True)
+            if target_dir not in seen_dirs:
+                seen_dirs.add(target_dir)
+                created_dirs.append(target_dir)
+            _notify(status_callback, f"Группа {grouping_key} → {target_dir.relative_to(destination_dir)}")
+        targets[grouping_key] = target_dir
+        return target_dir
+
+    def finish(record: TransferRecord) -> None:
+        counts[record.mode] += 1
+        if run_metrics is not None:
+            run_metrics.add_input(1, record.size)
+        if compute_checksums:
+            records.append(record)
+        _notify(status_callback, f"  • {record.source.name} → {record.destination.name}")
+
+    in_flight: dict[Path, set[str]] = {}
+
+    def transfers() -> Iterator[tuple[Path, Path]]:
+        for grouping_key, file_path in stream:
+            target_dir = target_for(grouping_key)
+            if target_dir is not None:
+                yield file_path, _reserve_destination(in_flight, target_dir, file_path.name)
+
+    stream = stream_files(source_dir, extract_grouping_key, exclude_dir=destination_dir)
+    journal = MoveJournal.create(destination_dir, []) if mode == TRANSFER_MOVE else None
+    try:
+        with journal if journal is not None else nullcontext():
+            if journal is None:
+                for record in _execute_transfers(scheduler, transfers(), mode, compute_checksums):
+                    in_flight[record.destination.parent].discard(record.destination.name)
+                    finish(record)
+            else:
+                # Перемещения пишутся в журнал порциями до переноса самих файлов.
+                move_id = 0
+                while batch := list(islice(stream, STREAM_JOURNAL_BATCH)):
+                    reserved: dict[Path, set[str]] = {}
+                    moves: list[tuple[Path, Path]] = []
+                    for grouping_key, file_path in batch:
+                        target_dir = target_for(grouping_key)
+                        if target_dir is None:
+                            continue
+                        taken = reserved.setdefault(target_dir, set())
+                        dest = _free_destination(target_dir, file_path.name, taken)
+                        taken.add(dest.name)
+                        moves.append((file_path, dest))
+                    journal.plan(move_id, moves)
+                    for record in _execute_transfers(scheduler, moves, mode, False):
+                        journal.mark_done(move_id)
+                        move_id += 1
+                        finish(record)
+                journal.close(STATUS_COMMITTED)
+    finally:
+        stream.close()
+
+    if not targets:
+        raise ValueError("Не удалось найти файлы с индексами в выбранном каталоге.")
+    return created_dirs, records
+
+
 def prepare_index_folders(
     source_dir: Path,
     destination_dir: Path,
@@ -297,8 +892,42 @@ def prepare_index_folders(
     status_callback: StatusCallback | None = None,
     use_copy: bool = True,
     group_by_suffix: bool = False,
+    transfer_mode: str | None = None,
+    transfer_counts: Counter[str] | None = None,
+    compute_checksums: bool = False,
+    catalog: FolderCatalog | None = None,
+    resolver: TzSuffixResolver | None = None,
+    streaming: bool = False,
+    io_scheduler: AdaptiveIOScheduler | None = None,
+    on_folder_ready: Callable[[Path], None] | None = None,
+    run_metrics: RunRecorder | None = None,
 ) -> list[Path]:
-    """Группирует файлы по индексам и перемещает их в целевые каталоги."""
+    """Группирует файлы по индексам и перемещает их в целевые каталоги.
+
+    `transfer_mode` (`copy`, `move`, `hardlink`, `reflink`) переопределяет
+    `use_copy`; ссылочные режимы на другом томе откатываются на копирование.
+    Фактические счётчики по режимам добавляются в `transfer_counts`.
+    С `compute_checksums` копии получают SHA-256, посчитанный при копировании,
+    а все переносы записываются в манифест `transfer_manifest.json`.
+    Перемещение ведёт журнал `move_journal.jsonl` в целевой папке; после сбоя
+    его можно продолжить или откатить (`move_journal.resume_moves`/`rollback_moves`).
+    С `catalog` список файлов берётся из общего каталога сессии, а не с диска;
+    готовый `resolver` избавляет от повторного чтения `tz_file_path`.
+    В режиме `streaming` файлы переносятся по мере сканирования (каталог
+    сессии не используется), а журнал перемещений пополняется порциями.
+    Файлы переносятся параллельно; число потоков подбирает `io_scheduler`
+    (по умолчанию — новый `AdaptiveIOScheduler`).
+    `on_folder_ready(папка)` вызывается, как только папка заполнена, — ещё до
+    завершения остальных групп (в потоковом режиме — после переноса всех файлов).
+    Длительности сканирования и переноса, а также число и размер файлов
+    (по спулу и по ходу переноса, без отдельного обхода) пишутся в `run_metrics`.
+    """
+    mode = transfer_mode or (TRANSFER_COPY if use_copy else TRANSFER_MOVE)
+    if mode not in TRANSFER_MODES:
+        raise ValueError(f"Неизвестный режим переноса: {mode}")
+    counts: Counter[str] = transfer_counts if transfer_counts is not None else Counter()
+    scheduler = io_scheduler or AdaptiveIOScheduler(status_callback=status_callback)
+
     source_dir = source_dir.resolve()
     destination_dir = destination_dir.resolve()
 
@@ -308,97 +937,76 @@ def prepare_index_folders(
     destination_dir.mkdir(parents=True, exist_ok=True)
     _notify(status_callback, f"Сканирование: {source_dir}")
 
-    files_by_key = _group_files(source_dir)
-    if not files_by_key:
-        raise ValueError("Не удалось найти файлы с индексами в выбранном каталоге.")
-
-    resolver = TzSuffixResolver(tz_file_path)
-
-    planned_folders: list[PlannedFolder] = []
-    items_without_suffix: list[str] = []
-
-    for grouping_key, file_paths in sorted(files_by_key.items()):
-        folder_name: str
-        suffix: str | None
-
-        if grouping_key.upper().endswith("-C"):
-            folder_name = transliterate_cyrillic_to_latin(grouping_key)
-            suffix = None  # У C-групп нет суффикса
-        else:
-            index_match = RE_INDEX_CODE.search(grouping_key)
-            if not index_match:
-                _notify(
+    if streaming:
+        with run_stage(run_metrics, "transfer"):
+            created_dirs, records = _run_index_stream(
+                source_dir,
+                destination_dir,
+                tz_file_path,
+                resolver,
+                mode,
+                group_by_suffix,
+                compute_checksums,
+                counts,
+                scheduler,
+                status_callback,
+                run_metrics=run_metrics,
+            )
+        if on_folder_ready is not None:
+            for folder in created_dirs:
+                on_folder_ready(folder)
+    else:
+        with run_stage(run_metrics, "scan"):
+            spool = spool_files(source_dir, extract_grouping_key, catalog)
+        if run_metrics is not None:
+            run_metrics.set_input(len(spool), 0)
+        try:
+            with run_stage(run_metrics, "transfer"):
+                created_dirs, records = _run_index_plan(
+                    spool,
+                    destination_dir,
+                    tz_file_path,
+                    resolver,
+                    mode,
+                    group_by_suffix,
+                    compute_checksums,
+                    counts,
+                    scheduler,
                     status_callback,
-                    f"Пропуск: не удалось выделить индекс из {grouping_key}.",
+                    on_folder_ready,
+                    run_metrics,
                 )
-                continue
-
-            index_code = index_match.group(1)
-            reserved_code = extract_reserved_value(grouping_key)
-            periodicity_code = extract_periodicity_value(grouping_key)
-            suffix = resolver.find_suffix(index_code, reserved_code, periodicity_code)
-
-            if not suffix:
-                items_without_suffix.append(
-                    f"{index_code} (Reserved={reserved_code or '—'}; Periodicity={periodicity_code or '—'})"
-                )
-                if not group_by_suffix:
-                    _notify(
-                        status_callback,
-                        "Нет суффикса для "
-                        f"{index_code} (Reserved={reserved_code or '—'}; Periodicity={periodicity_code or '—'}).",
-                    )
-                    continue
-
-            latin_key = transliterate_cyrillic_to_latin(grouping_key)
-            folder_name = f"{latin_key}_{suffix}" if suffix else latin_key
-
-        planned_folders.append(
-            PlannedFolder(
-                folder_name=folder_name,
-                suffix=suffix,
-                grouping_key=grouping_key,
-                file_paths=file_paths,
-            )
-        )
-
-    if group_by_suffix and items_without_suffix:
-        error_msg = (
-            "Невозможно сгруппировать по суффиксу. Не найдены суффиксы для следующих групп:\n\n"
-            + "\n".join(items_without_suffix)
-        )
-        raise ValueError(error_msg)
-
-    created_dirs: list[Path] = []
-    for plan in planned_folders:
-        base_dir = destination_dir
-        # Если группировка включена и суффикс есть, создаем подпапку
-        suffix_value = plan["suffix"]
-        if group_by_suffix and suffix_value:
-            base_dir = destination_dir / suffix_value
-
-        target_dir = base_dir / plan["folder_name"]
-        target_dir.mkdir(parents=True, exist_ok=True)
-        if target_dir not in created_dirs:
-            created_dirs.append(target_dir)
-
-        _notify(
-            status_callback,
-            f"Группа {plan['grouping_key']} → {target_dir.relative_to(destination_dir)}",
-        )
-
-        for file_path in plan["file_paths"]:
-            transferred_path = _transfer_file(file_path, target_dir, is_copy=use_copy)
-            _notify(status_callback, f"  • {file_path.name} → {transferred_path.name}")
-
+        finally:
+            spool.close()
+
+    if compute_checksums and records:
+        with run_stage(run_metrics, "manifest"):
+            manifest_path = write_transfer_manifest(destination_dir, source_dir, records)
+        _notify(status_callback, f"Манифест переноса: {manifest_path.name}")
+    if counts:
+        _notify(status_callback, f"Перенесено файлов: {format_transfer_counts(counts)}.")
     _notify(status_callback, "Группировка завершена.")
     return created_dirs
 
 
 __all__ = [
+    "MissingSuffix",
+    "MissingSuffixError",
+    "SUFFIX_FALLBACK_DEPTH",
+    "TRANSFER_COPY",
+    "TRANSFER_HARDLINK",
+    "TRANSFER_MODES",
+    "TRANSFER_MOVE",
+    "TRANSFER_MANIFEST_NAME",
+    "TRANSFER_REFLINK",
+    "TransferRecord",
+    "extract_grouping_key",
+    "format_transfer_counts",
     "prepare_index_folders",
     "transliterate_cyrillic_to_latin",
     "extract_reserved_value",
     "extract_periodicity_value",
     "TzSuffixResolver",
+    "verify_transfer_manifest",
+    "write_transfer_manifest",
 ]
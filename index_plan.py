@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+import heapq
+import os
+import queue
+import re
+import shutil
+import tempfile
+import threading
+from array import array
+from itertools import groupby
+from operator import itemgetter
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Iterator
+
+if TYPE_CHECKING:
+    from folder_catalog import FolderCatalog
+
+
+DEFAULT_RUN_SIZE = 200_000
+STREAM_QUEUE_SIZE = 64  # пачек файлов в очереди между сканером и переносом
+STREAM_CHUNK_SIZE = 256
+_SCAN_DONE = object()
+RE_UNESCAPE = re.compile(r"\\(.)")
+_UNESCAPE = {"\\": "\\", "t": "\t", "n": "\n", "r": "\r"}
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def _unescape(text: str) -> str:
+    if "\\" not in text:
+        return text
+    return RE_UNESCAPE.sub(lambda m: _UNESCAPE.get(m.group(1), m.group(1)), text)
+
+
+class FileGroup:
+    """Файлы одной группы в компактном виде.
+
+    Каталоги хранятся номерами из общей таблицы `dirs`, имена — одной
+    строкой с массивом смещений; `Path` создаётся только при обходе.
+    """
+
+    __slots__ = ("grouping_key", "_dirs", "_dir_ids", "_names", "_offsets")
+
+    def __init__(self, grouping_key: str, dirs: list[str]) -> None:
+        self.grouping_key = grouping_key
+        self._dirs = dirs
+        self._dir_ids = array("I")
+        self._names: list[str] | str = []
+        self._offsets = array("Q", [0])
+
+    def _append(self, dir_id: int, name: str) -> None:
+        self._dir_ids.append(dir_id)
+        self._names.append(name)  # type: ignore[union-attr]
+        self._offsets.append(self._offsets[-1] + len(name))
+
+    def _freeze(self) -> FileGroup:
+        self._names = "".join(self._names)
+        return self
+
+    def __len__(self) -> int:
+        return len(self._dir_ids)
+
+    def name(self, position: int) -> str:
+        return self._names[self._offsets[position] : self._offsets[position + 1]]  # type: ignore[index]
+
+    def path(self, position: int) -> Path:
+        return Path(self._dirs[self._dir_ids[position]], self.name(position))
+
+    def __iter__(self) -> Iterator[Path]:
+        for position in range(len(self._dir_ids)):
+            yield self.path(position)
+
+
+class FileSpool:
+    """Внешняя сортировка файлов по ключу группировки.
+
+    Записи `(ключ, номер каталога, имя)` копятся в буфере; при заполнении
+    буфер сортируется и сбрасывается на диск отдельным отрезком. Группы
+    выдаются слиянием отрезков (`heapq.merge`) и могут обходиться повторно,
+    так что в памяти одновременно находится не больше одного буфера и
+    одной группы.
+    """
+
+    __slots__ = ("dirs", "key_counts", "_dir_ids", "_buffer", "_runs", "_run_size", "_tmpdir")
+
+    def __init__(self, run_size: int = DEFAULT_RUN_SIZE) -> None:
+        self.dirs: list[str] = []
+        self.key_counts: dict[str, int] = {}
+        self._dir_ids: dict[str, int] = {}
+        self._buffer: list[tuple[str, int, str]] = []
+        self._runs: list[Path] = []
+        self._run_size = run_size
+        self._tmpdir: str | None = None
+
+    def __enter__(self) -> FileSpool:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return sum(self.key_counts.values())
+
+    def add(self, grouping_key: str, directory: str, name: str) -> None:
+        dir_id = self._dir_ids.get(directory)
+        if dir_id is None:
+            dir_id = self._dir_ids[directory] = len(self.dirs)
+            self.dirs.append(directory)
+        self.key_counts[grouping_key] = self.key_counts.get(grouping_key, 0) + 1
+        self._buffer.append((grouping_key, dir_id, name))
+        if len(self._buffer) >= self._run_size:
+            self._spill()
+
+    def _spill(self) -> None:
+        if self._tmpdir is None:
+            self._tmpdir = tempfile.mkdtemp(prefix="index_plan_")
+        self._buffer.sort()
+        run_path = Path(self._tmpdir) / f"run_{len(self._runs):05d}.tsv"
+        with open(run_path, "w", encoding="utf-8", newline="\n") as handle:
+            handle.writelines(f"{key}\t{dir_id}\t{_escape(name)}\n" for key, dir_id, name in self._buffer)
+        self._runs.append(run_path)
+        self._buffer = []
+
+    @staticmethod
+    def _read_run(run_path: Path) -> Iterator[tuple[str, int, str]]:
+        with open(run_path, encoding="utf-8", newline="\n") as handle:
+            for line in handle:
+                key, dir_id, name = line[:-1].split("\t", 2)
+                yield key, int(dir_id), _unescape(name)
+
+    def iter_groups(self) -> Iterator[FileGroup]:
+        """Выдаёт группы по возрастанию ключа; внутри группы — по каталогу и имени."""
+        self._buffer.sort()
+        sources = [self._read_run(run_path) for run_path in self._runs]
+        sources.append(iter(self._buffer))
+        merged = heapq.merge(*sources) if len(sources) > 1 else sources[0]
+        for grouping_key, records in groupby(merged, key=itemgetter(0)):
+            group = FileGroup(grouping_key, self.dirs)
+            for _key, dir_id, name in records:
+                group._append(dir_id, name)
+            yield group._freeze()
+
+    def close(self) -> None:
+        if self._tmpdir is not None:
+            shutil.rmtree(self._tmpdir, ignore_errors=True)
+            self._tmpdir = None
+        self._runs = []
+        self._buffer = []
+
+
+def spool_files(
+    source_dir: Path,
+    key_func: Callable[[str], str | None],
+    catalog: FolderCatalog | None = None,
+    run_size: int = DEFAULT_RUN_SIZE,
+) -> FileSpool:
+    """Сканирует дерево и складывает файлы с ключом группировки во внешнюю сортировку."""
+    spool = FileSpool(run_size)
+    try:
+        if catalog is not None:
+            # Поток по снимкам папок: спул сам сортирует, полный список не нужен
+            for entry in catalog.iter_entries(source_dir):
+                if entry.grouping_key:
+                    spool.add(entry.grouping_key, str(entry.path.parent), entry.name)
+            return spool
+
+        for directory, _subdirs, names in os.walk(source_dir):
+            for name in names:
+                grouping_key = key_func(name)
+                if grouping_key:
+                    spool.add(grouping_key, directory, name)
+    except BaseException:
+        spool.close()
+        raise
+    return spool
+
+
+def stream_files(
+    source_dir: Path,
+    key_func: Callable[[str], str | None],
+    queue_size: int = STREAM_QUEUE_SIZE,
+    exclude_dir: Path | None = None,
+) -> Iterator[tuple[str, Path]]:
+    """Выдаёт `(ключ, путь)` по мере обхода дерева фоновым потоком.
+
+    Сканер складывает пачки в ограниченную очередь: если перенос отстаёт,
+    сканер ждёт (обратное давление), а при закрытии генератора — завершается.
+    `exclude_dir` (например, целевая папка внутри источника) не обходится.
+    """
+    excluded = os.path.abspath(exclude_dir) if exclude_dir is not None else None
+    chunks: queue.Queue = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+
+    def put(item: object) -> bool:
+        while not stop.is_set():
+            try:
+                chunks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def scan() -> None:
+        try:
+            for directory, subdirs, names in os.walk(source_dir):
+                if excluded is not None:
+                    subdirs[:] = [d for d in subdirs if os.path.abspath(os.path.join(directory, d)) != excluded]
+                chunk: list[tuple[str, Path]] = []
+                for name in names:
+                    grouping_key = key_func(name)
+                    if grouping_key:
+                        chunk.append((grouping_key, Path(directory, name)))
+                    if len(chunk) >= STREAM_CHUNK_SIZE:
+                        if not put(chunk):
+                            return
+                        chunk = []
+                if chunk and not put(chunk):
+                    return
+        except BaseException as error:  # noqa: BLE001 - передаётся потребителю
+            put(error)
+        finally:
+            put(_SCAN_DONE)
+
+    scanner = threading.Thread(target=scan, name="index-scan", daemon=True)
+    scanner.start()
+    try:
+        while True:
+            item = chunks.get()
+            if item is _SCAN_DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield from item
+    finally:
+        stop.set()
+        scanner.join()
+
+
+def scan_keys(source_dir: Path, key_func: Callable[[str], str | None]) -> set[str]:
+    """Быстрый проход только по именам: множество ключей группировки дерева."""
+    keys: set[str] = set()
+    for _directory, _subdirs, names in os.walk(source_dir):
+        for name in names:
+            grouping_key = key_func(name)
+            if grouping_key:
+                keys.add(grouping_key)
+    return keys
+
+
+__all__ = [
+    "DEFAULT_RUN_SIZE",
+    "FileGroup",
+    "FileSpool",
+    "scan_keys",
+    "spool_files",
+    "stream_files",
+]
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import re
+from abc import abstractmethod
+from dataclasses import dataclass
+from typing import Callable, Generic, Iterable, Iterator, Mapping, TypeVar
+
+from tz_parser import normalize_key
+
+
+V = TypeVar("V")
+NormalizeKey = Callable[[str], str]
+
+DEFAULT_FALLBACK_DEPTH = 2  # на сколько уровней вверх искать ближайшего предка
+# Нормализованный индекс: римская часть, до трёх номеров и буква (`IВ.7.4.2А`)
+RE_INDEX_KEY = re.compile(r"^([^.\d\s]+)\.(\d+)(?:\.(\d+))?(?:\.(\d+))?(\D)?$")
+
+
+def index_components(index: str, normalize: NormalizeKey = normalize_key) -> tuple[str, ...] | None:
+    """Уровни индекса: `II.7.4.2a` → `('II', '7', '4', '2', 'А')`; `None`, если это не индекс."""
+    match = RE_INDEX_KEY.match(normalize(index.strip()))
+    if match is None:
+        return None
+    return tuple(part for part in match.groups() if part)
+
+
+def index_key(parts: tuple[str, ...]) -> str:
+    """Нормализованный ключ из уровней: `('II', '7', '4', 'А')` → `II.7.4А`."""
+    letter = parts[-1] if len(parts) > 2 and not parts[-1].isdigit() else ""
+    numbers = parts[1 : len(parts) - 1] if letter else parts[1:]
+    return ".".join((parts[0], *numbers)) + letter
+
+
+@dataclass(frozen=True)
+class TrieMatch(Generic[V]):
+    """Найденное значение: ключ TZ, по которому оно взято, и на сколько уровней пришлось подняться."""
+
+    key: str
+    value: V
+    depth: int = 0
+
+    @property
+    def exact(self) -> bool:
+        return self.depth == 0
+
+
+class _Node:
+    __slots__ = ("children", "key", "value", "filled")
+
+    def __init__(self) -> None:
+        self.children: dict[str, _Node] = {}
+        self.key: str | None = None
+        self.value: object = None
+        self.filled = False
+
+
+class IndexLookup(Mapping[str, V]):
+    """Справочник по нормализованным индексам с поиском ближайшего предка."""
+
+    @abstractmethod
+    def matches(self, index: str, max_fallback: int = DEFAULT_FALLBACK_DEPTH) -> Iterator[TrieMatch[V]]:
+        """Значения для индекса и его предков, от точного к дальним (не выше `max_fallback` уровней)."""
+
+    def lookup(self, index: str, max_fallback: int = DEFAULT_FALLBACK_DEPTH) -> TrieMatch[V] | None:
+        """Точное значение индекса или ближайшего предка; `None`, если ничего не найдено."""
+        return next(self.matches(index, max_fallback), None)
+
+
+class IndexTrie(IndexLookup[V]):
+    """Справочник по индексам TZ в виде дерева уровней (римская часть, номера, буква).
+
+    Как словарь ведёт себя по нормализованным ключам (`normalize_key`), так что
+    заменяет прежний `tz_map`. `lookup` находит индекс за число его уровней и,
+    если точного ключа нет, возвращает ближайшего предка не выше `max_fallback`
+    уровней: для `II.7.4.2a` — `II.7.4.2`, затем `II.7.4`. Ключи, не похожие на
+    индекс, доступны только как элементы словаря.
+    """
+
+    def __init__(
+        self, items: Mapping[str, V] | Iterable[tuple[str, V]] = (), normalize: NormalizeKey = normalize_key
+    ) -> None:
+        self._normalize = normalize
+        self._root = _Node()
+        self._items: dict[str, V] = {}
+        pairs = items.items() if isinstance(items, Mapping) else items
+        for key, value in pairs:
+            self.insert(key, value)
+
+    def insert(self, key: str, value: V) -> None:
+        """Добавляет или заменяет значение ключа."""
+        normalized = self._normalize(key.strip())
+        self._items[normalized] = value
+        parts = index_components(normalized, self._normalize)
+        if parts is None:
+            return
+        node = self._root
+        for part in parts:
+            node = node.children.setdefault(part, _Node())
+        node.key, node.value, node.filled = normalized, value, True
+
+    def __getitem__(self, key: str) -> V:
+        return self._items[self._normalize(key.strip())]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._items)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def matches(self, index: str, max_fallback: int = DEFAULT_FALLBACK_DEPTH) -> Iterator[TrieMatch[V]]:
+        parts = index_components(index, self._normalize)
+        if parts is None:
+            return
+        path: list[_Node] = []
+        node = self._root
+        for part in parts:
+            node = node.children.get(part)
+            if node is None:
+                break
+            path.append(node)
+        for level in range(len(path), 0, -1):
+            depth = len(parts) - level
+            if depth > max_fallback:
+                return
+            found = path[level - 1]
+            if found.filled:
+                yield TrieMatch(found.key, found.value, depth)
+
+
+def as_index_trie(mapping: Mapping[str, V], normalize: NormalizeKey = normalize_key) -> IndexLookup[V]:
+    """Дерево из словаря TZ; готовый справочник (`IndexTrie`, `TzModel`) возвращается как есть."""
+    return mapping if isinstance(mapping, IndexLookup) else IndexTrie(mapping, normalize)
+
+
+__all__ = [
+    "DEFAULT_FALLBACK_DEPTH",
+    "IndexLookup",
+    "IndexTrie",
+    "TrieMatch",
+    "as_index_trie",
+    "index_components",
+    "index_key",
+]
@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import statistics
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator, TypeVar
+
+
+StatusCallback = Callable[[str], None] | None
+T = TypeVar("T")
+R = TypeVar("R")
+
+DEFAULT_MIN_WORKERS = 2
+DEFAULT_MAX_WORKERS = 32
+DEFAULT_INITIAL_WORKERS = 4
+WINDOW_SECONDS = 1.0  # не чаще одного решения в секунду
+WINDOW_MIN_TASKS = 8
+INCREASE_GAIN = 1.05  # прирост пропускной способности, оправдывающий ещё один поток
+DECREASE_LOSS = 0.85  # падение, после которого число потоков уменьшается вдвое
+LATENCY_LIMIT = 2.0  # рост медианной задержки относительно лучшего окна
+
+
+@dataclass
+class SchedulerDecision:
+    """Решение регулятора по итогам одного окна измерений."""
+
+    elapsed: float
+    workers_before: int
+    workers_after: int
+    throughput: float
+    latency: float
+    reason: str
+
+
+class _Window:
+    __slots__ = ("started", "units", "tasks", "latencies", "errors")
+
+    def __init__(self) -> None:
+        self.started = time.monotonic()
+        self.units = 0
+        self.tasks = 0
+        self.latencies: list[float] = []
+        self.errors = 0
+
+
+def _format_rate(throughput: float, by_bytes: bool) -> str:
+    if by_bytes:
+        return f"{throughput / (1024 * 1024):.1f} МБ/с"
+    return f"{throughput:.0f} оп/с"
+
+
+class AdaptiveIOScheduler:
+    """Параллельный ввод-вывод с подстройкой числа потоков (AIMD).
+
+    По окну завершённых задач считаются пропускная способность (байт или
+    операций в секунду) и медианная задержка. Пока пропускная способность
+    растёт, добавляется по одному потоку; при её падении, росте задержки или
+    ошибках число потоков уменьшается вдвое. `bandwidth_limit` (байт/с)
+    ограничивает суммарную скорость. Изменения числа потоков записываются в
+    `decisions` и передаются в `status_callback`.
+    """
+
+    def __init__(
+        self,
+        min_workers: int = DEFAULT_MIN_WORKERS,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        initial_workers: int = DEFAULT_INITIAL_WORKERS,
+        bandwidth_limit: float | None = None,
+        status_callback: StatusCallback = None,
+    ) -> None:
+        if not 1 <= min_workers <= max_workers:
+            raise ValueError("Ожидается 1 <= min_workers <= max_workers")
+        self.min_workers = min_workers
+        self.max_workers = max_workers
+        self.workers = max(min_workers, min(initial_workers, max_workers))
+        self.bandwidth_limit = bandwidth_limit if bandwidth_limit and bandwidth_limit > 0 else None
+        self.status_callback = status_callback
+        self.decisions: list[SchedulerDecision] = []
+        self._created = time.monotonic()
+        self._pace_lock = threading.Lock()
+        self._next_slot = 0.0
+        self._best_latency: float | None = None
+        self._last_throughput: float | None = None
+
+    def _pace(self, units: int, started: float) -> None:
+        """Задерживает поток так, чтобы средняя скорость не превышала лимит."""
+        if self.bandwidth_limit is None or units <= 0:
+            return
+        with self._pace_lock:
+            self._next_slot = max(self._next_slot, started) + units / self.bandwidth_limit
+            delay = self._next_slot - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _run(
+        self, func: Callable[[T], R], item: T, size_of: Callable[[T, R], int] | None
+    ) -> tuple[R, float, int]:
+        started = time.monotonic()
+        result = func(item)
+        latency = time.monotonic() - started
+        units = size_of(item, result) if size_of is not None else 0
+        self._pace(units, started)
+        return result, latency, units
+
+    def _evaluate(self, window: _Window) -> None:
+        elapsed = max(time.monotonic() - window.started, 1e-6)
+        by_bytes = window.units > 0
+        throughput = (window.units if by_bytes else window.tasks) / elapsed
+        latency = statistics.median(window.latencies) if window.latencies else 0.0
+        before = self.workers
+
+        if window.errors:
+            self.workers = max(self.min_workers, self.workers // 2)
+            reason = f"ошибки ввода-вывода: {window.errors}"
+        elif (
+            self.bandwidth_limit is not None
+            and by_bytes
+            and throughput >= self.bandwidth_limit * 0.95
+        ):
+            reason = "достигнут лимит скорости"
+        elif self._best_latency is not None and latency > self._best_latency * LATENCY_LIMIT and (
+            self._last_throughput is None or throughput < self._last_throughput * INCREASE_GAIN
+        ):
+            self.workers = max(self.min_workers, self.workers // 2)
+            reason = "рост задержки"
+        elif self._last_throughput is not None and throughput < self._last_throughput * DECREASE_LOSS:
+            self.workers = max(self.min_workers, self.workers // 2)
+            reason = "падение пропускной способности"
+        elif self._last_throughput is None or throughput >= self._last_throughput * INCREASE_GAIN:
+            self.workers = min(self.max_workers, self.workers + 1)
+            reason = "рост пропускной способности"
+        else:
+            reason = "без изменений"
+
+        self._last_throughput = throughput
+        if latency and (self._best_latency is None or latency < self._best_latency):
+            self._best_latency = latency
+
+        decision = SchedulerDecision(
+            round(time.monotonic() - self._created, 3), before, self.workers, throughput, latency, reason
+        )
+        self.decisions.append(decision)
+        if before != self.workers and self.status_callback is not None:
+            self.status_callback(
+                f"[I/O] потоков {before} → {self.workers}: {_format_rate(throughput, by_bytes)}, "
+                f"задержка {latency * 1000:.0f} мс ({reason})"
+            )
+
+    def map(
+        self,
+        func: Callable[[T], R],
+        items: Iterable[T],
+        size_of: Callable[[T, R], int] | None = None,
+        cost_of: Callable[[T], int] | None = None,
+        max_pending_cost: int | None = None,
+    ) -> Iterator[R]:
+        """Выполняет `func` над элементами параллельно и выдаёт результаты по порядку.
+
+        `items` читается лениво в вызывающем потоке, одновременно выполняется
+        не больше `workers` задач. `size_of(item, result)` — объём в байтах
+        для измерения и лимита скорости; без него считаются операции.
+        `cost_of(item)` и `max_pending_cost` ограничивают суммарную «стоимость»
+        (например, байты в памяти) запущенных и ещё не выданных задач: новая
+        задача ждёт, пока освободится место, но одна задача запускается всегда.
+        Первая ошибка прерывает обход: невыполненные задачи отменяются.
+        """
+        iterator = iter(items)
+        pending: deque[tuple[Future, int]] = deque()
+        pending_cost = 0
+        window = _Window()
+        exhausted = False
+        lookahead: list[tuple[T, int]] = []
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="io") as executor:
+            try:
+                while True:
+                    while len(pending) < self.workers:
+                        if not lookahead:
+                            if exhausted:
+                                break
+                            try:
+                                item = next(iterator)
+                            except StopIteration:
+                                exhausted = True
+                                break
+                            lookahead.append((item, cost_of(item) if cost_of is not None else 0))
+                        item, cost = lookahead[0]
+                        if (
+                            pending
+                            and max_pending_cost is not None
+                            and pending_cost + cost > max_pending_cost
+                        ):
+                            break
+                        lookahead.clear()
+                        pending.append((executor.submit(self._run, func, item, size_of), cost))
+                        pending_cost += cost
+                    if not pending:
+                        return
+                    future, cost = pending.popleft()
+                    try:
+                        result, latency, units = future.result()
+                    except Exception:
+                        window.errors += 1
+                        self._evaluate(window)
+                        raise
+                    window.tasks += 1
+                    window.units += units
+                    window.latencies.append(latency)
+                    if (
+                        window.tasks >= max(WINDOW_MIN_TASKS, self.workers)
+                        and time.monotonic() - window.started >= WINDOW_SECONDS
+                    ):
+                        self._evaluate(window)
+                        window = _Window()
+                    yield result
+                    # Результат уже обработан потребителем — его место освобождается
+                    pending_cost -= cost
+            finally:
+                for future, _cost in pending:
+                    future.cancel()
+
+__all__ = [
+    "AdaptiveIOScheduler",
+    "SchedulerDecision",
+]
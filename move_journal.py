@@ -0,0 +1,306 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, TextIO
+
+
+StatusCallback = Callable[[str], None] | None
+JOURNAL_NAME = "move_journal.jsonl"
+STATUS_COMMITTED = "commit"
+STATUS_ROLLED_BACK = "rollback"
+
+
+@dataclass
+class JournalEntry:
+    """Запланированное перемещение одного файла."""
+
+    entry_id: int
+    source: Path
+    destination: Path
+
+
+@dataclass
+class JournalState:
+    """Состояние журнала, восстановленное из файла."""
+
+    entries: dict[int, JournalEntry] = field(default_factory=dict)
+    done: set[int] = field(default_factory=set)
+    undone: set[int] = field(default_factory=set)
+    status: str | None = None
+
+
+@dataclass
+class JournalReplayResult:
+    """Итог повторного проигрывания журнала (resume/rollback)."""
+
+    completed: list[Path] = field(default_factory=list)
+    skipped: list[Path] = field(default_factory=list)
+    missing: list[Path] = field(default_factory=list)
+    removed: list[Path] = field(default_factory=list)
+
+
+def _notify(callback: StatusCallback, message: str) -> None:
+    """Отправляет сообщение о статусе, если колбэк задан."""
+    if callback is not None:
+        callback(message)
+
+
+def journal_path(destination_dir: Path) -> Path:
+    return destination_dir / JOURNAL_NAME
+
+
+def load_journal(path: Path) -> JournalState:
+    """Читает журнал; оборванная последняя строка (сбой при записи) игнорируется."""
+    state = JournalState()
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                break
+            op = record.get("op")
+            if op == "plan":
+                entry_id = int(record["id"])
+                state.entries[entry_id] = JournalEntry(
+                    entry_id, Path(record["src"]), Path(record["dst"])
+                )
+            elif op == "done":
+                state.done.add(int(record["id"]))
+            elif op == "undone":
+                state.undone.add(int(record["id"]))
+            elif op in (STATUS_COMMITTED, STATUS_ROLLED_BACK):
+                state.status = op
+    return state
+
+
+class MoveJournal:
+    """Журнал упреждающей записи для перемещения файлов в целевую папку.
+
+    План всех перемещений сбрасывается на диск до первого переноса, поэтому
+    после сбоя по журналу можно продолжить (`resume_moves`) или откатить
+    (`rollback_moves`) операцию без повторного сканирования источника.
+    Успешно завершённый журнал удаляется; закрытый журнал прошлого запуска
+    (например, откатанного) удаляется при создании нового. Как контекстный
+    менеджер журнал закрывается без отметки о завершении, если её не сделали.
+    """
+
+    def __init__(self, path: Path, handle: TextIO) -> None:
+        self.path = path
+        self._handle = handle
+
+    @classmethod
+    def create(
+        cls, destination_dir: Path, moves: Iterable[tuple[Path, Path]]
+    ) -> MoveJournal:
+        path = journal_path(destination_dir)
+        if path.exists():
+            previous = load_journal(path)
+            if previous.status is None:
+                raise ValueError(
+                    f"В {destination_dir} найден незавершённый журнал перемещений "
+                    f"{JOURNAL_NAME}. Продолжите (resume) или откатите (rollback) "
+                    "прошлый запуск."
+                )
+            path.unlink()
+
+        journal = cls._open(path, "x")
+        with journal.closing_on_error():
+            journal._write({"op": "begin", "created": datetime.now().isoformat(timespec="seconds")})
+            journal.plan(0, moves)
+        return journal
+
+    @classmethod
+    def reopen(cls, destination_dir: Path) -> MoveJournal:
+        return cls._open(journal_path(destination_dir), "a")
+
+    @classmethod
+    def _open(cls, path: Path, mode: str) -> MoveJournal:
+        """Открывает файл журнала; закрывает его `close` или выход из `with`."""
+        return cls(path, open(path, mode, encoding="utf-8"))
+
+    def __enter__(self) -> MoveJournal:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    @contextmanager
+    def closing_on_error(self) -> Iterator[MoveJournal]:
+        """Закрывает файл журнала (без отметки о завершении), если в блоке произошла ошибка."""
+        try:
+            yield self
+        except BaseException:
+            self.close()
+            raise
+
+    def _write(self, record: dict[str, object]) -> None:
+        self._handle.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def _sync(self) -> None:
+        self._handle.flush()
+        os.fsync(self._handle.fileno())
+
+    def plan(self, first_id: int, moves: Iterable[tuple[Path, Path]]) -> None:
+        """Дописывает очередную порцию плана (потоковый режим) и сбрасывает её на диск."""
+        for entry_id, (source, destination) in enumerate(moves, first_id):
+            self._write({"op": "plan", "id": entry_id, "src": str(source), "dst": str(destination)})
+        self._sync()
+
+    def mark_done(self, entry_id: int) -> None:
+        # Без fsync: потерянную отметку восстановит resume по наличию файлов.
+        self._write({"op": "done", "id": entry_id})
+        self._handle.flush()
+
+    def mark_undone(self, entry_id: int) -> None:
+        self._write({"op": "undone", "id": entry_id})
+        self._handle.flush()
+
+    def close(self, status: str | None = None) -> None:
+        """Закрывает журнал; с `STATUS_COMMITTED` файл журнала больше не нужен и удаляется."""
+        if self._handle.closed:
+            return
+        if status is not None:
+            self._write({"op": status})
+            self._sync()
+        self._handle.close()
+        if status == STATUS_COMMITTED:
+            try:
+                self.path.unlink()
+            except OSError:
+                pass  # журнал с отметкой commit безопасен: следующий запуск его удалит
+
+
+def resume_moves(
+    destination_dir: Path, status_callback: StatusCallback = None
+) -> JournalReplayResult:
+    """Довыполняет незавершённые перемещения по журналу целевой папки."""
+    path = journal_path(destination_dir)
+    if not path.exists():
+        raise FileNotFoundError(f"Журнал перемещений не найден: {path}")
+    state = load_journal(path)
+    result = JournalReplayResult()
+    if state.status is not None:
+        _notify(status_callback, "Журнал уже закрыт — продолжать нечего.")
+        return result
+
+    with MoveJournal.reopen(destination_dir) as journal:
+        for entry_id, entry in sorted(state.entries.items()):
+            if entry_id in state.done:
+                result.skipped.append(entry.destination)
+                continue
+            if entry.source.exists():
+                entry.destination.parent.mkdir(parents=True, exist_ok=True)
+                # Остаток оборванного межтомового переноса перезаписывается.
+                entry.destination.unlink(missing_ok=True)
+                shutil.move(str(entry.source), str(entry.destination))
+                result.completed.append(entry.destination)
+                _notify(status_callback, f"  • {entry.source.name} → {entry.destination.name}")
+            elif entry.destination.exists():
+                result.skipped.append(entry.destination)
+            else:
+                result.missing.append(entry.source)
+                _notify(status_callback, f"Не найден: {entry.source}")
+                continue
+            journal.mark_done(entry_id)
+        journal.close(STATUS_COMMITTED)
+    _notify(
+        status_callback,
+        f"Продолжение завершено: перемещено {len(result.completed)}, "
+        f"пропущено {len(result.skipped)}, не найдено {len(result.missing)}.",
+    )
+    return result
+
+
+def rollback_moves(
+    destination_dir: Path, status_callback: StatusCallback = None
+) -> JournalReplayResult:
+    """Возвращает перемещённые по журналу файлы на исходные места."""
+    path = journal_path(destination_dir)
+    if not path.exists():
+        raise FileNotFoundError(f"Журнал перемещений не найден: {path}")
+    state = load_journal(path)
+    result = JournalReplayResult()
+    if state.status == STATUS_ROLLED_BACK:
+        _notify(status_callback, "Журнал уже откатан.")
+        return result
+
+    with MoveJournal.reopen(destination_dir) as journal:
+        for entry_id, entry in sorted(state.entries.items(), reverse=True):
+            if entry_id in state.undone:
+                continue
+            if not entry.destination.exists():
+                if entry_id in state.done:
+                    result.missing.append(entry.destination)
+                continue
+            if entry.source.exists():
+                if entry_id in state.done:
+                    result.skipped.append(entry.destination)
+                    _notify(status_callback, f"Пропуск (источник занят): {entry.source}")
+                    continue
+                # Перенос не завершён, источник цел: в целевой папке — неполная копия или дубль
+                entry.destination.unlink()
+                result.removed.append(entry.destination)
+                journal.mark_undone(entry_id)
+                _notify(status_callback, f"  • удалена неполная копия {entry.destination.name}")
+                continue
+            entry.source.parent.mkdir(parents=True, exist_ok=True)
+            shutil.move(str(entry.destination), str(entry.source))
+            result.completed.append(entry.source)
+            journal.mark_undone(entry_id)
+            _notify(status_callback, f"  • {entry.destination.name} → {entry.source.parent}")
+        journal.close(STATUS_ROLLED_BACK)
+
+    # Удаляем опустевшие каталоги групп, созданные прерванным запуском.
+    planned_dirs = {entry.destination.parent for entry in state.entries.values()}
+    for directory in sorted(planned_dirs, key=lambda p: len(p.parts), reverse=True):
+        while directory != destination_dir and destination_dir in directory.parents:
+            try:
+                directory.rmdir()
+            except OSError:
+                break
+            directory = directory.parent
+
+    _notify(
+        status_callback,
+        f"Откат завершён: возвращено {len(result.completed)}, удалено копий {len(result.removed)}, "
+        f"пропущено {len(result.skipped)}, не найдено {len(result.missing)}.",
+    )
+    return result
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Продолжение или откат перемещений по журналу move_journal.jsonl."
+    )
+    parser.add_argument("command", choices=("resume", "rollback"))
+    parser.add_argument("destination", type=Path, help="Целевая папка группировки")
+    args = parser.parse_args(argv)
+
+    replay = resume_moves if args.command == "resume" else rollback_moves
+    try:
+        result = replay(args.destination.resolve(), status_callback=print)
+    except (FileNotFoundError, ValueError) as error:
+        print(f"Ошибка: {error}")
+        return 1
+    return 1 if result.missing else 0
+
+
+__all__ = [
+    "JOURNAL_NAME",
+    "JournalReplayResult",
+    "MoveJournal",
+    "load_journal",
+    "resume_moves",
+    "rollback_moves",
+]
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,299 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import statistics
+import time
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, ContextManager, Iterable, Iterator, Sequence
+
+
+StatusCallback = Callable[[str], None] | None
+Clock = Callable[[], float]
+
+HISTORY_FILE_NAME = "run_history.sqlite3"
+RUN_TRANSMITTAL = "transmittal"
+RUN_GROUPING = "grouping"
+RUN_CMM = "cmm"
+RUN_KINDS = {
+    RUN_TRANSMITTAL: "Трансмиттал",
+    RUN_GROUPING: "Группировка",
+    RUN_CMM: "CMM",
+}
+ESTIMATE_RUNS = 10  # последних успешных запусков для оценки времени
+CHART_RUNS = 50
+MAX_ETA_PERCENT = 99  # до окончания запуска прогресс не показывает 100 %
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    duration REAL NOT NULL,
+    files INTEGER NOT NULL,
+    bytes INTEGER NOT NULL,
+    ok INTEGER NOT NULL,
+    stages TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_kind ON runs(kind, id);
+"""
+
+
+@dataclass
+class RunMetrics:
+    """Метрики одного запуска: длительности этапов, объём входных данных и итог."""
+
+    kind: str
+    started_at: str
+    duration: float
+    files: int = 0
+    bytes: int = 0
+    stages: dict[str, float] = field(default_factory=dict)
+    ok: bool = True
+
+    @property
+    def files_per_second(self) -> float:
+        return self.files / self.duration if self.duration > 0 else 0.0
+
+    @property
+    def megabytes_per_second(self) -> float:
+        return self.bytes / (1024 * 1024) / self.duration if self.duration > 0 else 0.0
+
+
+class RunRecorder:
+    """Секундомер запуска: общая длительность и этапы (`stage`)."""
+
+    def __init__(self, kind: str, files: int = 0, bytes_total: int = 0, clock: Clock = time.monotonic) -> None:
+        self.kind = kind
+        self.files = files
+        self.bytes = bytes_total
+        self.ok = True
+        self.stages: dict[str, float] = {}
+        self._clock = clock
+        self._started = clock()
+        self._started_at = datetime.now().isoformat(timespec="seconds")
+
+    @property
+    def elapsed(self) -> float:
+        return self._clock() - self._started
+
+    def set_input(self, files: int, bytes_total: int | None = None) -> None:
+        """Объём входа, как его отобрал сам запуск (без отдельного обхода папки)."""
+        self.files = files
+        if bytes_total is not None:
+            self.bytes = bytes_total
+
+    def add_input(self, files: int = 0, bytes_total: int = 0) -> None:
+        """Добавляет к объёму входа то, что запуск обработал по ходу работы."""
+        self.files += files
+        self.bytes += bytes_total
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Добавляет длительность блока к этапу `name` (повторные вызовы суммируются)."""
+        started = self._clock()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + self._clock() - started
+
+    def finish(self, ok: bool | None = None) -> RunMetrics:
+        if ok is not None:
+            self.ok = ok
+        return RunMetrics(
+            self.kind, self._started_at, self.elapsed, self.files, self.bytes, dict(self.stages), self.ok
+        )
+
+
+def run_stage(recorder: RunRecorder | None, name: str) -> ContextManager[None]:
+    """Этап запуска для необязательного `recorder`."""
+    return recorder.stage(name) if recorder is not None else nullcontext()
+
+
+def total_size(paths: Iterable[Path]) -> int:
+    """Общий размер уже отобранных файлов; недоступные пропускаются."""
+    total = 0
+    for path in paths:
+        try:
+            total += path.stat().st_size
+        except OSError:
+            continue
+    return total
+
+
+class RunHistory:
+    """Журнал запусков в SQLite: метрики, оценка длительности и ряды для графика."""
+
+    def __init__(self, db_path: Path) -> None:
+        self.db_path = db_path
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(db_path)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> RunHistory:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def record(self, metrics: RunMetrics) -> None:
+        with self._conn:
+            self._conn.execute(
+                "INSERT INTO runs (kind, started_at, duration, files, bytes, ok, stages)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    metrics.kind,
+                    metrics.started_at,
+                    metrics.duration,
+                    metrics.files,
+                    metrics.bytes,
+                    int(metrics.ok),
+                    json.dumps(metrics.stages, ensure_ascii=False),
+                ),
+            )
+
+    def recent(self, kind: str, limit: int = CHART_RUNS, ok_only: bool = False) -> list[RunMetrics]:
+        """Последние запуски вида `kind` в хронологическом порядке."""
+        rows = self._conn.execute(
+            "SELECT kind, started_at, duration, files, bytes, stages, ok FROM runs"
+            " WHERE kind = ? AND (ok = 1 OR ?) ORDER BY id DESC LIMIT ?",
+            (kind, int(not ok_only), limit),
+        ).fetchall()
+        return [
+            RunMetrics(row[0], row[1], row[2], row[3], row[4], json.loads(row[5]), bool(row[6]))
+            for row in reversed(rows)
+        ]
+
+    def seconds_per_file(self, kind: str) -> float | None:
+        """Медиана секунд на входной файл по последним успешным запускам."""
+        runs = [run for run in self.recent(kind, ESTIMATE_RUNS, ok_only=True) if run.files > 0]
+        if not runs:
+            return None
+        return statistics.median(run.duration / run.files for run in runs)
+
+    def estimate(self, kind: str, files: int) -> float | None:
+        """Ожидаемая длительность для `files` входных файлов по медиане последних запусков."""
+        rate = self.seconds_per_file(kind)
+        if rate is None or files <= 0:
+            return None
+        return files * rate
+
+
+def format_duration(seconds: float) -> str:
+    """`95.2` → `1 мин 35 с`."""
+    seconds = max(0, round(seconds))
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours} ч {minutes:02d} мин"
+    if minutes:
+        return f"{minutes} мин {seconds:02d} с"
+    return f"{seconds} с"
+
+
+class EtaSnapshotStatus:
+    """Колбэк статуса, дописывающий к сообщению оценку на момент этого сообщения.
+
+    Оценка берётся из истории запусков (`RunHistory.estimate`) и пересчитывается
+    только при очередном сообщении: между сообщениями надпись не обновляется,
+    поэтому в ней указано, сколько времени прошло к моменту оценки. Без истории
+    сообщения передаются как есть. С `seconds_per_file` оценка появляется, как
+    только запуск сообщит число входных файлов (`RunRecorder.set_input`).
+    """
+
+    def __init__(
+        self,
+        status_callback: Callable[[str], None],
+        recorder: RunRecorder,
+        expected: float | None = None,
+        seconds_per_file: float | None = None,
+    ) -> None:
+        self._status_callback = status_callback
+        self._recorder = recorder
+        self._expected = expected
+        self._seconds_per_file = seconds_per_file
+
+    @property
+    def expected(self) -> float | None:
+        if self._expected is not None:
+            return self._expected
+        if self._seconds_per_file is None or self._recorder.files <= 0:
+            return None
+        return self._seconds_per_file * self._recorder.files
+
+    def suffix(self) -> str:
+        if not self.expected:
+            return ""
+        elapsed = self._recorder.elapsed
+        remaining = self.expected - elapsed
+        if remaining <= 0:
+            return f" [на {format_duration(elapsed)}: дольше обычного, ожидалось ~{format_duration(self.expected)}]"
+        percent = min(MAX_ETA_PERCENT, int(elapsed / self.expected * 100))
+        return f" [на {format_duration(elapsed)}: ~{percent}%, оставалось ~{format_duration(remaining)}]"
+
+    def __call__(self, message: str) -> None:
+        self._status_callback(message + self.suffix())
+
+
+@dataclass(frozen=True)
+class ThroughputTrend:
+    """Сводка скорости по виду запусков: медиана и отклонение последнего запуска."""
+
+    kind: str
+    runs: int
+    median: float
+    last: float
+
+    @property
+    def change(self) -> float:
+        """Отклонение последнего запуска от медианы (−0.3 — на 30 % медленнее)."""
+        return self.last / self.median - 1 if self.median else 0.0
+
+
+def throughput_trend(kind: str, runs: Sequence[RunMetrics]) -> ThroughputTrend | None:
+    rates = [run.files_per_second for run in runs if run.ok and run.files > 0]
+    if not rates:
+        return None
+    return ThroughputTrend(kind, len(rates), statistics.median(rates), rates[-1])
+
+
+def chart_points(
+    series: dict[str, Sequence[float]], width: int, height: int, padding: int = 20
+) -> dict[str, list[tuple[float, float]]]:
+    """Координаты ломаных для графика скорости (общая шкала по оси Y, запуски по оси X)."""
+    peak = max((value for values in series.values() for value in values), default=0.0)
+    longest = max((len(values) for values in series.values()), default=0)
+    if peak <= 0 or longest == 0:
+        return {kind: [] for kind in series}
+    step = (width - 2 * padding) / max(1, longest - 1)
+    scale = (height - 2 * padding) / peak
+    return {
+        kind: [(padding + index * step, height - padding - value * scale) for index, value in enumerate(values)]
+        for kind, values in series.items()
+    }
+
+
+__all__ = [
+    "HISTORY_FILE_NAME",
+    "RUN_CMM",
+    "RUN_GROUPING",
+    "RUN_KINDS",
+    "RUN_TRANSMITTAL",
+    "EtaSnapshotStatus",
+    "RunHistory",
+    "RunMetrics",
+    "RunRecorder",
+    "ThroughputTrend",
+    "chart_points",
+    "format_duration",
+    "run_stage",
+    "throughput_trend",
+    "total_size",
+]
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass
+from typing import Callable, Iterable
+
+from tz_parser import normalize_key
+
+
+NormalizeKey = Callable[[str], str]
+
+NGRAM_SIZE = 3
+SHORTLIST_SIZE = 12  # индексов TZ, для которых считается расстояние правки
+COMMON_NGRAM_SHARE = 8  # n-грамма чаще, чем у 1/8 индексов, при отборе не учитывается
+DEFAULT_SUGGESTIONS = 3
+
+
+@dataclass(frozen=True)
+class SuffixCandidate:
+    """Строка TZ с суффиксом: индекс (B), периодичность (E), Reserved (H) и суффикс (G)."""
+
+    lookup: str
+    periodicity: str | None
+    reserved: str | None
+    suffix: str
+
+    def describe(self) -> str:
+        return (
+            f"{self.lookup} (Reserved={self.reserved or '—'}; "
+            f"Periodicity={self.periodicity or '—'}) → {self.suffix}"
+        )
+
+
+@dataclass(frozen=True)
+class SuffixSuggestion:
+    """Похожая строка TZ: правок в индексе и число несовпавших Reserved/Periodicity."""
+
+    candidate: SuffixCandidate
+    distance: int
+    mismatches: int
+
+
+def _ngrams(text: str) -> set[str]:
+    padded = f"^{text}$"
+    return {padded[i : i + NGRAM_SIZE] for i in range(max(1, len(padded) - NGRAM_SIZE + 1))}
+
+
+def edit_distance(left: str, right: str) -> int:
+    """Расстояние Левенштейна между двумя строками."""
+    if len(left) < len(right):
+        left, right = right, left
+    previous = list(range(len(right) + 1))
+    for i, left_char in enumerate(left, 1):
+        current = [i]
+        for j, right_char in enumerate(right, 1):
+            current.append(
+                min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (left_char != right_char))
+            )
+        previous = current
+    return previous[-1]
+
+
+class SuggestionIndex:
+    """Подсказки «возможно, имелось в виду» для групп без суффикса.
+
+    Индекс строится один раз: n-граммы нормализованных индексов TZ ведут
+    к строкам с суффиксом. Для запроса отбираются `SHORTLIST_SIZE` индексов
+    с наибольшим числом общих n-грамм, и только для них считается расстояние
+    правки; результаты по одному индексу запоминаются, так что тысячи
+    пропусков с повторяющимися индексами разбираются за миллисекунды.
+    Подсказки упорядочены по расстоянию, затем по несовпадениям Reserved и
+    периодичности.
+    """
+
+    def __init__(self, candidates: Iterable[SuffixCandidate], normalize: NormalizeKey = normalize_key) -> None:
+        self._normalize = normalize
+        self._keys: list[str] = []
+        self._candidates: list[list[SuffixCandidate]] = []
+        self._postings: dict[str, list[int]] = {}
+        positions: dict[str, int] = {}
+        for candidate in dict.fromkeys(candidates):
+            key = normalize(candidate.lookup.strip())
+            position = positions.get(key)
+            if position is None:
+                position = positions[key] = len(self._keys)
+                self._keys.append(key)
+                self._candidates.append([])
+                for gram in _ngrams(key):
+                    self._postings.setdefault(gram, []).append(position)
+            self._candidates[position].append(candidate)
+        self._shortlists: dict[str, list[tuple[int, int]]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(candidates) for candidates in self._candidates)
+
+    def _shortlist(self, key: str) -> list[tuple[int, int]]:
+        """Ближайшие индексы TZ: пары (расстояние правки, позиция)."""
+        cached = self._shortlists.get(key)
+        if cached is not None:
+            return cached
+        postings = [self._postings[gram] for gram in _ngrams(key) if gram in self._postings]
+        # Частые n-граммы (`^II`, `II.`) есть почти у всех индексов и отбору не помогают
+        common_limit = max(SHORTLIST_SIZE, len(self._keys) // COMMON_NGRAM_SHARE)
+        selective = [posting for posting in postings if len(posting) <= common_limit] or postings
+        overlap: Counter[int] = Counter()
+        for posting in selective:
+            overlap.update(posting)
+        shortlist = sorted(
+            (edit_distance(key, self._keys[position]), position)
+            for position, _count in overlap.most_common(SHORTLIST_SIZE)
+        )
+        self._shortlists[key] = shortlist
+        return shortlist
+
+    def suggest(
+        self,
+        lookup: str,
+        reserved: str | None = None,
+        periodicity: str | None = None,
+        limit: int = DEFAULT_SUGGESTIONS,
+    ) -> list[SuffixSuggestion]:
+        """Ближайшие строки TZ для индекса с уже нормализованными Reserved и периодичностью."""
+        key = self._normalize(lookup.strip())
+        if not key:
+            return []
+        suggestions = [
+            SuffixSuggestion(
+                candidate,
+                distance,
+                (candidate.reserved != reserved) + (candidate.periodicity != periodicity),
+            )
+            for distance, position in self._shortlist(key)
+            for candidate in self._candidates[position]
+        ]
+        suggestions.sort(key=lambda item: (item.distance, item.mismatches))
+        return suggestions[:limit]
+
+
+__all__ = [
+    "DEFAULT_SUGGESTIONS",
+    "SuffixCandidate",
+    "SuffixSuggestion",
+    "SuggestionIndex",
+    "edit_distance",
+]
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterable
+
+from template_compiler import load_template_meta
+from xlsx_stream_writer import TransmittalLayout
+
+
+StatusCallback = Callable[[str], None] | None
+Snapshot = dict[str, tuple[int, int]]  # имя файла → (размер, mtime_ns)
+Lister = Callable[[Path], Snapshot]
+
+TEMPLATE_SUFFIX = ".xltx"
+DEFAULT_POLL_SECONDS = 5.0
+
+
+def list_template_files(directory: Path) -> Snapshot:
+    """Имена, размеры и mtime шаблонов `*.xltx` в папке (пусто, если папки нет)."""
+    snapshot: Snapshot = {}
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.name.lower().endswith(TEMPLATE_SUFFIX) and entry.is_file():
+                    stat = entry.stat()
+                    snapshot[entry.name] = (stat.st_size, stat.st_mtime_ns)
+    except (FileNotFoundError, NotADirectoryError):
+        pass
+    return snapshot
+
+
+def template_abbreviation(file_name: str) -> str | None:
+    """Аббревиатура компании из имени: `CT-GST-TRA-PRM-Template.xltx` → `GST`."""
+    parts = Path(file_name).stem.split("-")
+    return parts[1].upper() if len(parts) > 1 else None
+
+
+@dataclass(frozen=True)
+class TemplateEntry:
+    """Шаблон трансмиттала в папке статуса."""
+
+    status_dir: str
+    path: Path
+    abbr: str | None
+    size: int
+    mtime_ns: int
+
+    @property
+    def name(self) -> str:
+        return self.path.name
+
+
+class TemplateCatalog:
+    """Кэш шаблонов `template_tra/<статус>` с обновлением по опросу.
+
+    Папки статусов сканируются фоновым потоком (`start`), а `options`
+    отдаёт список из памяти. Каждые `poll_interval` секунд снимок папки
+    (имена, размеры, mtime) сравнивается с прежним; при изменении список
+    обновляется, а `version` увеличивается. `lister` заменяет чтение диска
+    (например, в тестах). С `layout` метаданные новых шаблонов компилируются
+    заранее (`template_compiler.load_template_meta`).
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        status_dirs: Iterable[str],
+        poll_interval: float = DEFAULT_POLL_SECONDS,
+        lister: Lister = list_template_files,
+        layout: TransmittalLayout | None = None,
+        status_callback: StatusCallback = None,
+    ) -> None:
+        self.root = root
+        self.status_dirs = list(status_dirs)
+        self.poll_interval = poll_interval
+        self.version = 0
+        self._lister = lister
+        self._layout = layout
+        self._status_callback = status_callback
+        self._lock = threading.Lock()
+        self._snapshots: dict[str, Snapshot] = {}
+        self._entries: dict[str, list[TemplateEntry]] = {}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _make_entries(self, status_dir: str, snapshot: Snapshot) -> list[TemplateEntry]:
+        directory = self.root / status_dir
+        return [
+            TemplateEntry(status_dir, directory / name, template_abbreviation(name), size, mtime_ns)
+            for name, (size, mtime_ns) in sorted(snapshot.items())
+        ]
+
+    def _scan(self, status_dir: str) -> bool:
+        """Сканирует одну папку статуса; `True`, если её содержимое изменилось."""
+        snapshot = self._lister(self.root / status_dir)
+        with self._lock:
+            if self._snapshots.get(status_dir) == snapshot:
+                return False
+        entries = self._make_entries(status_dir, snapshot)
+        if self._layout is not None:
+            for entry in entries:
+                try:
+                    load_template_meta(entry.path, self._layout)
+                except Exception as error:  # noqa: BLE001 - шаблон проверится при формировании
+                    if self._status_callback is not None:
+                        self._status_callback(f"[ПРЕДУПРЕЖДЕНИЕ] Шаблон {entry.name}: {error}")
+        with self._lock:
+            self._snapshots[status_dir] = snapshot
+            self._entries[status_dir] = entries
+            self.version += 1
+        return True
+
+    def refresh(self) -> bool:
+        """Опрашивает все папки статусов; `True`, если хоть одна изменилась."""
+        changed = False
+        for status_dir in self.status_dirs:
+            try:
+                changed = self._scan(status_dir) or changed
+            except OSError as error:
+                if self._status_callback is not None:
+                    self._status_callback(f"[ПРЕДУПРЕЖДЕНИЕ] Папка шаблонов {status_dir}: {error}")
+        return changed
+
+    def options(self, status_dir: str) -> list[TemplateEntry]:
+        """Шаблоны папки статуса из кэша.
+
+        Ещё не сканированная папка читается сразу, но только список имён:
+        метаданные шаблонов компилирует фоновый поток (снимок папки не
+        запоминается, поэтому следующий опрос её обработает).
+        """
+        with self._lock:
+            entries = self._entries.get(status_dir)
+        if entries is None:
+            listed = self._make_entries(status_dir, self._lister(self.root / status_dir))
+            with self._lock:
+                entries = self._entries.setdefault(status_dir, listed)
+        return list(entries)
+
+    def _poll(self) -> None:
+        while True:
+            self.refresh()
+            if self._stop.wait(self.poll_interval):
+                return
+
+    def start(self) -> TemplateCatalog:
+        """Запускает фоновое сканирование и опрос (поток-демон)."""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._poll, name="template-catalog", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+__all__ = [
+    "TemplateCatalog",
+    "TemplateEntry",
+    "list_template_files",
+    "template_abbreviation",
+]
@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+from dataclasses import asdict, dataclass, field, replace
+from pathlib import Path
+from typing import Callable
+
+from openpyxl import load_workbook
+from openpyxl.utils.cell import get_column_letter, range_boundaries
+
+from file_copy import file_sha256
+from xlsx_stream_writer import TransmittalLayout
+
+
+StatusCallback = Callable[[str], None] | None
+
+TEMPLATE_META_SUFFIX = ".meta.json"
+TEMPLATE_META_VERSION = 2
+SENDER_CELL_NAME = "pripmem"
+
+ORIGIN_COMPILED = "compiled"
+ORIGIN_SIDECAR = "sidecar"
+ORIGIN_MEMORY = "memory"
+
+
+class TemplateError(ValueError):
+    """Шаблон трансмиттала непригоден для заполнения."""
+
+
+@dataclass
+class TemplateMeta:
+    """Заранее извлечённые сведения о шаблоне трансмиттала.
+
+    `named_cells` — лист и координата каждого глобального имени (первая ячейка
+    диапазона), `const_values` — постоянные значения первой строки данных по
+    номерам колонок. `errors` делают шаблон непригодным, `warnings` лишь
+    сообщают о запасных значениях. `volume_column_issue` объясняет, чем занята
+    колонка тома архива; с таким шаблоном многотомный архив не собирается.
+    """
+
+    template_sha256: str
+    sheet_name: str
+    footer_row: int
+    named_cells: dict[str, tuple[str, str]] = field(default_factory=dict)
+    const_values: dict[int, object] = field(default_factory=dict)
+    data_row_height: float | None = None
+    merge_ranges: list[str] = field(default_factory=list)
+    volume_column_issue: str | None = None
+    errors: list[str] = field(default_factory=list)
+    warnings: list[str] = field(default_factory=list)
+    origin: str = field(default=ORIGIN_COMPILED, compare=False)
+
+    def check(self, status_callback: StatusCallback = None) -> TemplateMeta:
+        """Выводит замечания в статус и поднимает `TemplateError` при ошибках шаблона."""
+        if status_callback is not None:
+            for warning in self.warnings:
+                status_callback(f"[ПРЕДУПРЕЖДЕНИЕ] Шаблон: {warning}")
+        if self.errors:
+            raise TemplateError("Шаблон трансмиттала содержит ошибки:\n" + "\n".join(self.errors))
+        return self
+
+    def check_volume_column(self) -> TemplateMeta:
+        """Поднимает `TemplateError`, если колонку тома архива занимает шаблон."""
+        if self.volume_column_issue:
+            raise TemplateError(
+                f"Многотомный архив недоступен: {self.volume_column_issue}. "
+                "Освободите колонку в шаблоне или отключите разбиение архива на тома."
+            )
+        return self
+
+    def named_cell(self, name: str, default_coord: str) -> tuple[str, str]:
+        """Лист и координата имени `name`; без имени — `default_coord` активного листа."""
+        return self.named_cells.get(name, (self.sheet_name, default_coord))
+
+    def to_dict(self) -> dict[str, object]:
+        data = asdict(self)
+        data.pop("origin")
+        data["const_values"] = {str(column): value for column, value in self.const_values.items()}
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict[str, object]) -> TemplateMeta:
+        values = dict(data)
+        values["const_values"] = {
+            int(column): value for column, value in dict(values.get("const_values") or {}).items()
+        }
+        values["named_cells"] = {
+            name: (str(sheet), str(coord))
+            for name, (sheet, coord) in dict(values.get("named_cells") or {}).items()
+        }
+        return cls(**values)
+
+
+def meta_path_for(template_path: Path) -> Path:
+    """Путь файла метаданных рядом с шаблоном: `<шаблон>.xltx.meta.json`."""
+    return template_path.with_name(template_path.name + TEMPLATE_META_SUFFIX)
+
+
+def _layout_key(layout: TransmittalLayout) -> object:
+    return json.loads(json.dumps(asdict(layout)))
+
+
+def _first_cell(ref: str) -> tuple[str, str]:
+    sheet, _, coord = ref.rpartition("!")
+    sheet = sheet.strip()
+    if sheet.startswith("'") and sheet.endswith("'"):
+        sheet = sheet[1:-1].replace("''", "'")
+    return sheet, coord.replace("$", "").split(":")[0]
+
+
+def _volume_column_issue(ws, layout: TransmittalLayout, merge_ranges: list[str]) -> str | None:
+    """Чем занята колонка тома в первой строке данных (`None`, если свободна)."""
+    column = layout.volume_column
+    first_row = layout.first_data_row
+    label = f"колонка {get_column_letter(column)} для тома архива"
+    if column in layout.const_columns:
+        return f"{label} совпадает с постоянной колонкой"
+    if any(start <= column <= end for start, end in layout.merge_ranges):
+        return f"{label} входит в объединение строки данных"
+    if ws.cell(row=first_row, column=column).value is not None:
+        return f"{label} заполнена в шаблоне ({get_column_letter(column)}{first_row})"
+    for ref in merge_ranges:
+        min_col, min_row, max_col, max_row = range_boundaries(ref)
+        if min_col <= column <= max_col and min_row <= first_row <= max_row:
+            return f"{label} входит в объединение {ref}"
+    return None
+
+
+def compile_template(
+    template_path: Path,
+    layout: TransmittalLayout | None = None,
+    template_sha256: str | None = None,
+) -> TemplateMeta:
+    """Открывает шаблон один раз и собирает футер, имена, строку данных и объединения."""
+    layout = layout or TransmittalLayout()
+    template_sha256 = template_sha256 or file_sha256(template_path)
+    wb = load_workbook(template_path)
+    try:
+        ws = wb.active
+        errors: list[str] = []
+        warnings: list[str] = []
+
+        named_cells: dict[str, tuple[str, str]] = {}
+        for name, defined in wb.defined_names.items():
+            try:
+                destinations = list(defined.destinations)
+            except Exception:
+                continue
+            for sheet, ref in destinations:
+                sheet_name, coord = _first_cell(f"{sheet}!{ref}")
+                if sheet_name in wb.sheetnames:
+                    named_cells.setdefault(name, (sheet_name, coord))
+
+        first_row = layout.first_data_row
+        footer_row = layout.default_footer_row
+        anchor = named_cells.get(layout.footer_anchor_name)
+        if anchor is not None and anchor[0] == ws.title:
+            footer_row = int(re.search(r"\d+", anchor[1]).group(0))
+        elif anchor is not None:
+            errors.append(
+                f"Имя {layout.footer_anchor_name} указывает на другой лист ({anchor[0]})."
+            )
+        else:
+            warnings.append(
+                f"нет имени {layout.footer_anchor_name} — футер считается со строки {footer_row}."
+            )
+        if footer_row <= first_row:
+            errors.append(
+                f"Футер (строка {footer_row}) не ниже первой строки данных ({first_row})."
+            )
+        if SENDER_CELL_NAME not in named_cells:
+            warnings.append(f"нет имени {SENDER_CELL_NAME} — отправитель пишется в I22.")
+
+        merge_ranges = [str(merged) for merged in ws.merged_cells.ranges]
+        for ref in merge_ranges:
+            _min_col, min_row, _max_col, max_row = range_boundaries(ref)
+            if min_row < footer_row <= max_row:
+                errors.append(f"Объединение {ref} пересекает строку футера {footer_row}.")
+            elif min_row < first_row <= max_row:
+                errors.append(f"Объединение {ref} заходит в первую строку данных {first_row}.")
+
+        const_values = {
+            column: ws.cell(row=first_row, column=column).value for column in layout.const_columns
+        }
+        volume_column_issue = _volume_column_issue(ws, layout, merge_ranges)
+        if volume_column_issue:
+            warnings.append(f"{volume_column_issue} — многотомный архив с этим шаблоном недоступен.")
+        return TemplateMeta(
+            template_sha256=template_sha256,
+            sheet_name=ws.title,
+            footer_row=footer_row,
+            named_cells=named_cells,
+            const_values=const_values,
+            data_row_height=ws.row_dimensions[first_row].height,
+            merge_ranges=merge_ranges,
+            volume_column_issue=volume_column_issue,
+            errors=errors,
+            warnings=warnings,
+        )
+    finally:
+        wb.close()
+
+
+def read_template_meta(
+    template_path: Path, template_sha256: str, layout: TransmittalLayout | None = None
+) -> TemplateMeta | None:
+    """Метаданные из файла рядом с шаблоном, если они собраны для этого же содержимого."""
+    layout = layout or TransmittalLayout()
+    try:
+        data = json.loads(meta_path_for(template_path).read_text(encoding="utf-8"))
+        if (
+            data.get("version") != TEMPLATE_META_VERSION
+            or data.get("layout") != _layout_key(layout)
+            or data["meta"].get("template_sha256") != template_sha256
+        ):
+            return None
+        meta = TemplateMeta.from_dict(data["meta"])
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        return None
+    meta.origin = ORIGIN_SIDECAR
+    return meta
+
+
+def save_template_meta(
+    template_path: Path, meta: TemplateMeta, layout: TransmittalLayout | None = None
+) -> bool:
+    """Сохраняет метаданные рядом с шаблоном; `False`, если папка недоступна для записи."""
+    layout = layout or TransmittalLayout()
+    target = meta_path_for(template_path)
+    try:
+        text = json.dumps(
+            {"version": TEMPLATE_META_VERSION, "layout": _layout_key(layout), "meta": meta.to_dict()},
+            ensure_ascii=False,
+            indent=2,
+        )
+        tmp_path = target.with_name(f"{target.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_text(text, encoding="utf-8")
+        os.replace(tmp_path, target)
+    except (OSError, TypeError, ValueError):
+        # Значения ячеек, которые нельзя записать в JSON, или шаблоны только для чтения
+        return False
+    return True
+
+
+_memory: dict[tuple[str, int, int, object], TemplateMeta] = {}
+_memory_lock = threading.Lock()
+
+
+def load_template_meta(template_path: Path, layout: TransmittalLayout | None = None) -> TemplateMeta:
+    """Метаданные шаблона: из памяти процесса, из файла рядом с шаблоном или компиляцией.
+
+    В памяти запись действует, пока не изменились размер и mtime шаблона;
+    файл `.meta.json` проверяется по SHA-256 содержимого.
+    """
+    layout = layout or TransmittalLayout()
+    stat = template_path.stat()
+    layout_key = _layout_key(layout)
+    key = (str(template_path.resolve()), stat.st_size, stat.st_mtime_ns, json.dumps(layout_key))
+    with _memory_lock:
+        cached = _memory.get(key)
+    if cached is not None:
+        return replace(cached, origin=ORIGIN_MEMORY)
+
+    template_sha256 = file_sha256(template_path)
+    meta = read_template_meta(template_path, template_sha256, layout)
+    if meta is None:
+        meta = compile_template(template_path, layout, template_sha256)
+        save_template_meta(template_path, meta, layout)
+    with _memory_lock:
+        _memory[key] = meta
+    return meta
+
+
+__all__ = [
+    "SENDER_CELL_NAME",
+    "TEMPLATE_META_SUFFIX",
+    "TemplateError",
+    "TemplateMeta",
+    "compile_template",
+    "load_template_meta",
+    "meta_path_for",
+    "read_template_meta",
+    "save_template_meta",
+]
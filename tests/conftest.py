@@ -3,7 +3,49 @@ from __future__ import annotations
 import sys
 from pathlib import Path
 
+import pytest
+from openpyxl import Workbook
+from openpyxl.styles import Border, Font, Side
+from openpyxl.workbook.defined_name import DefinedName
+
 # ????????? ?????? ??????? ? sys.path ??? ??????????? ??????? ??????? ???????.
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
+
+
+def build_transmittal_template(path: Path) -> None:
+    """Создаёт упрощённый шаблон трансмиттала с футером и именами."""
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Трансмитал"
+    thin = Side(style="thin")
+    ws["C3"] = "Датум: 01.01.2024"
+    for col in range(2, 17):
+        ws.cell(row=18, column=col).border = Border(left=thin, right=thin, top=thin, bottom=thin)
+    ws.cell(row=18, column=2).font = Font(bold=True)
+    ws["M18"] = "PDF"
+    ws["N18"] = 1
+    ws["O18"] = "A"
+    ws.row_dimensions[18].height = 30
+    ws.merge_cells("C18:H18")
+    ws.merge_cells("I18:L18")
+    ws["B20"] = "Напомена"
+    ws.merge_cells("B20:E20")
+    ws["I22"] = "—"
+    ws["B24"] = "Потпис"
+    wb.defined_names["FooterAnchor"] = DefinedName(
+        name="FooterAnchor", attr_text="'Трансмитал'!$B$20"
+    )
+    wb.defined_names["pripmem"] = DefinedName(
+        name="pripmem", attr_text="'Трансмитал'!$I$22"
+    )
+    wb.template = True
+    wb.save(path)
+
+
+@pytest.fixture
+def transmittal_template(tmp_path: Path) -> Path:
+    path = tmp_path / "CT-GST-TRA-PRM-Template.xltx"
+    build_transmittal_template(path)
+    return path
@@ -0,0 +1,142 @@
+import os
+import zipfile
+from pathlib import Path
+
+import pytest
+from openpyxl import load_workbook
+
+from template_compiler import TemplateError, compile_template
+from transmittal_registry import TransmittalRegistry
+
+from toir_tra_report_v1 import (
+    ARCHIVE_ENTRY_OVERHEAD,
+    OUTPUT_ENGINE_OPENPYXL,
+    OUTPUT_ENGINE_STREAM,
+    TRANSMITTAL_LAYOUT,
+    build_transmittal,
+    create_archive,
+    plan_archive_volumes,
+    record_transmittal,
+    write_transmittal_archive,
+)
+
+KB = 1024
+
+
+def _docs(tmp_path: Path, sizes_kb: list[int]) -> list[Path]:
+    docs_dir = tmp_path / "docs"
+    docs_dir.mkdir(exist_ok=True)
+    files = []
+    for i, size in enumerate(sizes_kb, 1):
+        path = docs_dir / f"CT-DR-II.7.{i}-00-1G.pdf"
+        path.write_bytes(bytes([i]) * size * KB)
+        files.append(path)
+    return files
+
+
+def test_plan_archive_volumes_bin_packs_under_budget(tmp_path: Path) -> None:
+    files = _docs(tmp_path, [30, 60, 20, 50, 10])
+    budget = 80 * KB + 2 * (ARCHIVE_ENTRY_OVERHEAD + 100)
+
+    volumes = plan_archive_volumes(files, budget)
+
+    assert len(volumes) == 3
+    assert sorted(path for volume in volumes for path in volume) == sorted(files)
+    for volume in volumes:
+        assert sum(path.stat().st_size for path in volume) <= budget
+        assert volume == sorted(volume, key=files.index)
+    assert volumes[0][0] == files[0]
+
+
+def test_plan_archive_volumes_isolates_oversized_files(tmp_path: Path) -> None:
+    files = _docs(tmp_path, [5, 200, 5])
+
+    volumes = plan_archive_volumes(files, 50 * KB)
+
+    assert volumes == [[files[0], files[2]], [files[1]]]
+    with pytest.raises(ValueError):
+        plan_archive_volumes(files, 0)
+
+
+def test_written_volumes_fit_budget_for_incompressible_files(tmp_path: Path) -> None:
+    files = _docs(tmp_path, [256, 256, 256, 256])
+    for path in files:
+        path.write_bytes(os.urandom(256 * KB))
+    # Впритык для двух файлов по несжатому размеру: deflate добавит свои блоки
+    budget = 512 * KB + 2 * (ARCHIVE_ENTRY_OVERHEAD + 2 * len(files[0].name))
+
+    volumes = plan_archive_volumes(files, budget)
+
+    for number, volume in enumerate(volumes, 1):
+        archive = create_archive(tmp_path / f"volume_{number}.zip", volume)
+        assert archive.stat().st_size <= budget
+
+
+@pytest.mark.parametrize("engine", [OUTPUT_ENGINE_OPENPYXL, OUTPUT_ENGINE_STREAM])
+def test_transmittal_records_volume_per_row(
+    tmp_path: Path, transmittal_template: Path, engine: str
+) -> None:
+    files = _docs(tmp_path, [40, 40, 40])
+    duplicate = files[0].with_name("CT-DR-II.7.9-00-1G.pdf")
+    duplicate.write_bytes(files[0].read_bytes())
+    files.append(duplicate)
+    duplicates = {duplicate: files[0]}
+    volumes = plan_archive_volumes(files, 50 * KB, duplicates)
+    messages: list[str] = []
+
+    output = build_transmittal(
+        files[0].parent,
+        transmittal_template,
+        messages.append,
+        output_engine=engine,
+        tz_map={},
+        files=files,
+        volumes=volumes,
+        duplicates=duplicates,
+    )
+    archives = write_transmittal_archive(output, None, messages.append, duplicates)
+
+    ws = load_workbook(output.saved_path).active
+    recorded = [ws.cell(row=18 + i, column=16).value for i in range(len(files))]
+    assert recorded == ["_att_01.zip", "_att_02.zip", "_att_03.zip", "_att_01.zip"]
+    assert [path.name for path in archives] == [
+        output.saved_path.stem + suffix for suffix in ("_att_01.zip", "_att_02.zip", "_att_03.zip")
+    ]
+    assert output.archive_paths() == archives
+    with zipfile.ZipFile(archives[0]) as first, zipfile.ZipFile(archives[1]) as second:
+        assert sorted(first.namelist()) == sorted(["_duplicates.txt", files[0].name])
+        assert second.namelist() == [files[1].name]
+
+    registry_path = tmp_path / "registry.sqlite3"
+    record_transmittal(output, None, None, messages.append, registry_path)
+    with TransmittalRegistry(registry_path) as registry:
+        assert [registry.find(path.name)[0].archive_path for path in files] == [
+            archives[0], archives[1], archives[2], archives[0]
+        ]
+
+
+def test_volumes_are_refused_when_template_uses_volume_column(
+    tmp_path: Path, transmittal_template: Path
+) -> None:
+    wb = load_workbook(transmittal_template)
+    wb.active["P18"] = "Примечание"
+    wb.template = True
+    wb.save(transmittal_template)
+    meta = compile_template(transmittal_template, TRANSMITTAL_LAYOUT)
+    assert meta.volume_column_issue and "P18" in meta.volume_column_issue
+    files = _docs(tmp_path, [40, 40])
+    messages: list[str] = []
+
+    with pytest.raises(TemplateError, match="колонка P"):
+        build_transmittal(
+            files[0].parent,
+            transmittal_template,
+            messages.append,
+            tz_map={},
+            files=files,
+            volumes=plan_archive_volumes(files, 50 * KB),
+        )
+    assert not list(tmp_path.glob("*.xlsx")) and not list(files[0].parent.glob("*.xlsx"))
+
+    output = build_transmittal(files[0].parent, transmittal_template, messages.append, tz_map={}, files=files)
+    assert load_workbook(output.saved_path).active["P18"].value == "Примечание"
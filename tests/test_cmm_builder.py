@@ -1,9 +1,10 @@
 from pathlib import Path
 
+import pytest
 from openpyxl import Workbook, load_workbook
 from openpyxl.workbook.defined_name import DefinedName
 
-from cmm_builder import generate_comment_sheets
+from cmm_builder import generate_comment_sheets, resolve_extra_value
 
 
 def _create_template(path: Path) -> None:
@@ -74,3 +75,80 @@ def test_generate_comment_sheets_skips_existing(tmp_path: Path) -> None:
     assert not result.created
     assert report_path in result.skipped_existing
     assert not result.failed
+
+
+def test_incremental_mode_patches_changed_descriptions(tmp_path: Path) -> None:
+    template_path = tmp_path / "CommentSheet_Template.xltx"
+    _create_template(template_path)
+
+    docs_dir = tmp_path / "docs"
+    docs_dir.mkdir()
+    (docs_dir / "CT-DR-II.7.4-00-1G.docx").write_text("stub", encoding="utf-8")
+    (docs_dir / "CT-DR-II.7.5-00-1G.docx").write_text("stub", encoding="utf-8")
+
+    tz_map = {"II.7.4": "Старое описание", "II.7.5": "Без изменений"}
+    first = generate_comment_sheets(docs_dir, template_path, tz_map, normalize_key=str.upper)
+    assert len(first.created) == 2
+
+    tz_map["II.7.4"] = "Исправленное описание"
+    second = generate_comment_sheets(
+        docs_dir, template_path, tz_map, normalize_key=str.upper, incremental=True
+    )
+
+    assert [path.name for path in second.updated] == ["CT-DR-II.7.4-00-1G_CMM.xlsx"]
+    assert [path.name for path in second.skipped_existing] == ["CT-DR-II.7.5-00-1G.docx"]
+    wb = load_workbook(docs_dir / "CT-DR-II.7.4-00-1G_CMM.xlsx")
+    assert wb.active["D6"].value == "Исправленное описание"
+    assert wb.active["D1"].value == "CT-DR-II.7.4-00-1G"
+    wb.close()
+
+    third = generate_comment_sheets(
+        docs_dir, template_path, tz_map, normalize_key=str.upper, incremental=True
+    )
+    assert not third.updated and len(third.skipped_existing) == 2
+
+
+def test_failed_rebuild_keeps_previous_comment_sheet(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    template_path = tmp_path / "CommentSheet_Template.xltx"
+    _create_template(template_path)
+    docs_dir = tmp_path / "docs"
+    docs_dir.mkdir()
+    (docs_dir / "CT-DR-II.7.4-00-1G.docx").write_text("stub", encoding="utf-8")
+    tz_map = {"II.7.4": "Описание"}
+    generate_comment_sheets(docs_dir, template_path, tz_map, normalize_key=str.upper)
+    cmm_path = docs_dir / "CT-DR-II.7.4-00-1G_CMM.xlsx"
+    before = cmm_path.read_bytes()
+
+    wb = load_workbook(template_path)
+    wb.active["A1"] = "Новая версия шаблона"
+    wb.save(template_path)
+
+    def broken_save(self, filename) -> None:
+        Path(filename).write_bytes(b"partial")
+        raise OSError("диск заполнен")
+
+    monkeypatch.setattr(Workbook, "save", broken_save)
+    result = generate_comment_sheets(
+        docs_dir, template_path, tz_map, normalize_key=str.upper, incremental=True
+    )
+
+    assert [path.name for path, _ in result.failed] == ["CT-DR-II.7.4-00-1G.docx"]
+    assert cmm_path.read_bytes() == before
+    assert sorted(path.name for path in docs_dir.iterdir()) == [
+        ".cmm_manifest.json",
+        "CT-DR-II.7.4-00-1G.docx",
+        "CT-DR-II.7.4-00-1G_CMM.xlsx",
+    ]
+
+
+def test_resolve_extra_value_uses_nearest_ancestor() -> None:
+    messages: list[str] = []
+    tz_map = {"II.7.4": "Описание объекта"}
+
+    value = resolve_extra_value("CT-DR-II.7.4.2a-00-1G", tz_map, str.upper, messages.append)
+
+    assert value == "Описание объекта"
+    assert messages == ["Описание для II.7.4.2a взято от II.7.4 (уровней вверх: 2)"]
+    assert resolve_extra_value("CT-DR-II.8.1-00-1G", tz_map, str.upper) == "Нет описания для II.8.1"
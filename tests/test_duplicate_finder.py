@@ -0,0 +1,104 @@
+import json
+import zipfile
+from pathlib import Path
+
+import pytest
+
+import duplicate_finder
+from duplicate_finder import HashCache, find_duplicates
+from toir_tra_report_v1 import DUPLICATES_NOTE_NAME, create_archive
+
+
+def _write(path: Path, data: bytes) -> Path:
+    path.write_bytes(data)
+    return path
+
+
+def _package(tmp_path: Path) -> list[Path]:
+    body = b"A" * 100_000 + b"B" * 100_000
+    changed_middle = b"A" * 100_000 + b"C" + b"B" * 99_999
+    return [
+        _write(tmp_path / "CT-DR-II.7.1-00-1G.pdf", body),
+        _write(tmp_path / "CT-DR-II.7.2-00-1G.pdf", changed_middle),
+        _write(tmp_path / "CT-DR-II.7.3-00-1G.pdf", body),
+        _write(tmp_path / "CT-DR-II.7.4-00-1G.docx", b"short"),
+        _write(tmp_path / "CT-DR-II.7.5-00-1G.pdf", body),
+    ]
+
+
+def test_find_duplicates_narrows_by_size_then_partial_then_full(tmp_path: Path) -> None:
+    files = _package(tmp_path)
+
+    report = find_duplicates(files)
+
+    assert report.groups == [[files[0], files[2], files[4]]]
+    assert report.duplicates == {files[2]: files[0], files[4]: files[0]}
+    # Файл уникального размера не читается; отличие в середине ловит только полный хеш
+    assert report.hashed_partial == 4
+    assert report.hashed_full == 4
+    assert report.saved_bytes() == 2 * 200_000
+
+
+def test_hash_cache_makes_repeated_runs_free(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    files = _package(tmp_path)
+    cache_path = tmp_path / "cache" / duplicate_finder.HASH_CACHE_FILE_NAME
+    cache_path.parent.mkdir()
+    cache = HashCache(cache_path)
+    first = find_duplicates(files, cache=cache)
+    cache.save()
+
+    def no_reads(*_args):
+        raise AssertionError("файл прочитан повторно")
+
+    monkeypatch.setattr(duplicate_finder, "file_sha256", no_reads)
+    monkeypatch.setattr(duplicate_finder, "partial_hash", no_reads)
+    warm = HashCache(cache_path)
+    assert find_duplicates(files, cache=warm).groups == first.groups
+    assert warm.hits == 4
+
+    files[2].write_bytes(b"D" * 200_000)
+    monkeypatch.undo()
+    assert find_duplicates(files, cache=warm).groups == [[files[0], files[4]]]
+
+
+def test_hash_cache_prunes_entries_lazily(tmp_path: Path) -> None:
+    kept = tmp_path / "kept.bin"
+    gone = tmp_path / "gone.bin"
+    kept.write_bytes(b"K" * 100)
+    gone.write_bytes(b"G" * 100)
+    cache_path = tmp_path / duplicate_finder.HASH_CACHE_FILE_NAME
+    cache = HashCache(cache_path)
+    cache.sha256(kept)
+    cache.sha256(gone)
+    cache._entries["/old/unused.bin"] = {"size": 1, "mtime_ns": 1, "used": 0}
+    cache.save()
+    assert set(json.loads(cache_path.read_text(encoding="utf-8"))["files"]) == {
+        str(kept.resolve()),
+        str(gone.resolve()),
+    }
+
+    gone.unlink()
+    warm = HashCache(cache_path)
+    with pytest.raises(FileNotFoundError):
+        warm.cached_sha256(gone)
+    warm.save()
+
+    assert set(json.loads(cache_path.read_text(encoding="utf-8"))["files"]) == {str(kept.resolve())}
+    assert [path.name for path in tmp_path.iterdir() if path.suffix == ".tmp"] == []
+
+
+def test_create_archive_stores_duplicate_content_once(tmp_path: Path) -> None:
+    files = _package(tmp_path)
+    report = find_duplicates(files)
+
+    archive = create_archive(tmp_path / "out_att.zip", files, duplicates=report.duplicates)
+
+    with zipfile.ZipFile(archive) as zipf:
+        names = zipf.namelist()
+        note = zipf.read(DUPLICATES_NOTE_NAME).decode("utf-8")
+    assert sorted(names) == sorted(
+        [DUPLICATES_NOTE_NAME, files[0].name, files[1].name, files[3].name]
+    )
+    assert f"{files[2].name} -> {files[0].name}" in note
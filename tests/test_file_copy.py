@@ -0,0 +1,77 @@
+import errno
+import hashlib
+import os
+from pathlib import Path
+
+import pytest
+
+import file_copy
+from file_copy import copy_file
+
+
+def _payload(size: int) -> bytes:
+    return bytes(range(256)) * (size // 256) + b"tail"
+
+
+def test_copy_file_computes_sha256_in_same_pass(tmp_path: Path) -> None:
+    src = tmp_path / "archive.zip"
+    data = _payload(3 * 1024 * 1024)
+    src.write_bytes(data)
+
+    result = copy_file(src, tmp_path / "copy.zip", compute_sha256=True)
+
+    assert result.size == len(data)
+    assert result.sha256 == hashlib.sha256(data).hexdigest()
+    assert (tmp_path / "copy.zip").read_bytes() == data
+
+
+def test_copy_file_falls_back_to_buffered_reads(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    src = tmp_path / "drawing.dwg"
+    data = _payload(300_000)
+    src.write_bytes(data)
+    monkeypatch.delattr(os, "copy_file_range", raising=False)
+    monkeypatch.delattr(os, "sendfile", raising=False)
+    monkeypatch.setattr(file_copy, "COPY_CHUNK_SIZE", 4096)
+
+    result = copy_file(src, tmp_path / "copy.dwg")
+
+    assert result.method == file_copy.COPY_METHOD_BUFFERED
+    assert result.sha256 is None
+    assert (tmp_path / "copy.dwg").read_bytes() == data
+
+
+def test_copy_file_uses_kernel_copy_when_available(tmp_path: Path) -> None:
+    src = tmp_path / "report.pdf"
+    src.write_bytes(_payload(100_000))
+
+    result = copy_file(src, tmp_path / "copy.pdf")
+
+    assert (tmp_path / "copy.pdf").read_bytes() == src.read_bytes()
+    assert result.size == 100_000 - 100_000 % 256 + 4
+    assert result.method in (
+        file_copy.COPY_METHOD_COPY_FILE_RANGE,
+        file_copy.COPY_METHOD_SENDFILE,
+        file_copy.COPY_METHOD_BUFFERED,
+    )
+
+
+def test_copy_file_falls_back_when_sendfile_needs_socket(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    src = tmp_path / "scan.pdf"
+    data = _payload(50_000)
+    src.write_bytes(data)
+
+    def sendfile(*_args: object) -> int:
+        raise OSError(errno.ENOTSOCK, "Socket operation on non-socket")
+
+    monkeypatch.delattr(os, "copy_file_range", raising=False)
+    monkeypatch.setattr(os, "sendfile", sendfile, raising=False)
+    monkeypatch.setattr(file_copy, "SENDFILE_TO_FILES", True)
+
+    result = copy_file(src, tmp_path / "copy.pdf")
+
+    assert result.method == file_copy.COPY_METHOD_BUFFERED
+    assert (tmp_path / "copy.pdf").read_bytes() == data
@@ -0,0 +1,89 @@
+import os
+from pathlib import Path
+
+from folder_catalog import FolderCatalog
+
+
+def _touch(path: Path) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("stub", encoding="utf-8")
+    return path
+
+
+def _age(root: Path) -> None:
+    """Сдвигает mtime всех папок дерева на час назад, за пределы окна гранулярности."""
+    for directory in [root, *(path for path in root.rglob("*") if path.is_dir())]:
+        stat = directory.stat()
+        os.utime(directory, ns=(stat.st_atime_ns, stat.st_mtime_ns - 3600 * 1_000_000_000))
+
+
+def _bump_mtime(directory: Path) -> None:
+    stat = directory.stat()
+    os.utime(directory, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_catalog_parses_names_and_filters_extensions(tmp_path: Path) -> None:
+    report = _touch(tmp_path / "a" / "CT-DR-II.7.4-00-1G.docx")
+    _touch(tmp_path / "notes.txt")
+
+    catalog = FolderCatalog()
+    entries = catalog.entries(tmp_path)
+
+    assert [entry.name for entry in entries] == [report.name, "notes.txt"]
+    assert entries[0].grouping_key == "II.7.4-00-1G"
+    assert entries[0].index_code == "II.7.4"
+    assert catalog.files(tmp_path, {".docx"}) == [report.resolve()]
+
+
+def test_catalog_rescans_only_changed_directories(tmp_path: Path) -> None:
+    _touch(tmp_path / "a" / "CT-DR-II.7.1-00-1G.pdf")
+    _touch(tmp_path / "b" / "CT-DR-II.7.2-00-1G.pdf")
+    _age(tmp_path)
+
+    catalog = FolderCatalog()
+    catalog.entries(tmp_path)
+    assert catalog.scanned_dirs == 3
+
+    catalog.entries(tmp_path)
+    assert catalog.scanned_dirs == 3
+
+    _touch(tmp_path / "b" / "CT-DR-II.7.3-00-1G.pdf")
+    _age(tmp_path / "b")
+    _bump_mtime(tmp_path / "b")
+    names = [entry.name for entry in catalog.entries(tmp_path)]
+    assert catalog.scanned_dirs == 4
+    assert "CT-DR-II.7.3-00-1G.pdf" in names
+
+    catalog.invalidate(tmp_path / "a")
+    catalog.entries(tmp_path)
+    assert catalog.scanned_dirs == 5
+
+
+def test_iter_entries_scans_directories_lazily(tmp_path: Path) -> None:
+    _touch(tmp_path / "CT-DR-II.7.1-00-1G.pdf")
+    _touch(tmp_path / "a" / "CT-DR-II.7.2-00-1G.pdf")
+    _touch(tmp_path / "b" / "CT-DR-II.7.3-00-1G.pdf")
+
+    catalog = FolderCatalog()
+    entries = catalog.iter_entries(tmp_path, {".pdf"})
+    assert next(entries).name == "CT-DR-II.7.1-00-1G.pdf"
+    assert catalog.scanned_dirs == 1
+
+    rest = sorted(entry.name for entry in entries)
+    assert rest == ["CT-DR-II.7.2-00-1G.pdf", "CT-DR-II.7.3-00-1G.pdf"]
+    assert catalog.scanned_dirs == 3
+
+
+def test_catalog_rescans_directory_with_racy_mtime(tmp_path: Path) -> None:
+    _touch(tmp_path / "CT-DR-II.7.1-00-1G.pdf")
+    mtime_ns = tmp_path.stat().st_mtime_ns
+
+    catalog = FolderCatalog()
+    catalog.entries(tmp_path)
+    # Файл добавлен, а mtime папки остался прежним, как на ФС с грубыми отметками
+    _touch(tmp_path / "CT-DR-II.7.2-00-1G.pdf")
+    os.utime(tmp_path, ns=(mtime_ns, mtime_ns))
+
+    names = [entry.name for entry in catalog.entries(tmp_path)]
+    assert names == ["CT-DR-II.7.1-00-1G.pdf", "CT-DR-II.7.2-00-1G.pdf"]
+    assert catalog.scanned_dirs == 2
@@ -0,0 +1,51 @@
+import zipfile
+from pathlib import Path
+
+from openpyxl import load_workbook
+
+from toir_tra_report_v1 import format_folder_report, generate_folder_transmittals
+from transmittal_registry import TransmittalRegistry
+
+
+def test_generate_folder_transmittals_per_folder(
+    tmp_path: Path, transmittal_template: Path
+) -> None:
+    folders = []
+    for index in ("II.7.1", "II.7.2"):
+        folder = tmp_path / f"{index}-00-1G"
+        folder.mkdir()
+        (folder / f"CT-DR-{index}-00-1G.pdf").write_text(index, encoding="utf-8")
+        folders.append(folder)
+    empty = tmp_path / "empty"
+    empty.mkdir()
+    registry_path = tmp_path / "registry.sqlite3"
+    messages: list[str] = []
+
+    results = generate_folder_transmittals(
+        [*folders, empty],
+        transmittal_template,
+        messages.append,
+        sender_value="Отправитель",
+        registry_path=registry_path,
+        tz_file_path=tmp_path / "missing_TZ_glob.xlsx",
+        max_workers=2,
+    )
+
+    assert [result.folder for result in results] == [*folders, empty]
+    for folder, result in zip(folders, results):
+        assert result.error is None
+        assert result.workbook.parent == folder
+        assert result.workbook.name.startswith("CT-GST-TRA-PRM-")
+        with zipfile.ZipFile(result.archive) as archive:
+            assert archive.namelist() == [f"CT-DR-{folder.name}.pdf"]
+        wb = load_workbook(result.workbook)
+        assert wb.active["C18"].value == f"CT-DR-{folder.name}.pdf"
+        wb.close()
+    assert "не найдено файлов" in results[-1].error
+    with TransmittalRegistry(registry_path) as registry:
+        assert len(registry.find("CT-DR-II.7")) == 2
+
+    report = format_folder_report(results)
+    assert report.splitlines()[0] == "Трансмитталов создано: 2 из 3."
+    assert report.splitlines()[1].startswith("- empty:")
+    assert len(messages) == 4
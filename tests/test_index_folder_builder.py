@@ -1,8 +1,23 @@
+import errno
+import hashlib
+import json
+import os
+from collections import Counter
+
 import pytest
 from pathlib import Path
 from openpyxl import Workbook
 
-from index_folder_builder import prepare_index_folders
+from index_folder_builder import (
+    TRANSFER_COPY,
+    MissingSuffixError,
+    TRANSFER_HARDLINK,
+    TRANSFER_MANIFEST_NAME,
+    TzSuffixResolver,
+    prepare_index_folders,
+    verify_transfer_manifest,
+)
+from move_journal import JOURNAL_NAME
 
 
 def _build_tz_file(
@@ -80,3 +95,179 @@ def test_prepare_index_folders_raises_when_no_matching_files(tmp_path: Path) ->
 
     with pytest.raises(ValueError):
         prepare_index_folders(source_dir, destination_dir, tz_file)
+
+
+def test_prepare_index_folders_hardlink_mode_counts_links(tmp_path: Path) -> None:
+    source_dir = tmp_path / "source"
+    destination_dir = tmp_path / "dest"
+    source_dir.mkdir()
+
+    tz_file = tmp_path / "TZ_glob.xlsx"
+    _build_tz_file(tz_file, [("II.7.4", "1Г", "GST", "00")])
+    source_file = source_dir / "CT-AAA-TRA-II.7.4-00-1G-20250101-00.pdf"
+    source_file.write_text("demo", encoding="utf-8")
+
+    counts: Counter[str] = Counter()
+    prepare_index_folders(
+        source_dir,
+        destination_dir,
+        tz_file,
+        transfer_mode=TRANSFER_HARDLINK,
+        transfer_counts=counts,
+    )
+
+    linked = destination_dir / "II.7.4-00-1G_GST" / source_file.name
+    assert counts == Counter({TRANSFER_HARDLINK: 1})
+    assert source_file.exists() and os.path.samefile(source_file, linked)
+
+
+def test_prepare_index_folders_link_mode_falls_back_to_copy(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    source_dir = tmp_path / "source"
+    source_dir.mkdir()
+    tz_file = tmp_path / "TZ_glob.xlsx"
+    _build_tz_file(tz_file, [("II.7.4", "1Г", "GST", "00")])
+    (source_dir / "CT-AAA-TRA-II.7.4-00-1G-20250101-00.pdf").write_text(
+        "demo", encoding="utf-8"
+    )
+
+    def cross_device_link(src, dst):
+        raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+    monkeypatch.setattr(os, "link", cross_device_link)
+    counts: Counter[str] = Counter()
+    prepare_index_folders(
+        source_dir,
+        tmp_path / "dest",
+        tz_file,
+        transfer_mode=TRANSFER_HARDLINK,
+        transfer_counts=counts,
+    )
+
+    assert counts == Counter({TRANSFER_COPY: 1})
+
+
+def test_prepare_index_folders_writes_checksum_manifest(tmp_path: Path) -> None:
+    source_dir = tmp_path / "source"
+    destination_dir = tmp_path / "dest"
+    source_dir.mkdir()
+    tz_file = tmp_path / "TZ_glob.xlsx"
+    _build_tz_file(tz_file, [("II.7.4", "1Г", "GST", "00")])
+    source_file = source_dir / "CT-AAA-TRA-II.7.4-00-1G-20250101-00.pdf"
+    source_file.write_text("demo", encoding="utf-8")
+
+    prepare_index_folders(
+        source_dir, destination_dir, tz_file, compute_checksums=True
+    )
+
+    manifest_path = destination_dir / TRANSFER_MANIFEST_NAME
+    manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    assert manifest["files"][0]["sha256"] == hashlib.sha256(b"demo").hexdigest()
+    assert verify_transfer_manifest(manifest_path) == []
+
+    copied = destination_dir / "II.7.4-00-1G_GST" / source_file.name
+    copied.write_text("changed", encoding="utf-8")
+    assert verify_transfer_manifest(manifest_path) == [copied]
+
+
+def test_prepare_index_folders_streaming_matches_batch_and_journals(tmp_path: Path) -> None:
+    tz_file = tmp_path / "TZ_glob.xlsx"
+    _build_tz_file(tz_file, [("II.7.4", "1Г", "GST", "00")])
+    names = [
+        "nested/CT-AAA-TRA-II.7.4-00-1G-20250101-00.pdf",
+        "CT-AAA-TRA-II.7.4-00-1G-20250101-00.pdf",
+        "CT-AAA-TRA-II.2.6-00-C-20250102-00.pdf",
+    ]
+    layouts = {}
+    for streaming in (False, True):
+        source_dir = tmp_path / f"source_{streaming}"
+        destination_dir = tmp_path / f"dest_{streaming}"
+        for name in names:
+            (source_dir / name).parent.mkdir(parents=True, exist_ok=True)
+            (source_dir / name).write_text("demo", encoding="utf-8")
+        prepare_index_folders(
+            source_dir, destination_dir, tz_file, use_copy=False, streaming=streaming
+        )
+        layouts[streaming] = sorted(
+            p.relative_to(destination_dir).as_posix()
+            for p in destination_dir.rglob("*")
+            if p.is_file()
+        )
+        # Завершённый журнал удаляется и не копится в целевой папке
+        assert not (destination_dir / JOURNAL_NAME).exists()
+
+    assert layouts[True] == layouts[False]
+    assert "II.7.4-00-1G_GST/CT-AAA-TRA-II.7.4-00-1G-20250101-00_1.pdf" in layouts[True]
+
+
+def test_prepare_index_folders_streaming_checks_suffixes_before_transfer(tmp_path: Path) -> None:
+    source_dir = tmp_path / "source"
+    source_dir.mkdir()
+    tz_file = tmp_path / "TZ_glob.xlsx"
+    _build_tz_file(tz_file, [("II.7.4", "1Г", "GST", "00")])
+    for name in (
+        "CT-AAA-TRA-II.7.4-00-1G-20250101-00.pdf",
+        "CT-AAA-TRA-II.9.1-00-1G-20250101-00.pdf",
+    ):
+        (source_dir / name).write_text("demo", encoding="utf-8")
+
+    destination_dir = source_dir / "grouped"
+    with pytest.raises(ValueError, match="II.9.1"):
+        prepare_index_folders(
+            source_dir, destination_dir, tz_file, group_by_suffix=True, streaming=True
+        )
+    assert not any(p.is_file() for p in destination_dir.rglob("*"))
+
+    (source_dir / "CT-AAA-TRA-II.9.1-00-1G-20250101-00.pdf").unlink()
+    prepare_index_folders(
+        source_dir, destination_dir, tz_file, group_by_suffix=True, streaming=True
+    )
+    copied = destination_dir / "GST" / "II.7.4-00-1G_GST" / "CT-AAA-TRA-II.7.4-00-1G-20250101-00.pdf"
+    assert copied.exists()
+    assert [p for p in destination_dir.rglob("*.pdf")] == [copied]
+
+
+def test_prepare_index_folders_takes_suffix_from_ancestor_index(tmp_path: Path) -> None:
+    source_dir = tmp_path / "source"
+    source_dir.mkdir()
+    tz_file = tmp_path / "TZ_glob.xlsx"
+    _build_tz_file(tz_file, [("II.7.4", "1Г", "GST", "00")])
+    (source_dir / "CT-AAA-TRA-II.7.4.2a-00-1G-20250101-00.pdf").write_text("demo", encoding="utf-8")
+    messages: list[str] = []
+
+    created = prepare_index_folders(
+        source_dir,
+        tmp_path / "dest",
+        tz_file,
+        status_callback=messages.append,
+        resolver=TzSuffixResolver(tz_file, fallback_depth=2),
+    )
+
+    assert [path.name for path in created] == ["II.7.4.2a-00-1G_GST"]
+    assert any("взят от II.7.4 (уровней вверх: 2)" in message for message in messages)
+
+
+def test_suffix_resolver_matches_exact_index_by_default(tmp_path: Path) -> None:
+    tz_file = tmp_path / "TZ_glob.xlsx"
+    _build_tz_file(tz_file, [("II.7.4", "1Г", "GST", "00")])
+
+    assert TzSuffixResolver(tz_file).find_suffix("II.7.4.2a", "00", "1G") is None
+    assert TzSuffixResolver(tz_file).find_suffix("II.7.4", "00", "1G") == "GST"
+
+
+def test_missing_suffix_error_lists_closest_tz_rows(tmp_path: Path) -> None:
+    source_dir = tmp_path / "source"
+    source_dir.mkdir()
+    tz_file = tmp_path / "TZ_glob.xlsx"
+    _build_tz_file(tz_file, [("II.7.4", "1Г", "GST", "00"), ("II.7.4", "6M", "OSS", "01"), ("IV.2", None, "FAR", None)])
+    (source_dir / "CT-AAA-TRA-II.7.4-02-1G-20250101-00.pdf").write_text("demo", encoding="utf-8")
+    (source_dir / "CT-AAA-TRA-II.7.4-00-3G-20250101-00.pdf").write_text("demo", encoding="utf-8")
+
+    with pytest.raises(MissingSuffixError) as error:
+        prepare_index_folders(source_dir, tmp_path / "dest", tz_file, group_by_suffix=True)
+
+    missing = {str(item): item for item in error.value.missing}
+    item = missing["II.7.4 (Reserved=00; Periodicity=3G)"]
+    assert [hint.candidate.suffix for hint in error.value.suggestions[item]][:2] == ["GST", "OSS"]
+    assert "возможно: II.7.4 (Reserved=00; Periodicity=1G) → GST" in str(error.value)
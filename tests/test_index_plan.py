@@ -0,0 +1,39 @@
+from pathlib import Path
+
+from index_folder_builder import extract_grouping_key
+from index_plan import FileSpool, spool_files
+
+
+def test_spool_merges_spilled_runs_in_key_order(tmp_path: Path) -> None:
+    entries = [
+        ("IV.2.3-02-6M", "/b", "CT-DR-IV.2.3-02-6M-x.pdf"),
+        ("I.5.8-02-6M", "/a", "tab\there.pdf"),
+        ("IV.2.3-02-6M", "/a", "CT-DR-IV.2.3-02-6M.pdf"),
+        ("I.5.8-02-6M", "/a", "back\\slash\nline.pdf"),
+        ("II.1-00-1G", "/c", "CT-DR-II.1-00-1G.docx"),
+    ]
+    with FileSpool(run_size=2) as spool:
+        for key, directory, name in entries:
+            spool.add(key, directory, name)
+
+        for _ in range(2):  # группы можно обходить повторно
+            groups = {group.grouping_key: list(group) for group in spool.iter_groups()}
+            assert list(groups) == sorted(spool.key_counts)
+            assert groups["I.5.8-02-6M"] == [Path("/a", "back\\slash\nline.pdf"), Path("/a", "tab\there.pdf")]
+            assert groups["IV.2.3-02-6M"] == [
+                Path("/b", "CT-DR-IV.2.3-02-6M-x.pdf"),
+                Path("/a", "CT-DR-IV.2.3-02-6M.pdf"),
+            ]
+        assert len(spool) == len(entries)
+
+
+def test_spool_files_scans_tree(tmp_path: Path) -> None:
+    for name in ("CT-DR-I.5.8-02-6M.pdf", "sub/CT-DR-I.5.8-02-6M-rev.pdf", "notes.txt"):
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("x", encoding="utf-8")
+
+    with spool_files(tmp_path, extract_grouping_key, run_size=1) as spool:
+        [group] = list(spool.iter_groups())
+        assert group.grouping_key == "I.5.8-02-6M"
+        assert sorted(p.name for p in group) == ["CT-DR-I.5.8-02-6M-rev.pdf", "CT-DR-I.5.8-02-6M.pdf"]
@@ -0,0 +1,30 @@
+from index_trie import IndexTrie, TrieMatch, as_index_trie, index_components
+from tz_parser import normalize_key
+
+
+def test_index_components_split_levels() -> None:
+    assert index_components("II.7.4.2a") == ("II", "7", "4", "2", "А")
+    assert index_components(" iv.1 ") == ("IВ", "1")
+    assert index_components("Шапка") is None
+
+
+def test_trie_behaves_like_normalized_map() -> None:
+    source = {normalize_key("II.7.4a"): "Объект", normalize_key("IV.1"): "Станция", "ШАПКА": "x"}
+    trie = IndexTrie(source)
+
+    assert dict(trie) == source
+    assert trie.get(normalize_key("II.7.4а")) == "Объект"
+    assert "ШАПКА" in trie and len(trie) == 3
+    assert as_index_trie(trie) is trie
+
+
+def test_lookup_falls_back_to_nearest_ancestor() -> None:
+    trie = IndexTrie({"II.7": "Раздел", "II.7.4": "Объект", "II.7.4.2": "Узел"})
+
+    assert trie.lookup("ii.7.4.2") == TrieMatch("II.7.4.2", "Узел", 0)
+    assert trie.lookup("II.7.4.2a") == TrieMatch("II.7.4.2", "Узел", 1)
+    assert trie.lookup("II.7.4.3b") == TrieMatch("II.7.4", "Объект", 2)
+    assert trie.lookup("II.7.4.3b", max_fallback=1) is None
+    assert trie.lookup("II.7.5", max_fallback=0) is None
+    assert [match.key for match in trie.matches("II.7.4.2", max_fallback=2)] == ["II.7.4.2", "II.7.4", "II.7"]
+    assert trie.lookup("III.1") is None
@@ -0,0 +1,138 @@
+import threading
+import time
+import zipfile
+from pathlib import Path
+
+import pytest
+
+import io_scheduler
+import toir_tra_report_v1 as app
+from io_scheduler import AdaptiveIOScheduler
+from toir_tra_report_v1 import create_archive
+
+
+@pytest.fixture
+def short_windows(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(io_scheduler, "WINDOW_SECONDS", 0.05)
+    monkeypatch.setattr(io_scheduler, "WINDOW_MIN_TASKS", 4)
+
+
+def test_scheduler_adds_workers_while_throughput_grows(short_windows: None) -> None:
+    messages: list[str] = []
+    scheduler = AdaptiveIOScheduler(initial_workers=2, status_callback=messages.append)
+
+    def slow_io(item: int) -> int:
+        time.sleep(0.005)
+        return item * 2
+
+    results = list(scheduler.map(slow_io, range(300)))
+
+    assert results == [item * 2 for item in range(300)]
+    assert scheduler.workers > 2
+    assert any(d.reason == "рост пропускной способности" for d in scheduler.decisions)
+    assert messages and messages[0].startswith("[I/O] потоков 2 → 3")
+
+
+def test_scheduler_halves_workers_on_errors() -> None:
+    scheduler = AdaptiveIOScheduler(initial_workers=8)
+
+    def failing_io(item: int) -> int:
+        if item == 3:
+            raise OSError("сетевой диск недоступен")
+        return item
+
+    with pytest.raises(OSError):
+        list(scheduler.map(failing_io, range(20)))
+
+    assert scheduler.workers == 4
+    assert scheduler.decisions[-1].reason.startswith("ошибки ввода-вывода")
+
+
+def test_scheduler_respects_bandwidth_limit() -> None:
+    scheduler = AdaptiveIOScheduler(initial_workers=8, bandwidth_limit=4000)
+
+    started = time.monotonic()
+    list(scheduler.map(lambda item: item, range(10), size_of=lambda _item, _result: 200))
+
+    # 10 × 200 байт при 4000 байт/с — не быстрее 0.5 с
+    assert time.monotonic() - started >= 0.45
+
+
+def test_create_archive_with_scheduler_matches_sequential(tmp_path: Path) -> None:
+    files = []
+    for i in range(5):
+        path = tmp_path / f"CT-DR-II.7.{i}-00-1G.pdf"
+        path.write_bytes(bytes([i]) * (1000 + i))
+        files.append(path)
+
+    sequential = create_archive(tmp_path / "seq.zip", files)
+    parallel = create_archive(tmp_path / "par.zip", files, AdaptiveIOScheduler())
+
+    with zipfile.ZipFile(sequential) as first, zipfile.ZipFile(parallel) as second:
+        assert [(i.filename, i.date_time, i.file_size) for i in first.infolist()] == [
+            (i.filename, i.date_time, i.file_size) for i in second.infolist()
+        ]
+        assert all(first.read(name) == second.read(name) for name in first.namelist())
+        assert second.infolist()[0].compress_type == zipfile.ZIP_DEFLATED
+
+
+def test_scheduler_limits_pending_cost() -> None:
+    scheduler = AdaptiveIOScheduler(initial_workers=8)
+    lock = threading.Lock()
+    running = 0
+    peak = 0
+
+    def track(item: int) -> int:
+        nonlocal running, peak
+        with lock:
+            running += item
+            peak = max(peak, running)
+        time.sleep(0.01)
+        with lock:
+            running -= item
+        return item
+
+    costs = [40, 30, 50, 10, 60, 20]
+    results = list(scheduler.map(track, costs, cost_of=lambda item: item, max_pending_cost=100))
+
+    assert results == costs
+    assert 0 < peak <= 100
+    # Задача дороже лимита всё равно выполняется, но только в одиночку
+    assert list(scheduler.map(track, [150], cost_of=lambda item: item, max_pending_cost=100)) == [150]
+
+
+def test_create_archive_bounds_prefetched_bytes(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(app, "ARCHIVE_PREFETCH_BUDGET", 2500)
+    files = []
+    for i in range(6):
+        path = tmp_path / f"CT-DR-II.7.{i}-00-1G.pdf"
+        path.write_bytes(bytes([i]) * 1000)
+        files.append(path)
+
+    in_memory = 0
+    peak = 0
+    read_for_archive = app._read_for_archive
+
+    def tracked_read(path: Path) -> tuple[zipfile.ZipInfo, bytes | None]:
+        nonlocal in_memory, peak
+        info, data = read_for_archive(path)
+        with lock:
+            in_memory += len(data or b"")
+            peak = max(peak, in_memory)
+        return info, data
+
+    write_entry = app._write_archive_entry
+
+    def tracked_write(zipf: zipfile.ZipFile, path: Path, info: zipfile.ZipInfo, data: bytes | None) -> str:
+        nonlocal in_memory
+        digest = write_entry(zipf, path, info, data)
+        with lock:
+            in_memory -= len(data or b"")
+        return digest
+
+    lock = threading.Lock()
+    monkeypatch.setattr(app, "_read_for_archive", tracked_read)
+    monkeypatch.setattr(app, "_write_archive_entry", tracked_write)
+    create_archive(tmp_path / "par.zip", files, AdaptiveIOScheduler(initial_workers=8))
+
+    assert 0 < peak <= 2000
@@ -0,0 +1,118 @@
+import shutil
+import threading
+from pathlib import Path
+
+import pytest
+from openpyxl import Workbook
+
+from index_folder_builder import prepare_index_folders
+from move_journal import JOURNAL_NAME, load_journal, resume_moves, rollback_moves
+
+
+FILES = [
+    "CT-AAA-TRA-II.7.4-00-1G-20250101-00.pdf",
+    "CT-AAA-TRA-II.7.4-00-1G-20250101-00.docx",
+    "CT-AAA-TRA-II.2.6-00-C-20250102-00.pdf",
+]
+
+
+def _prepare_tree(tmp_path: Path) -> tuple[Path, Path, Path]:
+    source_dir = tmp_path / "source"
+    source_dir.mkdir()
+    for name in FILES:
+        (source_dir / name).write_text(name, encoding="utf-8")
+
+    tz_file = tmp_path / "TZ_glob.xlsx"
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "gen_cl"
+    ws.append([None, "II.7.4", None, None, "1Г", None, "GST", "00"])
+    wb.save(tz_file)
+    return source_dir, tmp_path / "dest", tz_file
+
+
+def _crash_after_first_move(monkeypatch: pytest.MonkeyPatch) -> None:
+    real_move = shutil.move
+    calls = {"count": 0}
+
+    def flaky_move(src, dst):
+        calls["count"] += 1
+        if calls["count"] > 1:
+            raise OSError("Сетевой ресурс недоступен")
+        return real_move(src, dst)
+
+    monkeypatch.setattr(shutil, "move", flaky_move)
+
+
+def test_resume_completes_interrupted_move(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    source_dir, destination_dir, tz_file = _prepare_tree(tmp_path)
+    _crash_after_first_move(monkeypatch)
+    with pytest.raises(OSError):
+        prepare_index_folders(source_dir, destination_dir, tz_file, use_copy=False)
+    monkeypatch.undo()
+
+    state = load_journal(destination_dir / JOURNAL_NAME)
+    assert len(state.entries) == 3 and state.done == {0} and state.status is None
+
+    with pytest.raises(ValueError):
+        prepare_index_folders(source_dir, destination_dir, tz_file, use_copy=False)
+
+    result = resume_moves(destination_dir)
+
+    assert len(result.completed) == 2 and len(result.skipped) == 1
+    assert not any(source_dir.iterdir())
+    moved = [p.name for p in destination_dir.rglob("*") if p.is_file()]
+    assert sorted(moved) == sorted(FILES)
+
+
+def test_rollback_restores_source_tree(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    source_dir, destination_dir, tz_file = _prepare_tree(tmp_path)
+    _crash_after_first_move(monkeypatch)
+    with pytest.raises(OSError):
+        prepare_index_folders(source_dir, destination_dir, tz_file, use_copy=False)
+    monkeypatch.undo()
+
+    result = rollback_moves(destination_dir)
+
+    assert len(result.completed) == 1
+    assert sorted(p.name for p in source_dir.iterdir()) == sorted(FILES)
+    assert [p.name for p in destination_dir.iterdir()] == [JOURNAL_NAME]
+
+
+def test_rollback_removes_copy_of_unfinished_move(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    source_dir, destination_dir, tz_file = _prepare_tree(tmp_path)
+    real_move = shutil.move
+    calls = {"count": 0}
+    lock = threading.Lock()
+
+    def copy_then_fail(src, dst):
+        with lock:
+            calls["count"] += 1
+            first = calls["count"] == 1
+        if not first:
+            # Межтомовый перенос оборвался после копирования, до удаления источника
+            shutil.copyfile(src, dst)
+            raise OSError("Сетевой ресурс недоступен")
+        return real_move(src, dst)
+
+    monkeypatch.setattr(shutil, "move", copy_then_fail)
+    with pytest.raises(OSError):
+        prepare_index_folders(source_dir, destination_dir, tz_file, use_copy=False)
+    monkeypatch.undo()
+
+    result = rollback_moves(destination_dir)
+
+    # Переносы идут параллельно: оборваться могли один или оба оставшихся
+    assert len(result.completed) == 1 and result.removed and not result.skipped
+    assert sorted(p.name for p in source_dir.iterdir()) == sorted(FILES)
+    assert [p.name for p in destination_dir.iterdir()] == [JOURNAL_NAME]
+
+    # Закрытый журнал прошлого запуска заменяется, а не переименовывается рядом
+    prepare_index_folders(source_dir, destination_dir, tz_file, use_copy=False)
+    assert not any(p.name.startswith("move_journal") for p in destination_dir.iterdir())
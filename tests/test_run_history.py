@@ -0,0 +1,171 @@
+from pathlib import Path
+
+import pytest
+from openpyxl import Workbook
+
+import toir_tra_report_v1 as app
+from index_folder_builder import prepare_index_folders
+from run_history import (
+    RUN_CMM,
+    RUN_GROUPING,
+    EtaSnapshotStatus,
+    RunHistory,
+    RunMetrics,
+    RunRecorder,
+    chart_points,
+    format_duration,
+    throughput_trend,
+    total_size,
+)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _metrics(duration: float, files: int, ok: bool = True, kind: str = RUN_GROUPING) -> RunMetrics:
+    return RunMetrics(kind, "2025-01-01T00:00:00", duration, files, files * 1024, {}, ok)
+
+
+def test_recorder_sums_repeated_stages() -> None:
+    clock = FakeClock()
+    recorder = RunRecorder(RUN_GROUPING, files=4, bytes_total=400, clock=clock)
+
+    with recorder.stage("scan"):
+        clock.now += 1.5
+    for _ in range(2):
+        with recorder.stage("transfer"):
+            clock.now += 2.0
+    with pytest.raises(RuntimeError):
+        with recorder.stage("manifest"):
+            clock.now += 0.5
+            raise RuntimeError
+
+    metrics = recorder.finish(ok=False)
+    assert metrics.stages == {"scan": 1.5, "transfer": 4.0, "manifest": 0.5}
+    assert metrics.duration == pytest.approx(6.0)
+    assert (metrics.kind, metrics.files, metrics.bytes, metrics.ok) == (RUN_GROUPING, 4, 400, False)
+    assert metrics.files_per_second == pytest.approx(4 / 6)
+
+
+def test_history_keeps_runs_per_kind_and_estimates_from_successful(tmp_path: Path) -> None:
+    db_path = tmp_path / "history" / "runs.sqlite3"
+    with RunHistory(db_path) as history:
+        assert history.estimate(RUN_GROUPING, 10) is None
+        history.record(_metrics(10.0, 10))
+        history.record(_metrics(30.0, 10))
+        history.record(_metrics(500.0, 10, ok=False))
+        history.record(_metrics(40.0, 20))
+        history.record(_metrics(1.0, 100, kind=RUN_CMM))
+
+    with RunHistory(db_path) as history:
+        runs = history.recent(RUN_GROUPING)
+        assert [run.duration for run in runs] == [10.0, 30.0, 500.0, 40.0]
+        assert [run.duration for run in history.recent(RUN_GROUPING, ok_only=True)] == [10.0, 30.0, 40.0]
+        assert history.recent(RUN_GROUPING, limit=1)[0].duration == 40.0
+        # Медиана секунд на файл (1, 3, 2) — 2 с
+        assert history.estimate(RUN_GROUPING, 15) == pytest.approx(30.0)
+        assert history.estimate(RUN_GROUPING, 0) is None
+        assert history.estimate(RUN_CMM, 50) == pytest.approx(0.5)
+
+
+def test_eta_snapshot_appends_progress_and_remaining_time() -> None:
+    clock = FakeClock()
+    recorder = RunRecorder(RUN_GROUPING, clock=clock)
+    messages: list[str] = []
+
+    EtaSnapshotStatus(messages.append, recorder, None)("Сканирование...")
+    eta = EtaSnapshotStatus(messages.append, recorder, 120.0)
+    clock.now += 30
+    eta("Перенос файлов...")
+    clock.now += 100
+    eta("Манифест...")
+
+    assert messages == [
+        "Сканирование...",
+        "Перенос файлов... [на 30 с: ~25%, оставалось ~1 мин 30 с]",
+        "Манифест... [на 2 мин 10 с: дольше обычного, ожидалось ~2 мин 00 с]",
+    ]
+
+
+def test_format_duration() -> None:
+    assert format_duration(0.4) == "0 с"
+    assert format_duration(95.2) == "1 мин 35 с"
+    assert format_duration(3 * 3600 + 5 * 60) == "3 ч 05 мин"
+
+
+def test_throughput_trend_reports_change_of_last_run() -> None:
+    runs = [_metrics(10.0, 100), _metrics(10.0, 120), _metrics(50.0, 0), _metrics(20.0, 100)]
+
+    trend = throughput_trend(RUN_GROUPING, runs)
+
+    assert trend is not None
+    assert (trend.runs, trend.median, trend.last) == (3, 10.0, 5.0)
+    assert trend.change == pytest.approx(-0.5)
+    assert throughput_trend(RUN_GROUPING, [_metrics(1.0, 10, ok=False)]) is None
+
+
+def test_chart_points_share_scale_between_series() -> None:
+    points = chart_points({"a": [0.0, 5.0, 10.0], "b": [10.0], "c": []}, width=220, height=120, padding=10)
+
+    assert points["a"] == [(10, 110), (110, 60), (210, 10)]
+    assert points["b"] == [(10, 10)]
+    assert points["c"] == []
+    assert chart_points({"a": [0.0]}, 100, 100) == {"a": []}
+
+
+def test_eta_appears_once_run_reports_its_input() -> None:
+    clock = FakeClock()
+    recorder = RunRecorder(RUN_GROUPING, clock=clock)
+    messages: list[str] = []
+    eta = EtaSnapshotStatus(messages.append, recorder, seconds_per_file=2.0)
+
+    eta("Сканирование...")
+    recorder.set_input(60, 0)
+    clock.now += 30
+    eta("Перенос файлов...")
+
+    assert messages == ["Сканирование...", "Перенос файлов... [на 30 с: ~25%, оставалось ~1 мин 30 с]"]
+
+
+def test_total_size_skips_missing_files(tmp_path: Path) -> None:
+    (tmp_path / "a.pdf").write_bytes(b"12345")
+    (tmp_path / "b.pdf").write_bytes(b"123")
+
+    assert total_size([tmp_path / "a.pdf", tmp_path / "b.pdf", tmp_path / "missing.pdf"]) == 8
+
+
+def test_prepare_index_folders_records_stages(tmp_path: Path) -> None:
+    source_dir = tmp_path / "source"
+    source_dir.mkdir()
+    (source_dir / "CT-AAA-TRA-II.2.6-00-C-20250102-00.pdf").write_text("demo", encoding="utf-8")
+    tz_file = tmp_path / "TZ_glob.xlsx"
+    wb = Workbook()
+    wb.active.title = "gen_cl"
+    wb.active.cell(row=1, column=2, value="II.2.6")
+    wb.save(tz_file)
+    wb.close()
+
+    recorder = RunRecorder(RUN_GROUPING)
+    prepare_index_folders(source_dir, tmp_path / "dest", tz_file, run_metrics=recorder)
+    metrics = recorder.finish()
+
+    assert set(metrics.stages) == {"scan", "transfer"}
+    # Объём входа — из спула и переноса, а не из отдельного обхода папки
+    assert (metrics.files, metrics.bytes, metrics.ok) == (1, 4, True)
+
+
+def test_finish_run_reports_history_errors_to_status(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    # Путь к журналу занят папкой: SQLite не откроет файл
+    monkeypatch.setattr(app, "RUN_HISTORY_PATH", tmp_path)
+    messages: list[str] = []
+
+    recorder, eta = app.start_run(RUN_CMM, messages.append)
+    assert (recorder.files, eta.expected) == (0, None)
+    app.finish_run(recorder, messages.append)
+
+    assert len(messages) == 1 and messages[0].startswith("[ПРЕДУПРЕЖДЕНИЕ] Не удалось сохранить историю")
@@ -0,0 +1,47 @@
+import time
+
+from suffix_suggestions import SuffixCandidate, SuggestionIndex, edit_distance
+
+
+def _candidates(count: int) -> list[SuffixCandidate]:
+    return [
+        SuffixCandidate(f"II.{n // 10}.{n % 10}", "1G" if n % 2 else None, "00", f"S{n}")
+        for n in range(count)
+    ]
+
+
+def test_edit_distance() -> None:
+    assert edit_distance("II.7.4", "II.7.4") == 0
+    assert edit_distance("II.7.4", "II.7.14") == 1
+    assert edit_distance("", "abc") == 3
+
+
+def test_suggest_ranks_by_distance_then_mismatches() -> None:
+    index = SuggestionIndex(
+        [
+            SuffixCandidate("II.7.4", "1G", "00", "GST"),
+            SuffixCandidate("II.7.4", "6M", "01", "OSS"),
+            SuffixCandidate("II.7.5", "1G", "01", "ABC"),
+            SuffixCandidate("IV.1", None, None, "FAR"),
+        ]
+    )
+
+    hints = index.suggest("ii.7.4", reserved="01", periodicity="1G")
+
+    assert [hint.candidate.suffix for hint in hints] == ["GST", "OSS", "ABC"]
+    assert [(hint.distance, hint.mismatches) for hint in hints] == [(0, 1), (0, 1), (1, 0)]
+    assert hints[0].candidate.describe() == "II.7.4 (Reserved=00; Periodicity=1G) → GST"
+    assert index.suggest("  ") == []
+
+
+def test_thousands_of_misses_are_answered_quickly() -> None:
+    index = SuggestionIndex(_candidates(3000))
+    misses = [f"II.{n % 300}.{n % 7}a" for n in range(3000)]
+
+    started = time.perf_counter()
+    results = [index.suggest(miss, "00", "1G") for miss in misses]
+    elapsed = time.perf_counter() - started
+
+    assert all(results)
+    assert results[0][0].candidate.lookup == "II.0.0"
+    assert elapsed < 5
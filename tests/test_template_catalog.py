@@ -0,0 +1,74 @@
+from pathlib import Path
+
+import pytest
+
+import template_catalog
+from template_catalog import TemplateCatalog, list_template_files, template_abbreviation
+
+
+class FakeLister:
+    """Подмена чтения папок: снимки задаются словарём, вызовы считаются."""
+
+    def __init__(self) -> None:
+        self.folders: dict[str, dict[str, tuple[int, int]]] = {}
+        self.calls = 0
+
+    def __call__(self, directory: Path) -> dict[str, tuple[int, int]]:
+        self.calls += 1
+        return dict(self.folders.get(directory.name, {}))
+
+
+def test_catalog_serves_options_from_cache_and_detects_changes() -> None:
+    lister = FakeLister()
+    lister.folders["status_a"] = {"CT-GST-TRA-PRM-Template.xltx": (100, 1)}
+    catalog = TemplateCatalog(Path("/templates"), ["status_a", "status_b"], lister=lister)
+
+    assert catalog.refresh() is True
+    calls = lister.calls
+    options = catalog.options("status_a")
+    assert [(entry.name, entry.abbr) for entry in options] == [("CT-GST-TRA-PRM-Template.xltx", "GST")]
+    assert catalog.options("status_b") == []
+    assert lister.calls == calls  # ответы без обращения к диску
+
+    version = catalog.version
+    assert catalog.refresh() is False
+    assert catalog.version == version
+
+    lister.folders["status_a"]["CT-CDT-TRA-PRM-Template.xltx"] = (50, 2)
+    assert catalog.refresh() is True
+    assert catalog.version == version + 1
+    assert [entry.abbr for entry in catalog.options("status_a")] == ["CDT", "GST"]
+
+    lister.folders["status_a"]["CT-CDT-TRA-PRM-Template.xltx"] = (60, 3)
+    assert catalog.refresh() is True
+    assert catalog.options("status_a")[0].size == 60
+
+
+def test_options_miss_lists_names_without_compiling(monkeypatch: pytest.MonkeyPatch) -> None:
+    compiled: list[str] = []
+    monkeypatch.setattr(template_catalog, "load_template_meta", lambda path, _layout: compiled.append(path.name))
+    lister = FakeLister()
+    lister.folders["status_a"] = {"CT-GST-TRA-PRM-Template.xltx": (100, 1)}
+    catalog = TemplateCatalog(Path("/templates"), ["status_a"], lister=lister, layout=object())
+
+    assert [entry.abbr for entry in catalog.options("status_a")] == ["GST"]
+    assert compiled == []
+
+    # Фоновый опрос всё равно видит папку новой и компилирует шаблон
+    assert catalog.refresh() is True
+    assert compiled == ["CT-GST-TRA-PRM-Template.xltx"]
+
+
+def test_catalog_background_polling(tmp_path: Path, transmittal_template: Path) -> None:
+    status_dir = tmp_path / "template_tra" / "status_a"
+    status_dir.mkdir(parents=True)
+    (status_dir / transmittal_template.name).write_bytes(transmittal_template.read_bytes())
+    (status_dir / "notes.txt").write_text("x", encoding="utf-8")
+
+    catalog = TemplateCatalog(tmp_path / "template_tra", ["status_a"], poll_interval=0.01).start()
+    try:
+        assert [entry.name for entry in catalog.options("status_a")] == [transmittal_template.name]
+    finally:
+        catalog.stop()
+    assert list_template_files(tmp_path / "missing") == {}
+    assert template_abbreviation("Template.xltx") is None
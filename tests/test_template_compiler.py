@@ -0,0 +1,126 @@
+from pathlib import Path
+
+import pytest
+from openpyxl import load_workbook
+from openpyxl.workbook.defined_name import DefinedName
+
+from template_compiler import (
+    TemplateError,
+    compile_template,
+    load_template_meta,
+    meta_path_for,
+    read_template_meta,
+)
+from toir_tra_report_v1 import (
+    OUTPUT_ENGINE_OPENPYXL,
+    OUTPUT_ENGINE_STREAM,
+    TRANSMITTAL_LAYOUT,
+    write_transmittal,
+)
+
+
+def test_compile_template_extracts_layout(transmittal_template: Path) -> None:
+    meta = compile_template(transmittal_template, TRANSMITTAL_LAYOUT)
+
+    assert meta.footer_row == 20
+    assert meta.named_cells["pripmem"] == ("Трансмитал", "I22")
+    assert meta.const_values == {13: "PDF", 14: 1, 15: "A"}
+    assert meta.data_row_height == 30
+    assert "C18:H18" in meta.merge_ranges
+    assert not meta.errors and not meta.warnings
+
+
+def test_load_template_meta_persists_sidecar_by_hash(transmittal_template: Path) -> None:
+    meta = load_template_meta(transmittal_template, TRANSMITTAL_LAYOUT)
+
+    assert meta.origin == "compiled"
+    assert meta_path_for(transmittal_template).exists()
+    assert load_template_meta(transmittal_template, TRANSMITTAL_LAYOUT).origin == "memory"
+    stored = read_template_meta(transmittal_template, meta.template_sha256, TRANSMITTAL_LAYOUT)
+    assert stored == meta and stored.origin == "sidecar"
+    assert read_template_meta(transmittal_template, "другой хеш", TRANSMITTAL_LAYOUT) is None
+
+    wb = load_workbook(transmittal_template)
+    wb.active["M18"] = "DWG"
+    wb.template = True
+    wb.save(transmittal_template)
+    changed = load_template_meta(transmittal_template, TRANSMITTAL_LAYOUT)
+    assert changed.origin == "compiled"
+    assert changed.const_values[13] == "DWG"
+
+
+def test_template_problems_are_reported_up_front(transmittal_template: Path) -> None:
+    path = transmittal_template
+    wb = load_workbook(path)
+    ws = wb.active
+    ws.merge_cells("N19:N21")
+    del wb.defined_names["pripmem"]
+    wb.template = True
+    wb.save(path)
+
+    meta = compile_template(path, TRANSMITTAL_LAYOUT)
+    messages: list[str] = []
+    with pytest.raises(TemplateError, match="N19:N21"):
+        meta.check(messages.append)
+    assert any("pripmem" in message for message in messages)
+
+
+def test_write_transmittal_uses_compiled_meta(tmp_path: Path, transmittal_template: Path) -> None:
+    files = []
+    for i in range(1, 5):
+        path = tmp_path / f"CT-DR-II.7.{i}-00-1G.pdf"
+        path.write_text("demo", encoding="utf-8")
+        files.append(path)
+    meta = load_template_meta(transmittal_template, TRANSMITTAL_LAYOUT)
+
+    saved = write_transmittal(
+        transmittal_template,
+        files,
+        {},
+        tmp_path,
+        lambda _message: None,
+        sender_value="Отправитель",
+        output_engine=OUTPUT_ENGINE_OPENPYXL,
+        meta=meta,
+    )
+
+    wb = load_workbook(saved)
+    ws = wb.active
+    assert ws["I24"].value == "Отправитель"  # футер сдвинут на две строки
+    assert [ws.cell(row=row, column=13).value for row in range(18, 22)] == ["PDF"] * 4
+    assert ws.row_dimensions[21].height == 30
+    wb.close()
+
+
+@pytest.mark.parametrize("engine", [OUTPUT_ENGINE_OPENPYXL, OUTPUT_ENGINE_STREAM])
+def test_sender_is_written_to_named_cell_on_another_sheet(
+    tmp_path: Path, transmittal_template: Path, engine: str
+) -> None:
+    wb = load_workbook(transmittal_template)
+    wb.create_sheet("Реквизиты")["B3"] = "—"
+    wb.defined_names["pripmem"] = DefinedName(name="pripmem", attr_text="'Реквизиты'!$B$3")
+    wb.template = True
+    wb.save(transmittal_template)
+    meta = load_template_meta(transmittal_template, TRANSMITTAL_LAYOUT)
+    assert meta.named_cells["pripmem"] == ("Реквизиты", "B3")
+    report = tmp_path / "CT-DR-II.7.1-00-1G.pdf"
+    report.write_text("demo", encoding="utf-8")
+    messages: list[str] = []
+
+    saved = write_transmittal(
+        transmittal_template,
+        [report],
+        {},
+        tmp_path,
+        messages.append,
+        sender_value="Отправитель",
+        output_engine=engine,
+        meta=meta,
+    )
+
+    wb = load_workbook(saved)
+    assert wb["Реквизиты"]["B3"].value == "Отправитель"
+    assert wb.active.title == "Трансмитал"
+    assert wb.active["I22"].value == "—"
+    wb.close()
+    assert not any("недоступна" in message for message in messages)
@@ -0,0 +1,108 @@
+import os
+from pathlib import Path
+
+import pytest
+
+import toir_tra_report_v1 as app
+from toir_tra_report_v1 import (
+    OUTPUT_ENGINE_STREAM,
+    NoDocumentsError,
+    build_transmittal,
+    process_files,
+    run_transmittal,
+    write_transmittal_archive,
+    record_transmittal,
+)
+from transmittal_manifest import load_manifest
+
+
+def _send(folder: Path, template: Path, registry: Path):
+    output = build_transmittal(
+        folder, template, lambda _m: None, output_engine=OUTPUT_ENGINE_STREAM,
+        tz_map={}, differential=True,
+    )
+    digests: dict[Path, str] = {}
+    [archive] = write_transmittal_archive(output, None, lambda _m: None, digests=digests)
+    record_transmittal(output, None, archive, lambda _m: None, registry, hash_file=digests.get)
+    return output
+
+
+def test_differential_mode_sends_only_delta(tmp_path: Path, transmittal_template: Path) -> None:
+    folder = tmp_path / "living"
+    folder.mkdir()
+    first = folder / "CT-DR-II.7.1-00-1G.pdf"
+    second = folder / "CT-DR-II.7.2-00-1G.pdf"
+    first.write_text("one", encoding="utf-8")
+    second.write_text("two", encoding="utf-8")
+    registry = tmp_path / "registry.sqlite3"
+
+    assert _send(folder, transmittal_template, registry).files == [first, second]
+    manifest = load_manifest(folder)
+    assert set(manifest.files) == {first.name, second.name}
+    assert len(manifest.outputs) == 2  # книга и её архив
+
+    with pytest.raises(NoDocumentsError):
+        _send(folder, transmittal_template, registry)
+
+    third = folder / "CT-DR-II.7.3-00-1G.pdf"
+    third.write_text("three", encoding="utf-8")
+    stat = first.stat()
+    os.utime(first, ns=(stat.st_atime_ns, stat.st_mtime_ns + 5_000_000_000))
+    second.write_text("two, revised", encoding="utf-8")
+
+    assert _send(folder, transmittal_template, registry).files == [second, third]
+
+
+def test_failed_archive_leaves_files_unsent(
+    tmp_path: Path, transmittal_template: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    folder = tmp_path / "living"
+    folder.mkdir()
+    document = folder / "CT-DR-II.7.1-00-1G.pdf"
+    document.write_text("one", encoding="utf-8")
+    monkeypatch.setattr(app, "REGISTRY_PATH", tmp_path / "registry.sqlite3")
+    monkeypatch.setattr(app, "HASH_CACHE_PATH", tmp_path / "hash_cache.json")
+    monkeypatch.setattr(app.messagebox, "showerror", lambda *args: None)
+    monkeypatch.setattr(app.subprocess, "run", lambda *args, **kwargs: None)
+
+    def fail_archive(*args, **kwargs):
+        raise OSError("диск заполнен")
+
+    monkeypatch.setattr(app, "write_transmittal_archive", fail_archive)
+    messages: list[str] = []
+    process_files(
+        folder, transmittal_template, messages.append, True, True,
+        output_engine=OUTPUT_ENGINE_STREAM, differential=True,
+    )
+
+    assert "Ошибка создания архива: диск заполнен" in messages
+    assert document.exists()
+    assert load_manifest(folder).files == {}
+
+
+def test_run_transmittal_raises_archive_errors_without_handler(
+    tmp_path: Path, transmittal_template: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    folder = tmp_path / "living"
+    folder.mkdir()
+    (folder / "CT-DR-II.7.1-00-1G.pdf").write_text("one", encoding="utf-8")
+    registry = tmp_path / "registry.sqlite3"
+
+    def fail_archive(*args, **kwargs):
+        raise OSError("диск заполнен")
+
+    monkeypatch.setattr(app, "write_transmittal_archive", fail_archive)
+    with pytest.raises(OSError, match="диск заполнен"):
+        run_transmittal(
+            folder, transmittal_template, lambda _m: None, create_archive_flag=True,
+            tz_map={}, registry_path=registry,
+        )
+    assert not registry.exists()
+
+    errors: list[Exception] = []
+    run = run_transmittal(
+        folder, transmittal_template, lambda _m: None, create_archive_flag=True,
+        tz_map={}, registry_path=registry, on_archive_error=errors.append,
+    )
+    assert not run.archived and not run.archives and len(errors) == 1
+    assert registry.exists() and load_manifest(folder).files == {}
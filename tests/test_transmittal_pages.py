@@ -0,0 +1,109 @@
+import subprocess
+import sys
+import zipfile
+from pathlib import Path
+
+from openpyxl import load_workbook
+
+from toir_tra_report_v1 import OUTPUT_ENGINE_STREAM, run_transmittal, write_transmittal_pages
+
+
+def test_write_transmittal_pages_splits_files(
+    tmp_path: Path, transmittal_template: Path
+) -> None:
+    docs_dir = tmp_path / "docs"
+    docs_dir.mkdir()
+    files = []
+    for i in range(1, 6):
+        path = docs_dir / f"CT-DR-II.7.{i}-00-1G.pdf"
+        path.write_text("demo", encoding="utf-8")
+        files.append(path)
+
+    messages: list[str] = []
+    index_path, entries = write_transmittal_pages(
+        transmittal_template,
+        files,
+        {},
+        docs_dir,
+        page_size=2,
+        status_callback=messages.append,
+        output_engine=OUTPUT_ENGINE_STREAM,
+        page_archives=True,
+        max_workers=2,
+    )
+
+    assert [len(page_files) for _, page_files, _ in entries] == [2, 2, 1]
+    assert [book.name[-8:] for book, _, _ in entries] == ["_01.xlsx", "_02.xlsx", "_03.xlsx"]
+
+    last_book, last_files, last_archive = entries[-1]
+    wb = load_workbook(last_book)
+    assert wb.active["B18"].value == 5  # нумерация строк сквозная
+    assert wb.active["C18"].value == last_files[0].name
+    wb.close()
+    with zipfile.ZipFile(last_archive) as archive:
+        assert archive.namelist() == [last_files[0].name]
+
+    index = load_workbook(index_path).active
+    assert [row[1] for row in index.iter_rows(min_row=2, values_only=True)] == [
+        book.name for book, _, _ in entries
+    ]
+
+
+
+def test_shared_archive_of_pages_is_named_after_first_page(
+    tmp_path: Path, transmittal_template: Path
+) -> None:
+    docs_dir = tmp_path / "docs"
+    docs_dir.mkdir()
+    files = []
+    for i in range(1, 6):
+        path = docs_dir / f"CT-DR-II.7.{i}-00-1G.pdf"
+        path.write_text("demo", encoding="utf-8")
+        files.append(path)
+
+    run = run_transmittal(
+        docs_dir,
+        transmittal_template,
+        lambda _m: None,
+        create_archive_flag=True,
+        page_size=2,
+        page_archives=False,
+        tz_map={},
+        registry_path=tmp_path / "registry.sqlite3",
+    )
+
+    first_book = run.output.pages[0][0]
+    assert run.output.saved_path.name.endswith("_index.xlsx")
+    assert [path.name for path in run.archives] == [first_book.stem + "_att.zip"]
+    assert all(archive is None for _, _, archive in run.output.pages)
+    with zipfile.ZipFile(run.archives[0]) as archive:
+        assert sorted(archive.namelist()) == [path.name for path in files]
+    assert not list(docs_dir.glob("*_index_att.zip"))
+    numbers = []
+    for book, page_files, _ in run.output.pages:
+        wb = load_workbook(book)
+        numbers.extend(wb.active.cell(row=18 + i, column=2).value for i in range(len(page_files)))
+        wb.close()
+    assert numbers == [1, 2, 3, 4, 5]
+
+
+def test_importing_app_reads_settings_lazily() -> None:
+    # Рабочие процессы импортируют модуль приложения, но настройки им не нужны
+    code = (
+        "import toir_tra_report_v1 as app\n"
+        "assert not app._app_settings\n"
+        "print('imported')\n"
+        "print(app.TZ_FILE_PATH.name)\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=Path(__file__).resolve().parents[1],
+        capture_output=True,
+        text=True,
+        encoding="utf-8",
+        check=True,
+    )
+
+    lines = result.stdout.splitlines()
+    assert lines[0] == "imported"
+    assert lines[-1] == "TZ_glob.xlsx"
@@ -0,0 +1,102 @@
+import sqlite3
+from pathlib import Path
+
+from toir_tra_report_v1 import (
+    OUTPUT_ENGINE_STREAM,
+    TransmittalOutput,
+    create_archive,
+    record_transmittal,
+    write_transmittal,
+)
+from transmittal_registry import TransmittalRegistry
+
+
+def _make_docs(directory: Path, names: list[str]) -> list[Path]:
+    directory.mkdir(parents=True, exist_ok=True)
+    files = []
+    for name in names:
+        path = directory / name
+        path.write_text(name, encoding="utf-8")
+        files.append(path)
+    return files
+
+
+def test_record_and_find_transmittal(tmp_path: Path, transmittal_template: Path) -> None:
+    files = _make_docs(
+        tmp_path / "docs", ["CT-DR-II.7.1-00-1G.pdf", "CT-DR-IV.2.3-02-6M.docx", "CT-DR-II.7.4а-00-1G.pdf"]
+    )
+    tz_map = {"II.7.1": "Опис"}
+    workbook = write_transmittal(
+        transmittal_template, files, tz_map, tmp_path / "docs", lambda _m: None,
+        sender_value="Sender", output_engine=OUTPUT_ENGINE_STREAM,
+    )
+    registry_path = tmp_path / "registry.sqlite3"
+    digests: dict[Path, str] = {}
+    archive = create_archive(tmp_path / "docs" / "att.zip", files[:2], digests=digests)
+    record_transmittal(
+        TransmittalOutput(workbook, files, False, tz_map),
+        "Sender",
+        archive,
+        lambda _m: None,
+        registry_path,
+        hash_file=digests.get,
+    )
+
+    with TransmittalRegistry(registry_path) as registry:
+        [hit] = registry.find("ii.7.1")
+        assert hit.workbook_path == workbook.resolve()
+        assert hit.sender == "Sender"
+        assert hit.sha256 is not None and len(hit.sha256) == 64
+        assert [h.file_name for h in registry.find("ct-dr-iv")] == ["CT-DR-IV.2.3-02-6M.docx"]
+        assert [h.file_name for h in registry.find("2.3-02")] == ["CT-DR-IV.2.3-02-6M.docx"]
+        assert registry.find(hit.sha256)[0].file_name == "CT-DR-II.7.1-00-1G.pdf"
+        assert registry.find("CT-DR-V.1") == []
+        # Кириллическая буква индекса: NOCASE её не сворачивает, запрос нормализуется
+        [lettered] = registry.find("ii.7.4A")
+        assert lettered.file_name == "CT-DR-II.7.4а-00-1G.pdf"
+        assert lettered.sha256 is None  # не архивировался — ради реестра файл не читается
+
+
+def test_import_existing_workbooks(tmp_path: Path, transmittal_template: Path) -> None:
+    archive_dir = tmp_path / "history"
+    for year, names in (("2024", ["CT-DR-I.1-00-1G.pdf"]), ("2025", ["CT-DR-I.2-00-1G.pdf", "CT-DR-I.3-00-1G.pdf"])):
+        files = _make_docs(archive_dir / year, names)
+        write_transmittal(
+            transmittal_template, files, {}, archive_dir / year, lambda _m: None,
+            sender_value="Sender", output_engine=OUTPUT_ENGINE_STREAM,
+        )
+
+    with TransmittalRegistry(tmp_path / "registry.sqlite3") as registry:
+        result = registry.import_workbooks(archive_dir, max_workers=2)
+        assert len(result.imported) == 2 and not result.failed
+
+        [hit] = registry.find("CT-DR-I.3")
+        assert hit.workbook_path.parent.name == "2025"
+        assert hit.sender == "Sender"
+        assert hit.sent_date is not None and hit.sent_date[:2] == "20"
+
+        again = registry.import_workbooks(archive_dir, max_workers=2)
+        assert not again.imported and len(again.unchanged) == 2
+
+
+def test_registry_migrates_documents_without_archive_column(tmp_path: Path) -> None:
+    db_path = tmp_path / "registry.sqlite3"
+    with sqlite3.connect(db_path) as conn:
+        conn.executescript(
+            """
+            CREATE TABLE transmittals (id INTEGER PRIMARY KEY, workbook_path TEXT NOT NULL UNIQUE,
+                workbook_name TEXT NOT NULL, sender TEXT, sent_date TEXT, archive_path TEXT,
+                workbook_mtime_ns INTEGER, recorded_at TEXT NOT NULL);
+            CREATE TABLE documents (id INTEGER PRIMARY KEY, transmittal_id INTEGER NOT NULL,
+                position INTEGER NOT NULL, file_name TEXT NOT NULL, index_code TEXT, naziv TEXT,
+                size INTEGER, sha256 TEXT);
+            INSERT INTO transmittals VALUES (1, '/t/book.xlsx', 'book.xlsx', NULL, NULL, '/t/book_att.zip', NULL, '');
+            INSERT INTO documents VALUES (1, 1, 1, 'CT-DR-II.7.1-00-1G.pdf', 'II.7.1', NULL, NULL, NULL);
+            PRAGMA user_version = 1;
+            """
+        )
+    conn.close()
+
+    with TransmittalRegistry(db_path) as registry:
+        [hit] = registry.find("II.7.1")
+        assert hit.archive_path == Path("/t/book_att.zip")
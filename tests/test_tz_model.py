@@ -0,0 +1,89 @@
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from index_trie import IndexTrie
+from tz_model import (
+    TZ_MODEL_PREFIX,
+    TZ_MODEL_STALE_SECONDS,
+    TZ_MODEL_SUFFIX,
+    TzModel,
+    attach_tz_model,
+    published_tz_model,
+    remove_stale_tz_models,
+    write_tz_model,
+)
+from tz_parser import normalize_key
+
+
+DESCRIPTIONS = {
+    normalize_key("II.7"): "Раздел",
+    normalize_key("II.7.4a"): "Объект",
+    normalize_key("IV.1"): "Станция",
+    "ШАПКА": "не индекс",
+}
+
+
+def _lookup_in_worker(job: tuple[TzModel, str]) -> str | None:
+    model, index = job
+    match = model.lookup(index)
+    return match.value if match else None
+
+
+def test_model_matches_index_trie(tmp_path: Path) -> None:
+    trie = IndexTrie(DESCRIPTIONS)
+    path = write_tz_model(tmp_path / "tz.tzmodel", trie)
+
+    with TzModel(path) as model:
+        assert dict(model) == dict(trie)
+        assert model["ii.7.4а"] == "Объект"
+        assert "ШАПКА" in model and "II.8" not in model
+        for index in ("II.7.4a", "II.7.4.2", "II.7.5", "iv.1b", "III.1", "текст"):
+            assert model.lookup(index) == trie.lookup(index)
+            assert model.lookup(index, max_fallback=0) == trie.lookup(index, max_fallback=0)
+
+
+def test_published_model_is_removed_with_attached_maps(tmp_path: Path) -> None:
+    with published_tz_model(DESCRIPTIONS, directory=tmp_path) as path:
+        model = attach_tz_model(path)
+        assert model.lookup("II.7.4a").value == "Объект"
+    assert not path.exists()
+    assert model._data.closed
+
+
+def test_stale_models_are_swept(tmp_path: Path) -> None:
+    stale = tmp_path / f"{TZ_MODEL_PREFIX}old{TZ_MODEL_SUFFIX}"
+    fresh = tmp_path / f"{TZ_MODEL_PREFIX}new{TZ_MODEL_SUFFIX}"
+    foreign = tmp_path / f"old{TZ_MODEL_SUFFIX}"
+    for path in (stale, fresh, foreign):
+        path.write_bytes(b"")
+    two_days_ago = time.time() - 2 * TZ_MODEL_STALE_SECONDS
+    os.utime(stale, (two_days_ago, two_days_ago))
+    os.utime(foreign, (two_days_ago, two_days_ago))
+
+    assert remove_stale_tz_models(tmp_path) == 1
+    assert not stale.exists()
+    assert fresh.exists() and foreign.exists()
+
+
+def test_workers_attach_by_path(tmp_path: Path) -> None:
+    path = write_tz_model(tmp_path / "tz.tzmodel", DESCRIPTIONS)
+    model = attach_tz_model(path)
+
+    assert attach_tz_model(path) is model
+    assert len(pickle.dumps(model)) < 200  # передаётся путь, а не содержимое
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        values = list(executor.map(_lookup_in_worker, [(model, "II.7.4a"), (model, "II.7.9")]))
+    assert values == ["Объект", "Раздел"]
+
+
+def test_rejects_foreign_file(tmp_path: Path) -> None:
+    path = tmp_path / "other.tzmodel"
+    path.write_bytes(b"not a model")
+
+    with pytest.raises(ValueError, match="моделью TZ"):
+        TzModel(path)
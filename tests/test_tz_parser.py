@@ -0,0 +1,142 @@
+from pathlib import Path
+
+import pytest
+from openpyxl import Workbook, load_workbook
+
+import tz_parser
+from toir_tra_report_v1 import build_tz_map_from_xlsx
+from tz_parser import RE_INDEX, build_tz_map, normalize_key
+
+
+def _reference_tz_map(xlsx_path: Path) -> dict[str, str]:
+    """Прежний последовательный разбор (эталон для сравнения)."""
+    tz_map: dict[str, str] = {}
+    wb = load_workbook(xlsx_path, data_only=True)
+    for ws in wb.worksheets:
+        max_col = min(ws.max_column, 20)
+        for r in range(1, ws.max_row + 1):
+            idx_val, idx_col = None, None
+            for c in range(1, max_col + 1):
+                v = ws.cell(r, c).value
+                if isinstance(v, str):
+                    m = RE_INDEX.search(v)
+                    if m:
+                        roman, num1, num2, num3, suf = m.groups()
+                        idx_val = f"{roman.upper()}.{num1}"
+                        if num2: idx_val += f".{num2}"
+                        if num3: idx_val += f".{num3}"
+                        idx_val += suf or ""
+                        idx_col = c
+                        break
+            if not idx_val: continue
+            naziv = None
+            vC = ws.cell(r, 3).value
+            if isinstance(vC, str) and vC.strip():
+                naziv = vC.strip()
+            else:
+                for c in range((idx_col or 1) + 1, max_col + 1):
+                    v = ws.cell(r, c).value
+                    if isinstance(v, str) and len(v.strip()) >= 3:
+                        naziv = v.strip()
+                        break
+            if naziv:
+                tz_map.setdefault(normalize_key(idx_val), naziv)
+    return tz_map
+
+
+def build_reference_book(path: Path, sheets: int = 6, rows: int = 40) -> None:
+    """Книга TZ с разными раскладками листов и повторами ключей между листами."""
+    wb = Workbook()
+    wb.remove(wb.active)
+    for sheet in range(sheets):
+        ws = wb.create_sheet(f"list_{sheet}")
+        ws.append(["Индекс", "№", "Назив"])
+        for row in range(rows):
+            index = f"II.{row % 15}.{sheet % 3}"
+            if sheet % 2:
+                # Индекс в колонке B, описание в C
+                ws.append([None, f"{index}-00", f"Описание {sheet}/{row}"])
+            else:
+                # Индекс в колонке D, C пустая — описание ищется правее
+                ws.append([None, "x", None, f"CT {index}a", "ab", f"  Назив {sheet}/{row}  "])
+        ws.append(["IV.1", "  ", None])  # без описания
+        ws.append([42, "текст без индекса", "Описание"])
+    wb.save(path)
+    wb.close()
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_build_tz_map_matches_reference(tmp_path: Path, max_workers: int) -> None:
+    path = tmp_path / "TZ_glob.xlsx"
+    build_reference_book(path)
+
+    expected = _reference_tz_map(path)
+    result = build_tz_map(path, max_workers=max_workers)
+
+    assert list(result.items()) == list(expected.items())
+    assert result[normalize_key("II.3.1")] == "Описание 1/3"  # первый лист с ключом
+
+
+def test_build_tz_map_missing_file(tmp_path: Path) -> None:
+    assert build_tz_map_from_xlsx(tmp_path / "absent.xlsx") == {}
+
+
+def test_small_books_are_parsed_inline(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    path = tmp_path / "TZ_glob.xlsx"
+    build_reference_book(path, sheets=2, rows=5)
+    monkeypatch.setattr(tz_parser, "ProcessPoolExecutor", None)
+
+    assert build_tz_map(path) == _reference_tz_map(path)
+
+
+def _probe_only(rows: list[tuple]) -> dict[str, str]:
+    """Карта без схемы: каждая строка перебирается целиком."""
+    result: dict[str, str] = {}
+    for row in rows:
+        parsed = tz_parser._parse_row(row)
+        if parsed is not None:
+            result.setdefault(*parsed)
+    return result
+
+
+def _matches_full_probe(rows: list[tuple]) -> bool:
+    return list(tz_parser.parse_rows(rows).items()) == list(_probe_only(rows).items())
+
+
+def test_infer_schema_picks_common_columns() -> None:
+    rows = [("Шапка", None, None)] + [
+        (None, "x", None, f"II.{n}.1", "ab", f"Назив {n}") for n in range(10)
+    ]
+
+    assert tz_parser.infer_schema(rows) == tz_parser.SheetSchema(4, 6)
+    assert tz_parser.infer_schema([("без индекса",), (None, None)]) is None
+
+
+def test_rows_outside_schema_match_full_probe() -> None:
+    typical = [(None, f"II.{n}.1", f"Описание {n}") for n in range(60)]
+    odd = [
+        ("I.5 раньше колонки", "II.8.1", "Описание"),  # индекс левее схемы
+        (None, "текст", "Описание", "III.2"),  # индекс правее схемы
+        (None, "II.9.1", None, "ab", "Далее", "Ещё"),  # описание не в C
+        (None, "II.9.2", "   ", None, "Описание 2"),
+        (None, "II.9.3"),  # короткая строка без C
+        (None, "II.9.4", None),
+        ("v1.0", "II.9.5", "Версия перед индексом"),  # точка без индекса
+    ]
+    rows = typical + odd
+
+    assert _matches_full_probe(rows)
+    assert _matches_full_probe(odd + typical)
+
+
+def test_fallback_description_schema_respects_earlier_candidates() -> None:
+    rows = [(None, f"II.{n}.1", None, None, f"Назив {n}") for n in range(60)]
+    rows += [
+        (None, "IV.7.1", None, "Раньше", "Назив"),  # подходящая строка до колонки схемы
+        (None, "IV.7.2", "Есть C", None, "Назив"),
+        (None, "IV.7.3", None, "ab", "Назив"),
+    ]
+
+    assert tz_parser.infer_schema(rows) == tz_parser.SheetSchema(2, 5)
+    assert _matches_full_probe(rows)
+    assert tz_parser.parse_rows(rows)[normalize_key("IV.7.1")] == "Раньше"
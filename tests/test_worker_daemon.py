@@ -0,0 +1,124 @@
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import pytest
+from openpyxl import load_workbook
+
+from worker_daemon import TOKEN_HEADER, WorkerClient, create_server, ensure_loopback, read_token
+
+
+@pytest.fixture
+def client(tmp_path: Path):
+    token_path = tmp_path / "daemon.token"
+    server = create_server(
+        port=0,
+        tz_file_path=tmp_path / "missing_TZ_glob.xlsx",
+        registry_path=tmp_path / "registry.sqlite3",
+        token_path=token_path,
+    )
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield WorkerClient(port=server.server_address[1], timeout=30, token_path=token_path)
+    server.shutdown()
+    server.server_close()
+    server.jobs.shutdown()
+
+
+def test_daemon_runs_transmittal_job(
+    tmp_path: Path, transmittal_template: Path, client: WorkerClient
+) -> None:
+    docs_dir = tmp_path / "docs"
+    docs_dir.mkdir()
+    for i in (1, 2):
+        (docs_dir / f"CT-DR-II.7.{i}-00-1G.pdf").write_text("demo", encoding="utf-8")
+
+    reply = client.submit(
+        "transmittal",
+        {"target_dir": str(docs_dir), "template_path": str(transmittal_template), "archive": True},
+    )
+
+    assert reply["status"] == "done", reply["error"]
+    assert reply["result"]["files"] == 2
+    assert Path(reply["result"]["archive"]).exists()
+    wb = load_workbook(reply["result"]["workbook"])
+    assert wb.active["C19"].value == "CT-DR-II.7.2-00-1G.pdf"
+    wb.close()
+    assert client.status(reply["id"])["status"] == "done"
+
+
+def test_daemon_reports_failures(tmp_path: Path, client: WorkerClient) -> None:
+    reply = client.submit("cmm", {"source_dir": str(tmp_path / "absent")})
+    assert reply["status"] == "failed"
+    assert "absent" in reply["error"]
+
+    with pytest.raises(RuntimeError, match="400"):
+        client.submit("unknown", {})
+
+
+def _raw_post(client: WorkerClient, path: str, headers: dict[str, str]) -> int:
+    request = urllib.request.Request(
+        client.base_url + path, data=json.dumps({}).encode("utf-8"), method="POST", headers=headers
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return response.status
+    except urllib.error.HTTPError as error:
+        return error.code
+
+
+def test_daemon_rejects_requests_without_token_or_from_browser(client: WorkerClient) -> None:
+    token = read_token(client.token_path)
+    if sys.platform != "win32":
+        assert client.token_path.stat().st_mode & 0o777 == 0o600
+
+    assert _raw_post(client, "/shutdown", {"Content-Type": "text/plain"}) == 415
+    assert _raw_post(client, "/shutdown", {"Content-Type": "application/json"}) == 401
+    assert _raw_post(client, "/jobs", {"Content-Type": "application/json", TOKEN_HEADER: "wrong"}) == 401
+    browser = {"Content-Type": "application/json", TOKEN_HEADER: token, "Origin": "https://example.com"}
+    assert _raw_post(client, "/shutdown", browser) == 403
+
+    assert client.health() == {"status": "ok"}
+    with pytest.raises(RuntimeError, match="401"):
+        WorkerClient(port=int(client.base_url.rsplit(":", 1)[1]), token_path=Path(os.devnull)).status(1)
+
+
+def test_daemon_refuses_non_loopback_host(tmp_path: Path) -> None:
+    assert ensure_loopback("::1") == "::1"
+    assert ensure_loopback("localhost") == "localhost"
+    with pytest.raises(ValueError, match="0.0.0.0"):
+        create_server("0.0.0.0", port=0, token_path=tmp_path / "daemon.token")
+    assert not (tmp_path / "daemon.token").exists()
+
+
+class _ProxyErrorHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        body = b"<html>502 Bad Gateway</html>"
+        self.send_response(502 if self.path == "/health" else 200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+def test_client_reports_non_json_replies(tmp_path: Path) -> None:
+    token_path = tmp_path / "daemon.token"
+    token_path.write_text("token", encoding="utf-8")
+    server = HTTPServer(("127.0.0.1", 0), _ProxyErrorHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        client = WorkerClient(port=server.server_address[1], timeout=30, token_path=token_path)
+        with pytest.raises(RuntimeError, match="502: <html>502 Bad Gateway"):
+            client.health()
+        with pytest.raises(RuntimeError, match="не JSON"):
+            client.status(1)
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,115 @@
+from pathlib import Path
+
+from openpyxl import Workbook, load_workbook
+from openpyxl.workbook.defined_name import DefinedName
+
+from duplicate_finder import HashCache
+from index_folder_builder import prepare_index_folders
+from workflow import WorkflowOptions, run_workflow
+
+
+def _build_tz_file(path: Path, rows: list[tuple[str, str, str, str, str]]) -> None:
+    """TZ_glob.xlsx: индекс (B), название (C), периодичность (E), суффикс (G), резерв (H)."""
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "gen_cl"
+    for row, values in enumerate(rows, start=1):
+        for column, value in zip((2, 3, 5, 7, 8), values):
+            ws.cell(row=row, column=column, value=value)
+    wb.save(path)
+    wb.close()
+
+
+def _build_cmm_template(path: Path) -> None:
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Sheet1"
+    wb.defined_names.add(DefinedName(name="ReportName", attr_text="'Sheet1'!$D$1"))
+    wb.defined_names.add(DefinedName(name="CreatedDate", attr_text="'Sheet1'!$D$4"))
+    wb.defined_names.add(DefinedName(name="ExtraField1", attr_text="'Sheet1'!$D$6"))
+    wb.save(path)
+
+
+def _make_sources(source_dir: Path) -> None:
+    source_dir.mkdir()
+    for name in (
+        "CT-DR-II.7.4-00-1G-20250101-00.pdf",
+        "CT-DR-II.7.4-00-1G-20250101-00.docx",
+        "CT-DR-II.2.6-00-C-20250102-00.pdf",
+    ):
+        (source_dir / name).write_text(name, encoding="utf-8")
+
+
+def test_on_folder_ready_reports_each_folder_once(tmp_path: Path) -> None:
+    tz_file = tmp_path / "TZ_glob.xlsx"
+    _build_tz_file(tz_file, [("II.7.4", "Объект", "1Г", "GST", "00")])
+    _make_sources(tmp_path / "source")
+    ready: list[Path] = []
+
+    created = prepare_index_folders(
+        tmp_path / "source", tmp_path / "dest", tz_file, on_folder_ready=ready.append
+    )
+
+    assert sorted(ready) == sorted(created)
+    assert len(ready) == 2
+    # К моменту уведомления все файлы группы уже в папке
+    assert all(any(folder.iterdir()) for folder in ready)
+
+
+def test_run_workflow_builds_cmm_and_transmittal_per_folder(
+    tmp_path: Path, transmittal_template: Path
+) -> None:
+    tz_file = tmp_path / "TZ_glob.xlsx"
+    _build_tz_file(tz_file, [("II.7.4", "Объект", "1Г", "GST", "00"), ("II.2.6", "Станция", "C", "GST", "00")])
+    cmm_template = tmp_path / "CommentSheet_Template.xltx"
+    _build_cmm_template(cmm_template)
+    _make_sources(tmp_path / "source")
+    messages: list[str] = []
+
+    result = run_workflow(
+        tmp_path / "source",
+        tmp_path / "dest",
+        WorkflowOptions(transmittal_template, cmm_template, archive=True, max_workers=2),
+        messages.append,
+        tz_file_path=tz_file,
+        registry_path=tmp_path / "registry.sqlite3",
+        hash_cache=HashCache(tmp_path / "hash_cache.json"),
+    )
+
+    assert not result.failed, [outcome.error for outcome in result.failed]
+    assert sorted(outcome.folder for outcome in result.folders) == sorted(result.created_dirs)
+    by_name = {outcome.folder.name: outcome for outcome in result.folders}
+    outcome = by_name["II.7.4-00-1G_GST"]
+    assert [path.name for path in outcome.cmm_created] == [
+        "CT-DR-II.7.4-00-1G-20250101-00_CMM.xlsx"
+    ]
+    assert outcome.archives and outcome.archives[0].exists()
+    wb = load_workbook(outcome.workbook)
+    listed = {wb.active.cell(row=row, column=3).value for row in range(18, 22)}
+    wb.close()
+    assert "CT-DR-II.7.4-00-1G-20250101-00_CMM.xlsx" in listed
+    assert any(message.startswith("[II.2.6-00-C]") for message in messages)
+    assert (tmp_path / "registry.sqlite3").exists()
+
+
+def test_run_workflow_keeps_going_after_folder_error(
+    tmp_path: Path, transmittal_template: Path
+) -> None:
+    tz_file = tmp_path / "TZ_glob.xlsx"
+    _build_tz_file(tz_file, [("II.7.4", "Объект", "1Г", "GST", "00")])
+    source_dir = tmp_path / "source"
+    _make_sources(source_dir)
+    # Файл без поддерживаемого расширения: папка создаётся, но документов в ней нет
+    (source_dir / "CT-DR-II.9.1-00-C-20250103-00.tmp").write_text("x", encoding="utf-8")
+
+    result = run_workflow(
+        source_dir,
+        tmp_path / "dest",
+        WorkflowOptions(transmittal_template),
+        tz_file_path=tz_file,
+        registry_path=tmp_path / "registry.sqlite3",
+        hash_cache=HashCache(tmp_path / "hash_cache.json"),
+    )
+
+    assert [outcome.folder.name for outcome in result.failed] == ["II.9.1-00-C"]
+    assert len(result.folders) - len(result.failed) == 2
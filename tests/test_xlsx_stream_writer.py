@@ -0,0 +1,116 @@
+import zipfile
+from pathlib import Path
+
+import pytest
+from openpyxl import load_workbook
+
+from toir_tra_report_v1 import (
+    OUTPUT_ENGINE_OPENPYXL,
+    OUTPUT_ENGINE_STREAM,
+    write_transmittal,
+)
+
+
+def _snapshot(path: Path) -> dict:
+    wb = load_workbook(path)
+    ws = wb.active
+    cells = {
+        cell.coordinate: cell.value
+        for row in ws.iter_rows()
+        for cell in row
+        if cell.value is not None
+    }
+    alignment = {
+        coord: (ws[coord].alignment.horizontal, ws[coord].alignment.wrap_text)
+        for coord in ("C18", "I18", "C21", "I21")
+    }
+    snapshot = {
+        "cells": cells,
+        "merges": sorted(str(mr) for mr in ws.merged_cells.ranges),
+        "anchor": wb.defined_names["FooterAnchor"].attr_text,
+        "print_area": ws.print_area,
+        "alignment": alignment,
+        "borders": [ws.cell(row=21, column=col).border.left.style for col in (2, 9, 16)],
+        "height": ws.row_dimensions[21].height,
+        "template": wb.template,
+    }
+    wb.close()
+    return snapshot
+
+
+@pytest.mark.parametrize("file_count", [1, 2, 6])
+def test_stream_engine_matches_openpyxl(
+    tmp_path: Path, transmittal_template: Path, file_count: int
+) -> None:
+    template_path = transmittal_template
+    files = [tmp_path / f"CT-DR-II.7.{i}-00-1G-C-2025.pdf" for i in range(1, file_count + 1)]
+    tz_map = {"II.7.1": "Опис & <одржавање>"}
+    messages: list[str] = []
+
+    outputs = {}
+    for engine in (OUTPUT_ENGINE_OPENPYXL, OUTPUT_ENGINE_STREAM):
+        out_dir = tmp_path / engine
+        outputs[engine] = write_transmittal(
+            template_path,
+            files,
+            tz_map,
+            out_dir,
+            messages.append,
+            sender_value="Sender",
+            output_engine=engine,
+        )
+
+    assert not any("ПРЕДУПРЕЖДЕНИЕ" in message for message in messages)
+    assert outputs[OUTPUT_ENGINE_STREAM].name == outputs[OUTPUT_ENGINE_OPENPYXL].name
+    assert _snapshot(outputs[OUTPUT_ENGINE_STREAM]) == _snapshot(outputs[OUTPUT_ENGINE_OPENPYXL])
+
+
+def test_stream_engine_copies_other_parts(
+    tmp_path: Path, transmittal_template: Path
+) -> None:
+    template_path = transmittal_template
+    out_path = write_transmittal(
+        template_path,
+        [tmp_path / "CT-DR-II.7.1-00-1G.pdf"],
+        {},
+        tmp_path / "out",
+        lambda _message: None,
+        output_engine=OUTPUT_ENGINE_STREAM,
+    )
+
+    changed = {
+        "[Content_Types].xml",
+        "xl/workbook.xml",
+        "xl/styles.xml",
+        "xl/worksheets/sheet1.xml",
+    }
+    with zipfile.ZipFile(template_path) as source, zipfile.ZipFile(out_path) as result:
+        assert source.namelist() == sorted(
+            result.namelist(), key=source.namelist().index
+        )
+        for name in set(source.namelist()) - changed:
+            assert source.read(name) == result.read(name)
+
+
+@pytest.mark.parametrize("engine", [OUTPUT_ENGINE_OPENPYXL, OUTPUT_ENGINE_STREAM])
+def test_transmittal_reports_naziv_from_ancestor(
+    tmp_path: Path, transmittal_template: Path, engine: str
+) -> None:
+    files = [tmp_path / "CT-DR-II.7.4.2a-00-1G.pdf", tmp_path / "CT-DR-II.7.1-00-1G.pdf"]
+    messages: list[str] = []
+
+    saved = write_transmittal(
+        transmittal_template,
+        files,
+        {"II.7.4": "Објекат", "II.7.1": "Опис"},
+        tmp_path / engine,
+        messages.append,
+        output_engine=engine,
+    )
+
+    wb = load_workbook(saved)
+    assert [wb.active["I18"].value, wb.active["I19"].value] == ["Објекат", "Опис"]
+    wb.close()
+    assert [m for m in messages if m.startswith("Назив")] == [
+        "Назив для II.7.4.2a взят от II.7.4 (уровней вверх: 2)"
+    ]
@@ -1,4 +1,5 @@
 import re
+import hashlib
 from pathlib import Path
 from datetime import datetime
 import sys
@@ -7,12 +8,55 @@ import subprocess
 import zipfile
 import webbrowser
 import json
+from collections import Counter
+from dataclasses import dataclass, field
+import sqlite3
 import shutil
+import multiprocessing
 import tkinter as tk
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from tkinter import filedialog, messagebox, ttk
 
-from index_folder_builder import prepare_index_folders
+from index_folder_builder import (
+    TRANSFER_COPY,
+    TRANSFER_HARDLINK,
+    TRANSFER_MOVE,
+    TRANSFER_REFLINK,
+    format_transfer_counts,
+    prepare_index_folders,
+)
 from cmm_builder import generate_comment_sheets
+from duplicate_finder import HASH_CACHE_FILE_NAME, HashCache, find_duplicates
+from folder_catalog import FolderCatalog
+from index_trie import IndexTrie, as_index_trie
+from io_scheduler import AdaptiveIOScheduler
+from move_journal import resume_moves, rollback_moves
+from run_history import (
+    HISTORY_FILE_NAME,
+    RUN_CMM,
+    RUN_GROUPING,
+    RUN_KINDS,
+    RUN_TRANSMITTAL,
+    EtaSnapshotStatus,
+    RunHistory,
+    RunRecorder,
+    chart_points,
+    run_stage,
+    throughput_trend,
+    total_size,
+)
+from template_catalog import TemplateCatalog
+from template_compiler import SENDER_CELL_NAME, TemplateMeta, load_template_meta
+from tz_model import attach_tz_model, published_tz_model
+from tz_parser import RE_INDEX, build_tz_map, format_index, normalize_key
+from transmittal_manifest import fingerprint_files, load_manifest, select_new_files, update_manifest
+from transmittal_registry import (
+    REGISTRY_FILE_NAME,
+    RegistryTransmittal,
+    TransmittalRegistry,
+    documents_from_files,
+)
+from xlsx_stream_writer import StreamTemplateError, TransmittalLayout, stream_transmittal
 
 # Настройка UTF-8 вывода
 try:
@@ -22,7 +66,7 @@ except Exception:
     pass
 
 try:
-    from openpyxl import load_workbook
+    from openpyxl import Workbook, load_workbook
     from openpyxl.utils import get_column_letter
     from openpyxl.styles import Alignment
     from openpyxl.workbook.defined_name import DefinedName
@@ -163,6 +207,42 @@ def load_settings() -> tuple[Path, dict[str, str], list[str]]:
         print(f"[ОШИБКА] Не удалось прочитать settings.json: {e}")
         return default_path, default_companies, default_senders
 
+def load_io_bandwidth_limit() -> float | None:
+    """Лимит скорости ввода-вывода из `io_bandwidth_limit_mb` (МБ/с) в settings.json; без ключа — без лимита."""
+    try:
+        with open(SETTINGS_FILE, 'r', encoding='utf-8') as f:
+            value = json.load(f).get("io_bandwidth_limit_mb")
+        return float(value) * 1024 * 1024 if value else None
+    except (OSError, ValueError, TypeError, AttributeError):
+        return None
+
+def build_io_scheduler(status_callback=None) -> AdaptiveIOScheduler:
+    """Создаёт регулятор параллельного ввода-вывода с лимитом скорости из настроек."""
+    return AdaptiveIOScheduler(bandwidth_limit=load_io_bandwidth_limit(), status_callback=status_callback)
+
+def start_run(kind: str, status_callback) -> tuple[RunRecorder, EtaSnapshotStatus]:
+    """Начинает замер запуска и оборачивает колбэк статуса оценкой оставшегося времени.
+
+    Папка заранее не обходится: число и размер файлов задаёт сам запуск
+    (`RunRecorder.set_input`), и с этого момента к каждому сообщению статуса
+    добавляется оценка на момент этого сообщения.
+    """
+    recorder = RunRecorder(kind)
+    try:
+        with RunHistory(RUN_HISTORY_PATH) as history:
+            seconds_per_file = history.seconds_per_file(kind)
+    except (OSError, sqlite3.Error):
+        seconds_per_file = None
+    return recorder, EtaSnapshotStatus(status_callback, recorder, seconds_per_file=seconds_per_file)
+
+def finish_run(recorder: RunRecorder, status_callback, ok: bool | None = None) -> None:
+    """Сохраняет метрики запуска в журнал; ошибка записи не прерывает работу."""
+    try:
+        with RunHistory(RUN_HISTORY_PATH) as history:
+            history.record(recorder.finish(ok))
+    except (OSError, sqlite3.Error) as e:
+        status_callback(f"[ПРЕДУПРЕЖДЕНИЕ] Не удалось сохранить историю запусков: {e}")
+
 def ensure_template_structure(base_path: Path):
     """
     Проверяет и создает необходимую структуру папок для шаблонов.
@@ -198,12 +278,42 @@ def ensure_template_structure(base_path: Path):
         print(f"[ОШИБКА] Не удалось создать подпапки статусов: {e}")
 
 # --- Основные пути ---
-TEMPLATES_ROOT, COMPANY_NAMES, TRANSMITTAL_SENDERS = load_settings()
-ensure_template_structure(TEMPLATES_ROOT)
+# Пути из settings.json читаются при первом обращении, а не при импорте: модуль
+# импортируют рабочие процессы пулов и обработчик, которым настройки не нужны.
+APP_SETTING_NAMES = (
+    "TEMPLATES_ROOT",
+    "COMPANY_NAMES",
+    "TRANSMITTAL_SENDERS",
+    "TEMPLATE_DIR",
+    "TZ_FILE_PATH",
+    "COMMENT_TEMPLATE_PATH",
+)
+_app_settings: dict[str, object] = {}
+
+def app_setting(name: str):
+    """Значение из `APP_SETTING_NAMES`; при первом вызове читает настройки и готовит папку шаблонов."""
+    if not _app_settings:
+        templates_root, company_names, senders = load_settings()
+        ensure_template_structure(templates_root)
+        _app_settings.update(
+            TEMPLATES_ROOT=templates_root,
+            COMPANY_NAMES=company_names,
+            TRANSMITTAL_SENDERS=senders,
+            TEMPLATE_DIR=templates_root / "Template" / "template_tra",
+            TZ_FILE_PATH=templates_root / "Template" / "TZ_glob.xlsx",
+            COMMENT_TEMPLATE_PATH=templates_root / "Template" / "CommentSheet_Template.xltx",
+        )
+    return _app_settings[name]
+
+def __getattr__(name: str):
+    # `app.TZ_FILE_PATH` и т.п. для модулей, импортирующих приложение
+    if name in APP_SETTING_NAMES:
+        return app_setting(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-TEMPLATE_DIR = TEMPLATES_ROOT / "Template" / "template_tra"
-TZ_FILE_PATH = TEMPLATES_ROOT / "Template" / "TZ_glob.xlsx"
-COMMENT_TEMPLATE_PATH = TEMPLATES_ROOT / "Template" / "CommentSheet_Template.xltx"
+REGISTRY_PATH = BASE_DIR / REGISTRY_FILE_NAME
+HASH_CACHE_PATH = BASE_DIR / HASH_CACHE_FILE_NAME
+RUN_HISTORY_PATH = BASE_DIR / HISTORY_FILE_NAME
 
 # --- Настройки ячеек и колонок (можно вынести в конфиг) ---
 DATE_CELL_ADDR = "C3"
@@ -216,12 +326,41 @@ COL_NZ = 9
 MERGE_BD_FROM, MERGE_BD_TO = 3, 8
 MERGE_NZ_FROM, MERGE_NZ_TO = 9, 12
 ALLOWED_EXT = { ".pdf", ".docx", ".xlsx", ".xls", ".dwg", ".zip", ".7z"}
+# Движки записи трансмиттала: объектная модель openpyxl или потоковая запись по шаблону
+OUTPUT_ENGINE_OPENPYXL = "openpyxl"
+OUTPUT_ENGINE_STREAM = "stream"
+# Движок по умолчанию для GUI, пакетной обработки, сквозного прогона и обработчика
+DEFAULT_OUTPUT_ENGINE = OUTPUT_ENGINE_OPENPYXL
+DEFAULT_PAGE_SIZE = 500
+DEFAULT_VOLUME_MB = 100
+# Файлы крупнее пишутся в архив потоком, без параллельной предзагрузки в память
+ARCHIVE_PREFETCH_LIMIT = 32 * 1024 * 1024
+# Сколько байт предзагруженных файлов может одновременно находиться в памяти
+ARCHIVE_PREFETCH_BUDGET = 128 * 1024 * 1024
+ARCHIVE_READ_CHUNK = 1024 * 1024  # блок потоковой записи крупного файла в архив
+# Список повторяющихся вложений внутри архива, если одинаковые файлы хранятся один раз
+DUPLICATES_NOTE_NAME = "_duplicates.txt"
+# Как часто GUI проверяет, не изменился ли кэш шаблонов (мс)
+TEMPLATE_WATCH_MS = 1000
+# Запас на заголовки ZIP (локальный и центральный каталог) на каждый файл тома
+ARCHIVE_ENTRY_OVERHEAD = 128
+# Запись о конце центрального каталога, одна на том
+ARCHIVE_END_OVERHEAD = 22
+# Режимы переноса файлов на вкладке «Формирование папок»
+INDEX_TRANSFER_LABELS = {
+    "Копировать": TRANSFER_COPY,
+    "Перемещать": TRANSFER_MOVE,
+    "Жёсткие ссылки (тот же диск, иначе копия)": TRANSFER_HARDLINK,
+    "Reflink / CoW-клон (иначе копия)": TRANSFER_REFLINK,
+}
+TRANSMITTAL_LAYOUT = TransmittalLayout(
+    first_data_row=FIRST_DATA_ROW,
+    footer_anchor_name=FOOTER_ANCHOR_NAME,
+    merge_ranges=((MERGE_BD_FROM, MERGE_BD_TO), (MERGE_NZ_FROM, MERGE_NZ_TO)),
+    wrap_columns=(COL_BD, COL_NZ),
+)
 
 # --- Регулярные выражения ---
-RE_INDEX = re.compile(
-    r"\b([IVXLCDM]+)\.(\d+)(?:\.(\d+))?(?:\.(\d+))?([A-Za-zА-Яа-я])?\b",
-    re.IGNORECASE
-)
 DATE_PATTERNS = [
     re.compile(r"\b\d{2}\.\d{2}\.\d{4}\b"),
     re.compile(r"\b\d{4}-\d{2}-\d{2}\b"),
@@ -230,98 +369,945 @@ DATE_PATTERNS = [
 
 # ---------- БИЗНЕС-ЛОГИКА (ОСНОВНОЙ КОД ОБРАБОТКИ) ----------
 
-def process_files(
+def _report_naziv_fallbacks(fallbacks: dict, status_callback) -> None:
+    """Сообщает, для каких индексов 'Назив документа' взят от предка и на сколько уровней вверх."""
+    for idx, match in sorted(fallbacks.items()):
+        status_callback(f"Назив для {idx} взят от {match.key} (уровней вверх: {match.depth})")
+
+def write_transmittal(
+    template_path: Path,
+    files: list[Path],
+    tz_map: dict[str, str],
+    out_dir: Path,
+    status_callback,
+    sender_value: str | None = None,
+    output_engine: str = DEFAULT_OUTPUT_ENGINE,
+    out_path: Path | None = None,
+    volumes: dict[Path, str] | None = None,
+    meta: TemplateMeta | None = None,
+    first_number: int = 1,
+) -> Path:
+    """Заполняет шаблон трансмиттала строками файлов и сохраняет его с инкрементом.
+
+    Если передан `out_path`, книга сохраняется по этому пути без подбора номера.
+    Порядковые номера строк начинаются с `first_number` (у страниц — сквозные).
+    `volumes` (файл → том архива) записываются в колонку тома из
+    `TRANSMITTAL_LAYOUT`; если шаблон её занимает, поднимается `TemplateError`.
+    Строка футера, ячейка отправителя и постоянные колонки берутся из
+    метаданных шаблона `meta` (по умолчанию — `load_template_meta`), а не
+    ищутся в книге заново.
+    """
+    prefix = template_path.stem.replace("-Template", "-")
+    meta = meta or load_template_meta(template_path, TRANSMITTAL_LAYOUT)
+    tz_map = as_index_trie(tz_map)
+    if volumes:
+        meta.check_volume_column()
+    sender_sheet, sender_cell = meta.named_cell(SENDER_CELL_NAME, "I22")
+    fallbacks: dict = {}
+
+    if output_engine == OUTPUT_ENGINE_STREAM:
+        status_callback("Потоковая запись трансмиттала...")
+        sheet_values = {(sender_sheet, sender_cell): sender_value} if sender_value else {}
+        rows = [
+            {COL_RB: i, COL_BD: p.name, COL_NZ: build_naziv(p.name, tz_map, fallbacks)}
+            for i, p in enumerate(files, first_number)
+        ]
+        if volumes:
+            for row, p in zip(rows, files):
+                row[TRANSMITTAL_LAYOUT.volume_column] = volumes.get(p)
+        out_path = out_path or next_increment_path(out_dir, prefix)
+        try:
+            saved_path = stream_transmittal(
+                template_path,
+                out_path,
+                rows,
+                layout=TRANSMITTAL_LAYOUT,
+                cell_transforms={DATE_CELL_ADDR: format_date_value},
+                sheet_values=sheet_values,
+            )
+        except StreamTemplateError as e:
+            out_path.unlink(missing_ok=True)
+            status_callback(f"[ПРЕДУПРЕЖДЕНИЕ] Потоковая запись недоступна ({e}) — используется openpyxl.")
+        else:
+            _report_naziv_fallbacks(fallbacks, status_callback)
+            return saved_path
+
+    wb = load_workbook(template_path)
+    ws = wb.active
+
+    if sender_value:
+        status_callback("Заполнение данных отправителя...")
+        wb[sender_sheet][sender_cell].value = sender_value
+
+    status_callback("Запись даты...")
+    write_date(ws)
+
+    footer_row = meta.footer_row
+    status_callback(f"Строка футера: {footer_row}")
+
+    num_files = len(files)
+    available_data_rows = footer_row - FIRST_DATA_ROW
+    rows_to_insert = 0
+    if num_files > available_data_rows:
+        rows_to_insert = num_files - available_data_rows
+
+    if rows_to_insert > 0:
+        status_callback(f"Вставка {rows_to_insert} строк...")
+        insert_rows_and_preserve_footer_merges(ws, footer_row, rows_to_insert)
+
+    new_footer_row = footer_row + rows_to_insert
+    status_callback("Заполнение строк данными...")
+    final_footer_row = fill_rows(
+        ws,
+        files,
+        tz_map,
+        FIRST_DATA_ROW,
+        new_footer_row,
+        volumes,
+        meta.const_values,
+        meta.data_row_height,
+        fallbacks,
+        first_number,
+    )
+    _report_naziv_fallbacks(fallbacks, status_callback)
+
+    status_callback("Обновление якоря футера и области печати...")
+    update_footer_anchor(wb, ws.title, FOOTER_ANCHOR_NAME, final_footer_row)
+
+    last_row = ws.max_row
+    ws.print_area = f'B3:P{last_row}'
+
+    wb.template = False
+    if out_path is not None:
+        wb.save(out_path)
+        return out_path
+    return save_with_increment(wb, out_dir, prefix=prefix)
+
+def _ignore_status(message: str) -> None:
+    """Колбэк статуса для рабочих процессов (сообщения собирает главный процесс)."""
+
+def _write_transmittal_page(job: tuple) -> Path:
+    """Формирует одну страницу трансмиттала в рабочем процессе."""
+    template_path, page_files, tz_model_path, out_path, sender_value, output_engine, archive_path, first_number = job
+    saved_path = write_transmittal(
+        template_path,
+        page_files,
+        attach_tz_model(tz_model_path),
+        out_path.parent,
+        _ignore_status,
+        sender_value=sender_value,
+        output_engine=output_engine,
+        out_path=out_path,
+        first_number=first_number,
+    )
+    if archive_path is not None:
+        create_archive(archive_path, page_files)
+    return saved_path
+
+def split_into_pages(files: list[Path], page_size: int) -> list[list[Path]]:
+    """Делит список файлов на страницы не длиннее `page_size`."""
+    if page_size <= 0:
+        raise ValueError("Размер страницы должен быть положительным.")
+    return [files[i:i + page_size] for i in range(0, len(files), page_size)]
+
+def write_transmittal_pages(
+    template_path: Path,
+    files: list[Path],
+    tz_map: dict[str, str],
+    out_dir: Path,
+    page_size: int,
+    status_callback,
+    sender_value: str | None = None,
+    output_engine: str = DEFAULT_OUTPUT_ENGINE,
+    page_archives: bool = False,
+    max_workers: int | None = None,
+) -> tuple[Path, list[tuple[Path, list[Path], Path | None]]]:
+    """Формирует трансмиттал постранично (параллельно) и общую книгу-оглавление.
+
+    Карта TZ публикуется одним файлом (`tz_model`), который рабочие процессы
+    отображают в память вместо копии словаря в каждой задаче.
+    Нумерация строк сквозная: страница продолжает номера предыдущей. Номер
+    трансмиттала (`<yymmdd>_NN`) у каждой страницы свой — это отдельная книга
+    со своей записью в реестре, а оглавление связывает их в один комплект.
+    Возвращает путь оглавления и список `(книга, файлы страницы, архив или None)`.
+    """
+    pages = split_into_pages(files, page_size)
+    prefix = template_path.stem.replace("-Template", "-")
+    out_paths = next_increment_paths(out_dir, prefix, len(pages))
+    archive_paths = [
+        path.with_name(path.stem + "_att.zip") if page_archives else None
+        for path in out_paths
+    ]
+    status_callback(f"Формирование {len(pages)} страниц по {page_size} файлов...")
+    workers = max_workers or min(len(pages), os.cpu_count() or 1)
+    with published_tz_model(tz_map) as tz_model_path, ProcessPoolExecutor(max_workers=workers) as executor:
+        first_numbers = [1 + page_size * page_number for page_number in range(len(pages))]
+        jobs = [
+            (template_path, page_files, tz_model_path, out_path, sender_value, output_engine, archive_path, first)
+            for page_files, out_path, archive_path, first in zip(pages, out_paths, archive_paths, first_numbers)
+        ]
+        futures = {executor.submit(_write_transmittal_page, job): job for job in jobs}
+        for done, future in enumerate(as_completed(futures), 1):
+            saved_path = future.result()
+            status_callback(f"Страница {done}/{len(jobs)} готова: {saved_path.name}")
+
+    entries = list(zip(out_paths, pages, archive_paths))
+    index_path = out_paths[0].with_name(out_paths[0].stem + "_index.xlsx")
+    write_pages_index(index_path, entries)
+    status_callback(f"Оглавление страниц: {index_path.name}")
+    return index_path, entries
+
+def write_pages_index(index_path: Path, entries: list[tuple[Path, list[Path], Path | None]]) -> Path:
+    """Сохраняет книгу-оглавление со списком всех страниц трансмиттала."""
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Index"
+    ws.append(["№", "Трансмиттал", "Архив", "Файлов", "Первый файл", "Последний файл"])
+    for i, (book_path, page_files, archive_path) in enumerate(entries, 1):
+        ws.append([
+            i,
+            book_path.name,
+            archive_path.name if archive_path else "",
+            len(page_files),
+            page_files[0].name,
+            page_files[-1].name,
+        ])
+    for column, width in zip("ABCDEF", (6, 40, 44, 10, 50, 50)):
+        ws.column_dimensions[column].width = width
+    wb.save(index_path)
+    return index_path
+
+def _archive_info(path: Path) -> zipfile.ZipInfo:
+    info = zipfile.ZipInfo.from_file(path, arcname=path.name)
+    info.compress_type = zipfile.ZIP_DEFLATED
+    return info
+
+def _read_for_archive(path: Path) -> tuple[zipfile.ZipInfo, bytes | None]:
+    """Читает файл для архива; крупные файлы не загружаются в память (`None`)."""
+    info = _archive_info(path)
+    if info.file_size > ARCHIVE_PREFETCH_LIMIT:
+        return info, None
+    return info, path.read_bytes()
+
+def _write_archive_entry(zipf: zipfile.ZipFile, path: Path, info: zipfile.ZipInfo, data: bytes | None) -> str:
+    """Пишет файл в архив и возвращает его SHA-256, посчитанный по тем же байтам."""
+    if data is not None:
+        zipf.writestr(info, data)
+        return hashlib.sha256(data).hexdigest()
+    digest = hashlib.sha256()
+    with open(path, "rb") as source, zipf.open(info, "w") as target:
+        while chunk := source.read(ARCHIVE_READ_CHUNK):
+            digest.update(chunk)
+            target.write(chunk)
+    return digest.hexdigest()
+
+def create_archive(
+    archive_path: Path,
+    files: list[Path],
+    io_scheduler: AdaptiveIOScheduler | None = None,
+    duplicates: dict[Path, Path] | None = None,
+    digests: dict[Path, str] | None = None,
+) -> Path:
+    """Упаковывает файлы в ZIP-архив (без вложенных каталогов).
+
+    С `io_scheduler` файлы читаются параллельно (это ускоряет работу с сетевыми
+    папками), а сжатие и запись в архив идут по порядку; в памяти одновременно
+    не больше `ARCHIVE_PREFETCH_BUDGET` байт предзагруженных файлов. Файлы
+    из `duplicates` (повтор → основной файл) в архив не кладутся: вместо них
+    в архиве `_duplicates.txt` со списком «повтор → основной файл». SHA-256 каждого
+    записанного файла считается попутно и добавляется в `digests`, так что
+    реестру и манифесту не нужно читать файлы ещё раз.
+    """
+    digests = {} if digests is None else digests
+    if duplicates:
+        files = [path for path in files if path not in duplicates]
+    with zipfile.ZipFile(archive_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        if duplicates:
+            zipf.writestr(
+                DUPLICATES_NOTE_NAME,
+                "".join(f"{copy.name} -> {original.name}\n" for copy, original in duplicates.items()),
+            )
+        if io_scheduler is None:
+            for file_to_add in files:
+                digests[file_to_add] = _write_archive_entry(zipf, file_to_add, _archive_info(file_to_add), None)
+            return archive_path
+
+        def prefetched_bytes(_path: Path, result: tuple[zipfile.ZipInfo, bytes | None]) -> int:
+            return len(result[1]) if result[1] is not None else 0
+
+        def prefetch_cost(path: Path) -> int:
+            try:
+                size = path.stat().st_size
+            except OSError:
+                return 0
+            return size if size <= ARCHIVE_PREFETCH_LIMIT else 0
+
+        prefetched = io_scheduler.map(
+            _read_for_archive, files, prefetched_bytes, prefetch_cost, ARCHIVE_PREFETCH_BUDGET
+        )
+        for file_to_add, (info, data) in zip(files, prefetched):
+            digests[file_to_add] = _write_archive_entry(zipf, file_to_add, info, data)
+    return archive_path
+
+def _deflate_bound(size: int) -> int:
+    """Наибольший размер `size` байт после deflate (как `deflateBound` в zlib).
+
+    Несжимаемые данные (PDF, архивы) deflate пишет «сохранёнными» блоками
+    с заголовком на каждый блок, поэтому результат может быть больше исходного.
+    """
+    return size + (size >> 12) + (size >> 14) + (size >> 25) + 13
+
+def plan_archive_volumes(
+    files: list[Path],
+    budget: int,
+    duplicates: dict[Path, Path] | None = None,
+) -> list[list[Path]]:
+    """Раскладывает файлы по томам архива не больше `budget` байт.
+
+    Упаковка «первый подходящий по убыванию размера» по наибольшему размеру
+    после сжатия (несжимаемые файлы deflate немного увеличивает) с запасом на
+    заголовки ZIP, так что том не превысит лимит при любом содержимом.
+    Файл больше лимита получает отдельный том. Повторы из `duplicates` не
+    упаковываются (они попадают в том своего основного файла). Внутри тома
+    и между томами сохраняется исходный порядок файлов.
+    """
+    if budget <= 0:
+        raise ValueError("Размер тома должен быть положительным.")
+    duplicates = duplicates or {}
+    stored = [path for path in files if path not in duplicates]
+    order = {path: position for position, path in enumerate(stored)}
+    sizes = {
+        path: _deflate_bound(path.stat().st_size)
+        + ARCHIVE_ENTRY_OVERHEAD
+        + 2 * len(path.name.encode("utf-8"))
+        for path in stored
+    }
+    budget -= ARCHIVE_END_OVERHEAD
+    if duplicates:
+        # Список повторов пишется в каждый том, где лежат основные файлы
+        note_text = sum(
+            len(copy.name.encode("utf-8")) + len(original.name.encode("utf-8")) + 5
+            for copy, original in duplicates.items()
+        )
+        budget -= ARCHIVE_ENTRY_OVERHEAD + 2 * len(DUPLICATES_NOTE_NAME) + _deflate_bound(note_text)
+    budget = max(1, budget)
+
+    volumes: list[list[Path]] = []
+    free: list[int] = []
+    for path in sorted(stored, key=lambda item: (-sizes[item], order[item])):
+        for index, room in enumerate(free):
+            if sizes[path] <= room:
+                volumes[index].append(path)
+                free[index] -= sizes[path]
+                break
+        else:
+            volumes.append([path])
+            free.append(budget - sizes[path])
+
+    for volume in volumes:
+        volume.sort(key=order.__getitem__)
+    volumes.sort(key=lambda volume: order[volume[0]])
+    return volumes
+
+def archive_volume_suffixes(count: int) -> list[str]:
+    """Окончания имён томов: `_att.zip` для одного тома, иначе `_att_01.zip`, `_att_02.zip`, ..."""
+    if count <= 1:
+        return ["_att.zip"]
+    return [f"_att_{number:02d}.zip" for number in range(1, count + 1)]
+
+def volume_labels(volumes: list[list[Path]], duplicates: dict[Path, Path] | None = None) -> dict[Path, str]:
+    """Том (окончание имени архива) для каждого файла, включая повторы."""
+    labels = {
+        path: suffix
+        for volume, suffix in zip(volumes, archive_volume_suffixes(len(volumes)))
+        for path in volume
+    }
+    for copy, original in (duplicates or {}).items():
+        if original in labels:
+            labels[copy] = labels[original]
+    return labels
+
+def _write_archive_volume(job: tuple) -> tuple[Path, dict[Path, str]]:
+    """Записывает один том архива в рабочем процессе; возвращает его путь и SHA-256 файлов."""
+    archive_path, volume_files, duplicates = job
+    digests: dict[Path, str] = {}
+    return create_archive(archive_path, volume_files, duplicates=duplicates, digests=digests), digests
+
+def write_archive_volumes(
+    saved_path: Path,
+    volumes: list[list[Path]],
+    status_callback,
+    duplicates: dict[Path, Path] | None = None,
+    max_workers: int | None = None,
+    digests: dict[Path, str] | None = None,
+) -> list[Path]:
+    """Записывает тома `<книга>_att_NN.zip` параллельно, по процессу на том (SHA-256 файлов — в `digests`)."""
+    suffixes = archive_volume_suffixes(len(volumes))
+    paths = [saved_path.with_name(saved_path.stem + suffix) for suffix in suffixes]
+    jobs = []
+    for archive_path, volume_files in zip(paths, volumes):
+        stored = set(volume_files)
+        volume_duplicates = {
+            copy: original for copy, original in (duplicates or {}).items() if original in stored
+        }
+        jobs.append((archive_path, volume_files, volume_duplicates or None))
+
+    status_callback(f"Запись {len(jobs)} томов архива...")
+    workers = max_workers or min(len(jobs), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_write_archive_volume, job) for job in jobs]
+        for done, future in enumerate(as_completed(futures), 1):
+            archive_path, volume_digests = future.result()
+            if digests is not None:
+                digests.update(volume_digests)
+            size_mb = archive_path.stat().st_size / (1024 * 1024)
+            status_callback(f"Том {done}/{len(jobs)} готов: {archive_path.name} ({size_mb:.1f} МБ)")
+    return paths
+
+class NoDocumentsError(ValueError):
+    """В папке нет документов для трансмиттала."""
+
+
+@dataclass
+class TransmittalOutput:
+    """Результат формирования трансмиттала без GUI-шагов."""
+
+    saved_path: Path
+    files: list[Path]
+    paged_archives: bool
+    tz_map: dict[str, str] = field(default_factory=dict)
+    pages: list[tuple[Path, list[Path], Path | None]] = field(default_factory=list)
+    source_dir: Path | None = None
+    volumes: list[list[Path]] = field(default_factory=list)
+    volume_labels: dict[Path, str] = field(default_factory=dict)
+
+    @property
+    def archive_base(self) -> Path:
+        """Книга, по имени которой называется общий архив: первая страница или сама книга.
+
+        Оглавление страниц (`*_index.xlsx`) — не трансмиттал, поэтому архив
+        всех страниц называется по номеру первой из них.
+        """
+        return self.pages[0][0] if self.pages else self.saved_path
+
+    def archive_path(self, suffix: str = "_att.zip") -> Path:
+        return self.archive_base.with_name(self.archive_base.stem + suffix)
+
+    def archive_paths(self) -> list[Path]:
+        """Пути томов общего архива (пусто, если тома не планировались)."""
+        return [
+            self.archive_path(suffix) for suffix in archive_volume_suffixes(len(self.volumes))
+        ] if self.volumes else []
+
+    def volume_path(self, path: Path) -> Path | None:
+        """Том общего архива, в который попал файл `path` (или `None` без томов)."""
+        label = self.volume_labels.get(path)
+        return self.archive_path(label) if label else None
+
+
+def check_transmittal_template(template_path: Path, status_callback=None) -> TemplateMeta:
+    """Проверяет шаблон до поиска файлов: ошибки — `TemplateError`, замечания — в статус."""
+    if not template_path.exists():
+        raise FileNotFoundError(f"Шаблон не найден: {template_path}")
+    return load_template_meta(template_path, TRANSMITTAL_LAYOUT).check(status_callback)
+
+def select_transmittal_files(
+    target_dir: Path,
+    status_callback,
+    catalog: FolderCatalog | None = None,
+    differential: bool = False,
+) -> list[Path]:
+    """Находит документы для трансмиттала (с `differential` — только ещё не отправленные)."""
+    if not target_dir.exists():
+        raise FileNotFoundError(f"Папка с файлами не найдена: {target_dir}")
+    status_callback(f"Поиск документов в {target_dir}...")
+    files = list_docs(target_dir, catalog)
+    if not files:
+        raise NoDocumentsError(f"В папке {target_dir} не найдено файлов для обработки.")
+    if differential:
+        files, already_sent = select_new_files(target_dir, files, load_manifest(target_dir))
+        status_callback(f"Отправлено ранее: {len(already_sent)}, новых или изменённых: {len(files)}.")
+        if not files:
+            raise NoDocumentsError(f"В папке {target_dir} нет новых файлов с момента прошлого трансмиттала.")
+    return files
+
+def build_transmittal(
     target_dir: Path,
     template_path: Path,
     status_callback,
-    create_archive_flag: bool,
-    delete_files_flag: bool,
     sender_value: str | None = None,
-):
-    """Основная функция для обработки файлов и создания отчета."""
+    output_engine: str = DEFAULT_OUTPUT_ENGINE,
+    page_size: int | None = None,
+    page_archives: bool = False,
+    catalog: FolderCatalog | None = None,
+    tz_map: dict[str, str] | None = None,
+    differential: bool = False,
+    files: list[Path] | None = None,
+    volumes: list[list[Path]] | None = None,
+    duplicates: dict[Path, Path] | None = None,
+) -> TransmittalOutput:
+    """Находит документы и записывает трансмиттал (одной книгой или страницами).
+
+    Не показывает диалогов и не создаёт общий архив — это делает вызывающий код.
+    `page_archives` включает архив на каждую страницу; `tz_map` можно передать
+    заранее прочитанным, чтобы не разбирать TZ_glob повторно. С `differential`
+    в трансмиттал попадают только файлы, которых нет в манифесте папки
+    (`.transmittal_manifest.json`), либо изменившиеся с прошлой отправки.
+    Готовый список `files` (см. `select_transmittal_files`) заменяет поиск.
+    План томов архива `volumes` (см. `plan_archive_volumes`) записывается
+    в колонку P одиночной книги; повторы из `duplicates` получают том основного файла.
+    """
+    status_callback(f"Загрузка шаблона: {template_path.name}")
+    if not template_path.exists():
+        raise FileNotFoundError(f"Шаблон не найден: {template_path}")
+    tz_file_path = app_setting("TZ_FILE_PATH") if tz_map is None else None
+    if tz_file_path is not None and not tz_file_path.exists():
+        status_callback(f"[ПРЕДУПРЕЖДЕНИЕ] Не найден {tz_file_path} — 'Назив документа' будет пустым.")
+
+    if files is None:
+        files = select_transmittal_files(target_dir, status_callback, catalog, differential)
+
+    status_callback(f"Найдено {len(files)} файлов. Чтение карты индексов...")
+    tz_map = build_tz_map_from_xlsx(tz_file_path) if tz_map is None else as_index_trie(tz_map)
+
+    if page_size and len(files) > page_size:
+        saved_path, pages = write_transmittal_pages(
+            template_path,
+            files,
+            tz_map,
+            target_dir,
+            page_size,
+            status_callback,
+            sender_value=sender_value,
+            output_engine=output_engine,
+            page_archives=page_archives,
+        )
+        return TransmittalOutput(saved_path, files, page_archives, tz_map, pages, target_dir)
+
+    labels = volume_labels(volumes, duplicates) if volumes else {}
+    saved_path = write_transmittal(
+        template_path,
+        files,
+        tz_map,
+        target_dir,
+        status_callback,
+        sender_value=sender_value,
+        output_engine=output_engine,
+        volumes=labels,
+    )
+    return TransmittalOutput(
+        saved_path, files, False, tz_map, source_dir=target_dir, volumes=volumes or [], volume_labels=labels
+    )
+
+def write_transmittal_archive(
+    output: TransmittalOutput,
+    io_scheduler: AdaptiveIOScheduler | None,
+    status_callback,
+    duplicates: dict[Path, Path] | None = None,
+    digests: dict[Path, str] | None = None,
+) -> list[Path]:
+    """Создаёт общий архив трансмиттала: `_att.zip` или тома `_att_NN.zip` по плану книги.
+
+    SHA-256 заархивированных файлов добавляются в `digests` (см. `create_archive`).
+    """
+    if len(output.volumes) > 1:
+        return write_archive_volumes(output.archive_base, output.volumes, status_callback, duplicates, digests=digests)
+    archive_path = output.archive_path()
+    create_archive(archive_path, output.files, io_scheduler, duplicates or None, digests)
+    return [archive_path]
+
+def plan_transmittal_volumes(
+    files: list[Path],
+    volume_budget: int,
+    status_callback,
+    duplicates: dict[Path, Path] | None = None,
+) -> list[list[Path]]:
+    """Планирует тома архива и сообщает об их числе и о файлах больше лимита."""
+    volumes = plan_archive_volumes(files, volume_budget, duplicates)
+    budget_mb = volume_budget / (1024 * 1024)
+    status_callback(f"Архив: томов {len(volumes)} (не больше {budget_mb:.0f} МБ каждый).")
+    for volume in volumes:
+        if len(volume) == 1 and volume[0].stat().st_size > volume_budget:
+            status_callback(f"[ПРЕДУПРЕЖДЕНИЕ] {volume[0].name} больше лимита тома — записан отдельным томом.")
+    return volumes
+
+
+def remember_digests(hash_cache: HashCache, digests: dict[Path, str]):
+    """Сохраняет хеши, посчитанные при архивации, в кэш и возвращает поиск известного SHA-256."""
+    for path, digest in digests.items():
+        try:
+            hash_cache.remember_sha256(path, digest)
+        except OSError:
+            continue
+    return hash_cache.cached_sha256
+
+def record_transmittal(
+    output: TransmittalOutput,
+    sender_value: str | None,
+    archive_path: Path | None,
+    status_callback,
+    registry_path: Path | None = None,
+    hash_file=None,
+    mark_sent: bool = True,
+) -> None:
+    """Записывает трансмиттал (или его страницы) и строки в реестр SQLite.
+
+    Вызывается после архивации, но до удаления исходников: размер и SHA-256
+    файлов снимаются один раз и попадают также в манифест папки
+    `output.source_dir`, по которому работает дифференциальный режим.
+    С `mark_sent=False` (архив не создан) файлы в манифест не заносятся,
+    чтобы следующий дифференциальный запуск их не пропустил. Ошибка реестра
+    или манифеста не прерывает формирование, а выводится предупреждением.
+    Файлы ради реестра заново не читаются: `hash_file` возвращает уже
+    известный SHA-256 или `None` (обычно `HashCache.cached_sha256`, куда
+    хеши попадают при архивации и поиске дубликатов). Если общий архив
+    разбит на тома, у каждой строки в реестре свой том (`output.volume_labels`),
+    а `archive_path` трансмиттала обычно `None`.
+    """
+    fingerprints = fingerprint_files(output.files, hash_file)
+    books = output.pages or [(output.saved_path, output.files, None)]
+    sent_date = datetime.now().date().isoformat()
     try:
-        status_callback(f"Загрузка шаблона: {template_path.name}")
-        if not template_path.exists():
-            raise FileNotFoundError(f"Шаблон не найден: {template_path}")
-        if not target_dir.exists():
-            raise FileNotFoundError(f"Папка с файлами не найдена: {target_dir}")
-        if not TZ_FILE_PATH.exists():
-            status_callback(f"[ПРЕДУПРЕЖДЕНИЕ] Не найден {TZ_FILE_PATH} — 'Назив документа' будет пустым.")
+        transmittals = [
+            RegistryTransmittal(
+                workbook_path=book,
+                documents=documents_from_files(
+                    book_files,
+                    lambda name: build_naziv(name, output.tz_map),
+                    lambda path: fingerprints[path].sha256,
+                    output.volume_path if output.volume_labels else None,
+                ),
+                sender=sender_value,
+                sent_date=sent_date,
+                archive_path=book_archive or archive_path,
+                workbook_mtime_ns=book.stat().st_mtime_ns,
+            )
+            for book, book_files, book_archive in books
+        ]
+        with TransmittalRegistry(registry_path or REGISTRY_PATH) as registry:
+            registry.record(transmittals)
+    except (OSError, KeyError, sqlite3.Error) as e:
+        status_callback(f"[ПРЕДУПРЕЖДЕНИЕ] Трансмиттал не записан в реестр: {e}")
 
-        wb = load_workbook(template_path)
-        ws = wb.active
+    if output.source_dir is not None and mark_sent:
+        try:
+            outputs = [output.saved_path, archive_path] if archive_path else [output.saved_path]
+            outputs.extend(output.archive_paths())
+            for book, _book_files, book_archive in output.pages:
+                outputs.extend(path for path in (book, book_archive) if path is not None)
+            update_manifest(output.source_dir, fingerprints, output.saved_path.name, outputs)
+        except OSError as e:
+            status_callback(f"[ПРЕДУПРЕЖДЕНИЕ] Манифест отправленных файлов не обновлён: {e}")
+
+def report_duplicates(
+    files: list[Path],
+    io_scheduler: AdaptiveIOScheduler,
+    hash_cache: HashCache,
+    status_callback,
+) -> dict[Path, Path]:
+    """Ищет одинаковые по содержимому вложения и выводит их группы в статус."""
+    try:
+        report = find_duplicates(files, io_scheduler, hash_cache)
+    except OSError as e:
+        status_callback(f"[ПРЕДУПРЕЖДЕНИЕ] Поиск одинаковых вложений не выполнен: {e}")
+        return {}
+    if not report.groups:
+        status_callback("Одинаковых вложений нет.")
+        return {}
+    saved_mb = report.saved_bytes() / (1024 * 1024)
+    status_callback(
+        f"Одинаковых вложений: {report.duplicate_count} в {len(report.groups)} группах "
+        f"(повторно {saved_mb:.1f} МБ)."
+    )
+    for group in report.groups:
+        status_callback("  = " + ", ".join(path.name for path in group))
+    return report.duplicates
 
-        if sender_value:
-            status_callback("Заполнение данных отправителя...")
-            if not set_named_cell_value(wb, "pripmem", sender_value):
-                ws["I22"].value = sender_value
+@dataclass
+class TransmittalRun:
+    """Итог `run_transmittal`: книга (или страницы), общий архив и найденные повторы.
 
-        status_callback("Запись даты...")
-        write_date(ws)
+    `duplicates` — все найденные одинаковые вложения, даже если в архив они
+    положены как есть; `archived` ложно, если общий архив не удалось записать.
+    """
 
-        footer_row = get_footer_row_by_name(wb, ws.title, FOOTER_ANCHOR_NAME) or 20
-        status_callback(f"Найдена строка футера: {footer_row}")
+    output: TransmittalOutput
+    archives: list[Path] = field(default_factory=list)
+    duplicates: dict[Path, Path] = field(default_factory=dict)
+    archived: bool = True
 
-        status_callback(f"Поиск документов в {target_dir}...")
-        files = list_docs(target_dir)
-        if not files:
-            messagebox.showwarning("Нет файлов", f"В папке {target_dir} не найдено файлов для обработки.")
-            return
+def run_transmittal(
+    target_dir: Path,
+    template_path: Path,
+    status_callback,
+    sender_value: str | None = None,
+    output_engine: str = DEFAULT_OUTPUT_ENGINE,
+    create_archive_flag: bool = False,
+    page_size: int | None = None,
+    page_archives: bool = True,
+    catalog: FolderCatalog | None = None,
+    tz_map: dict[str, str] | None = None,
+    differential: bool = False,
+    io_scheduler: AdaptiveIOScheduler | None = None,
+    hash_cache: HashCache | None = None,
+    dedupe_archive: bool = False,
+    volume_budget: int | None = None,
+    registry_path: Path | None = None,
+    run_metrics: RunRecorder | None = None,
+    on_archive_error=None,
+) -> TransmittalRun:
+    """Полный конвейер трансмиттала без диалогов, общий для GUI, пакетной обработки,
+    сквозного прогона и обработчика.
+
+    Шаблон проверяется, документы отбираются, одинаковые вложения выводятся
+    в статус, планируются тома, пишутся книга (или страницы) и архив, затем
+    трансмиттал записывается в реестр и манифест папки. Ошибка архива
+    поднимается, если не задан `on_archive_error(error)`; с ним прогон
+    продолжается, а файлы не отмечаются отправленными. Кэш хешей `hash_cache`
+    (по умолчанию — только в памяти) сохраняет вызывающий код.
+    Длительности этапов пишутся в `run_metrics`.
+    """
+    hash_cache = hash_cache if hash_cache is not None else HashCache()
+    with run_stage(run_metrics, "select"):
+        check_transmittal_template(template_path, status_callback)
+        files = select_transmittal_files(target_dir, status_callback, catalog, differential)
+    if run_metrics is not None:
+        run_metrics.set_input(len(files), total_size(files))
+    paged = bool(page_size and len(files) > page_size)
+    common_archive = create_archive_flag and not (paged and page_archives)
+
+    found: dict[Path, Path] = {}
+    volumes = None
+    with run_stage(run_metrics, "duplicates"):
+        if common_archive:
+            status_callback("Поиск одинаковых вложений...")
+            io_scheduler = io_scheduler or build_io_scheduler(status_callback)
+            found = report_duplicates(files, io_scheduler, hash_cache, status_callback)
+        if common_archive and volume_budget and not paged:
+            volumes = plan_transmittal_volumes(
+                files, volume_budget, status_callback, found if dedupe_archive else None
+            )
+    duplicates = found if dedupe_archive else {}
 
-        status_callback(f"Найдено {len(files)} файлов. Чтение карты индексов...")
-        tz_map = build_tz_map_from_xlsx(TZ_FILE_PATH)
+    with run_stage(run_metrics, "workbook"):
+        output = build_transmittal(
+            target_dir,
+            template_path,
+            status_callback,
+            sender_value=sender_value,
+            output_engine=output_engine,
+            page_size=page_size,
+            page_archives=create_archive_flag and page_archives,
+            catalog=catalog,
+            tz_map=tz_map,
+            files=files,
+            volumes=volumes,
+            duplicates=duplicates,
+        )
+    run = TransmittalRun(output, duplicates=found)
 
-        num_files = len(files)
-        available_data_rows = footer_row - FIRST_DATA_ROW
-        rows_to_insert = 0
-        if num_files > available_data_rows:
-            rows_to_insert = num_files - available_data_rows
+    digests: dict[Path, str] = {}
+    if common_archive:
+        status_callback("Создание ZIP-архива...")
+        try:
+            with run_stage(run_metrics, "archive"):
+                run.archives = write_transmittal_archive(
+                    output, io_scheduler, status_callback, duplicates, digests
+                )
+        except Exception as e:
+            if on_archive_error is None:
+                raise
+            run.archived = False
+            on_archive_error(e)
+
+    # Реестр и манифест — до удаления исходников, пока файлы ещё на месте
+    status_callback("Запись в реестр трансмитталов...")
+    with run_stage(run_metrics, "registry"):
+        record_transmittal(
+            output,
+            sender_value,
+            run.archives[0] if len(run.archives) == 1 else None,
+            status_callback,
+            registry_path,
+            hash_file=remember_digests(hash_cache, digests),
+            mark_sent=run.archived,
+        )
+    return run
+
+@dataclass
+class FolderTransmittalResult:
+    """Итог трансмиттала одной папки при пакетной обработке."""
+
+    folder: Path
+    workbook: Path | None = None
+    archive: Path | None = None
+    files: int = 0
+    error: str | None = None
+
+# Данные, загружаемые один раз на рабочий процесс пакетной обработки папок
+_folder_worker_state: dict = {}
+
+def _init_folder_worker(template_path: Path, tz_model_path: Path) -> None:
+    """Подключает опубликованную модель TZ и читает метаданные шаблона при запуске процесса."""
+    load_template_meta(template_path, TRANSMITTAL_LAYOUT)
+    _folder_worker_state["template_path"] = template_path
+    _folder_worker_state["tz_map"] = attach_tz_model(tz_model_path)
+
+def _build_folder_transmittal(job: tuple) -> FolderTransmittalResult:
+    """Трансмиттал, архив и запись в реестр одной папки в рабочем процессе."""
+    folder, sender_value, output_engine, create_archive_flag, registry_path = job
+    result = FolderTransmittalResult(folder)
+    try:
+        run = run_transmittal(
+            folder,
+            _folder_worker_state["template_path"],
+            _ignore_status,
+            sender_value=sender_value,
+            output_engine=output_engine,
+            create_archive_flag=create_archive_flag,
+            tz_map=_folder_worker_state["tz_map"],
+            registry_path=registry_path,
+        )
+        result.workbook, result.files = run.output.saved_path, len(run.output.files)
+        result.archive = run.archives[0] if run.archives else None
+    except Exception as e:
+        result.error = str(e)
+    return result
 
-        if rows_to_insert > 0:
-            status_callback(f"Вставка {rows_to_insert} строк...")
-            insert_rows_and_preserve_footer_merges(ws, footer_row, rows_to_insert)
+def generate_folder_transmittals(
+    folders: list[Path],
+    template_path: Path,
+    status_callback,
+    sender_value: str | None = None,
+    output_engine: str = DEFAULT_OUTPUT_ENGINE,
+    create_archive_flag: bool = True,
+    registry_path: Path | None = None,
+    tz_file_path: Path | None = None,
+    max_workers: int | None = None,
+) -> list[FolderTransmittalResult]:
+    """Формирует по трансмитталу (и архиву `_att.zip`) на каждую папку параллельно.
+
+    Папки обрабатываются пулом процессов. Карта TZ разбирается один раз в
+    вызывающем процессе и публикуется файлом `tz_model`, который рабочие
+    процессы отображают в память без копирования.
+    Ошибка одной папки не прерывает остальные и возвращается в её результате.
+    Результаты идут в порядке `folders`.
+    """
+    if not folders:
+        return []
+    check_transmittal_template(template_path, status_callback)
+    jobs = [
+        (folder, sender_value, output_engine, create_archive_flag, registry_path or REGISTRY_PATH)
+        for folder in folders
+    ]
+    results: dict[Path, FolderTransmittalResult] = {}
+    status_callback(f"Трансмитталы для {len(jobs)} папок...")
+    workers = max_workers or min(len(jobs), os.cpu_count() or 1)
+    tz_map = build_tz_map_from_xlsx(tz_file_path or app_setting("TZ_FILE_PATH"))
+    with published_tz_model(tz_map) as tz_model_path, ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_folder_worker,
+        initargs=(template_path, tz_model_path),
+    ) as executor:
+        futures = [executor.submit(_build_folder_transmittal, job) for job in jobs]
+        for done, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            results[result.folder] = result
+            state = f"ошибка: {result.error}" if result.error else result.workbook.name
+            status_callback(f"Папка {done}/{len(jobs)}: {result.folder.name} — {state}")
+    return [results[folder] for folder in folders]
+
+def format_folder_report(results: list[FolderTransmittalResult]) -> str:
+    """Сводка пакетной обработки папок: число успешных и список ошибок."""
+    failed = [result for result in results if result.error]
+    lines = [f"Трансмитталов создано: {len(results) - len(failed)} из {len(results)}."]
+    lines.extend(f"- {result.folder.name}: {result.error}" for result in failed)
+    return "\n".join(lines)
 
-        new_footer_row = footer_row + rows_to_insert
-        status_callback("Заполнение строк данными...")
-        final_footer_row = fill_rows(ws, files, tz_map, FIRST_DATA_ROW, new_footer_row)
-        
-        status_callback("Обновление якоря футера и области печати...")
-        update_footer_anchor(wb, ws.title, FOOTER_ANCHOR_NAME, final_footer_row)
-        
-        last_row = ws.max_row
-        ws.print_area = f'B3:P{last_row}'
+def process_files(
+    target_dir: Path,
+    template_path: Path,
+    status_callback,
+    create_archive_flag: bool,
+    delete_files_flag: bool,
+    sender_value: str | None = None,
+    output_engine: str = DEFAULT_OUTPUT_ENGINE,
+    page_size: int | None = None,
+    page_archives: bool = True,
+    catalog: FolderCatalog | None = None,
+    differential: bool = False,
+    io_scheduler: AdaptiveIOScheduler | None = None,
+    dedupe_archive: bool = False,
+    volume_budget: int | None = None,
+    run_metrics: RunRecorder | None = None,
+):
+    """Основная функция для обработки файлов и создания отчета.
+
+    При заданном `page_size` большой список файлов разбивается на страницы:
+    каждая формируется отдельной нумерованной книгой (и, при `page_archives`,
+    своим архивом), а общее оглавление сохраняется в `*_index.xlsx`.
+    С `catalog` список документов берётся из общего каталога сессии;
+    `differential` оставляет только ещё не отправленные файлы папки.
+    Чтение файлов для архива и удаление исходников выполняются параллельно
+    через `io_scheduler` (по умолчанию — с лимитом скорости из настроек).
+    Перед архивацией одинаковые по содержимому файлы выводятся в статус;
+    с `dedupe_archive` каждое содержимое кладётся в `_att.zip` один раз.
+    С `volume_budget` (байт) общий архив делится на тома `_att_NN.zip`, которые
+    пишутся параллельно, а том каждой строки указывается в книге (колонка P).
+    Шаблон проверяется до поиска файлов (`check_transmittal_template`).
+    Длительности этапов и итог записываются в `run_metrics`, если он передан.
+    Сам конвейер — `run_transmittal`; здесь остаются диалоги, удаление
+    исходников и открытие папки.
+    """
+    io_scheduler = io_scheduler or build_io_scheduler(status_callback)
 
-        wb.template = False
-        
-        prefix = template_path.stem.replace("-Template", "-")
-        saved_path = save_with_increment(wb, target_dir, prefix=prefix)
-        
-        if create_archive_flag:
-            status_callback("Создание ZIP-архива...")
-            archive_name = saved_path.with_suffix('').name + "_att.zip"
-            archive_path = saved_path.parent / archive_name
-            
-            try:
-                with zipfile.ZipFile(archive_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                    for file_to_add in files:
-                        zipf.write(file_to_add, arcname=file_to_add.name)
-                
-                if delete_files_flag:
-                    status_callback("Удаление исходных файлов...")
-                    try:
-                        for file_to_delete in files:
-                            os.remove(file_to_delete)
-                        status_callback("Исходные файлы удалены. Открываю папку...")
-                    except Exception as e:
-                        messagebox.showerror("Ошибка удаления", f"Не удалось удалить исходные файлы: {e}")
-                        status_callback("Ошибка удаления файлов.")
-                else:
-                    status_callback("Архив создан. Открываю папку...")
+    def archive_failed(e: Exception) -> None:
+        if run_metrics is not None:
+            run_metrics.ok = False
+        status_callback(f"Ошибка создания архива: {e}")
+        messagebox.showerror("Ошибка архивации", f"Не удалось создать ZIP-архив: {e}")
 
-            except Exception as e:
-                status_callback(f"Ошибка создания архива: {e}")
-                messagebox.showerror("Ошибка архивации", f"Не удалось создать ZIP-архив: {e}")
-        else:
+    try:
+        hash_cache = HashCache(HASH_CACHE_PATH)
+        run = run_transmittal(
+            target_dir,
+            template_path,
+            status_callback,
+            sender_value=sender_value,
+            output_engine=output_engine,
+            create_archive_flag=create_archive_flag,
+            page_size=page_size,
+            page_archives=page_archives,
+            catalog=catalog,
+            differential=differential,
+            io_scheduler=io_scheduler,
+            hash_cache=hash_cache,
+            dedupe_archive=dedupe_archive,
+            volume_budget=volume_budget,
+            run_metrics=run_metrics,
+            on_archive_error=archive_failed,
+        )
+        files, saved_path, archived = run.output.files, run.output.saved_path, run.archived
+        try:
+            hash_cache.save()
+        except OSError as e:
+            status_callback(f"[ПРЕДУПРЕЖДЕНИЕ] Кэш хешей не сохранён: {e}")
+
+        if create_archive_flag and archived:
+            if delete_files_flag:
+                status_callback("Удаление исходных файлов...")
+                try:
+                    with run_stage(run_metrics, "delete"):
+                        list(io_scheduler.map(os.remove, files))
+                    status_callback("Исходные файлы удалены. Открываю папку...")
+                except Exception as e:
+                    if run_metrics is not None:
+                        run_metrics.ok = False
+                    messagebox.showerror("Ошибка удаления", f"Не удалось удалить исходные файлы: {e}")
+                    status_callback("Ошибка удаления файлов.")
+            else:
+                status_callback("Архив создан. Открываю папку...")
+        elif not create_archive_flag:
              status_callback("Готово! Файл сохранен. Открываю папку...")
 
         try:
@@ -334,20 +1320,27 @@ def process_files(
         except Exception as e:
             messagebox.showwarning("Ошибка", f"Не удалось автоматически открыть папку: {e}")
 
+    except NoDocumentsError as e:
+        if run_metrics is not None:
+            run_metrics.ok = False
+        messagebox.showwarning("Нет файлов", str(e))
     except Exception as e:
+        if run_metrics is not None:
+            run_metrics.ok = False
         status_callback(f"Ошибка: {e}")
         messagebox.showerror("Ошибка выполнения", f"Произошла ошибка:\n{e}")
 
 # ---------- Утилиты (без изменений) ----------
 
-def list_docs(doc_dir: Path):
+def list_docs(doc_dir: Path, catalog: FolderCatalog | None = None):
+    if catalog is not None:
+        return catalog.files(doc_dir, ALLOWED_EXT)
     return [p for p in sorted(doc_dir.rglob('*'))
             if p.is_file() and p.suffix.lower() in ALLOWED_EXT]
 
-def write_date(ws):
+def format_date_value(val) -> str:
+    """Подставляет сегодняшнюю дату в текст ячейки даты (или возвращает её саму)."""
     today = datetime.now().strftime(DATE_FMT_TEXT)
-    cell = ws[DATE_CELL_ADDR]
-    val = cell.value
     if isinstance(val, str):
         new = val
         for pat in DATE_PATTERNS:
@@ -356,52 +1349,12 @@ def write_date(ws):
                 break
         else:
             new = today
-        cell.value = new
-    else:
-        cell.value = today
+        return new
+    return today
 
-def set_named_cell_value(workbook, defined_name: str, value: str) -> bool:
-    """Записывает значение в именованную ячейку, если она определена."""
-    dn = workbook.defined_names.get(defined_name)
-    if dn is None:
-        return False
-    try:
-        destinations = list(dn.destinations)
-    except Exception:
-        destinations = []
-    for sheet_name, ref in destinations:
-        sheet_key = sheet_name.strip("'") if isinstance(sheet_name, str) else sheet_name
-        if sheet_key not in workbook.sheetnames:
-            continue
-        worksheet = workbook[sheet_key]
-        coord = str(ref).split("!")[-1].replace("$", "")
-        if ":" in coord:
-            try:
-                cells = worksheet[coord]
-            except Exception:
-                continue
-            if isinstance(cells, tuple):
-                first_row = cells[0]
-                if not first_row:
-                    continue
-                target_cell = first_row[0]
-            else:
-                target_cell = cells
-        else:
-            try:
-                target_cell = worksheet[coord]
-            except Exception:
-                continue
-        target_cell.value = value
-        return True
-    return False
-
-def normalize_key(key: str) -> str:
-    key = key.upper()
-    replacements = {'A': 'А', 'B': 'Б', 'V': 'В', 'G': 'Г'}
-    for lat, cyr in replacements.items():
-        key = key.replace(lat, cyr)
-    return key
+def write_date(ws):
+    cell = ws[DATE_CELL_ADDR]
+    cell.value = format_date_value(cell.value)
 
 def get_footer_row_by_name(wb, ws_name: str, name: str) -> int | None:
     dn = wb.defined_names.get(name)
@@ -449,54 +1402,17 @@ def ensure_row_merges(ws, row, footer_row):
     ws.merge_cells(rng1)
     ws.merge_cells(rng2)
 
-def build_tz_map_from_xlsx(xlsx_path: Path) -> dict[str, str]:
-    tz_map: dict[str, str] = {}
-    if not xlsx_path.exists(): return tz_map
-    wb = load_workbook(xlsx_path, data_only=True)
-    for ws in wb.worksheets:
-        max_col = min(ws.max_column, 20)
-        for r in range(1, ws.max_row + 1):
-            idx_val, idx_col = None, None
-            for c in range(1, max_col + 1):
-                v = ws.cell(r, c).value
-                if isinstance(v, str):
-                    m = RE_INDEX.search(v)
-                    if m:
-                        roman, num1, num2, num3, suf = m.groups()
-                        suf = suf or ""
-                        idx_val = f"{roman.upper()}.{num1}"
-                        if num2: idx_val += f".{num2}"
-                        if num3: idx_val += f".{num3}"
-                        idx_val += suf
-                        idx_col = c
-                        break
-            if not idx_val: continue
-            naziv = None
-            vC = ws.cell(r, 3).value
-            if isinstance(vC, str) and vC.strip():
-                naziv = vC.strip()
-            else:
-                for c in range((idx_col or 1) + 1, max_col + 1):
-                    v = ws.cell(r, c).value
-                    if isinstance(v, str) and len(v.strip()) >= 3:
-                        naziv = v.strip()
-                        break
-            if naziv:
-                normalized_key = normalize_key(idx_val)
-                if normalized_key not in tz_map:
-                    tz_map[normalized_key] = naziv
-    return tz_map
+def build_tz_map_from_xlsx(xlsx_path: Path, max_workers: int | None = None) -> IndexTrie[str]:
+    """Карта «индекс → назив» из TZ_glob.xlsx; листы разбираются параллельно (`tz_parser`).
+
+    Возвращается дерево индексов (`IndexTrie`): кроме точного ключа оно находит
+    описание ближайшего предка для более глубоких индексов.
+    """
+    return IndexTrie(build_tz_map(xlsx_path, max_workers))
 
 def extract_index_from_name(filename: str) -> str | None:
     m = RE_INDEX.search(filename)
-    if not m: return None
-    roman, num1, num2, num3, suf = m.groups()
-    suf = suf or ""
-    idx = f"{roman.upper()}.{num1}"
-    if num2: idx += f".{num2}"
-    if num3: idx += f".{num3}"
-    idx += suf
-    return idx
+    return format_index(m) if m else None
 
 def insert_rows_and_preserve_footer_merges(ws, insert_at_row: int, num_rows: int):
     if num_rows <= 0: return
@@ -532,15 +1448,51 @@ def insert_rows_and_preserve_footer_merges(ws, insert_at_row: int, num_rows: int
         mr.shift(0, num_rows)
         ws.merge_cells(str(mr))
 
-def fill_rows(ws, files, tz_map: dict, start_row: int, final_footer_row: int):
+def build_naziv(file_name: str, tz_map: dict, fallbacks: dict | None = None) -> str:
+    """Формирует 'Назив документа' по индексу из имени файла и меткам -C-/-MOM-/_CMM.
+
+    Если описание взято от предка индекса, совпадение попадает в `fallbacks`
+    (индекс → `TrieMatch`), чтобы вызывающий код сообщил о нём.
+    """
+    idx = extract_index_from_name(file_name)
+    match = as_index_trie(tz_map).lookup(idx) if idx else None
+    if match is not None and not match.exact and fallbacks is not None:
+        fallbacks[idx] = match
+    base_naziv = match.value if match else ""
+    prefix = ""
+    if "-C-" in file_name.upper(): prefix += "Корективно одржавање. "
+    if "-MOM-" in file_name.upper(): prefix += "Записник са састанка Организација рада "
+    if "_CMM" in file_name.upper(): prefix += "Листа коментара уз документ. "
+    return (prefix + base_naziv).strip()
+
+def fill_rows(
+    ws,
+    files,
+    tz_map: dict,
+    start_row: int,
+    final_footer_row: int,
+    volumes: dict | None = None,
+    const_vals: dict | None = None,
+    template_row_height: float | None = None,
+    fallbacks: dict | None = None,
+    first_number: int = 1,
+):
+    """Заполняет строки данных; `const_vals` и высота строки — из метаданных шаблона, если есть.
+
+    Номер в колонке B начинается с `first_number`.
+
+    Описания, взятые от предка индекса, собираются в `fallbacks` (см. `build_naziv`).
+    """
+    tz_map = as_index_trie(tz_map)
     min_col_style, max_col_style = 2, 16
     template_styles = [ws.cell(row=start_row, column=j)._style for j in range(min_col_style, max_col_style + 1)]
-    template_row_height = ws.row_dimensions[start_row].height
-    const_vals = {
-        13: ws.cell(row=start_row, column=13).value,
-        14: ws.cell(row=start_row, column=14).value,
-        15: ws.cell(row=start_row, column=15).value,
-    }
+    if const_vals is None:
+        template_row_height = ws.row_dimensions[start_row].height
+        const_vals = {
+            13: ws.cell(row=start_row, column=13).value,
+            14: ws.cell(row=start_row, column=14).value,
+            15: ws.cell(row=start_row, column=15).value,
+        }
     for i, p in enumerate(files, 1):
         r = start_row + i - 1
         if r >= final_footer_row: continue
@@ -550,44 +1502,55 @@ def fill_rows(ws, files, tz_map: dict, start_row: int, final_footer_row: int):
             for j_idx, style in enumerate(template_styles):
                 ws.cell(row=r, column=min_col_style + j_idx)._style = style
         ensure_row_merges(ws, r, final_footer_row)
-        ws.cell(r, COL_RB).value = i
+        ws.cell(r, COL_RB).value = first_number + i - 1
         c = ws.cell(r, COL_BD)
         c.value = p.name
         c.alignment = Alignment(wrap_text=True, horizontal='center', vertical='center')
-        idx = extract_index_from_name(p.name)
-        base_naziv = tz_map.get(normalize_key(idx), "") if idx else ""
-        final_naziv = ""
-        prefix = ""
-        if "-C-" in p.name.upper(): prefix += "Корективно одржавање. "
-        if "-MOM-" in p.name.upper(): prefix += "Записник са састанка Организација рада "
-        if "_CMM" in p.name.upper(): prefix += "Листа коментара уз документ. "
-        final_naziv = (prefix + base_naziv).strip()
         naziv_cell = ws.cell(r, COL_NZ)
-        naziv_cell.value = final_naziv
+        naziv_cell.value = build_naziv(p.name, tz_map, fallbacks)
         naziv_cell.alignment = Alignment(wrap_text=True, horizontal='center', vertical='center')
         for col_num, value in const_vals.items():
             ws.cell(row=r, column=col_num).value = value
+        if volumes:
+            ws.cell(r, TRANSMITTAL_LAYOUT.volume_column).value = volumes.get(p)
     return final_footer_row
 
-def save_with_increment(wb, out_dir: Path, prefix="CT-GST-TRA-PRM-"):
+def next_increment_paths(out_dir: Path, prefix="CT-GST-TRA-PRM-", count: int = 1) -> list[Path]:
+    """Возвращает `count` первых свободных путей вида `<prefix><yymmdd>_NN.xlsx`."""
     out_dir.mkdir(parents=True, exist_ok=True)
     today = datetime.now().strftime("%y%m%d")
+    paths: list[Path] = []
     n = 1
-    while True:
+    while len(paths) < count:
         out = out_dir / f"{prefix}{today}_{n:02d}.xlsx"
         if not out.exists():
-            wb.save(out)
-            return out
+            paths.append(out)
         n += 1
+    return paths
+
+def next_increment_path(out_dir: Path, prefix="CT-GST-TRA-PRM-") -> Path:
+    """Возвращает первый свободный путь вида `<prefix><yymmdd>_NN.xlsx`."""
+    return next_increment_paths(out_dir, prefix, 1)[0]
+
+def save_with_increment(wb, out_dir: Path, prefix="CT-GST-TRA-PRM-"):
+    out = next_increment_path(out_dir, prefix)
+    wb.save(out)
+    return out
 
 # ---------- ГРАФИЧЕСКИЙ ИНТЕРФЕЙС (GUI) ----------
 
 def create_transmittal_gui():
     """Создает и управляет GUI для выбора папки и шаблона."""
+    TEMPLATE_DIR, TZ_FILE_PATH, COMMENT_TEMPLATE_PATH, COMPANY_NAMES, TRANSMITTAL_SENDERS = (
+        app_setting(name)
+        for name in ("TEMPLATE_DIR", "TZ_FILE_PATH", "COMMENT_TEMPLATE_PATH", "COMPANY_NAMES", "TRANSMITTAL_SENDERS")
+    )
     root = tk.Tk()
     root.title("Формирование трансмиттала v3.4")
-    root.geometry("550x790")
+    root.geometry("550x850")
     root.resizable(False, False)
+    # Общий каталог файлов: вкладки не сканируют одну и ту же папку повторно.
+    folder_catalog = FolderCatalog()
 
     # --- Стилизация ---
     BG_COLOR = "#F4F6F5"
@@ -632,6 +1595,10 @@ def create_transmittal_gui():
     notebook.add(report_tab, text="Формирование трансмиттала")
     notebook.add(index_tab, text="Формирование папок")
     notebook.add(cmm_tab, text="Создание CMM")
+    registry_tab = ttk.Frame(notebook, padding=0)
+    notebook.add(registry_tab, text="Реестр")
+    stats_tab = ttk.Frame(notebook, padding=0)
+    notebook.add(stats_tab, text="Статистика")
 
 
     # --- Переменные ---
@@ -641,19 +1608,36 @@ def create_transmittal_gui():
     selected_sender = tk.StringVar(value=TRANSMITTAL_SENDERS[0] if TRANSMITTAL_SENDERS else "")
     should_create_archive = tk.BooleanVar(value=True)
     should_delete_files = tk.BooleanVar(value=False)
+    should_stream_output = tk.BooleanVar(value=False)
+    should_send_only_new = tk.BooleanVar(value=False)
+    should_dedupe_archive = tk.BooleanVar(value=False)
+    should_paginate = tk.BooleanVar(value=False)
+    page_size_value = tk.IntVar(value=DEFAULT_PAGE_SIZE)
+    should_split_volumes = tk.BooleanVar(value=False)
+    volume_size_mb = tk.IntVar(value=DEFAULT_VOLUME_MB)
     
     templates_map = {}
+    # Шаблоны всех статусов сканируются в фоне; меню берёт их из кэша
+    template_catalog = TemplateCatalog(TEMPLATE_DIR, TEMPLATE_STATUSES.values(), layout=TRANSMITTAL_LAYOUT).start()
+    template_catalog_version = template_catalog.version
     index_source_path = tk.StringVar()
     index_destination_path = tk.StringVar()
     index_source_display = tk.StringVar(value="(не выбрана)")
     index_destination_display = tk.StringVar(value="(не выбрана)")
     index_status_message = tk.StringVar(value="Выберите исходную и целевую папки.")
     should_copy_files = tk.BooleanVar(value=True)
+    index_transfer_label = tk.StringVar(value=next(iter(INDEX_TRANSFER_LABELS)))
     should_group_by_suffix = tk.BooleanVar(value=True)
+    should_compute_checksums = tk.BooleanVar(value=False)
+    should_stream_index = tk.BooleanVar(value=False)
+    last_created_dirs: list[Path] = []
     cmm_source_path = tk.StringVar()
     cmm_source_display = tk.StringVar(value='(Не выбрано)')
+    should_update_cmm = tk.BooleanVar(value=False)
     cmm_status_message = tk.StringVar(value='Готово к запуску.')
     cmm_run_button: ttk.Button | None = None
+    registry_query = tk.StringVar()
+    registry_status_message = tk.StringVar(value=f'Реестр: {REGISTRY_PATH.name}')
 
     # --- Функции-обработчики GUI ---
     def select_custom_template_path():
@@ -682,32 +1666,28 @@ def create_transmittal_gui():
     def open_github(event=None):
         webbrowser.open_new("https://github.com/Dun4ev/toir_tra_report")
 
-    def update_template_options(*args):
+    def update_template_options(*args, keep_selection=False):
+        """Перестраивает меню шаблонов; с `keep_selection` выбор пользователя сохраняется, если шаблон остался."""
         nonlocal templates_map
         status_dir_name = TEMPLATE_STATUSES.get(selected_status_key.get())
         if not status_dir_name:
             return
 
-        templates_path = TEMPLATE_DIR / status_dir_name
         templates_map.clear()
 
-        if templates_path.is_dir():
-            for f in templates_path.glob("*.xltx"):
-                # Пример: CT-GST-TRA-PRM-Template.xltx -> GST
-                parts = f.stem.split('-')
-                if len(parts) > 1:
-                    abbr = parts[1].upper()
-                    # Ищем полное имя в настройках, если нет - используем саму аббревиатуру
-                    full_name = COMPANY_NAMES.get(abbr, abbr)
-                    
-                    # Формируем ключ для отображения в меню
-                    full_name = COMPANY_NAMES.get(abbr, abbr)
-                    if abbr == "XXX":
-                        full_name = COMPANY_NAMES.get("XXX", "Общий")
-                    
-                    key_name = f"({abbr}) {full_name}"
-
-                    templates_map[key_name] = f.name
+        for entry in template_catalog.options(status_dir_name):
+            # Пример: CT-GST-TRA-PRM-Template.xltx -> GST
+            abbr = entry.abbr
+            if abbr:
+                # Ищем полное имя в настройках, если нет - используем саму аббревиатуру
+                full_name = COMPANY_NAMES.get(abbr, abbr)
+                if abbr == "XXX":
+                    full_name = COMPANY_NAMES.get("XXX", "Общий")
+
+                # Формируем ключ для отображения в меню
+                key_name = f"({abbr}) {full_name}"
+
+                templates_map[key_name] = entry.name
         
         # Обновление меню шаблонов
         menu = template_menu["menu"]
@@ -723,6 +1703,8 @@ def create_transmittal_gui():
         sorted_keys = sorted(templates_map.keys(), key=lambda x: "zzz" if "Общий" in x else x)
         for key in sorted_keys:
             menu.add_command(label=key, command=tk._setit(selected_template_key, key))
+        if keep_selection and selected_template_key.get() in templates_map:
+            return
         
         # Автоматический выбор шаблона
         folder_path = selected_folder.get()
@@ -789,9 +1771,15 @@ def create_transmittal_gui():
     def toggle_delete_option():
         if should_create_archive.get():
             delete_check.config(state=tk.NORMAL)
+            dedupe_check.config(state=tk.NORMAL)
+            volume_check.config(state=tk.NORMAL)
         else:
             delete_check.config(state=tk.DISABLED)
+            dedupe_check.config(state=tk.DISABLED)
+            volume_check.config(state=tk.DISABLED)
             should_delete_files.set(False)
+            should_dedupe_archive.set(False)
+            should_split_volumes.set(False)
 
     def select_folder():
         folder_path = filedialog.askdirectory(title="Выберите папку с документами")
@@ -822,19 +1810,43 @@ def create_transmittal_gui():
 
         template_path = TEMPLATE_DIR / status_dir_name / template_file_name
 
+        try:
+            page_size = int(page_size_value.get())
+        except (tk.TclError, ValueError):
+            page_size = 0
+        if should_paginate.get() and page_size <= 0:
+            messagebox.showerror("Ошибка", "Размер страницы должен быть положительным числом.")
+            return
+        try:
+            volume_mb = int(volume_size_mb.get())
+        except (tk.TclError, ValueError):
+            volume_mb = 0
+        if should_create_archive.get() and should_split_volumes.get() and volume_mb <= 0:
+            messagebox.showerror("Ошибка", "Размер тома архива должен быть положительным числом.")
+            return
+
         run_button.config(state=tk.DISABLED)
         def status_update(message):
             status_label.config(text=message)
             root.update_idletasks()
 
+        run, eta_status = start_run(RUN_TRANSMITTAL, status_update)
         process_files(
             Path(target_dir),
             template_path,
-            status_update,
+            eta_status,
             should_create_archive.get(),
             should_delete_files.get(),
             sender_value,
+            OUTPUT_ENGINE_STREAM if should_stream_output.get() else OUTPUT_ENGINE_OPENPYXL,
+            page_size=page_size if should_paginate.get() else None,
+            catalog=folder_catalog,
+            differential=should_send_only_new.get(),
+            dedupe_archive=should_dedupe_archive.get(),
+            volume_budget=volume_mb * 1024 * 1024 if should_split_volumes.get() else None,
+            run_metrics=run,
         )
+        finish_run(run, status_update)
         run_button.config(state=tk.NORMAL)
 
     # --- Компоновка ---
@@ -894,7 +1906,33 @@ def create_transmittal_gui():
     archive_check.pack(anchor="w")
 
     delete_check = ttk.Checkbutton(run_card, text="Удалить исходные файлы после архивации", variable=should_delete_files, style="TCheckbutton")
-    delete_check.pack(anchor="w", padx=(20, 0), pady=(0, 15))
+    delete_check.pack(anchor="w", padx=(20, 0))
+
+    dedupe_check = ttk.Checkbutton(run_card, text="Одинаковые вложения класть в архив один раз", variable=should_dedupe_archive, style="TCheckbutton")
+    dedupe_check.pack(anchor="w", padx=(20, 0))
+
+    volume_frame = ttk.Frame(run_card, style="Card.TFrame")
+    volume_frame.pack(anchor="w", padx=(20, 0))
+    volume_check = ttk.Checkbutton(volume_frame, text="Разбить архив на тома по", variable=should_split_volumes, style="TCheckbutton")
+    volume_check.pack(side=tk.LEFT)
+    ttk.Spinbox(volume_frame, from_=1, to=100000, increment=10, width=7, textvariable=volume_size_mb).pack(side=tk.LEFT, padx=5)
+    ttk.Label(volume_frame, text="МБ", background=FRAME_COLOR).pack(side=tk.LEFT)
+
+    stream_check = ttk.Checkbutton(run_card, text="Быстрая потоковая запись XLSX", variable=should_stream_output, style="TCheckbutton")
+    stream_check.pack(anchor="w")
+
+    ttk.Checkbutton(
+        run_card,
+        text="Только новые файлы (ещё не отправленные из этой папки)",
+        variable=should_send_only_new,
+        style="TCheckbutton",
+    ).pack(anchor="w")
+
+    paging_frame = ttk.Frame(run_card, style="Card.TFrame")
+    paging_frame.pack(anchor="w", pady=(0, 15))
+    ttk.Checkbutton(paging_frame, text="Разбить на страницы по", variable=should_paginate, style="TCheckbutton").pack(side=tk.LEFT)
+    ttk.Spinbox(paging_frame, from_=1, to=100000, increment=100, width=7, textvariable=page_size_value).pack(side=tk.LEFT, padx=5)
+    ttk.Label(paging_frame, text="файлов", background=FRAME_COLOR).pack(side=tk.LEFT)
 
     run_button = ttk.Button(run_card, text="Сформировать трансмиттал", command=run_processing, style="TButton")
     run_button.pack(ipady=10, fill=tk.X)
@@ -904,6 +1942,10 @@ def create_transmittal_gui():
     settings_menu = tk.Menu(menubar, tearoff=0)
     settings_menu.add_command(label="Указать папку с шаблонами...", command=select_custom_template_path)
     menubar.add_cascade(label="Настройки", menu=settings_menu)
+    journal_menu = tk.Menu(menubar, tearoff=0)
+    journal_menu.add_command(label="Продолжить прерванное перемещение...", command=lambda: replay_move_journal(resume_moves))
+    journal_menu.add_command(label="Откатить перемещение...", command=lambda: replay_move_journal(rollback_moves))
+    menubar.add_cascade(label="Журнал перемещений", menu=journal_menu)
     root.config(menu=menubar)
 
     # --- Нижняя панель (статус-бар и ссылка) ---
@@ -996,28 +2038,45 @@ def create_transmittal_gui():
             return
 
         apply_index_button.config(state=tk.DISABLED)
+        transfer_counts: Counter[str] = Counter()
+        run, eta_status = start_run(RUN_GROUPING, update_index_status)
         try:
-            update_index_status("Запуск группировки...")
+            eta_status("Запуск группировки...")
             created_dirs = prepare_index_folders(
                 Path(source_dir),
                 Path(destination_dir),
                 TZ_FILE_PATH,
-                status_callback=update_index_status,
+                status_callback=eta_status,
                 use_copy=should_copy_files.get(),
+                transfer_mode=INDEX_TRANSFER_LABELS.get(index_transfer_label.get()),
                 group_by_suffix=should_group_by_suffix.get(),
+                transfer_counts=transfer_counts,
+                compute_checksums=should_compute_checksums.get(),
+                catalog=folder_catalog,
+                streaming=should_stream_index.get(),
+                io_scheduler=build_io_scheduler(update_index_status),
+                run_metrics=run,
             )
         except FileNotFoundError as exc:
+            finish_run(run, update_index_status, ok=False)
             messagebox.showerror("Ошибка", str(exc))
             update_index_status(str(exc))
         except ValueError as exc:
+            finish_run(run, update_index_status, ok=False)
             # Для ошибок валидации (например, отсутствие суффиксов) показываем более детальное сообщение
             messagebox.showerror("Ошибка группировки", str(exc))
             update_index_status(f"Ошибка: {exc}")
         except Exception as exc:
+            finish_run(run, update_index_status, ok=False)
             messagebox.showerror("Ошибка", f"Неожиданная ошибка: {exc}")
             update_index_status("Возникла ошибка при группировке.")
         else:
+            finish_run(run, update_index_status)
+            last_created_dirs[:] = created_dirs
+            folders_button.config(state=tk.NORMAL)
             summary = f"Готово: создано {len(created_dirs)} папок."
+            if transfer_counts:
+                summary += f"\nПеренос: {format_transfer_counts(transfer_counts)}."
             update_index_status(summary)
             messagebox.showinfo("Готово", summary)
 
@@ -1040,6 +2099,125 @@ def create_transmittal_gui():
         finally:
             apply_index_button.config(state=tk.NORMAL)
 
+    def selected_transmittal_template() -> Path | None:
+        """Шаблон, выбранный на вкладке трансмиттала (с сообщением об ошибке, если его нет)."""
+        status_dir_name = TEMPLATE_STATUSES.get(selected_status_key.get())
+        template_file_name = templates_map.get(selected_template_key.get())
+        if not status_dir_name or not template_file_name:
+            messagebox.showerror("Ошибка", "Выберите статус и шаблон трансмиттала на вкладке трансмиттала.")
+            return None
+        return TEMPLATE_DIR / status_dir_name / template_file_name
+
+    def run_created_folder_transmittals() -> None:
+        """Трансмиттал и архив для каждой папки, созданной последней группировкой."""
+        if not last_created_dirs:
+            messagebox.showerror("Ошибка", "Сначала выполните группировку.")
+            return
+        template_path = selected_transmittal_template()
+        if template_path is None:
+            return
+        folders_button.config(state=tk.DISABLED)
+        try:
+            results = generate_folder_transmittals(
+                list(last_created_dirs),
+                template_path,
+                update_index_status,
+                sender_value=selected_sender.get().strip() or None,
+                output_engine=OUTPUT_ENGINE_STREAM if should_stream_output.get() else OUTPUT_ENGINE_OPENPYXL,
+                create_archive_flag=should_create_archive.get(),
+            )
+        except Exception as exc:
+            messagebox.showerror("Ошибка", f"Не удалось сформировать трансмитталы: {exc}")
+            update_index_status("Ошибка при формировании трансмитталов.")
+        else:
+            report = format_folder_report(results)
+            update_index_status(report.splitlines()[0])
+            if any(result.error for result in results):
+                messagebox.showwarning("Трансмитталы по папкам", report)
+            else:
+                messagebox.showinfo("Трансмитталы по папкам", report)
+        finally:
+            folders_button.config(state=tk.NORMAL)
+
+    def run_index_workflow() -> None:
+        """Группировка, затем CMM и трансмиттал для каждой папки по мере её заполнения."""
+        from workflow import WorkflowOptions, run_workflow
+
+        source_dir = index_source_path.get()
+        destination_dir = index_destination_path.get()
+        if not source_dir or not destination_dir:
+            messagebox.showerror("Ошибка", "Выберите исходную и целевую папки.")
+            return
+        if not TZ_FILE_PATH.exists():
+            messagebox.showerror("Ошибка", f"Файл {TZ_FILE_PATH.name} не найден.")
+            return
+        template_path = selected_transmittal_template()
+        if template_path is None:
+            return
+
+        options = WorkflowOptions(
+            transmittal_template=template_path,
+            cmm_template=COMMENT_TEMPLATE_PATH if COMMENT_TEMPLATE_PATH.exists() else None,
+            sender=selected_sender.get().strip() or None,
+            transfer_mode=INDEX_TRANSFER_LABELS.get(index_transfer_label.get(), TRANSFER_COPY),
+            group_by_suffix=should_group_by_suffix.get(),
+            archive=should_create_archive.get(),
+            dedupe=should_dedupe_archive.get(),
+        )
+        apply_index_button.config(state=tk.DISABLED)
+        workflow_button.config(state=tk.DISABLED)
+        try:
+            result = run_workflow(
+                Path(source_dir),
+                Path(destination_dir),
+                options,
+                update_index_status,
+                tz_file_path=TZ_FILE_PATH,
+                catalog=folder_catalog,
+            )
+        except (FileNotFoundError, ValueError) as exc:
+            messagebox.showerror("Ошибка", str(exc))
+            update_index_status(f"Ошибка: {exc}")
+        except Exception as exc:
+            messagebox.showerror("Ошибка", f"Неожиданная ошибка: {exc}")
+            update_index_status("Возникла ошибка при сквозной обработке.")
+        else:
+            last_created_dirs[:] = result.created_dirs
+            folders_button.config(state=tk.NORMAL)
+            summary = f"Готово: папок {len(result.folders)}, трансмитталов {len(result.folders) - len(result.failed)}."
+            if result.failed:
+                details = "\n".join(f"- {outcome.folder.name}: {outcome.error}" for outcome in result.failed[:5])
+                messagebox.showwarning("Сквозная обработка", f"{summary}\n\nОшибки:\n{details}")
+            else:
+                messagebox.showinfo("Сквозная обработка", summary)
+            update_index_status(summary)
+        finally:
+            apply_index_button.config(state=tk.NORMAL)
+            workflow_button.config(state=tk.NORMAL)
+
+    def replay_move_journal(replay) -> None:
+        """Продолжает или откатывает перемещение по журналу выбранной целевой папки."""
+        folder_path = filedialog.askdirectory(
+            title="Выберите целевую папку с журналом move_journal.jsonl",
+            initialdir=index_destination_path.get() or None,
+        )
+        if not folder_path:
+            return
+        try:
+            result = replay(Path(folder_path), status_callback=update_index_status)
+        except (FileNotFoundError, ValueError) as exc:
+            messagebox.showerror("Журнал перемещений", str(exc))
+            return
+        summary = (
+            f"Обработано: {len(result.completed)}\n"
+            f"Пропущено: {len(result.skipped)}\n"
+            f"Не найдено: {len(result.missing)}"
+        )
+        if result.missing:
+            messagebox.showwarning("Журнал перемещений", summary)
+        else:
+            messagebox.showinfo("Журнал перемещений", summary)
+
     def update_cmm_status(message: str) -> None:
         cmm_status_message.set(message)
         root.update_idletasks()
@@ -1070,29 +2248,38 @@ def create_transmittal_gui():
         if cmm_run_button is not None:
             cmm_run_button.config(state=tk.DISABLED)
 
+        run, eta_status = start_run(RUN_CMM, update_cmm_status)
         try:
-            tz_map = build_tz_map_from_xlsx(TZ_FILE_PATH)
+            with run_stage(run, 'tz'):
+                tz_map = build_tz_map_from_xlsx(TZ_FILE_PATH)
             result = generate_comment_sheets(
                 Path(folder_value),
                 COMMENT_TEMPLATE_PATH,
                 tz_map,
                 normalize_key,
-                status_callback=update_cmm_status,
+                status_callback=eta_status,
+                catalog=folder_catalog,
+                incremental=should_update_cmm.get(),
+                run_metrics=run,
             )
         except FileNotFoundError as exc:
+            finish_run(run, update_cmm_status, ok=False)
             messagebox.showerror('Ошибка', str(exc))
             update_cmm_status(str(exc))
             return
         except Exception as exc:
+            finish_run(run, update_cmm_status, ok=False)
             messagebox.showerror('Ошибка', f'Не удалось создать CMM: {exc}')
             update_cmm_status('Ошибка при создании CMM.')
             return
         finally:
             if cmm_run_button is not None:
                 cmm_run_button.config(state=tk.NORMAL)
+        finish_run(run, update_cmm_status)
 
         summary_lines = [
             f'Создано файлов: {len(result.created)}',
+            f'Обновлено: {len(result.updated)}',
             f'Пропущено (CMM уже существует): {len(result.skipped_existing)}',
         ]
         error_preview = ''
@@ -1137,6 +2324,12 @@ def create_transmittal_gui():
         justify=tk.LEFT,
         wraplength=480,
     ).pack(anchor="w")
+    ttk.Checkbutton(
+        cmm_info_card,
+        text="Обновлять существующие CMM при изменении описания в TZ или шаблона",
+        variable=should_update_cmm,
+        style="TCheckbutton",
+    ).pack(anchor="w", pady=(5, 0))
 
     cmm_run_card = ttk.Frame(cmm_tab_container, style="Card.TFrame", padding=15)
     cmm_run_card.pack(fill=tk.X, pady=5)
@@ -1157,6 +2350,200 @@ def create_transmittal_gui():
         wraplength=480,
     ).pack(anchor="w", pady=(5, 0))
 
+    def update_registry_status(message: str) -> None:
+        registry_status_message.set(message)
+        root.update_idletasks()
+
+    def run_registry_search(event=None) -> None:
+        query = registry_query.get().strip()
+        registry_results.delete(*registry_results.get_children())
+        if not query:
+            return
+        try:
+            with TransmittalRegistry(REGISTRY_PATH) as registry:
+                hits = registry.find(query)
+        except sqlite3.Error as exc:
+            messagebox.showerror('Ошибка', f'Не удалось открыть реестр: {exc}')
+            return
+        for hit in hits:
+            registry_results.insert(
+                '',
+                tk.END,
+                values=(hit.file_name, hit.workbook_path.name, hit.sent_date or '', hit.sender or ''),
+                tags=(str(hit.workbook_path),),
+            )
+        update_registry_status(f'Найдено: {len(hits)}' if hits else 'Документ в реестре не найден.')
+
+    def open_registry_hit(event=None) -> None:
+        selection = registry_results.selection()
+        if not selection:
+            return
+        folder_path = Path(registry_results.item(selection[0], 'tags')[0]).parent
+        if not folder_path.is_dir():
+            messagebox.showwarning('Внимание', f'Папка не найдена: {folder_path}')
+            return
+        try:
+            if sys.platform == "win32":
+                os.startfile(folder_path)
+            elif sys.platform == "darwin":
+                subprocess.run(['open', str(folder_path)])
+            else:
+                subprocess.run(['xdg-open', str(folder_path)])
+        except Exception as e:
+            messagebox.showwarning("Ошибка", f"Не удалось открыть папку: {e}")
+
+    def import_registry_folder() -> None:
+        folder_path = filedialog.askdirectory(title="Выберите папку с архивом трансмитталов")
+        if not folder_path:
+            return
+        try:
+            with TransmittalRegistry(REGISTRY_PATH) as registry:
+                result = registry.import_workbooks(Path(folder_path), status_callback=update_registry_status)
+        except (OSError, sqlite3.Error) as exc:
+            messagebox.showerror('Ошибка', f'Импорт не выполнен: {exc}')
+            return
+        message = (
+            f'Импортировано: {len(result.imported)}\n'
+            f'Без изменений: {len(result.unchanged)}\n'
+            f'Ошибки: {len(result.failed)}'
+        )
+        if result.failed:
+            preview = '\n'.join(f'- {path.name}: {error}' for path, error in result.failed[:3])
+            messagebox.showwarning('Импорт в реестр', f'{message}\n\n{preview}')
+        else:
+            messagebox.showinfo('Импорт в реестр', message)
+
+    registry_container = ttk.Frame(registry_tab, padding=(15, 10))
+    registry_container.pack(fill=tk.BOTH, expand=True)
+
+    registry_search_card = ttk.Frame(registry_container, style="Card.TFrame", padding=15)
+    registry_search_card.pack(fill=tk.X, pady=5)
+    ttk.Label(registry_search_card, text="Поиск отправленного документа", style="Header.TLabel").pack(anchor="w")
+    ttk.Label(
+        registry_search_card,
+        text="Индекс (II.7.4), начало или часть имени файла, либо SHA-256.",
+        font=FONT_HELP_TEXT,
+        foreground="#757575",
+        background=FRAME_COLOR,
+    ).pack(anchor="w", pady=(5, 5))
+    registry_search_row = ttk.Frame(registry_search_card, style="Card.TFrame")
+    registry_search_row.pack(fill=tk.X)
+    registry_entry = ttk.Entry(registry_search_row, textvariable=registry_query)
+    registry_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
+    registry_entry.bind("<Return>", run_registry_search)
+    ttk.Button(registry_search_row, text="Найти", command=run_registry_search, style="TButton").pack(
+        side=tk.LEFT, padx=(5, 0)
+    )
+
+    registry_results_card = ttk.Frame(registry_container, style="Card.TFrame", padding=15)
+    registry_results_card.pack(fill=tk.BOTH, expand=True, pady=5)
+    registry_results = ttk.Treeview(
+        registry_results_card,
+        columns=("file", "transmittal", "date", "sender"),
+        show="headings",
+        height=18,
+    )
+    for column, title, width in (
+        ("file", "Документ", 170),
+        ("transmittal", "Трансмиттал", 150),
+        ("date", "Дата", 75),
+        ("sender", "Отправитель", 80),
+    ):
+        registry_results.heading(column, text=title)
+        registry_results.column(column, width=width, anchor="w")
+    registry_results.pack(fill=tk.BOTH, expand=True)
+    registry_results.bind("<Double-1>", open_registry_hit)
+
+    registry_import_card = ttk.Frame(registry_container, style="Card.TFrame", padding=15)
+    registry_import_card.pack(fill=tk.X, pady=5)
+    ttk.Button(
+        registry_import_card,
+        text="Импортировать трансмитталы из папки...",
+        command=import_registry_folder,
+        style="TButton",
+    ).pack(fill=tk.X)
+    ttk.Label(
+        registry_import_card,
+        textvariable=registry_status_message,
+        font=FONT_HELP_TEXT,
+        foreground="#757575",
+        background=FRAME_COLOR,
+        justify=tk.LEFT,
+        wraplength=480,
+    ).pack(anchor="w", pady=(5, 0))
+
+    stats_colors = {RUN_TRANSMITTAL: "#1E88E5", RUN_GROUPING: "#43A047", RUN_CMM: "#FB8C00"}
+
+    def refresh_statistics(event=None) -> None:
+        """Перерисовывает график скорости (файлов/с) и сводку по последним запускам."""
+        try:
+            with RunHistory(RUN_HISTORY_PATH) as history:
+                runs = {kind: history.recent(kind) for kind in RUN_KINDS}
+        except (OSError, sqlite3.Error) as exc:
+            stats_summary.set(f"Не удалось открыть историю запусков: {exc}")
+            return
+        series = {
+            kind: [run.files_per_second for run in kind_runs if run.ok and run.files > 0]
+            for kind, kind_runs in runs.items()
+        }
+        stats_canvas.delete("all")
+        width = stats_canvas.winfo_width() or int(stats_canvas["width"])
+        height = stats_canvas.winfo_height() or int(stats_canvas["height"])
+        for kind, points in chart_points(series, width, height).items():
+            coords = [value for point in points for value in point]
+            if len(points) > 1:
+                stats_canvas.create_line(*coords, fill=stats_colors[kind], width=2)
+            for x, y in points:
+                stats_canvas.create_oval(x - 2, y - 2, x + 2, y + 2, fill=stats_colors[kind], outline="")
+
+        lines = []
+        for kind, label in RUN_KINDS.items():
+            trend = throughput_trend(kind, runs[kind])
+            if trend is None:
+                lines.append(f"{label}: запусков пока нет.")
+                continue
+            lines.append(
+                f"{label}: медиана {trend.median:.1f} файл/с, последний {trend.last:.1f} файл/с "
+                f"({trend.change:+.0%}, запусков: {trend.runs})"
+            )
+        stats_summary.set("\n".join(lines))
+
+    stats_summary = tk.StringVar(value="")
+    stats_container = ttk.Frame(stats_tab, padding=(15, 10))
+    stats_container.pack(fill=tk.BOTH, expand=True)
+
+    stats_chart_card = ttk.Frame(stats_container, style="Card.TFrame", padding=15)
+    stats_chart_card.pack(fill=tk.BOTH, expand=True, pady=5)
+    ttk.Label(stats_chart_card, text="Скорость обработки, файлов/с", style="Header.TLabel").pack(anchor="w")
+    stats_legend = ttk.Frame(stats_chart_card, style="Card.TFrame")
+    stats_legend.pack(anchor="w", pady=(5, 5))
+    for kind, label in RUN_KINDS.items():
+        tk.Label(stats_legend, text=f"■ {label}", fg=stats_colors[kind], bg=FRAME_COLOR, font=FONT_LABEL).pack(
+            side=tk.LEFT, padx=(0, 10)
+        )
+    stats_canvas = tk.Canvas(stats_chart_card, width=480, height=240, bg=FRAME_COLOR, highlightthickness=0)
+    stats_canvas.pack(fill=tk.BOTH, expand=True)
+    stats_canvas.bind("<Configure>", refresh_statistics)
+
+    stats_summary_card = ttk.Frame(stats_container, style="Card.TFrame", padding=15)
+    stats_summary_card.pack(fill=tk.X, pady=5)
+    ttk.Label(
+        stats_summary_card,
+        textvariable=stats_summary,
+        font=FONT_HELP_TEXT,
+        foreground="#757575",
+        background=FRAME_COLOR,
+        justify=tk.LEFT,
+        wraplength=480,
+    ).pack(anchor="w")
+    ttk.Button(stats_summary_card, text="Обновить", command=refresh_statistics, style="TButton").pack(
+        anchor="w", pady=(5, 0)
+    )
+    notebook.bind(
+        "<<NotebookTabChanged>>",
+        lambda event: refresh_statistics() if notebook.select() == str(stats_tab) else None,
+    )
+
     index_tab_container = ttk.Frame(index_tab, padding=0)
     index_tab_container.pack(fill=tk.BOTH, expand=True)
 
@@ -1218,13 +2605,21 @@ def create_transmittal_gui():
     options_card = ttk.Frame(main_content_frame, style="Card.TFrame", padding=15)
     options_card.pack(fill=tk.X, pady=5)
 
-    copy_check = ttk.Checkbutton(
-        options_card,
-        text="Копировать файлы (не перемещать)",
-        variable=should_copy_files,
-        style="TCheckbutton",
+    def _sync_copy_flag(*_):
+        should_copy_files.set(INDEX_TRANSFER_LABELS.get(index_transfer_label.get()) != TRANSFER_MOVE)
+
+    transfer_frame = ttk.Frame(options_card, style="Card.TFrame")
+    transfer_frame.pack(anchor="w", fill=tk.X, pady=(0, 5))
+    ttk.Label(transfer_frame, text="Перенос файлов:", background=FRAME_COLOR).pack(side=tk.LEFT)
+    transfer_combo = ttk.Combobox(
+        transfer_frame,
+        textvariable=index_transfer_label,
+        values=list(INDEX_TRANSFER_LABELS),
+        state="readonly",
+        width=40,
     )
-    copy_check.pack(anchor="w")
+    transfer_combo.pack(side=tk.LEFT, padx=(5, 0))
+    index_transfer_label.trace_add("write", _sync_copy_flag)
 
     group_check = ttk.Checkbutton(
         options_card,
@@ -1232,7 +2627,23 @@ def create_transmittal_gui():
         variable=should_group_by_suffix,
         style="TCheckbutton",
     )
-    group_check.pack(anchor="w", pady=(0, 10))
+    group_check.pack(anchor="w")
+
+    checksum_check = ttk.Checkbutton(
+        options_card,
+        text="Считать SHA-256 копий (манифест transfer_manifest.json)",
+        variable=should_compute_checksums,
+        style="TCheckbutton",
+    )
+    checksum_check.pack(anchor="w")
+
+    stream_index_check = ttk.Checkbutton(
+        options_card,
+        text="Потоковый режим (перенос начинается сразу, без полного списка)",
+        variable=should_stream_index,
+        style="TCheckbutton",
+    )
+    stream_index_check.pack(anchor="w", pady=(0, 10))
 
     # --- Место для информации пользователя ---
     info_card = ttk.Frame(main_content_frame, padding=5)
@@ -1376,6 +2787,21 @@ def create_transmittal_gui():
         style="TButton",
     )
     apply_index_button.pack(fill=tk.X, ipady=10)
+    workflow_button = ttk.Button(
+        run_card,
+        text="Группировать → CMM → трансмиттал",
+        command=run_index_workflow,
+        style="TButton",
+    )
+    workflow_button.pack(fill=tk.X, ipady=6, pady=(6, 0))
+    folders_button = ttk.Button(
+        run_card,
+        text="Трансмитталы для созданных папок",
+        command=run_created_folder_transmittals,
+        style="TButton",
+        state=tk.DISABLED,
+    )
+    folders_button.pack(fill=tk.X, ipady=6, pady=(6, 0))
     ttk.Label(
         run_card,
         textvariable=index_status_message,
@@ -1387,10 +2813,19 @@ def create_transmittal_gui():
     ).pack(anchor="w", pady=(5, 0))
 
 
+    def watch_template_catalog():
+        """Перестраивает меню шаблонов, если фоновый опрос нашёл изменения в папках."""
+        nonlocal template_catalog_version
+        if template_catalog.version != template_catalog_version:
+            template_catalog_version = template_catalog.version
+            update_template_options(keep_selection=True)
+        root.after(TEMPLATE_WATCH_MS, watch_template_catalog)
+
     # --- Инициализация и привязки ---
     selected_status_key.trace_add("write", update_template_options)
     toggle_delete_option()
     update_template_options()
+    root.after(TEMPLATE_WATCH_MS, watch_template_catalog)
     # Fallback: если аббревиатура не найдена — выбрать XXX
     if not selected_template_key.get():
         for key, filename in templates_map.items():
@@ -1402,4 +2837,5 @@ def create_transmittal_gui():
     root.mainloop()
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     create_transmittal_gui()
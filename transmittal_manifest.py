@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Iterable, Mapping
+
+from file_copy import file_sha256
+
+
+MANIFEST_NAME = ".transmittal_manifest.json"
+MANIFEST_VERSION = 1
+
+
+@dataclass
+class FileFingerprint:
+    """Отпечаток отправленного файла: размер, mtime и (если посчитан) SHA-256."""
+
+    size: int
+    mtime_ns: int
+    sha256: str | None = None
+    transmittal: str | None = None
+
+
+@dataclass
+class TransmittalManifest:
+    """Манифест папки: отправленные файлы и собственные результаты трансмитталов."""
+
+    files: dict[str, FileFingerprint] = field(default_factory=dict)
+    outputs: set[str] = field(default_factory=set)
+
+
+def manifest_path(folder: Path) -> Path:
+    return folder / MANIFEST_NAME
+
+
+def _key(folder: Path, path: Path) -> str:
+    try:
+        return path.relative_to(folder).as_posix()
+    except ValueError:
+        return path.resolve().relative_to(folder.resolve()).as_posix()
+
+
+def load_manifest(folder: Path) -> TransmittalManifest:
+    """Читает манифест отправленных файлов папки; повреждённый манифест считается пустым."""
+    path = manifest_path(folder)
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+        return TransmittalManifest(
+            files={key: FileFingerprint(**value) for key, value in data.get("files", {}).items()},
+            outputs=set(data.get("outputs", [])),
+        )
+    except FileNotFoundError:
+        return TransmittalManifest()
+    except (ValueError, TypeError, AttributeError):
+        return TransmittalManifest()
+
+
+def fingerprint_files(
+    files: Iterable[Path], hash_file: Callable[[Path], str] | None = file_sha256
+) -> dict[Path, FileFingerprint]:
+    """Снимает размер, mtime и SHA-256 файлов (до архивации и удаления исходников)."""
+    fingerprints: dict[Path, FileFingerprint] = {}
+    for path in files:
+        try:
+            stat = path.stat()
+            digest = hash_file(path) if hash_file is not None else None
+        except OSError:
+            continue
+        fingerprints[path] = FileFingerprint(stat.st_size, stat.st_mtime_ns, digest)
+    return fingerprints
+
+
+def select_new_files(
+    folder: Path,
+    files: Iterable[Path],
+    manifest: TransmittalManifest,
+    hash_file: Callable[[Path], str] = file_sha256,
+) -> tuple[list[Path], list[Path]]:
+    """Делит файлы на новые/изменённые и уже отправленные.
+
+    Совпадение имени, размера и mtime считается отправленным без чтения файла;
+    при изменившемся только mtime решает сравнение SHA-256 из манифеста.
+    Книги и архивы, созданные прошлыми трансмитталами, в отбор не попадают.
+    """
+    new_files: list[Path] = []
+    already_sent: list[Path] = []
+    for path in files:
+        key = _key(folder, path)
+        if key in manifest.outputs:
+            continue
+        known = manifest.files.get(key)
+        if known is None:
+            new_files.append(path)
+            continue
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        if stat.st_size != known.size:
+            new_files.append(path)
+        elif stat.st_mtime_ns == known.mtime_ns:
+            already_sent.append(path)
+        elif known.sha256 is not None and hash_file(path) == known.sha256:
+            already_sent.append(path)
+        else:
+            new_files.append(path)
+    return new_files, already_sent
+
+
+def update_manifest(
+    folder: Path,
+    fingerprints: Mapping[Path, FileFingerprint],
+    transmittal_name: str,
+    outputs: Iterable[Path] = (),
+) -> Path:
+    """Добавляет отправленные файлы и результаты (книги, архивы) в манифест папки.
+
+    Файл манифеста заменяется атомарно.
+    """
+    manifest = load_manifest(folder)
+    for path, fingerprint in fingerprints.items():
+        manifest.files[_key(folder, path)] = FileFingerprint(
+            fingerprint.size, fingerprint.mtime_ns, fingerprint.sha256, transmittal_name
+        )
+    for path in outputs:
+        try:
+            manifest.outputs.add(_key(folder, path))
+        except ValueError:
+            continue  # результат сохранён вне папки
+    payload = {
+        "version": MANIFEST_VERSION,
+        "updated": datetime.now().isoformat(timespec="seconds"),
+        "files": {key: asdict(value) for key, value in sorted(manifest.files.items())},
+        "outputs": sorted(manifest.outputs),
+    }
+    path = manifest_path(folder)
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_text(json.dumps(payload, ensure_ascii=False, indent=1), encoding="utf-8")
+    os.replace(tmp_path, path)
+    return path
+
+
+__all__ = [
+    "MANIFEST_NAME",
+    "FileFingerprint",
+    "TransmittalManifest",
+    "fingerprint_files",
+    "load_manifest",
+    "select_new_files",
+    "update_manifest",
+]
@@ -0,0 +1,386 @@
+from __future__ import annotations
+
+import re
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Iterable, Sequence
+
+from openpyxl import load_workbook
+from openpyxl.utils.cell import column_index_from_string
+
+from cmm_builder import extract_index_from_name
+from tz_parser import normalize_key
+
+
+StatusCallback = Callable[[str], None] | None
+REGISTRY_FILE_NAME = "transmittal_registry.sqlite3"
+TRANSMITTAL_GLOB = "CT-*-TRA-PRM-*.xlsx"
+SEARCH_LIMIT = 200
+RE_DATE_TEXT = re.compile(r"\b(\d{2})\.(\d{2})\.(\d{4})\b")
+RE_INDEX_QUERY = re.compile(r"^[IVXLCDM]+\.\d+(?:\.\d+)*[A-Za-zЀ-ӿ]?$", re.IGNORECASE)
+# 1: индексы документов хранятся нормализованными (`normalize_key`)
+# 2: у документа свой архив (том `_att_NN.zip`), у трансмиттала — общий
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transmittals (
+    id INTEGER PRIMARY KEY,
+    workbook_path TEXT NOT NULL UNIQUE,
+    workbook_name TEXT NOT NULL,
+    sender TEXT,
+    sent_date TEXT,
+    archive_path TEXT,
+    workbook_mtime_ns INTEGER,
+    recorded_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    transmittal_id INTEGER NOT NULL REFERENCES transmittals(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    file_name TEXT NOT NULL COLLATE NOCASE,
+    index_code TEXT COLLATE NOCASE,
+    naziv TEXT,
+    size INTEGER,
+    sha256 TEXT,
+    archive_path TEXT
+);
+CREATE INDEX IF NOT EXISTS documents_file_name ON documents(file_name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS documents_index_code ON documents(index_code COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS documents_sha256 ON documents(sha256);
+CREATE INDEX IF NOT EXISTS documents_transmittal ON documents(transmittal_id);
+"""
+
+
+@dataclass
+class RegistryDocument:
+    """Строка трансмиттала для записи в реестр."""
+
+    file_name: str
+    naziv: str | None = None
+    index_code: str | None = None
+    size: int | None = None
+    sha256: str | None = None
+    archive_path: Path | None = None
+
+    def __post_init__(self) -> None:
+        if self.index_code is None:
+            self.index_code = extract_index_from_name(self.file_name)
+        if self.index_code is not None:
+            # NOCASE в SQLite сворачивает только ASCII: `II.7.4а` и `II.7.4A` сравниваются после нормализации
+            self.index_code = normalize_key(self.index_code)
+
+
+@dataclass
+class RegistryTransmittal:
+    """Трансмиттал со строками, готовый к записи в реестр."""
+
+    workbook_path: Path
+    documents: list[RegistryDocument]
+    sender: str | None = None
+    sent_date: str | None = None
+    archive_path: Path | None = None
+    workbook_mtime_ns: int | None = None
+
+
+@dataclass
+class RegistryHit:
+    """Найденный документ и трансмиттал, в котором он был отправлен."""
+
+    file_name: str
+    index_code: str | None
+    naziv: str | None
+    workbook_path: Path
+    sender: str | None
+    sent_date: str | None
+    archive_path: Path | None
+    sha256: str | None
+
+
+@dataclass
+class RegistryImportResult:
+    """Итог пакетного импорта существующих трансмитталов."""
+
+    imported: list[Path] = field(default_factory=list)
+    unchanged: list[Path] = field(default_factory=list)
+    failed: list[tuple[Path, str]] = field(default_factory=list)
+
+
+def _notify(callback: StatusCallback, message: str) -> None:
+    """Отправляет сообщение о статусе, если колбэк задан."""
+    if callback is not None:
+        callback(message)
+
+
+class TransmittalRegistry:
+    """Реестр отправленных трансмитталов в SQLite с индексами по имени и индексу документа."""
+
+    def __init__(self, db_path: Path) -> None:
+        self.db_path = db_path
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(db_path)
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self) -> None:
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            return
+        with self._conn:
+            if version < 1:
+                self._conn.create_function("normalize_key", 1, normalize_key, deterministic=True)
+                self._conn.execute(
+                    "UPDATE documents SET index_code = normalize_key(index_code) WHERE index_code IS NOT NULL"
+                )
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(documents)")}
+            if "archive_path" not in columns:
+                self._conn.execute("ALTER TABLE documents ADD COLUMN archive_path TEXT")
+            self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> TransmittalRegistry:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def record(self, transmittals: Iterable[RegistryTransmittal]) -> int:
+        """Записывает трансмитталы одной транзакцией; повторная запись книги заменяет её строки."""
+        recorded_at = datetime.now().isoformat(timespec="seconds")
+        count = 0
+        with self._conn:
+            for item in transmittals:
+                workbook_path = str(item.workbook_path.resolve())
+                self._conn.execute("DELETE FROM transmittals WHERE workbook_path = ?", (workbook_path,))
+                cursor = self._conn.execute(
+                    "INSERT INTO transmittals (workbook_path, workbook_name, sender, sent_date,"
+                    " archive_path, workbook_mtime_ns, recorded_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        workbook_path,
+                        item.workbook_path.name,
+                        item.sender,
+                        item.sent_date,
+                        str(item.archive_path) if item.archive_path else None,
+                        item.workbook_mtime_ns,
+                        recorded_at,
+                    ),
+                )
+                self._conn.executemany(
+                    "INSERT INTO documents (transmittal_id, position, file_name, index_code,"
+                    " naziv, size, sha256, archive_path) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (
+                            cursor.lastrowid,
+                            position,
+                            doc.file_name,
+                            doc.index_code,
+                            doc.naziv,
+                            doc.size,
+                            doc.sha256,
+                            str(doc.archive_path) if doc.archive_path else None,
+                        )
+                        for position, doc in enumerate(item.documents, 1)
+                    ],
+                )
+                count += 1
+        return count
+
+    def find(self, query: str, limit: int = SEARCH_LIMIT) -> list[RegistryHit]:
+        """Ищет документ по индексу (`II.7.4`), SHA-256 или началу имени файла.
+
+        Если по началу имени ничего не найдено, выполняется поиск подстроки.
+        """
+        text = query.strip()
+        if not text:
+            return []
+        select = (
+            "SELECT d.file_name, d.index_code, d.naziv, t.workbook_path, t.sender,"
+            " t.sent_date, COALESCE(d.archive_path, t.archive_path), d.sha256 FROM documents d"
+            " JOIN transmittals t ON t.id = d.transmittal_id WHERE {} "
+            "ORDER BY t.sent_date DESC, t.workbook_name DESC, d.position LIMIT ?"
+        )
+        if RE_INDEX_QUERY.match(text):
+            rows = self._conn.execute(select.format("d.index_code = ?"), (normalize_key(text), limit)).fetchall()
+        elif re.fullmatch(r"[0-9a-fA-F]{64}", text):
+            rows = self._conn.execute(select.format("d.sha256 = ?"), (text.lower(), limit)).fetchall()
+        else:
+            pattern = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            condition = "d.file_name LIKE ? ESCAPE '\\'"
+            rows = self._conn.execute(select.format(condition), (pattern + "%", limit)).fetchall()
+            if not rows:
+                rows = self._conn.execute(select.format(condition), ("%" + pattern + "%", limit)).fetchall()
+        return [
+            RegistryHit(
+                file_name=row[0],
+                index_code=row[1],
+                naziv=row[2],
+                workbook_path=Path(row[3]),
+                sender=row[4],
+                sent_date=row[5],
+                archive_path=Path(row[6]) if row[6] else None,
+                sha256=row[7],
+            )
+            for row in rows
+        ]
+
+    def known_workbooks(self) -> dict[str, int | None]:
+        """Пути книг в реестре и их mtime на момент записи."""
+        return dict(self._conn.execute("SELECT workbook_path, workbook_mtime_ns FROM transmittals"))
+
+    def import_workbooks(
+        self,
+        root_dir: Path,
+        status_callback: StatusCallback = None,
+        max_workers: int | None = None,
+        first_data_row: int = 18,
+        name_column: str = "C",
+        naziv_column: str = "I",
+        sender_name: str = "pripmem",
+        date_cell: str = "C3",
+    ) -> RegistryImportResult:
+        """Заполняет реестр из существующих книг `CT-*-TRA-PRM-*.xlsx` (разбор — в нескольких процессах).
+
+        Книги, не изменившиеся с прошлого импорта, пропускаются.
+        """
+        result = RegistryImportResult()
+        known = self.known_workbooks()
+        pending: list[Path] = []
+        for path in sorted(root_dir.rglob(TRANSMITTAL_GLOB)):
+            if path.stem.endswith("_index") or path.name.startswith("~$"):
+                continue
+            if known.get(str(path.resolve())) == path.stat().st_mtime_ns:
+                result.unchanged.append(path)
+            else:
+                pending.append(path)
+
+        _notify(status_callback, f"Книг для импорта: {len(pending)} (без изменений: {len(result.unchanged)})")
+        if not pending:
+            return result
+
+        layout = (first_data_row, name_column, naziv_column, sender_name, date_cell)
+        parsed: list[RegistryTransmittal] = []
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            for path, outcome in zip(pending, executor.map(_read_workbook_safe, pending, [layout] * len(pending), chunksize=8)):
+                if isinstance(outcome, str):
+                    result.failed.append((path, outcome))
+                    _notify(status_callback, f"Ошибка: {path.name} - {outcome}")
+                else:
+                    parsed.append(outcome)
+                    result.imported.append(path)
+
+        self.record(parsed)
+        _notify(status_callback, f"Импортировано книг: {len(result.imported)}")
+        return result
+
+
+def _read_workbook_safe(path: Path, layout: tuple) -> RegistryTransmittal | str:
+    try:
+        return read_transmittal_workbook(path, *layout)
+    except Exception as error:  # noqa: BLE001
+        return str(error)
+
+
+def _parse_sent_date(value: object) -> str | None:
+    """Приводит дату из шапки трансмиттала («Датум: 19.10.2026») к ISO."""
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if not value:
+        return None
+    match = RE_DATE_TEXT.search(str(value))
+    if match:
+        day, month, year = match.groups()
+        return f"{year}-{month}-{day}"
+    return str(value).strip() or None
+
+
+def read_transmittal_workbook(
+    path: Path,
+    first_data_row: int = 18,
+    name_column: str = "C",
+    naziv_column: str = "I",
+    sender_name: str = "pripmem",
+    date_cell: str = "C3",
+) -> RegistryTransmittal:
+    """Читает строки и реквизиты из готовой книги трансмиттала."""
+    mtime_ns = path.stat().st_mtime_ns
+    workbook = load_workbook(path, data_only=True)
+    try:
+        worksheet = workbook.active
+        sender = None
+        defined = workbook.defined_names.get(sender_name)
+        if defined is not None:
+            for sheet_name, coord in defined.destinations:
+                sender = workbook[sheet_name][coord.replace("$", "")].value
+                break
+
+        sent_date = _parse_sent_date(worksheet[date_cell].value)
+
+        name_idx = column_index_from_string(name_column) - 1
+        naziv_idx = column_index_from_string(naziv_column) - 1
+        number_idx = name_idx - 1
+        documents: list[RegistryDocument] = []
+        for row in worksheet.iter_rows(min_row=first_data_row, values_only=True):
+            if len(row) <= name_idx or not isinstance(row[number_idx], int) or not row[name_idx]:
+                break
+            naziv = row[naziv_idx] if len(row) > naziv_idx else None
+            documents.append(RegistryDocument(str(row[name_idx]).strip(), naziv or None))
+    finally:
+        workbook.close()
+
+    archive = path.with_name(path.stem + "_att.zip")
+    return RegistryTransmittal(
+        workbook_path=path,
+        documents=documents,
+        sender=str(sender) if sender else None,
+        sent_date=sent_date,
+        archive_path=archive if archive.exists() else None,
+        workbook_mtime_ns=mtime_ns,
+    )
+
+
+def documents_from_files(
+    files: Sequence[Path],
+    naziv_for: Callable[[str], str | None],
+    hash_file: Callable[[Path], str] | None = None,
+    archive_for: Callable[[Path], Path | None] | None = None,
+) -> list[RegistryDocument]:
+    """Строит строки реестра по исходным файлам трансмиттала.
+
+    Размер берётся всегда, SHA-256 — через `hash_file`, том архива
+    с файлом — через `archive_for` (если архив разбит на тома).
+    """
+    documents = []
+    for path in files:
+        try:
+            size = path.stat().st_size
+            digest = hash_file(path) if hash_file is not None else None
+        except OSError:
+            size, digest = None, None
+        documents.append(
+            RegistryDocument(
+                path.name,
+                naziv_for(path.name) or None,
+                size=size,
+                sha256=digest,
+                archive_path=archive_for(path) if archive_for is not None else None,
+            )
+        )
+    return documents
+
+
+__all__ = [
+    "REGISTRY_FILE_NAME",
+    "RegistryDocument",
+    "RegistryHit",
+    "RegistryImportResult",
+    "RegistryTransmittal",
+    "TransmittalRegistry",
+    "documents_from_files",
+    "read_transmittal_workbook",
+]
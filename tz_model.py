@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import atexit
+import mmap
+import os
+import struct
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Mapping
+
+from index_trie import DEFAULT_FALLBACK_DEPTH, IndexLookup, TrieMatch, index_components, index_key
+from tz_parser import normalize_key
+
+
+TZ_MODEL_MAGIC = b"TZMODEL2"
+TZ_MODEL_PREFIX = "tzmodel-"
+TZ_MODEL_SUFFIX = ".tzmodel"
+TZ_MODEL_STALE_SECONDS = 24 * 60 * 60  # старше суток — остаток упавшего или не удалённого запуска
+NO_VALUE = 0xFFFFFFFF  # длина пустого описания
+
+_HEADER = struct.Struct("<8sI")  # метка, число описаний
+_DESCRIPTION = struct.Struct("<IIII")  # смещение и длина ключа, смещение и длина описания
+
+
+def write_tz_model(path: Path, descriptions: Mapping[str, str]) -> Path:
+    """Сохраняет описания TZ в компактный файл для отображения в память.
+
+    Описания сортируются по байтам нормализованного ключа (поиск делением
+    пополам), все тексты лежат в общем блоке UTF-8. Файл записывается целиком
+    и подменяется атомарно.
+    """
+    blob = bytearray()
+
+    def put(value: object) -> tuple[int, int]:
+        if value is None:
+            return 0, NO_VALUE
+        data = str(value).encode("utf-8")
+        offset = len(blob)
+        blob.extend(data)
+        return offset, len(data)
+
+    entries: dict[bytes, str] = {}
+    for key, value in descriptions.items():
+        entries.setdefault(normalize_key(key.strip()).encode("utf-8"), value)
+    description_table = bytearray()
+    for key in sorted(entries):
+        key_offset = len(blob)
+        blob.extend(key)
+        description_table.extend(_DESCRIPTION.pack(key_offset, len(key), *put(entries[key])))
+
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as handle:
+        handle.write(_HEADER.pack(TZ_MODEL_MAGIC, len(entries)))
+        handle.write(description_table)
+        handle.write(blob)
+    os.replace(tmp_path, path)
+    return path
+
+
+class TzModel(IndexLookup[str]):
+    """Модель TZ, отображённая в память только для чтения.
+
+    Процессы, открывшие один файл, делят его страницы через кэш ОС: описание
+    декодируется только для найденного ключа, так что запуск рабочего процесса
+    не требует ни разбора TZ_glob.xlsx, ни распаковки словаря. Ведёт себя как
+    `IndexTrie` (словарь по нормализованным ключам и `lookup` с предками).
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        with open(path, "rb") as handle:
+            self._data = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, self._count = _HEADER.unpack_from(self._data, 0)
+        except struct.error:
+            magic = None
+        if magic != TZ_MODEL_MAGIC:
+            self._data.close()
+            raise ValueError(f"Файл не является моделью TZ: {path}")
+        self._blob_at = _HEADER.size + self._count * _DESCRIPTION.size
+
+    def close(self) -> None:
+        self._data.close()
+
+    def __enter__(self) -> TzModel:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def __reduce__(self) -> tuple[object, tuple[Path]]:
+        # В другой процесс передаётся путь, а не содержимое
+        return attach_tz_model, (self.path,)
+
+    def _bytes(self, offset: int, length: int) -> bytes:
+        start = self._blob_at + offset
+        return self._data[start : start + length]
+
+    def _text(self, offset: int, length: int) -> str | None:
+        return None if length == NO_VALUE else self._bytes(offset, length).decode("utf-8")
+
+    def _entry(self, position: int) -> tuple[int, int, int, int]:
+        return _DESCRIPTION.unpack_from(self._data, _HEADER.size + position * _DESCRIPTION.size)
+
+    def _find(self, key: bytes) -> int | None:
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            key_offset, key_length, _, _ = self._entry(middle)
+            probe = self._bytes(key_offset, key_length)
+            if probe < key:
+                low = middle + 1
+            elif probe > key:
+                high = middle
+            else:
+                return middle
+        return None
+
+    def __getitem__(self, key: str) -> str:
+        position = self._find(normalize_key(key.strip()).encode("utf-8"))
+        if position is None:
+            raise KeyError(key)
+        _, _, value_offset, value_length = self._entry(position)
+        return self._text(value_offset, value_length)
+
+    def __iter__(self) -> Iterator[str]:
+        for position in range(self._count):
+            key_offset, key_length, _, _ = self._entry(position)
+            yield self._bytes(key_offset, key_length).decode("utf-8")
+
+    def __len__(self) -> int:
+        return self._count
+
+    def matches(self, index: str, max_fallback: int = DEFAULT_FALLBACK_DEPTH) -> Iterator[TrieMatch[str]]:
+        parts = index_components(index)
+        if parts is None:
+            return
+        for depth in range(min(max_fallback, len(parts) - 1) + 1):
+            key = index_key(parts[: len(parts) - depth])
+            position = self._find(key.encode("utf-8"))
+            if position is not None:
+                _, _, value_offset, value_length = self._entry(position)
+                yield TrieMatch(key, self._text(value_offset, value_length), depth)
+
+
+_attached: dict[tuple[Path, int, int], TzModel] = {}
+_leftovers: set[Path] = set()
+
+
+def attach_tz_model(path: Path) -> TzModel:
+    """Открывает опубликованную модель один раз на процесс (пока файл не заменён)."""
+    stat = os.stat(path)
+    key = (Path(path), stat.st_ino, stat.st_mtime_ns)
+    model = _attached.get(key)
+    if model is None:
+        model = _attached[key] = TzModel(Path(path))
+    return model
+
+
+def _detach(path: Path) -> None:
+    for key in [key for key in _attached if key[0] == path]:
+        _attached.pop(key).close()
+
+
+def _remove(path: Path) -> bool:
+    _detach(path)
+    try:
+        path.unlink(missing_ok=True)
+    except OSError:
+        return False  # Windows: файл ещё отображён в другом процессе
+    return True
+
+
+@atexit.register
+def _remove_leftovers() -> None:
+    for path in list(_leftovers):
+        if _remove(path):
+            _leftovers.discard(path)
+
+
+def remove_stale_tz_models(directory: Path | None = None, max_age: float = TZ_MODEL_STALE_SECONDS) -> int:
+    """Удаляет опубликованные модели, оставшиеся от прошлых запусков.
+
+    На Windows файл, который ещё отображён рабочим процессом, удалить нельзя;
+    такие файлы добираются при выходе или при следующем запуске. Свежие файлы
+    не трогаются — они могут принадлежать параллельному запуску.
+    """
+    folder = Path(directory) if directory is not None else Path(tempfile.gettempdir())
+    deadline = time.time() - max_age
+    removed = 0
+    for path in folder.glob(f"{TZ_MODEL_PREFIX}*{TZ_MODEL_SUFFIX}"):
+        try:
+            if path.stat().st_mtime < deadline:
+                path.unlink()
+                removed += 1
+        except OSError:
+            continue
+    return removed
+
+
+@contextmanager
+def published_tz_model(descriptions: Mapping[str, str], directory: Path | None = None) -> Iterator[Path]:
+    """Публикует модель TZ во временный файл на время блока и удаляет его после.
+
+    Уже открытая `TzModel` не переписывается — отдаётся её собственный файл.
+    Если удалить файл не удалось, попытка повторяется при выходе из процесса.
+    """
+    if isinstance(descriptions, TzModel):
+        yield descriptions.path
+        return
+    remove_stale_tz_models(directory)
+    handle, name = tempfile.mkstemp(prefix=TZ_MODEL_PREFIX, suffix=TZ_MODEL_SUFFIX, dir=directory)
+    os.close(handle)
+    path = Path(name)
+    try:
+        write_tz_model(path, descriptions)
+        yield path
+    finally:
+        if not _remove(path):
+            _leftovers.add(path)
+
+
+__all__ = [
+    "TZ_MODEL_PREFIX",
+    "TZ_MODEL_STALE_SECONDS",
+    "TZ_MODEL_SUFFIX",
+    "TzModel",
+    "attach_tz_model",
+    "published_tz_model",
+    "remove_stale_tz_models",
+    "write_tz_model",
+]
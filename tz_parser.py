@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+import os
+import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import chain, islice
+from pathlib import Path
+from typing import Iterable, Sequence
+
+from openpyxl import load_workbook
+
+
+RE_INDEX = re.compile(
+    r"\b([IVXLCDM]+)\.(\d+)(?:\.(\d+))?(?:\.(\d+))?([A-Za-zА-Яа-я])?\b",
+    re.IGNORECASE
+)
+MAX_PROBE_COLUMNS = 20  # индекс и описание ищутся в первых 20 колонках
+DESCRIPTION_COLUMN = 3  # колонка C — основное место описания
+MIN_FALLBACK_LENGTH = 3
+PARALLEL_MIN_SHEETS = 4  # меньше листов разбираются в текущем процессе
+SCHEMA_SAMPLE_ROWS = 50  # строк для определения колонок листа
+
+
+def normalize_key(key: str) -> str:
+    key = key.upper()
+    replacements = {'A': 'А', 'B': 'Б', 'V': 'В', 'G': 'Г'}
+    for lat, cyr in replacements.items():
+        key = key.replace(lat, cyr)
+    return key
+
+
+def format_index(match: re.Match) -> str:
+    """Индекс из совпадения `RE_INDEX`: `II.7.4`, `IV.2.3a` и т.п."""
+    roman, num1, num2, num3, suf = match.groups()
+    index = f"{roman.upper()}.{num1}"
+    if num2:
+        index += f".{num2}"
+    if num3:
+        index += f".{num3}"
+    return index + (suf or "")
+
+
+@dataclass(frozen=True)
+class SheetSchema:
+    """Колонки листа, выведенные по первым строкам: индекс и описание (1-based)."""
+
+    index_column: int
+    description_column: int | None
+
+
+def _is_fallback_description(value: object) -> bool:
+    return isinstance(value, str) and len(value.strip()) >= MIN_FALLBACK_LENGTH
+
+
+def _has_primary_description(row: Sequence[object]) -> bool:
+    value = row[DESCRIPTION_COLUMN - 1] if len(row) >= DESCRIPTION_COLUMN else None
+    return isinstance(value, str) and bool(value.strip())
+
+
+def _may_hold_index(value: object) -> bool:
+    # Без точки `RE_INDEX` не совпадёт — такие ячейки отсекаются без регулярки
+    return isinstance(value, str) and "." in value
+
+
+def _description_column(row: Sequence[object], idx_col: int) -> int | None:
+    """Колонка описания: C, если заполнена, иначе первая строка не короче трёх символов правее индекса."""
+    if _has_primary_description(row):
+        return DESCRIPTION_COLUMN
+    for column in range(idx_col + 1, len(row) + 1):
+        if _is_fallback_description(row[column - 1]):
+            return column
+    return None
+
+
+def _probe_row(row: Sequence[object]) -> tuple[re.Match, int, int | None] | None:
+    """Полный перебор: первая ячейка с `RE_INDEX`, её колонка и колонка описания."""
+    for idx_col, value in enumerate(row, 1):
+        if isinstance(value, str):
+            match = RE_INDEX.search(value)
+            if match:
+                return match, idx_col, _description_column(row, idx_col)
+    return None
+
+
+def _fit_row(row: Sequence[object], schema: SheetSchema) -> tuple[re.Match, int | None] | None:
+    """Разбор строки по схеме листа одной регуляркой; `None`, если строка в схему не укладывается.
+
+    Результат совпадает с `_probe_row`: левее колонки индекса не должно быть
+    ячеек, где `RE_INDEX` мог бы найтись, а колонка описания из схемы берётся,
+    только если C пуста и между индексом и ней нет других подходящих строк.
+    """
+    idx_col = schema.index_column
+    if len(row) < idx_col or any(_may_hold_index(value) for value in row[: idx_col - 1]):
+        return None
+    value = row[idx_col - 1]
+    if not isinstance(value, str):
+        return None
+    match = RE_INDEX.search(value)
+    if match is None:
+        return None
+    desc_col = schema.description_column
+    if (
+        desc_col is not None
+        and desc_col != DESCRIPTION_COLUMN
+        and idx_col < desc_col <= len(row)
+        and _is_fallback_description(row[desc_col - 1])
+        and not _has_primary_description(row)
+        and not any(_is_fallback_description(value) for value in row[idx_col : desc_col - 1])
+    ):
+        return match, desc_col
+    return match, _description_column(row, idx_col)
+
+
+def infer_schema(sample: Iterable[Sequence[object]]) -> SheetSchema | None:
+    """Самые частые колонки индекса и описания среди строк выборки; `None`, если индексов нет."""
+    index_columns: Counter[int] = Counter()
+    description_columns: Counter[int] = Counter()
+    for row in sample:
+        probed = _probe_row(row)
+        if probed is None:
+            continue
+        _match, idx_col, desc_col = probed
+        index_columns[idx_col] += 1
+        if desc_col is not None:
+            description_columns[desc_col] += 1
+    if not index_columns:
+        return None
+    description = description_columns.most_common(1)[0][0] if description_columns else None
+    return SheetSchema(index_columns.most_common(1)[0][0], description)
+
+
+def _parse_row(row: Sequence[object], schema: SheetSchema | None = None) -> tuple[str, str] | None:
+    """Ключ и описание строки: по схеме листа, а если строка в неё не укладывается — полным перебором."""
+    fitted = _fit_row(row, schema) if schema is not None else None
+    if fitted is None:
+        probed = _probe_row(row)
+        if probed is None:
+            return None
+        match, _idx_col, desc_col = probed
+    else:
+        match, desc_col = fitted
+    if desc_col is None:
+        return None
+    return normalize_key(format_index(match)), row[desc_col - 1].strip()
+
+
+def parse_rows(rows: Iterable[Sequence[object]]) -> dict[str, str]:
+    """Карта «ключ → описание» одного листа; из повторов остаётся первый.
+
+    Колонки индекса и описания определяются по первым `SCHEMA_SAMPLE_ROWS`
+    строкам (`infer_schema`); остальные строки проверяются одной регуляркой
+    в колонке индекса и перебираются целиком, только если не подходят.
+    """
+    rows = iter(rows)
+    sample = list(islice(rows, SCHEMA_SAMPLE_ROWS))
+    schema = infer_schema(sample)
+    sheet_map: dict[str, str] = {}
+    for row in chain(sample, rows):
+        parsed = _parse_row(row, schema)
+        if parsed is not None and parsed[0] not in sheet_map:
+            sheet_map[parsed[0]] = parsed[1]
+    return sheet_map
+
+
+def _sheet_rows(ws) -> Iterable[Sequence[object]]:
+    # Размеры из <dimension> бывают неверными — строки читаются до конца листа
+    ws.reset_dimensions()
+    return ws.iter_rows(max_col=MAX_PROBE_COLUMNS, values_only=True)
+
+
+def parse_sheet(xlsx_path: Path, sheet_name: str) -> dict[str, str]:
+    """Разбирает один лист книги в режиме только для чтения (подходит для рабочего процесса)."""
+    wb = load_workbook(xlsx_path, read_only=True, data_only=True)
+    try:
+        return parse_rows(_sheet_rows(wb[sheet_name]))
+    finally:
+        wb.close()
+
+
+def _parse_sheet_job(job: tuple[Path, str]) -> dict[str, str]:
+    return parse_sheet(*job)
+
+
+def merge_sheet_maps(sheet_maps: Iterable[dict[str, str]]) -> dict[str, str]:
+    """Объединяет карты листов по порядку: описание берётся из первого листа с ключом."""
+    tz_map: dict[str, str] = {}
+    for sheet_map in sheet_maps:
+        for key, naziv in sheet_map.items():
+            tz_map.setdefault(key, naziv)
+    return tz_map
+
+
+def build_tz_map(xlsx_path: Path, max_workers: int | None = None) -> dict[str, str]:
+    """Читает карту TZ_glob: листы разбираются параллельно, по процессу на лист.
+
+    Каждый процесс открывает книгу только для чтения и разбирает один лист;
+    частичные карты объединяются в порядке листов, так что при повторе ключа
+    остаётся описание из более раннего листа. Небольшие книги (меньше
+    `PARALLEL_MIN_SHEETS` листов) и `max_workers=1` разбираются в текущем процессе.
+    """
+    if not xlsx_path.exists():
+        return {}
+    wb = load_workbook(xlsx_path, read_only=True, data_only=True)
+    try:
+        sheet_names = [ws.title for ws in wb.worksheets]
+        workers = max_workers or min(len(sheet_names), os.cpu_count() or 1)
+        if workers <= 1 or len(sheet_names) < PARALLEL_MIN_SHEETS:
+            return merge_sheet_maps(parse_rows(_sheet_rows(wb[name])) for name in sheet_names)
+    finally:
+        wb.close()
+
+    jobs = [(xlsx_path, name) for name in sheet_names]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return merge_sheet_maps(executor.map(_parse_sheet_job, jobs))
+
+
+__all__ = [
+    "RE_INDEX",
+    "SheetSchema",
+    "build_tz_map",
+    "format_index",
+    "infer_schema",
+    "merge_sheet_maps",
+    "normalize_key",
+    "parse_rows",
+    "parse_sheet",
+]
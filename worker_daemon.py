@@ -0,0 +1,622 @@
+from __future__ import annotations
+
+import argparse
+import hmac
+import ipaddress
+import itertools
+import json
+import multiprocessing
+import os
+import secrets
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Mapping
+
+import toir_tra_report_v1 as app
+from cmm_builder import generate_comment_sheets
+from duplicate_finder import HASH_CACHE_FILE_NAME, HashCache
+from folder_catalog import FolderCatalog
+from index_folder_builder import TRANSFER_COPY, TzSuffixResolver, prepare_index_folders
+from workflow import WorkflowOptions, run_workflow
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_PENDING = 64
+FINISHED_JOBS_KEPT = 500
+JOB_KINDS = ("transmittal", "index", "cmm", "workflow")
+# Ключ доступа: сервер пишет его при запуске в файл, доступный только владельцу
+TOKEN_FILE_NAME = "worker_daemon.token"
+TOKEN_HEADER = "X-Worker-Token"
+JSON_CONTENT_TYPE = "application/json"
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+
+class QueueFullError(RuntimeError):
+    """Очередь задач демона заполнена."""
+
+
+def ensure_loopback(host: str) -> str:
+    """Возвращает `host`, если это локальный интерфейс, иначе поднимает ValueError.
+
+    Задачи демона работают с любыми путями пользователя, поэтому слушать
+    внешние интерфейсы нельзя даже с ключом доступа.
+    """
+    if host == "localhost":
+        return host
+    try:
+        if ipaddress.ip_address(host).is_loopback:
+            return host
+    except ValueError:
+        pass
+    raise ValueError(f"Демон слушает только локальный интерфейс (127.0.0.1, ::1), а не {host}")
+
+
+def default_token_path() -> Path:
+    return app.BASE_DIR / TOKEN_FILE_NAME
+
+
+def write_token(path: Path) -> str:
+    """Создаёт новый ключ доступа и записывает его в файл с правами только для владельца."""
+    token = secrets.token_urlsafe(32)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    handle = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(handle, "w", encoding="utf-8") as stream:
+        stream.write(token)
+    os.replace(tmp_path, path)
+    return token
+
+
+def read_token(path: Path) -> str:
+    return path.read_text(encoding="utf-8").strip()
+
+
+@dataclass
+class Job:
+    """Задача, поставленная в очередь демона."""
+
+    job_id: int
+    kind: str
+    params: dict[str, Any]
+    status: str = JOB_QUEUED
+    messages: list[str] = field(default_factory=list)
+    result: dict[str, Any] | None = None
+    error: str | None = None
+    submitted: float = field(default_factory=time.time)
+    started: float | None = None
+    finished: float | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "id": self.job_id,
+            "kind": self.kind,
+            "status": self.status,
+            "messages": list(self.messages),
+            "result": self.result,
+            "error": self.error,
+            "queued_seconds": round((self.started or time.time()) - self.submitted, 4),
+            "run_seconds": (
+                round((self.finished or time.time()) - self.started, 4)
+                if self.started is not None
+                else None
+            ),
+        }
+
+
+class WarmState:
+    """Прогретые ресурсы, общие для всех задач демона.
+
+    Карта TZ и резолвер суффиксов перечитываются только при изменении
+    mtime файла TZ_glob.xlsx; каталог папок и кэш хешей общие для всех задач.
+    """
+
+    def __init__(self, tz_file_path: Path, registry_path: Path | None = None) -> None:
+        self.tz_file_path = tz_file_path
+        self.registry_path = registry_path or app.REGISTRY_PATH
+        self.catalog = FolderCatalog()
+        # Кэш хешей лежит рядом с реестром и остаётся в памяти между задачами
+        self.hash_cache = HashCache(self.registry_path.with_name(HASH_CACHE_FILE_NAME))
+        self._lock = threading.Lock()
+        self._tz_map: tuple[int, dict[str, str]] | None = None
+        self._resolver: tuple[int, TzSuffixResolver] | None = None
+
+    def _tz_mtime(self) -> int:
+        try:
+            return self.tz_file_path.stat().st_mtime_ns
+        except OSError:
+            return -1
+
+    def tz_map(self) -> dict[str, str]:
+        with self._lock:
+            mtime = self._tz_mtime()
+            if self._tz_map is None or self._tz_map[0] != mtime:
+                self._tz_map = (mtime, app.build_tz_map_from_xlsx(self.tz_file_path))
+            return self._tz_map[1]
+
+    def resolver(self) -> TzSuffixResolver:
+        with self._lock:
+            mtime = self._tz_mtime()
+            if self._resolver is None or self._resolver[0] != mtime:
+                self._resolver = (mtime, TzSuffixResolver(self.tz_file_path))
+            return self._resolver[1]
+
+
+def _require(params: Mapping[str, Any], name: str) -> Path:
+    value = params.get(name)
+    if not value:
+        raise ValueError(f"Не задан параметр '{name}'.")
+    return Path(value)
+
+
+def run_transmittal_job(
+    state: WarmState, params: Mapping[str, Any], status_callback: Callable[[str], None]
+) -> dict[str, Any]:
+    """Трансмиттал: `target_dir`, `template_path`, `sender`, `engine`, `page_size`, `archive`,
+    `differential`, `dedupe`, `volume_mb` (размер тома общего архива)."""
+    volume_mb = params.get("volume_mb")
+    run = app.run_transmittal(
+        _require(params, "target_dir"),
+        _require(params, "template_path"),
+        status_callback,
+        sender_value=params.get("sender") or None,
+        output_engine=params.get("engine", app.DEFAULT_OUTPUT_ENGINE),
+        create_archive_flag=bool(params.get("archive", False)),
+        page_size=params.get("page_size") or None,
+        catalog=state.catalog,
+        tz_map=state.tz_map(),
+        differential=bool(params.get("differential", False)),
+        hash_cache=state.hash_cache,
+        dedupe_archive=bool(params.get("dedupe")),
+        volume_budget=int(float(volume_mb) * 1024 * 1024) if volume_mb else None,
+        registry_path=state.registry_path,
+    )
+    state.hash_cache.save()
+    return {
+        "workbook": str(run.output.saved_path),
+        "files": len(run.output.files),
+        "archive": str(run.archives[0]) if run.archives else None,
+        "volumes": [str(path) for path in run.archives],
+        "duplicates": {str(copy): str(original) for copy, original in run.duplicates.items()},
+    }
+
+
+def run_index_job(
+    state: WarmState, params: Mapping[str, Any], status_callback: Callable[[str], None]
+) -> dict[str, Any]:
+    """Группировка: `source_dir`, `destination_dir`, `transfer_mode`, `group_by_suffix`, `checksums`, `streaming`."""
+    counts: Counter[str] = Counter()
+    created = prepare_index_folders(
+        _require(params, "source_dir"),
+        _require(params, "destination_dir"),
+        state.tz_file_path,
+        status_callback=status_callback,
+        transfer_mode=params.get("transfer_mode"),
+        group_by_suffix=bool(params.get("group_by_suffix", False)),
+        transfer_counts=counts,
+        compute_checksums=bool(params.get("checksums", False)),
+        catalog=state.catalog,
+        resolver=state.resolver(),
+        streaming=bool(params.get("streaming", False)),
+        io_scheduler=app.build_io_scheduler(status_callback),
+    )
+    return {"created_dirs": [str(path) for path in created], "transfer_counts": dict(counts)}
+
+
+def run_cmm_job(
+    state: WarmState, params: Mapping[str, Any], status_callback: Callable[[str], None]
+) -> dict[str, Any]:
+    """CMM: `source_dir`, необязательные `template_path` и `incremental`."""
+    result = generate_comment_sheets(
+        _require(params, "source_dir"),
+        Path(params.get("template_path") or app.COMMENT_TEMPLATE_PATH),
+        state.tz_map(),
+        app.normalize_key,
+        status_callback=status_callback,
+        catalog=state.catalog,
+        incremental=bool(params.get("incremental", False)),
+    )
+    return {
+        "created": [str(path) for path in result.created],
+        "updated": [str(path) for path in result.updated],
+        "skipped_existing": [str(path) for path in result.skipped_existing],
+        "failed": [[str(path), error] for path, error in result.failed],
+    }
+
+
+def run_workflow_job(
+    state: WarmState, params: Mapping[str, Any], status_callback: Callable[[str], None]
+) -> dict[str, Any]:
+    """Группировка → CMM → трансмиттал: `source_dir`, `destination_dir`, `template_path`,
+    `cmm_template_path`, `cmm` (по умолчанию — да), `sender`, `transfer_mode`,
+    `group_by_suffix`, `archive`, `dedupe`, `volume_mb`, `workers`."""
+    cmm_template = Path(params.get("cmm_template_path") or app.COMMENT_TEMPLATE_PATH)
+    options = WorkflowOptions(
+        transmittal_template=_require(params, "template_path"),
+        cmm_template=cmm_template if params.get("cmm", True) else None,
+        sender=params.get("sender") or None,
+        transfer_mode=params.get("transfer_mode") or TRANSFER_COPY,
+        group_by_suffix=bool(params.get("group_by_suffix", False)),
+        output_engine=params.get("engine", app.DEFAULT_OUTPUT_ENGINE),
+        archive=bool(params.get("archive", False)),
+        dedupe=bool(params.get("dedupe", False)),
+        volume_budget=int(float(params["volume_mb"]) * 1024 * 1024) if params.get("volume_mb") else None,
+        max_workers=int(params.get("workers") or DEFAULT_WORKERS),
+    )
+    result = run_workflow(
+        _require(params, "source_dir"),
+        _require(params, "destination_dir"),
+        options,
+        status_callback,
+        tz_file_path=state.tz_file_path,
+        tz_map=state.tz_map(),
+        resolver=state.resolver(),
+        catalog=state.catalog,
+        hash_cache=state.hash_cache,
+        registry_path=state.registry_path,
+    )
+    return {
+        "created_dirs": [str(path) for path in result.created_dirs],
+        "folders": [
+            {
+                "folder": str(outcome.folder),
+                "cmm": [str(path) for path in outcome.cmm_created],
+                "workbook": str(outcome.workbook) if outcome.workbook else None,
+                "volumes": [str(path) for path in outcome.archives],
+                "error": outcome.error,
+            }
+            for outcome in result.folders
+        ],
+    }
+
+
+JOB_HANDLERS = {
+    "transmittal": run_transmittal_job,
+    "index": run_index_job,
+    "cmm": run_cmm_job,
+    "workflow": run_workflow_job,
+}
+
+
+class JobQueue:
+    """Очередь задач с ограниченным числом одновременно выполняемых задач."""
+
+    def __init__(
+        self,
+        state: WarmState,
+        max_workers: int = DEFAULT_WORKERS,
+        max_pending: int = DEFAULT_MAX_PENDING,
+    ) -> None:
+        self.state = state
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs: OrderedDict[int, Job] = OrderedDict()
+        self._futures: dict[int, Future] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, params: dict[str, Any]) -> Job:
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f"Неизвестный тип задачи: {kind}")
+        with self._lock:
+            if len(self._futures) >= self.max_pending:
+                raise QueueFullError("Очередь задач заполнена, повторите позже.")
+            job = Job(next(self._ids), kind, params)
+            self._jobs[job.job_id] = job
+            self._futures[job.job_id] = self._executor.submit(self._run, job)
+            self._prune()
+        return job
+
+    def _prune(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished is not None]
+        for job_id in finished[: max(0, len(finished) - FINISHED_JOBS_KEPT)]:
+            del self._jobs[job_id]
+
+    def _run(self, job: Job) -> None:
+        job.status = JOB_RUNNING
+        job.started = time.time()
+        try:
+            job.result = JOB_HANDLERS[job.kind](self.state, job.params, job.messages.append)
+            job.status = JOB_DONE
+        except Exception as error:
+            job.error = str(error)
+            job.status = JOB_FAILED
+        finally:
+            job.finished = time.time()
+            with self._lock:
+                self._futures.pop(job.job_id, None)
+
+    def get(self, job_id: int) -> Job | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def wait(self, job_id: int, timeout: float | None = None) -> Job | None:
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is not None:
+            future.result(timeout=timeout)
+        return self.get(job_id)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    server: WorkerServer
+
+    def log_message(self, format: str, *args: object) -> None:
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _reply(self, status: HTTPStatus, payload: Mapping[str, Any]) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _rejection(self, needs_body: bool) -> tuple[HTTPStatus, str] | None:
+        """Причина отказа: запрос со страницы браузера, без JSON или без ключа демона."""
+        # Клиент демона заголовок Origin не отправляет, браузер — всегда при запросе с чужой страницы
+        if self.headers.get("Origin") is not None:
+            return HTTPStatus.FORBIDDEN, "Запросы из браузера не принимаются"
+        content_type = (self.headers.get("Content-Type") or "").split(";", 1)[0].strip().lower()
+        if needs_body and content_type != JSON_CONTENT_TYPE:
+            return HTTPStatus.UNSUPPORTED_MEDIA_TYPE, f"Ожидается {JSON_CONTENT_TYPE}"
+        token = self.headers.get(TOKEN_HEADER) or ""
+        if not hmac.compare_digest(token.encode("utf-8"), self.server.token.encode("utf-8")):
+            return HTTPStatus.UNAUTHORIZED, "Неверный ключ демона"
+        return None
+
+    def _authorized(self, needs_body: bool = False) -> bool:
+        rejection = self._rejection(needs_body)
+        if rejection is None:
+            return True
+        status, error = rejection
+        self._reply(status, {"error": error})
+        return False
+
+    def do_GET(self) -> None:
+        if self.path == "/health":
+            self._reply(HTTPStatus.OK, {"status": "ok"})
+            return
+        if not self._authorized():
+            return
+        if self.path.startswith("/jobs/"):
+            job_id = self.path.rsplit("/", 1)[-1]
+            job = self.server.jobs.get(int(job_id)) if job_id.isdigit() else None
+            if job is None:
+                self._reply(HTTPStatus.NOT_FOUND, {"error": "Задача не найдена"})
+            else:
+                self._reply(HTTPStatus.OK, job.to_dict())
+            return
+        self._reply(HTTPStatus.NOT_FOUND, {"error": "Неизвестный путь"})
+
+    def do_POST(self) -> None:
+        if not self._authorized(needs_body=True):
+            return
+        if self.path == "/shutdown":
+            self._reply(HTTPStatus.OK, {"status": "stopping"})
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+            return
+        if self.path != "/jobs":
+            self._reply(HTTPStatus.NOT_FOUND, {"error": "Неизвестный путь"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            request = json.loads(self.rfile.read(length) or b"{}")
+            job = self.server.jobs.submit(request.get("kind", ""), dict(request.get("params") or {}))
+        except QueueFullError as error:
+            self._reply(HTTPStatus.SERVICE_UNAVAILABLE, {"error": str(error)})
+            return
+        except (ValueError, TypeError, AttributeError) as error:
+            self._reply(HTTPStatus.BAD_REQUEST, {"error": str(error)})
+            return
+        if request.get("wait"):
+            job = self.server.jobs.wait(job.job_id) or job
+        self._reply(HTTPStatus.ACCEPTED if job.finished is None else HTTPStatus.OK, job.to_dict())
+
+
+class WorkerServer(ThreadingHTTPServer):
+    """HTTP-сервер демона; слушает только локальный интерфейс.
+
+    Кроме `/health`, запросы принимаются только с ключом `token` в заголовке
+    `X-Worker-Token`, без заголовка `Origin` и (для POST) с телом JSON, так что
+    страница в браузере пользователя не может ни поставить задачу, ни остановить демон.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        jobs: JobQueue,
+        token: str,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+        verbose: bool = False,
+    ) -> None:
+        super().__init__((ensure_loopback(host), port), _RequestHandler)
+        self.jobs = jobs
+        self.token = token
+        self.verbose = verbose
+
+
+def create_server(
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    max_workers: int = DEFAULT_WORKERS,
+    max_pending: int = DEFAULT_MAX_PENDING,
+    tz_file_path: Path | None = None,
+    verbose: bool = False,
+    registry_path: Path | None = None,
+    token_path: Path | None = None,
+) -> WorkerServer:
+    """Создаёт сервер с прогретым состоянием (порт 0 — любой свободный).
+
+    Новый ключ доступа записывается в `token_path` (по умолчанию
+    `worker_daemon.token` рядом с settings.json), откуда его читает `WorkerClient`.
+    """
+    ensure_loopback(host)
+    token = write_token(token_path or default_token_path())
+    state = WarmState(tz_file_path or app.TZ_FILE_PATH, registry_path)
+    return WorkerServer(JobQueue(state, max_workers, max_pending), token, host, port, verbose)
+
+
+def _decode_reply(status: int, body: bytes) -> dict[str, Any]:
+    try:
+        reply = json.loads(body)
+    except ValueError:
+        reply = None
+    if not isinstance(reply, dict):
+        text = body.decode("utf-8", "replace").strip()[:200]
+        raise RuntimeError(f"Ответ {status} не похож на ответ демона (не JSON): {text!r}")
+    return reply
+
+
+class WorkerClient:
+    """Тонкий клиент демона на `urllib`; ключ доступа читается из файла демона."""
+
+    def __init__(
+        self,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+        timeout: float | None = None,
+        token_path: Path | None = None,
+    ) -> None:
+        self.base_url = f"http://{host}:{port}"
+        self.timeout = timeout
+        self.token_path = token_path or default_token_path()
+
+    def _token(self) -> str:
+        try:
+            return read_token(self.token_path)
+        except FileNotFoundError:
+            raise RuntimeError(f"Не найден ключ демона {self.token_path}: запустите `serve`") from None
+
+    def _request(self, method: str, path: str, payload: Mapping[str, Any] | None = None) -> dict[str, Any]:
+        data = json.dumps(payload).encode("utf-8") if payload is not None else None
+        request = urllib.request.Request(
+            self.base_url + path,
+            data=data,
+            method=method,
+            headers={"Content-Type": JSON_CONTENT_TYPE, TOKEN_HEADER: self._token()},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return _decode_reply(response.status, response.read())
+        except urllib.error.HTTPError as error:
+            body = error.read()
+            try:
+                detail = json.loads(body or b"{}").get("error", error.reason)
+            except (ValueError, AttributeError):
+                detail = body.decode("utf-8", "replace").strip()[:200] or error.reason
+            raise RuntimeError(f"Демон вернул {error.code}: {detail}") from None
+
+    def submit(self, kind: str, params: Mapping[str, Any], wait: bool = True) -> dict[str, Any]:
+        return self._request("POST", "/jobs", {"kind": kind, "params": dict(params), "wait": wait})
+
+    def status(self, job_id: int) -> dict[str, Any]:
+        return self._request("GET", f"/jobs/{job_id}")
+
+    def health(self) -> dict[str, Any]:
+        return self._request("GET", "/health")
+
+    def shutdown(self) -> dict[str, Any]:
+        return self._request("POST", "/shutdown", {})
+
+
+def _parse_params(pairs: list[str]) -> dict[str, Any]:
+    params: dict[str, Any] = {}
+    for pair in pairs:
+        key, sep, raw = pair.partition("=")
+        if not sep:
+            raise SystemExit(f"Ожидался параметр вида ключ=значение: {pair}")
+        try:
+            params[key] = json.loads(raw)
+        except json.JSONDecodeError:
+            params[key] = raw
+    return params
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Фоновый обработчик трансмитталов, группировки и CMM.")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="Только локальный адрес (127.0.0.1, ::1, localhost)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="Запустить демон")
+    serve.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    serve.add_argument("--max-pending", type=int, default=DEFAULT_MAX_PENDING)
+    serve.add_argument("--verbose", action="store_true")
+
+    submit = commands.add_parser("submit", help="Отправить задачу и дождаться результата")
+    submit.add_argument("kind", choices=JOB_KINDS)
+    submit.add_argument("params", nargs="*", help="Параметры вида ключ=значение")
+    submit.add_argument("--no-wait", action="store_true")
+
+    status = commands.add_parser("status", help="Состояние задачи")
+    status.add_argument("job_id", type=int)
+    commands.add_parser("stop", help="Остановить демон")
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        try:
+            server = create_server(args.host, args.port, args.workers, args.max_pending, verbose=args.verbose)
+        except ValueError as error:
+            print(f"Ошибка: {error}")
+            return 2
+        print(f"Демон слушает http://{args.host}:{server.server_address[1]}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            server.jobs.shutdown()
+            default_token_path().unlink(missing_ok=True)
+        return 0
+
+    client = WorkerClient(args.host, args.port)
+    try:
+        if args.command == "submit":
+            reply = client.submit(args.kind, _parse_params(args.params), wait=not args.no_wait)
+        elif args.command == "status":
+            reply = client.status(args.job_id)
+        else:
+            reply = client.shutdown()
+    except (OSError, RuntimeError) as error:
+        print(f"Ошибка: {error}")
+        return 1
+    print(json.dumps(reply, ensure_ascii=False, indent=2))
+    return 1 if reply.get("status") == JOB_FAILED else 0
+
+
+__all__ = [
+    "Job",
+    "JobQueue",
+    "WarmState",
+    "WorkerClient",
+    "WorkerServer",
+    "create_server",
+    "ensure_loopback",
+    "read_token",
+    "write_token",
+]
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    raise SystemExit(main())
@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import queue
+import sys
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+
+import toir_tra_report_v1 as app
+from cmm_builder import generate_comment_sheets
+from duplicate_finder import HashCache
+from folder_catalog import FolderCatalog
+from index_folder_builder import TRANSFER_COPY, TRANSFER_MODES, TzSuffixResolver, prepare_index_folders
+
+
+StatusCallback = Callable[[str], None] | None
+
+DEFAULT_WORKFLOW_WORKERS = 4
+STATUS_POLL_SECONDS = 0.1
+
+
+@dataclass
+class WorkflowOptions:
+    """Параметры сквозного прогона «группировка → CMM → трансмиттал»."""
+
+    transmittal_template: Path
+    cmm_template: Path | None = None  # без шаблона CMM не создаются
+    sender: str | None = None
+    transfer_mode: str = TRANSFER_COPY
+    group_by_suffix: bool = False
+    output_engine: str = app.DEFAULT_OUTPUT_ENGINE
+    archive: bool = False
+    dedupe: bool = False
+    volume_budget: int | None = None  # байт на том общего архива
+    max_workers: int = DEFAULT_WORKFLOW_WORKERS
+
+
+@dataclass
+class FolderOutcome:
+    """Итог обработки одной сгруппированной папки."""
+
+    folder: Path
+    cmm_created: list[Path] = field(default_factory=list)
+    cmm_failed: list[tuple[Path, str]] = field(default_factory=list)
+    workbook: Path | None = None
+    archives: list[Path] = field(default_factory=list)
+    error: str | None = None
+
+
+@dataclass
+class WorkflowResult:
+    """Итог сквозного прогона: созданные папки и результат по каждой из них."""
+
+    created_dirs: list[Path]
+    folders: list[FolderOutcome]
+
+    @property
+    def failed(self) -> list[FolderOutcome]:
+        return [outcome for outcome in self.folders if outcome.error is not None]
+
+
+def _process_folder(
+    folder: Path,
+    options: WorkflowOptions,
+    tz_map: dict[str, str],
+    catalog: FolderCatalog,
+    hash_cache: HashCache,
+    registry_path: Path | None,
+    status_callback: Callable[[str], None],
+) -> FolderOutcome:
+    """CMM и трансмиттал одной папки; ошибка записывается в итог, а не поднимается."""
+    outcome = FolderOutcome(folder)
+
+    def say(message: str) -> None:
+        status_callback(f"[{folder.name}] {message}")
+
+    try:
+        if options.cmm_template is not None:
+            cmm = generate_comment_sheets(
+                folder, options.cmm_template, tz_map, app.normalize_key, say, catalog=catalog
+            )
+            outcome.cmm_created = cmm.created + cmm.updated
+            outcome.cmm_failed = cmm.failed
+            # Новые _CMM должны попасть в отбор даже там, где mtime папки не сдвинулся
+            catalog.invalidate(folder)
+
+        run = app.run_transmittal(
+            folder,
+            options.transmittal_template,
+            say,
+            sender_value=options.sender,
+            output_engine=options.output_engine,
+            create_archive_flag=options.archive,
+            catalog=catalog,
+            tz_map=tz_map,
+            hash_cache=hash_cache,
+            dedupe_archive=options.dedupe,
+            volume_budget=options.volume_budget,
+            registry_path=registry_path,
+        )
+        outcome.workbook = run.output.saved_path
+        outcome.archives = run.archives
+        say("Готово.")
+    except Exception as error:  # noqa: BLE001 - ошибка одной папки не останавливает остальные
+        outcome.error = str(error)
+        say(f"Ошибка: {error}")
+    return outcome
+
+
+def run_workflow(
+    source_dir: Path,
+    destination_dir: Path,
+    options: WorkflowOptions,
+    status_callback: StatusCallback = None,
+    tz_file_path: Path | None = None,
+    tz_map: dict[str, str] | None = None,
+    resolver: TzSuffixResolver | None = None,
+    catalog: FolderCatalog | None = None,
+    hash_cache: HashCache | None = None,
+    registry_path: Path | None = None,
+) -> WorkflowResult:
+    """Группирует файлы и сразу готовит CMM и трансмиттал для каждой папки.
+
+    Папка передаётся в пул из `options.max_workers` потоков, как только в неё
+    перенесены все файлы, — пока остальные группы ещё копируются. Карта TZ,
+    резолвер суффиксов, каталог и кэш хешей читаются один раз и общие для всех
+    папок. Ошибка в папке не прерывает прогон и попадает в `FolderOutcome.error`.
+    `status_callback` вызывается только из вызывающего потока, так что
+    подходит и для обновления GUI.
+    """
+    tz_file_path = tz_file_path or app.TZ_FILE_PATH
+    if options.transfer_mode not in TRANSFER_MODES:
+        raise ValueError(f"Неизвестный режим переноса: {options.transfer_mode}")
+    app.check_transmittal_template(options.transmittal_template, status_callback)
+    if options.cmm_template is not None and not options.cmm_template.exists():
+        raise FileNotFoundError(f"Шаблон CMM не найден: {options.cmm_template}")
+
+    if tz_map is None:
+        tz_map = app.build_tz_map_from_xlsx(tz_file_path)
+    resolver = resolver or TzSuffixResolver(tz_file_path)
+    catalog = catalog or FolderCatalog()
+    hash_cache = hash_cache or HashCache(app.HASH_CACHE_PATH)
+
+    # Сообщения рабочих потоков копятся в очереди и выводятся вызывающим потоком
+    messages: queue.SimpleQueue[str] = queue.SimpleQueue()
+
+    def drain() -> None:
+        while True:
+            try:
+                message = messages.get_nowait()
+            except queue.Empty:
+                return
+            if status_callback is not None:
+                status_callback(message)
+
+    def notify(message: str) -> None:
+        drain()
+        if status_callback is not None:
+            status_callback(message)
+
+    futures: list[Future[FolderOutcome]] = []
+    with ThreadPoolExecutor(max_workers=max(1, options.max_workers), thread_name_prefix="workflow") as executor:
+
+        def submit(folder: Path) -> None:
+            notify(f"Папка готова: {folder.name} — CMM и трансмиттал в очереди.")
+            futures.append(
+                executor.submit(
+                    _process_folder, folder, options, tz_map, catalog, hash_cache, registry_path, messages.put
+                )
+            )
+
+        created_dirs = prepare_index_folders(
+            source_dir,
+            destination_dir,
+            tz_file_path,
+            status_callback=notify,
+            group_by_suffix=options.group_by_suffix,
+            transfer_mode=options.transfer_mode,
+            catalog=catalog,
+            resolver=resolver,
+            on_folder_ready=submit,
+        )
+
+        pending = set(futures)
+        while pending:
+            _done, pending = wait(pending, timeout=STATUS_POLL_SECONDS, return_when=FIRST_COMPLETED)
+            drain()
+
+    drain()
+    try:
+        hash_cache.save()
+    except OSError as error:
+        notify(f"[ПРЕДУПРЕЖДЕНИЕ] Кэш хешей не сохранён: {error}")
+
+    result = WorkflowResult(created_dirs, [future.result() for future in futures])
+    notify(
+        f"Сквозной прогон завершён: папок {len(result.folders)}, "
+        f"с ошибками {len(result.failed)}."
+    )
+    return result
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Группировка по индексам, CMM и трансмиттал для каждой папки без GUI."
+    )
+    parser.add_argument("source_dir", type=Path)
+    parser.add_argument("destination_dir", type=Path)
+    parser.add_argument("--template", type=Path, required=True, help="шаблон трансмиттала (.xltx)")
+    parser.add_argument("--cmm-template", type=Path, default=app.COMMENT_TEMPLATE_PATH)
+    parser.add_argument("--no-cmm", action="store_true", help="не создавать CMM")
+    parser.add_argument("--sender", default=None)
+    parser.add_argument("--mode", choices=TRANSFER_MODES, default=TRANSFER_COPY)
+    parser.add_argument("--group-by-suffix", action="store_true")
+    parser.add_argument("--archive", action="store_true", help="создать ZIP-архив вложений")
+    parser.add_argument("--dedupe", action="store_true", help="одинаковые вложения в архив один раз")
+    parser.add_argument("--volume-mb", type=int, default=0, help="делить архив на тома этого размера")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKFLOW_WORKERS)
+    parser.add_argument("--tz-file", type=Path, default=app.TZ_FILE_PATH)
+    args = parser.parse_args(argv)
+
+    options = WorkflowOptions(
+        transmittal_template=args.template,
+        cmm_template=None if args.no_cmm else args.cmm_template,
+        sender=args.sender,
+        transfer_mode=args.mode,
+        group_by_suffix=args.group_by_suffix,
+        archive=args.archive,
+        dedupe=args.dedupe,
+        volume_budget=args.volume_mb * 1024 * 1024 if args.volume_mb > 0 else None,
+        max_workers=args.workers,
+    )
+    try:
+        result = run_workflow(args.source_dir, args.destination_dir, options, print, tz_file_path=args.tz_file)
+    except (FileNotFoundError, ValueError) as error:
+        # Для групп без суффикса сообщение содержит подсказки из TZ
+        print(f"Ошибка: {error}", file=sys.stderr)
+        return 1
+    for outcome in result.folders:
+        state = f"ошибка: {outcome.error}" if outcome.error else str(outcome.workbook)
+        print(f"{outcome.folder}: {state}", file=sys.stderr if outcome.error else sys.stdout)
+    return 1 if result.failed else 0
+
+
+__all__ = [
+    "DEFAULT_WORKFLOW_WORKERS",
+    "FolderOutcome",
+    "WorkflowOptions",
+    "WorkflowResult",
+    "run_workflow",
+]
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    raise SystemExit(main())
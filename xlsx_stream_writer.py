@@ -0,0 +1,639 @@
+from __future__ import annotations
+
+import html
+import posixpath
+import re
+import zipfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterator, Mapping, Sequence
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+
+from openpyxl.utils.cell import (
+    column_index_from_string,
+    coordinate_from_string,
+    get_column_letter,
+    range_boundaries,
+)
+
+
+CellTransform = Callable[[object | None], object]
+DataRow = Mapping[int, object]
+
+# --- Части пакета OOXML ---
+CONTENT_TYPES_PART = "[Content_Types].xml"
+WORKBOOK_PART = "xl/workbook.xml"
+WORKBOOK_RELS_PART = "xl/_rels/workbook.xml.rels"
+SHARED_STRINGS_PART = "xl/sharedStrings.xml"
+STYLES_PART = "xl/styles.xml"
+TEMPLATE_CONTENT_TYPE = (
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.template.main+xml"
+)
+WORKBOOK_CONTENT_TYPE = (
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"
+)
+PRINT_AREA_NAME = "_xlnm.Print_Area"
+NS_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+NS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+NS_PKG_REL = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+# --- Регулярные выражения для разбора XML листа ---
+RE_SHEET_DATA = re.compile(r"<sheetData\s*/>|<sheetData>(.*?)</sheetData>", re.S)
+RE_ROW = re.compile(r"<row\b([^>]*?)(?:/>|>(.*?)</row>)", re.S)
+RE_CELL = re.compile(r"<c\b([^>]*?)(?:/>|>(.*?)</c>)", re.S)
+RE_ATTR = re.compile(r'([\w:.-]+)="([^"]*)"')
+RE_DIMENSION = re.compile(r'<dimension\b[^>]*?ref="([^"]+)"[^>]*/>')
+RE_MERGE_CELLS = re.compile(r"<mergeCells\b[^>]*?(?:/>|>.*?</mergeCells>)", re.S)
+RE_MERGE_REF = re.compile(r'<mergeCell\b[^>]*?ref="([^"]+)"')
+RE_CELL_XFS = re.compile(r"<cellXfs\b([^>]*)>(.*?)</cellXfs>", re.S)
+RE_XF = re.compile(r"<xf\b([^>]*?)(?:/>|>(.*?)</xf>)", re.S)
+RE_ALIGNMENT = re.compile(r"<alignment\b([^>]*?)(?:/>|>.*?</alignment>)", re.S)
+RE_DEFINED_NAME = re.compile(r"<definedName\b([^>]*)>(.*?)</definedName>", re.S)
+RE_EMPTY_DEFINED_NAMES = re.compile(r"<definedNames\s*/>")
+RE_INLINE_TEXT = re.compile(r"<t\b[^>]*?(?:/>|>(.*?)</t>)", re.S)
+RE_VALUE = re.compile(r"<v>(.*?)</v>", re.S)
+RE_CALC_CHAIN_OVERRIDE = re.compile(r'<Override\b[^>]*PartName="/xl/calcChain\.xml"[^>]*/>')
+RE_CALC_CHAIN_REL = re.compile(r'<Relationship\b[^>]*Type="[^"]*/calcChain"[^>]*/>')
+RE_LINKED_FORMULA = re.compile(r'<f\b[^>]*\b(?:t="(?:shared|array)"|ref=)')
+
+# Элементы, перед которыми по схеме должен стоять <mergeCells>.
+MERGE_CELLS_FOLLOWERS = (
+    "phoneticPr",
+    "conditionalFormatting",
+    "dataValidations",
+    "hyperlinks",
+    "printOptions",
+    "pageMargins",
+    "pageSetup",
+    "headerFooter",
+    "rowBreaks",
+    "colBreaks",
+    "customProperties",
+    "cellWatches",
+    "ignoredErrors",
+    "smartTags",
+    "drawing",
+    "legacyDrawing",
+    "legacyDrawingHF",
+    "picture",
+    "oleObjects",
+    "controls",
+    "webPublishItems",
+    "tableParts",
+    "extLst",
+)
+WRAP_ALIGNMENT_ATTRS = {"horizontal": "center", "vertical": "center", "wrapText": "1"}
+ROW_HEIGHT_ATTRS = ("ht", "customHeight")
+
+
+class StreamTemplateError(ValueError):
+    """Шаблон содержит конструкции, которые потоковая запись не поддерживает."""
+
+
+@dataclass(frozen=True)
+class TransmittalLayout:
+    """Геометрия табличной части трансмиттала в шаблоне."""
+
+    first_data_row: int = 18
+    default_footer_row: int = 20
+    footer_anchor_name: str = "FooterAnchor"
+    style_columns: tuple[int, int] = (2, 16)
+    const_columns: tuple[int, ...] = (13, 14, 15)
+    merge_ranges: tuple[tuple[int, int], ...] = ((3, 8), (9, 12))
+    wrap_columns: tuple[int, ...] = (3, 9)
+    print_area_columns: tuple[str, str] = ("B", "P")
+    print_area_first_row: int = 3
+    volume_column: int = 16  # том архива каждой строки (колонка P)
+
+
+@dataclass
+class _Cell:
+    attrs: dict[str, str]
+    body: str | None = None
+
+
+@dataclass
+class _Row:
+    attrs: dict[str, str]
+    cells: dict[int, _Cell] = field(default_factory=dict)
+
+
+def _parse_attrs(raw: str) -> dict[str, str]:
+    return dict(RE_ATTR.findall(raw))
+
+
+def _format_attrs(attrs: Mapping[str, str]) -> str:
+    return "".join(f' {key}="{value}"' for key, value in attrs.items())
+
+
+def _split_sheet_ref(text: str) -> tuple[str, str]:
+    """Делит ссылку `'Лист'!$B$20` на имя листа и координату без `$`."""
+    sheet, _, coord = text.rpartition("!")
+    sheet = sheet.strip()
+    if sheet.startswith("'") and sheet.endswith("'"):
+        sheet = sheet[1:-1].replace("''", "'")
+    return sheet, coord.replace("$", "").split(":")[0]
+
+
+def _cell_column(ref: str) -> int:
+    return column_index_from_string(coordinate_from_string(ref)[0])
+
+
+def _parse_rows(sheet_data: str) -> dict[int, _Row]:
+    rows: dict[int, _Row] = {}
+    for row_match in RE_ROW.finditer(sheet_data):
+        attrs = _parse_attrs(row_match.group(1))
+        if "r" not in attrs:
+            raise StreamTemplateError("Строка листа без атрибута r.")
+        row = _Row(attrs)
+        for cell_match in RE_CELL.finditer(row_match.group(2) or ""):
+            cell_attrs = _parse_attrs(cell_match.group(1))
+            if "r" not in cell_attrs:
+                raise StreamTemplateError("Ячейка листа без атрибута r.")
+            row.cells[_cell_column(cell_attrs["r"])] = _Cell(
+                cell_attrs, cell_match.group(2)
+            )
+        rows[int(attrs["r"])] = row
+    return rows
+
+
+def _read_shared_strings(xml_bytes: bytes | None) -> list[str]:
+    if xml_bytes is None:
+        return []
+    root = ElementTree.fromstring(xml_bytes)
+    strings: list[str] = []
+    for item in root.iter(f"{{{NS_MAIN}}}si"):
+        parts = [node.text or "" for node in item.findall(f"{{{NS_MAIN}}}t")]
+        for run in item.findall(f"{{{NS_MAIN}}}r"):
+            parts.extend(node.text or "" for node in run.findall(f"{{{NS_MAIN}}}t"))
+        strings.append("".join(parts))
+    return strings
+
+
+def _read_cell_value(cell: _Cell | None, shared_strings: Sequence[str]) -> object | None:
+    """Возвращает значение ячейки так, как его увидел бы openpyxl."""
+    if cell is None or not cell.body:
+        return None
+    cell_type = cell.attrs.get("t", "n")
+    if cell_type == "inlineStr":
+        return html.unescape(
+            "".join(match.group(1) or "" for match in RE_INLINE_TEXT.finditer(cell.body))
+        )
+    value_match = RE_VALUE.search(cell.body)
+    if value_match is None:
+        return None
+    raw = value_match.group(1)
+    if cell_type == "s":
+        return shared_strings[int(raw)]
+    if cell_type in ("str", "e"):
+        return html.unescape(raw)
+    if cell_type == "b":
+        return raw == "1"
+    number = float(raw)
+    return int(number) if number.is_integer() else number
+
+
+def _assign_value(cell: _Cell, value: object | None) -> None:
+    cell.attrs.pop("t", None)
+    if value is None:
+        cell.body = None
+    elif isinstance(value, bool):
+        cell.attrs["t"] = "b"
+        cell.body = f"<v>{int(value)}</v>"
+    elif isinstance(value, (int, float)):
+        cell.attrs["t"] = "n"
+        cell.body = f"<v>{value!r}</v>"
+    else:
+        cell.attrs["t"] = "inlineStr"
+        cell.body = f'<is><t xml:space="preserve">{escape(str(value))}</t></is>'
+
+
+def _set_style(cell: _Cell, style_id: str | None) -> None:
+    if style_id is None:
+        cell.attrs.pop("s", None)
+    else:
+        cell.attrs["s"] = style_id
+
+
+def _render_row(row_number: int, row: _Row) -> str:
+    attrs = {"r": str(row_number)}
+    attrs.update((key, value) for key, value in row.attrs.items() if key != "r")
+    if not row.cells:
+        return f"<row{_format_attrs(attrs)}/>"
+    cells: list[str] = []
+    for column in sorted(row.cells):
+        cell = row.cells[column]
+        cell_attrs = {"r": f"{get_column_letter(column)}{row_number}"}
+        cell_attrs.update((k, v) for k, v in cell.attrs.items() if k != "r")
+        if cell.body is None:
+            cells.append(f"<c{_format_attrs(cell_attrs)}/>")
+        else:
+            cells.append(f"<c{_format_attrs(cell_attrs)}>{cell.body}</c>")
+    return f"<row{_format_attrs(attrs)}>{''.join(cells)}</row>"
+
+
+class _WrapStyles:
+    """Добавляет в cellXfs копии стилей с выравниванием по центру и переносом."""
+
+    def __init__(self, styles_xml: str | None) -> None:
+        self._styles_xml = styles_xml
+        self._match = RE_CELL_XFS.search(styles_xml) if styles_xml else None
+        self._xfs = (
+            [m.group(0) for m in RE_XF.finditer(self._match.group(2))]
+            if self._match
+            else []
+        )
+        self._added: list[str] = []
+        self._cache: dict[str, str] = {}
+
+    def wrapped(self, style_id: str | None) -> str | None:
+        base = style_id or "0"
+        if base in self._cache:
+            return self._cache[base]
+        if self._match is None or int(base) >= len(self._xfs):
+            raise StreamTemplateError("В шаблоне отсутствует таблица стилей cellXfs.")
+
+        xf_match = RE_XF.fullmatch(self._xfs[int(base)])
+        assert xf_match is not None
+        attrs = _parse_attrs(xf_match.group(1))
+        body = xf_match.group(2) or ""
+        alignment = RE_ALIGNMENT.search(body)
+        if alignment and _parse_attrs(alignment.group(1)) == WRAP_ALIGNMENT_ATTRS:
+            self._cache[base] = style_id
+            return style_id
+
+        attrs["applyAlignment"] = "1"
+        alignment_xml = f"<alignment{_format_attrs(WRAP_ALIGNMENT_ATTRS)}/>"
+        self._added.append(
+            f"<xf{_format_attrs(attrs)}>{alignment_xml}{RE_ALIGNMENT.sub('', body)}</xf>"
+        )
+        new_id = str(len(self._xfs) + len(self._added) - 1)
+        self._cache[base] = new_id
+        return new_id
+
+    def render(self) -> str | None:
+        if not self._added or self._match is None or self._styles_xml is None:
+            return None
+        attrs = _parse_attrs(self._match.group(1))
+        attrs["count"] = str(len(self._xfs) + len(self._added))
+        cell_xfs = f"<cellXfs{_format_attrs(attrs)}>{''.join(self._xfs + self._added)}</cellXfs>"
+        start, end = self._match.span()
+        return self._styles_xml[:start] + cell_xfs + self._styles_xml[end:]
+
+
+def _read_global_names(workbook_xml: str) -> dict[str, str]:
+    names: dict[str, str] = {}
+    for match in RE_DEFINED_NAME.finditer(workbook_xml):
+        attrs = _parse_attrs(match.group(1))
+        if "localSheetId" in attrs:
+            continue
+        names.setdefault(html.unescape(attrs.get("name", "")), html.unescape(match.group(2)))
+    return names
+
+
+def _set_defined_name(
+    workbook_xml: str, name: str, text: str, local_sheet_id: int | None = None
+) -> str:
+    """Заменяет или добавляет определённое имя в workbook.xml."""
+    expected_local = None if local_sheet_id is None else str(local_sheet_id)
+    element = f"{escape(text)}</definedName>"
+    for match in RE_DEFINED_NAME.finditer(workbook_xml):
+        attrs = _parse_attrs(match.group(1))
+        if attrs.get("name") == name and attrs.get("localSheetId") == expected_local:
+            replacement = f"<definedName{match.group(1)}>{element}"
+            return workbook_xml[: match.start()] + replacement + workbook_xml[match.end() :]
+
+    attrs = {"name": name}
+    if expected_local is not None:
+        attrs["localSheetId"] = expected_local
+    new_name = f"<definedName{_format_attrs(attrs)}>{element}"
+    if "</definedNames>" in workbook_xml:
+        return workbook_xml.replace("</definedNames>", new_name + "</definedNames>", 1)
+    if RE_EMPTY_DEFINED_NAMES.search(workbook_xml):
+        return RE_EMPTY_DEFINED_NAMES.sub(
+            f"<definedNames>{new_name}</definedNames>", workbook_xml, count=1
+        )
+    return workbook_xml.replace(
+        "</sheets>", f"</sheets><definedNames>{new_name}</definedNames>", 1
+    )
+
+
+def _sheet_parts(workbook_xml: str, rels_xml: str) -> tuple[int, list[tuple[str, str | None]]]:
+    """Возвращает индекс активного листа и пары (имя, часть пакета) всех листов.
+
+    Для листов, которые не являются таблицами (диаграммы), часть — `None`.
+    """
+    workbook = ElementTree.fromstring(workbook_xml)
+    view = workbook.find(f"{{{NS_MAIN}}}bookViews/{{{NS_MAIN}}}workbookView")
+    active_index = int(view.get("activeTab", "0")) if view is not None else 0
+    sheets = workbook.findall(f"{{{NS_MAIN}}}sheets/{{{NS_MAIN}}}sheet")
+    if not sheets:
+        raise StreamTemplateError("В шаблоне нет листов.")
+
+    targets: dict[str, str | None] = {}
+    for rel in ElementTree.fromstring(rels_xml).iter(f"{{{NS_PKG_REL}}}Relationship"):
+        target = rel.get("Target", "")
+        part = target.lstrip("/") if target.startswith("/") else posixpath.normpath(
+            posixpath.join("xl", target)
+        )
+        targets[rel.get("Id", "")] = part if rel.get("Type", "").endswith("/worksheet") else None
+    parts: list[tuple[str, str | None]] = []
+    for sheet in sheets:
+        rel_id = sheet.get(f"{{{NS_REL}}}id", "")
+        if rel_id not in targets:
+            raise StreamTemplateError(f"Не найдена связь {rel_id} для листа {sheet.get('name', '')}.")
+        parts.append((sheet.get("name", ""), targets[rel_id]))
+    return min(active_index, len(sheets) - 1), parts
+
+
+def _row_cell(rows: dict[int, _Row], coord: str) -> _Cell:
+    """Ячейка `coord` среди строк листа; отсутствующие строка и ячейка создаются."""
+    column_letter, row_number = coordinate_from_string(coord)
+    row = rows.setdefault(row_number, _Row({"r": str(row_number)}))
+    return row.cells.setdefault(column_index_from_string(column_letter), _Cell({"r": coord}))
+
+
+def _patch_sheet_values(sheet_xml: str, values: Mapping[str, object]) -> str:
+    """Записывает значения ячеек в XML неактивного листа, не трогая остальное."""
+    sheet_data = RE_SHEET_DATA.search(sheet_xml)
+    if sheet_data is None:
+        raise StreamTemplateError("В листе не найден блок sheetData.")
+    rows = _parse_rows(sheet_data.group(1) or "")
+    for coord, value in values.items():
+        _assign_value(_row_cell(rows, coord), value)
+    body = "".join(_render_row(number, rows[number]) for number in sorted(rows))
+    return f"{sheet_xml[: sheet_data.start()]}<sheetData>{body}</sheetData>{sheet_xml[sheet_data.end() :]}"
+
+
+def _insert_merge_cells(tail: str, merge_refs: Sequence[str]) -> str:
+    merge_xml = ""
+    if merge_refs:
+        refs = "".join(f'<mergeCell ref="{ref}"/>' for ref in merge_refs)
+        merge_xml = f'<mergeCells count="{len(merge_refs)}">{refs}</mergeCells>'
+    if RE_MERGE_CELLS.search(tail):
+        return RE_MERGE_CELLS.sub(merge_xml, tail, count=1)
+    positions = [
+        match.start()
+        for tag in MERGE_CELLS_FOLLOWERS
+        if (match := re.search(rf"<{tag}\b", tail))
+    ]
+    insert_at = min(positions) if positions else tail.rfind("</worksheet>")
+    return tail[:insert_at] + merge_xml + tail[insert_at:]
+
+
+def stream_transmittal(
+    template_path: Path,
+    output_path: Path,
+    rows: Sequence[DataRow],
+    layout: TransmittalLayout | None = None,
+    cell_transforms: Mapping[str, CellTransform] | None = None,
+    sheet_values: Mapping[tuple[str, str], object] | None = None,
+) -> Path:
+    """Записывает трансмиттал, используя шаблон .xltx как каркас пакета.
+
+    Строки данных, стили, объединения, область печати и якорь футера
+    пишутся прямо в XML активного листа; остальные части пакета копируются
+    без изменений. `cell_transforms` пересчитывают значения ячеек шаблона
+    (например, дату), `sheet_values` задают значения ячеек по паре
+    (лист, координата); ячейки других листов правятся в XML этих листов.
+    """
+    layout = layout or TransmittalLayout()
+    with zipfile.ZipFile(template_path) as source:
+        part_names = set(source.namelist())
+        workbook_xml = source.read(WORKBOOK_PART).decode("utf-8")
+        rels_xml = source.read(WORKBOOK_RELS_PART).decode("utf-8")
+        sheet_index, all_sheets = _sheet_parts(workbook_xml, rels_xml)
+        sheet_name, sheet_part = all_sheets[sheet_index]
+        if sheet_part is None:
+            raise StreamTemplateError("Активный лист шаблона не является таблицей.")
+        sheet_xml = source.read(sheet_part).decode("utf-8")
+        styles = _WrapStyles(
+            source.read(STYLES_PART).decode("utf-8") if STYLES_PART in part_names else None
+        )
+        shared_strings = _read_shared_strings(
+            source.read(SHARED_STRINGS_PART) if SHARED_STRINGS_PART in part_names else None
+        )
+
+        sheet_data = RE_SHEET_DATA.search(sheet_xml)
+        if sheet_data is None:
+            raise StreamTemplateError(f"В листе {sheet_part} не найден блок sheetData.")
+        sheet_rows = _parse_rows(sheet_data.group(1) or "")
+        global_names = _read_global_names(workbook_xml)
+
+        sheet_part_by_name = dict(all_sheets)
+        other_sheet_values: dict[str, dict[str, object]] = {}
+        for (dest_sheet, coord), value in (sheet_values or {}).items():
+            if dest_sheet == sheet_name:
+                _assign_value(_row_cell(sheet_rows, coord), value)
+                continue
+            part = sheet_part_by_name.get(dest_sheet)
+            if part is None:
+                raise StreamTemplateError(f"Лист {dest_sheet} не найден или не является таблицей.")
+            other_sheet_values.setdefault(part, {})[coord] = value
+
+        for coord, transform in (cell_transforms or {}).items():
+            cell = _row_cell(sheet_rows, coord)
+            _assign_value(cell, transform(_read_cell_value(cell, shared_strings)))
+
+        footer_row = layout.default_footer_row
+        if layout.footer_anchor_name in global_names:
+            dest_sheet, coord = _split_sheet_ref(global_names[layout.footer_anchor_name])
+            row_digits = re.search(r"\d+", coord)
+            if dest_sheet == sheet_name and row_digits:
+                footer_row = int(row_digits.group(0))
+
+        first_row = layout.first_data_row
+        shift = max(0, len(rows) - (footer_row - first_row))
+        final_footer_row = footer_row + shift
+        if shift:
+            for row_number, row in sheet_rows.items():
+                if row_number >= footer_row and any(
+                    cell.body and RE_LINKED_FORMULA.search(cell.body)
+                    for cell in row.cells.values()
+                ):
+                    raise StreamTemplateError(
+                        f"Строка {row_number} футера содержит общие/массивные формулы."
+                    )
+            sheet_rows = {
+                (number + shift if number >= footer_row else number): row
+                for number, row in sheet_rows.items()
+            }
+
+        template_row = sheet_rows.get(first_row, _Row({"r": str(first_row)}))
+        min_style_col, max_style_col = layout.style_columns
+        template_styles = {
+            column: (
+                template_row.cells[column].attrs.get("s")
+                if column in template_row.cells
+                else None
+            )
+            for column in range(min_style_col, max_style_col + 1)
+        }
+        template_height = (
+            {key: template_row.attrs[key] for key in ROW_HEIGHT_ATTRS if key in template_row.attrs}
+            if "ht" in template_row.attrs
+            else {}
+        )
+        const_cells = {
+            column: _Cell(
+                {k: v for k, v in template_row.cells[column].attrs.items() if k == "t"},
+                template_row.cells[column].body,
+            )
+            for column in layout.const_columns
+            if column in template_row.cells
+        }
+        for cell in const_cells.values():
+            if cell.body and RE_LINKED_FORMULA.search(cell.body):
+                raise StreamTemplateError("Постоянные колонки содержат общие формулы.")
+
+        merge_cols_min = min(start for start, _ in layout.merge_ranges)
+        merge_cols_max = max(end for _, end in layout.merge_ranges)
+        last_data_row = first_row + len(rows) - 1
+        merge_section = RE_MERGE_CELLS.search(sheet_xml, sheet_data.end())
+        merge_refs: list[str] = []
+        for ref in RE_MERGE_REF.findall(merge_section.group(0) if merge_section else ""):
+            min_col, min_row, max_col, max_row = range_boundaries(ref)
+            if min_row >= footer_row:
+                merge_refs.append(
+                    f"{get_column_letter(min_col)}{min_row + shift}:"
+                    f"{get_column_letter(max_col)}{max_row + shift}"
+                )
+                continue
+            touches_data = min_row <= last_data_row and max_row >= first_row
+            touches_cols = not (max_col < merge_cols_min or min_col > merge_cols_max)
+            if rows and touches_data and touches_cols and max_row < final_footer_row:
+                continue
+            merge_refs.append(ref)
+
+        covered_columns = {
+            column
+            for start, end in layout.merge_ranges
+            for column in range(start + 1, end + 1)
+        }
+        for offset in range(len(rows)):
+            row_number = first_row + offset
+            merge_refs.extend(
+                f"{get_column_letter(start)}{row_number}:{get_column_letter(end)}{row_number}"
+                for start, end in layout.merge_ranges
+            )
+
+        occupied_rows = [number for number, row in sheet_rows.items() if row.cells]
+        max_row = max(
+            [last_data_row, *occupied_rows]
+            + [range_boundaries(ref)[3] for ref in merge_refs]
+        )
+
+        def iter_row_xml() -> Iterator[str]:
+            data_rows = range(first_row, last_data_row + 1)
+            for row_number in sorted(set(sheet_rows) | set(data_rows)):
+                row = sheet_rows.get(row_number)
+                if row_number not in data_rows:
+                    assert row is not None
+                    yield _render_row(row_number, row)
+                    continue
+
+                index = row_number - first_row
+                if row is None:
+                    row = _Row({"r": str(row_number)})
+                row.attrs.pop("spans", None)
+                if row_number > first_row:
+                    for key in ROW_HEIGHT_ATTRS:
+                        row.attrs.pop(key, None)
+                    row.attrs.update(template_height)
+                    for column, style_id in template_styles.items():
+                        _set_style(
+                            row.cells.setdefault(column, _Cell({})), style_id
+                        )
+                for column in covered_columns:
+                    if column in row.cells:
+                        _assign_value(row.cells[column], None)
+                for column, value in rows[index].items():
+                    cell = row.cells.setdefault(column, _Cell({}))
+                    _assign_value(cell, value)
+                    if column in layout.wrap_columns:
+                        _set_style(cell, styles.wrapped(cell.attrs.get("s")))
+                for column, const_cell in const_cells.items():
+                    cell = row.cells.setdefault(column, _Cell({}))
+                    cell.attrs.pop("t", None)
+                    cell.attrs.update(const_cell.attrs)
+                    cell.body = const_cell.body
+                yield _render_row(row_number, row)
+                sheet_rows.pop(row_number, None)
+
+        head = sheet_xml[: sheet_data.start()]
+        dimension = RE_DIMENSION.search(head)
+        if dimension:
+            min_col, min_row, max_col, _ = range_boundaries(dimension.group(1))
+            new_ref = (
+                f"{get_column_letter(min_col or 1)}{min_row or 1}:"
+                f"{get_column_letter(max(max_col or 1, max_style_col))}{max_row}"
+            )
+            head = head[: dimension.start(1)] + new_ref + head[dimension.end(1) :]
+        tail = _insert_merge_cells(sheet_xml[sheet_data.end() :], merge_refs)
+
+        quoted_sheet = f"'{sheet_name}'"
+        workbook_xml = _set_defined_name(
+            workbook_xml,
+            layout.footer_anchor_name,
+            f"{quoted_sheet}!$B${final_footer_row}",
+        )
+        first_col, last_col = layout.print_area_columns
+        workbook_xml = _set_defined_name(
+            workbook_xml,
+            PRINT_AREA_NAME,
+            f"{quoted_sheet}!${first_col}${layout.print_area_first_row}:${last_col}${max_row}",
+            local_sheet_id=sheet_index,
+        )
+        content_types = source.read(CONTENT_TYPES_PART).decode("utf-8")
+        content_types = RE_CALC_CHAIN_OVERRIDE.sub(
+            "", content_types.replace(TEMPLATE_CONTENT_TYPE, WORKBOOK_CONTENT_TYPE)
+        )
+
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        # Стили пишутся последними: новые xf появляются только при выводе строк.
+        infos = sorted(source.infolist(), key=lambda item: item.filename == STYLES_PART)
+        with zipfile.ZipFile(output_path, "w", zipfile.ZIP_DEFLATED) as target:
+            for info in infos:
+                name = info.filename
+                if name == "xl/calcChain.xml":
+                    continue
+                if name == sheet_part:
+                    with target.open(_deflated_info(info), "w") as stream:
+                        stream.write(head.encode("utf-8"))
+                        stream.write(b"<sheetData>")
+                        for row_xml in iter_row_xml():
+                            stream.write(row_xml.encode("utf-8"))
+                        stream.write(b"</sheetData>")
+                        stream.write(tail.encode("utf-8"))
+                    continue
+                if name in other_sheet_values:
+                    data = _patch_sheet_values(
+                        source.read(info).decode("utf-8"), other_sheet_values[name]
+                    ).encode("utf-8")
+                elif name == WORKBOOK_PART:
+                    data = workbook_xml.encode("utf-8")
+                elif name == WORKBOOK_RELS_PART:
+                    data = RE_CALC_CHAIN_REL.sub("", rels_xml).encode("utf-8")
+                elif name == CONTENT_TYPES_PART:
+                    data = content_types.encode("utf-8")
+                elif name == STYLES_PART and (styles_xml := styles.render()) is not None:
+                    data = styles_xml.encode("utf-8")
+                else:
+                    data = source.read(info)
+                target.writestr(_deflated_info(info), data)
+    return output_path
+
+
+def _deflated_info(info: zipfile.ZipInfo) -> zipfile.ZipInfo:
+    copy = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+    copy.compress_type = zipfile.ZIP_DEFLATED
+    copy.external_attr = info.external_attr
+    return copy
+
+
+__all__ = [
+    "StreamTemplateError",
+    "TransmittalLayout",
+    "stream_transmittal",
+]